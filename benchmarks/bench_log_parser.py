@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Némesis IA - Benchmark del LogParser
+
+Compara el tokenizador actual contra el parser anterior (dos regex
+completas + datetime.strptime por línea) sobre un archivo de N líneas
+en Common/Combined Log Format.
+
+Uso:
+    python benchmarks/bench_log_parser.py --lines 1000000 --repeat 3
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from logs.log_parser import LogParser
+
+
+@dataclass
+class LegacyParsedLog:
+    """ParsedLog anterior (dataclass sin slots)"""
+    timestamp: datetime
+    source_ip: str
+    method: str
+    path: str
+    status_code: int
+    raw_line: str
+    format_type: str
+
+
+class LegacyLogParser:
+    """Parser anterior (referencia): APACHE_PATTERN, NGINX_PATTERN y strptime"""
+
+    APACHE_PATTERN = re.compile(
+        r'^(?P<ip>[\d\.]+) - - \[(?P<timestamp>[^\]]+)\] '
+        r'"(?P<method>\w+) (?P<path>[^\s]+) HTTP/[\d\.]+" '
+        r'(?P<status>\d+)'
+    )
+
+    NGINX_PATTERN = re.compile(
+        r'^(?P<ip>[\d\.]+) - - \[(?P<timestamp>[^\]]+)\] '
+        r'"(?P<method>\w+) (?P<path>[^\s"]+)'
+    )
+
+    def parse(self, log_line: str):
+        parsed = self._parse_with(self.APACHE_PATTERN, log_line, "apache")
+        if parsed:
+            return parsed
+        return self._parse_with(self.NGINX_PATTERN, log_line, "nginx")
+
+    def _parse_with(self, pattern, log_line: str, format_type: str):
+        match = pattern.match(log_line)
+        if not match:
+            return None
+
+        groups = match.groupdict()
+        return LegacyParsedLog(
+            timestamp=self._parse_timestamp(groups['timestamp']),
+            source_ip=groups['ip'],
+            method=groups['method'],
+            path=groups['path'],
+            status_code=int(groups.get('status') or 200),
+            raw_line=log_line,
+            format_type=format_type
+        )
+
+    def _parse_timestamp(self, timestamp_str: str) -> datetime:
+        try:
+            if '+' in timestamp_str or '-' in timestamp_str:
+                timestamp_str = timestamp_str.split()[0]
+            return datetime.strptime(timestamp_str, "%d/%b/%Y:%H:%M:%S")
+        except Exception:
+            return datetime.now()
+
+
+PATHS = [
+    "/index.html", "/static/app.js", "/static/style.css", "/api/users?page=1",
+    "/search?q=python+tutorial", "/login?user=admin' OR '1'='1'--",
+    "/download?file=../../../etc/passwd", "/health",
+]
+AGENTS = [
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36",
+    "curl/8.4.0", "sqlmap/1.7", "kube-probe/1.28",
+]
+
+
+def generate_log(path: str, n_lines: int, seed: int = 42):
+    """Genera un access.log sintético (mitad Common, mitad Combined)"""
+    rng = random.Random(seed)
+    start = datetime(2025, 12, 4, 10, 0, 0)
+
+    with open(path, 'w') as f:
+        for i in range(n_lines):
+            ts = (start + timedelta(seconds=i // 50)).strftime("%d/%b/%Y:%H:%M:%S +0000")
+            ip = f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+            request = f"GET {rng.choice(PATHS)} HTTP/1.1"
+            status = rng.choice((200, 200, 200, 304, 404, 403))
+            if i % 2:
+                f.write(f'{ip} - - [{ts}] "{request}" {status} {rng.randint(100, 9000)} '
+                        f'"-" "{rng.choice(AGENTS)}"\n')
+            else:
+                f.write(f'{ip} - - [{ts}] "{request}" {status}\n')
+
+
+def run(parser, lines, repeat: int) -> float:
+    """Devuelve líneas por segundo (mejor de `repeat` pasadas)"""
+    parse = parser.parse
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            parse(line)
+        best = min(best, time.perf_counter() - start)
+    return len(lines) / best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark del LogParser")
+    arg_parser.add_argument("--lines", type=int, default=1_000_000)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = os.path.join(tmp, "access.log")
+        print(f"📝 Generando {args.lines:,} líneas...")
+        generate_log(log_file, args.lines)
+
+        with open(log_file) as f:
+            lines = f.read().splitlines()
+
+    legacy_rate = run(LegacyLogParser(), lines, args.repeat)
+    fast_rate = run(LogParser(), lines, args.repeat)
+
+    print("=" * 60)
+    print("📊 BENCHMARK LOG PARSER")
+    print("=" * 60)
+    print(f"Parser anterior:  {legacy_rate:12,.0f} líneas/s")
+    print(f"Tokenizador:      {fast_rate:12,.0f} líneas/s")
+    print(f"Speedup:          {fast_rate / legacy_rate:12.1f}x")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,28 @@ Némesis IA - Core Module
 
 Este módulo contiene los componentes principales del sistema:
 - NemesisAgent: Agente autónomo de detección
-- ThreatEvent: Clase de datos para eventos
+- ThreatEvent: Evento tipado (alias de logs.ParsedLog)
 - ThreatVerdict: Clase de datos para veredictos
+- DetectionWorkerPool: Detección multiproceso particionada por IP
+- VerdictCache: Caché LRU de veredictos por payload
+- ModelReloader: Recarga en caliente del modelo (canario + rollback)
+- PrefilterCascade: Primera etapa barata que resuelve lo obviamente legítimo
+- BehaviorStore: Features de comportamiento por IP (O(1) por evento, con TTL)
 
 Copyright (C) 2025 Némesis AI Project Contributors
 Licensed under GPL-3.0
 """
 
 from .nemesis_agent import NemesisAgent, ThreatEvent, ThreatVerdict
+from .worker_pool import DetectionWorkerPool
+from .verdict_cache import VerdictCache
+from .model_reloader import ModelReloader
+from .prefilter import PrefilterCascade
+from .behavior_store import BehaviorStore, BEHAVIOR_FEATURES
 
-__all__ = ["NemesisAgent", "ThreatEvent", "ThreatVerdict"]
+__all__ = [
+    "NemesisAgent", "ThreatEvent", "ThreatVerdict",
+    "DetectionWorkerPool", "VerdictCache", "ModelReloader",
+    "PrefilterCascade", "BehaviorStore", "BEHAVIOR_FEATURES",
+]
 __version__ = "1.0.0"
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Némesis IA - Behavior Store
+Capítulo 1: El Agente Némesis
+
+Features de comportamiento por IP de origen, actualizadas en O(1) por
+evento y sin consultar la base de datos durante la inferencia:
+
+- request_rate: peticiones/segundo (contador con decaimiento exponencial)
+- distinct_paths: rutas distintas en la ventana reciente (linear counting
+  sobre un bitmap de 256 bits, rotado cada `window` segundos)
+- error_ratio: fracción de respuestas 4xx/5xx (mismo decaimiento)
+- mean_interarrival: tiempo entre peticiones (media móvil exponencial)
+
+El tiempo es el del log (event.timestamp), así que reprocesar un
+histórico da las mismas features que verlo en directo. La memoria está
+acotada: como mucho `max_ips` entradas (LRU) y las IPs sin actividad
+durante `ttl` segundos se expulsan.
+
+Copyright (C) 2025 Némesis AI Project Contributors
+Licensed under GPL-3.0
+"""
+
+import logging
+import math
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+BEHAVIOR_FEATURES = ("request_rate", "distinct_paths", "error_ratio", "mean_interarrival")
+
+
+class _IPState:
+    """Contadores de una IP (slots: ~100 bytes por IP)"""
+
+    __slots__ = ("last_seen", "requests", "errors", "gap", "paths", "previous_paths", "window_start")
+
+    def __init__(self, timestamp: float):
+        self.last_seen = timestamp
+        self.requests = 0.0
+        self.errors = 0.0
+        self.gap: Optional[float] = None
+        self.paths = 0
+        self.previous_paths = 0
+        self.window_start = timestamp
+
+
+class BehaviorStore:
+    """Features de comportamiento por IP con memoria acotada"""
+
+    MAX_IPS = 100000
+    HALF_LIFE = 60.0
+    WINDOW = 300.0
+    TTL = 1800.0
+    GAP_SMOOTHING = 0.2
+    SKETCH_BITS = 256  # _sketch_bit devuelve 8 bits
+
+    def __init__(
+        self,
+        max_ips: int = MAX_IPS,
+        half_life: float = HALF_LIFE,
+        window: float = WINDOW,
+        ttl: float = TTL,
+        gap_smoothing: float = GAP_SMOOTHING
+    ):
+        """
+        Inicializa el almacén
+
+        Args:
+            max_ips: IPs seguidas como máximo (se expulsa la menos reciente)
+            half_life: Semivida en segundos de los contadores de peticiones y errores
+            window: Ventana en segundos del conteo de rutas distintas
+            ttl: Segundos sin actividad tras los que se olvida una IP
+            gap_smoothing: Peso de cada nuevo intervalo en mean_interarrival
+        """
+        self.max_ips = max_ips
+        self.half_life = half_life
+        self.window = window
+        self.ttl = ttl
+        self.gap_smoothing = gap_smoothing
+
+        self._decay_rate = math.log(2) / half_life
+        self._states: "OrderedDict[str, _IPState]" = OrderedDict()
+        self._clock = 0.0
+
+        self.updates = 0
+        self.expired = 0
+        self.evicted = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> Optional["BehaviorStore"]:
+        """
+        Crea el almacén desde un diccionario de configuración (p. ej. YAML)
+
+        Args:
+            config: {"enabled": bool, "max_ips": int, "half_life": float, ...}
+
+        Returns:
+            BehaviorStore o None si no está habilitado
+        """
+        if not config or not config.get("enabled", True):
+            return None
+
+        options = {key: value for key, value in config.items() if key != "enabled"}
+        return cls(**options)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def update(self, source_ip: str, path: str, status_code: int, timestamp: float) -> List[float]:
+        """
+        Registra una petición y retorna las features de la IP tras ella
+
+        Args:
+            source_ip: IP de origen
+            path: Ruta pedida (la query se ignora)
+            status_code: Código de respuesta (0 = desconocido)
+            timestamp: Instante del log (segundos epoch)
+
+        Returns:
+            Features en el orden de BEHAVIOR_FEATURES
+        """
+        states = self._states
+        state = states.get(source_ip)
+
+        if state is None:
+            state = _IPState(timestamp)
+            states[source_ip] = state
+            elapsed = 0.0
+        else:
+            states.move_to_end(source_ip)
+            # Logs ligeramente desordenados: nunca hacia atrás
+            elapsed = max(timestamp - state.last_seen, 0.0)
+            if state.gap is None:
+                state.gap = elapsed
+            else:
+                state.gap += self.gap_smoothing * (elapsed - state.gap)
+
+        decay = math.exp(-self._decay_rate * elapsed)
+        state.requests = state.requests * decay + 1.0
+        state.errors = state.errors * decay + (status_code >= 400)
+        state.last_seen = max(state.last_seen, timestamp)
+
+        # Ventanas de rutas: la actual y la anterior
+        since_window = state.last_seen - state.window_start
+        if since_window >= self.window:
+            state.previous_paths = state.paths if since_window < 2 * self.window else 0
+            state.paths = 0
+            state.window_start = state.last_seen
+        state.paths |= 1 << _sketch_bit(path)
+
+        self.updates += 1
+        if timestamp > self._clock:
+            self._clock = timestamp
+        self._evict()
+
+        return [
+            state.requests * self._decay_rate,
+            self._distinct(state.paths | state.previous_paths),
+            state.errors / state.requests,
+            self.ttl if state.gap is None else state.gap,
+        ]
+
+    def observe(self, events: Sequence) -> np.ndarray:
+        """
+        Registra un lote de eventos (en orden) y retorna sus features
+
+        Args:
+            events: Eventos (con source_ip, path, status_code, timestamp)
+
+        Returns:
+            Array (n, 4): features de la IP de cada evento justo tras él
+        """
+        update = self.update
+        rows = [
+            update(event.source_ip, event.path, event.status_code, _epoch(event.timestamp))
+            for event in events
+        ]
+        return np.array(rows, dtype=np.float64).reshape(len(rows), len(BEHAVIOR_FEATURES))
+
+    def features(self, source_ip: str, timestamp: Optional[float] = None) -> List[float]:
+        """
+        Features actuales de una IP sin registrar ninguna petición
+
+        Args:
+            source_ip: IP de origen
+            timestamp: Instante de la consulta (None = último evento visto)
+
+        Returns:
+            Features en el orden de BEHAVIOR_FEATURES (sin intervalo
+            conocido, mean_interarrival = ttl)
+        """
+        state = self._states.get(source_ip)
+        if state is None:
+            return [0.0, 0.0, 0.0, self.ttl]
+
+        now = self._clock if timestamp is None else timestamp
+        decay = math.exp(-self._decay_rate * max(now - state.last_seen, 0.0))
+        since_window = now - state.window_start
+        if since_window < self.window:
+            paths = state.paths | state.previous_paths
+        else:
+            paths = state.paths if since_window < 2 * self.window else 0
+
+        return [
+            state.requests * decay * self._decay_rate,
+            self._distinct(paths),
+            state.errors / state.requests,
+            self.ttl if state.gap is None else state.gap,
+        ]
+
+    def _distinct(self, bitmap: int) -> float:
+        """Estimación de rutas distintas (linear counting)"""
+        bits = self.SKETCH_BITS
+        zeros = bits - bitmap.bit_count()
+        return bits * math.log(bits / max(zeros, 1))
+
+    def _evict(self) -> None:
+        """Expulsa IPs inactivas (TTL) y las menos recientes si se supera max_ips"""
+        states = self._states
+        horizon = self._clock - self.ttl
+
+        # Orden de actualización: las inactivas están al principio
+        while states:
+            ip, state = next(iter(states.items()))
+            if state.last_seen >= horizon:
+                break
+            del states[ip]
+            self.expired += 1
+
+        while len(states) > self.max_ips:
+            states.popitem(last=False)
+            self.evicted += 1
+
+    def clear(self) -> None:
+        """Olvida todas las IPs"""
+        self._states.clear()
+
+    @property
+    def stats(self) -> Dict:
+        """Retorna estadísticas del almacén"""
+        return {
+            "tracked_ips": len(self._states),
+            "max_ips": self.max_ips,
+            "updates": self.updates,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+def _sketch_bit(path: str) -> int:
+    """Bit del bitmap de rutas (la query se ignora)"""
+    # Los bits bajos de crc32 se reparten mal entre rutas parecidas
+    # (/admin1, /admin2...): se mezclan con un producto de Fibonacci
+    crc = zlib.crc32(path.partition("?")[0].encode())
+    return ((crc * 0x9E3779B1) & 0xFFFFFFFF) >> 24
+
+
+def _epoch(timestamp) -> float:
+    """Segundos epoch de un datetime (o número)"""
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    return float(timestamp)
+
+
+def replay_features(events: Sequence, **options) -> np.ndarray:
+    """
+    Features de comportamiento de un histórico, como las vería el agente
+
+    Reproduce los eventos en orden temporal sobre un almacén nuevo (para
+    entrenar con exactamente las mismas features que en inferencia).
+
+    Args:
+        events: Eventos del histórico
+        **options: Parámetros de BehaviorStore
+
+    Returns:
+        Array (n, 4) alineado con events
+    """
+    order = sorted(range(len(events)), key=lambda i: _epoch(events[i].timestamp))
+    rows = BehaviorStore(**options).observe([events[i] for i in order])
+
+    result = np.empty_like(rows)
+    result[order] = rows
+    return result
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Némesis IA - Model Reloader
+Capítulo 1: El Agente Némesis
+
+Recarga en caliente del modelo de detección. El nuevo modelo se carga,
+se valida y se prueba con un lote canario (tráfico reciente) en un hilo
+de fondo, comparando latencia y veredictos con el modelo activo. Solo si
+pasa se cambia la referencia que usa el agente (una asignación, atómica
+para el hilo de detección, que nunca espera a la carga). Si el modelo
+nuevo falla en sus primeros lotes, se vuelve al anterior.
+
+Copyright (C) 2025 Némesis AI Project Contributors
+Licensed under GPL-3.0
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from ml.batch_features import text_statistics
+from ml.compiled_forest import compiled_path
+from ml.pattern_matcher import identify_attack_type
+
+logger = logging.getLogger(__name__)
+
+
+# Canario por defecto si todavía no ha pasado tráfico por el agente
+DEFAULT_CANARY = [
+    "GET /index.html HTTP/1.1",
+    "GET /api/users?page=1&limit=10 HTTP/1.1",
+    "GET /search?q=python+tutorial HTTP/1.1",
+    "POST /login HTTP/1.1",
+    "GET /login?user=admin' OR '1'='1'-- HTTP/1.1",
+    "GET /products?id=1' UNION SELECT * FROM users-- HTTP/1.1",
+    "GET /search?q=<script>alert('XSS')</script> HTTP/1.1",
+    "GET /download?file=../../../etc/passwd HTTP/1.1",
+    "GET /ping?host=127.0.0.1;cat /etc/passwd HTTP/1.1",
+]
+
+
+class ModelReloader:
+    """Carga, valida, prueba y activa modelos nuevos sin parar la detección"""
+
+    CANARY_SIZE = 256
+    MIN_AGREEMENT = 0.5
+    MAX_LATENCY_RATIO = 5.0
+    CANARY_RUNS = 5
+    PROBATION_BATCHES = 20
+
+    def __init__(
+        self,
+        agent,
+        canary_size: int = CANARY_SIZE,
+        min_agreement: float = MIN_AGREEMENT,
+        max_latency_ratio: float = MAX_LATENCY_RATIO,
+        canary_runs: int = CANARY_RUNS,
+        probation_batches: int = PROBATION_BATCHES
+    ):
+        """
+        Inicializa el recargador
+
+        Args:
+            agent: NemesisAgent cuyo modelo se gestiona
+            canary_size: Payloads recientes que forman el lote canario
+            min_agreement: Fracción mínima de veredictos iguales al modelo
+                activo (o a las reglas si no hay modelo)
+            max_latency_ratio: Latencia máxima del canario respecto al
+                modelo activo
+            canary_runs: Ejecuciones cronometradas del canario por modelo
+                (se compara la mediana)
+            probation_batches: Lotes tras el cambio en los que un error
+                provoca la vuelta al modelo anterior
+        """
+        self.agent = agent
+        self.min_agreement = min_agreement
+        self.max_latency_ratio = max_latency_ratio
+        self.canary_runs = max(canary_runs, 1)
+        self.probation_batches = probation_batches
+
+        self._recent: deque = deque(maxlen=canary_size)
+        self._recent_behavior: deque = deque(maxlen=canary_size)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Optional[Future] = None
+        self._lock = threading.Lock()
+
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watch_stop = threading.Event()
+
+        # Modelo anterior (para rollback) y lotes restantes en periodo de prueba
+        self._previous: Optional[tuple] = None
+        self._probation = 0
+
+        self.last_report: Dict = {}
+        self.swaps = 0
+        self.rejected = 0
+        self.rollbacks = 0
+
+    def record(self, events: Iterable, behavior: Optional[np.ndarray] = None) -> None:
+        """
+        Guarda payloads recientes para el próximo lote canario
+
+        Args:
+            events: Eventos analizados
+            behavior: Sus features de comportamiento (si el agente las tiene)
+        """
+        self._recent.extend(event.payload for event in events)
+        if behavior is None:
+            self._recent_behavior.clear()
+        else:
+            self._recent_behavior.extend(behavior)
+
+    def reload(self, model_path: Optional[str] = None) -> Future:
+        """
+        Programa la recarga del modelo en un hilo de fondo
+
+        Si ya hay una recarga en curso, devuelve esa misma.
+
+        Args:
+            model_path: Nuevo modelo (None = recargar la ruta actual)
+
+        Returns:
+            Future con el informe de la recarga (ver _reload)
+        """
+        with self._lock:
+            if self._pending is not None and not self._pending.done():
+                return self._pending
+
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="nemesis-model-reload"
+                )
+
+            self._pending = self._executor.submit(
+                self._reload, model_path or self.agent.model_path
+            )
+            return self._pending
+
+    def _reload(self, model_path: str) -> Dict:
+        """Carga, valida, prueba y (si pasa) activa el modelo"""
+        report = {"model_path": str(model_path), "accepted": False}
+        logger.info(f"🔄 Recargando modelo desde {model_path}...")
+
+        try:
+            start = time.perf_counter()
+            brain, model_format = self.agent._read_model(model_path)
+            report["format"] = model_format
+            report["load_ms"] = (time.perf_counter() - start) * 1000
+
+            if brain is None:
+                raise ValueError("no se pudo cargar el modelo")
+
+            report.update(self._canary(brain))
+
+            if report["agreement"] < self.min_agreement:
+                raise ValueError(
+                    f"veredictos del canario demasiado distintos "
+                    f"({report['agreement']:.0%} < {self.min_agreement:.0%})"
+                )
+
+            ratio = report.get("latency_ratio")
+            if ratio is not None and ratio > self.max_latency_ratio:
+                raise ValueError(f"canario {ratio:.1f}x más lento que el modelo activo")
+
+        except Exception as e:
+            self.rejected += 1
+            report["reason"] = str(e)
+            self.last_report = report
+            logger.warning(f"⚠️  Modelo nuevo rechazado, se mantiene el actual: {e}")
+            return report
+
+        self._swap(brain, model_path, report)
+        report["accepted"] = True
+        self.last_report = report
+        return report
+
+    def _canary(self, brain) -> Dict:
+        """
+        Ejecuta el lote canario con el modelo nuevo y el activo
+
+        Tras calentar ambos, se cronometran canary_runs ejecuciones
+        alternas de cada uno y se comparan las medianas: una sola medida
+        desde este hilo depende de quién tenga el GIL en ese momento.
+
+        Returns:
+            Tamaño, latencias, ratio de latencia y fracción de veredictos iguales
+        """
+        payloads: List[str] = list(self._recent) or list(DEFAULT_CANARY)
+        text = text_statistics(payloads)
+        behavior = (
+            np.array(self._recent_behavior)
+            if len(self._recent_behavior) == len(payloads) else None
+        )
+
+        # Validación (probabilidades bien formadas) y calentamiento
+        features = self._canary_features(brain, text, behavior)
+        new_predictions = self._predict(brain, features)
+
+        current = self.agent._ai_brain
+        if current is not None:
+            try:
+                current_features = self._canary_features(current, text, behavior)
+                current_predictions = self._predict(current, current_features)
+            except Exception:
+                current = None
+
+        new_times, current_times = [], []
+        for _ in range(self.canary_runs):
+            new_times.append(self._timed_predict(brain, features))
+            if current is not None:
+                current_times.append(self._timed_predict(current, current_features))
+
+        new_ms = float(np.median(new_times))
+        result = {"canary_size": len(payloads), "canary_ms": new_ms}
+
+        if current is not None:
+            current_ms = float(np.median(current_times))
+            result["current_ms"] = current_ms
+            result["latency_ratio"] = new_ms / max(current_ms, 1e-6)
+        else:
+            # Sin modelo activo utilizable: comparar con las reglas
+            current_predictions = np.array([
+                identify_attack_type(p) != "UNKNOWN" for p in payloads
+            ])
+
+        result["agreement"] = float(np.mean(new_predictions == current_predictions))
+        return result
+
+    @staticmethod
+    def _timed_predict(brain, features: np.ndarray) -> float:
+        """Milisegundos de un predict_proba"""
+        start = time.perf_counter()
+        brain.predict_proba(features)
+        return (time.perf_counter() - start) * 1000
+
+    @staticmethod
+    def _canary_features(brain, text: np.ndarray, behavior: Optional[np.ndarray]) -> np.ndarray:
+        """Features del canario para un modelo (con comportamiento si lo espera)"""
+        if behavior is not None and getattr(brain, "n_features_in_", None) == text.shape[1] + behavior.shape[1]:
+            return np.hstack((text, behavior))
+        return text
+
+    @staticmethod
+    def _predict(brain, features: np.ndarray) -> np.ndarray:
+        """Clase maliciosa (True/False) por fila, validando la salida"""
+        probabilities = np.asarray(brain.predict_proba(features))
+        classes = np.asarray(brain.classes_)
+
+        if probabilities.shape != (len(features), len(classes)):
+            raise ValueError(f"predict_proba devolvió forma {probabilities.shape}")
+        if not np.all(np.isfinite(probabilities)):
+            raise ValueError("predict_proba devolvió valores no finitos")
+
+        return classes[probabilities.argmax(axis=1)] == 1
+
+    def _swap(self, brain, model_path: str, report: Dict) -> None:
+        """Activa el modelo validado (una asignación de referencia)"""
+        agent = self.agent
+        self._previous = (agent._ai_brain, agent.model_path, agent.model_stats)
+
+        agent.model_path = str(model_path)
+        agent.model_stats = {"format": report["format"], "load_ms": report["load_ms"]}
+        agent._ai_brain = brain
+
+        # Nueva versión de caché: los veredictos del modelo anterior quedan
+        # inaccesibles y salen por LRU (no se limpia la caché desde este
+        # hilo para no competir con el de detección)
+        agent._model_version += 1
+
+        self._probation = self.probation_batches
+        self.swaps += 1
+        logger.info(
+            f"✅ Modelo activado: {model_path} ({report['format']}, "
+            f"canario {report['canary_size']} payloads, "
+            f"{report['agreement']:.0%} de acuerdo)"
+        )
+
+    def rollback(self, reason: str = "manual") -> bool:
+        """
+        Vuelve al modelo anterior al último cambio
+
+        Args:
+            reason: Motivo (para el log)
+
+        Returns:
+            True si había un modelo anterior
+        """
+        if self._previous is None:
+            return False
+
+        agent = self.agent
+        brain, model_path, model_stats = self._previous
+        self._previous = None
+        self._probation = 0
+
+        agent.model_path = model_path
+        agent.model_stats = model_stats
+        agent._ai_brain = brain
+        agent._model_version += 1
+
+        self.rollbacks += 1
+        logger.warning(f"↩️  Rollback al modelo anterior ({model_path}): {reason}")
+        return True
+
+    def batch_succeeded(self) -> None:
+        """Un lote ML correcto acerca el fin del periodo de prueba"""
+        if self._probation:
+            self._probation -= 1
+            if not self._probation:
+                self._previous = None
+
+    def batch_failed(self, error: Exception) -> None:
+        """Un error durante el periodo de prueba revierte el cambio"""
+        if self._probation:
+            self.rollback(f"error en detección: {error}")
+
+    def watch(self, interval: float = 5.0) -> None:
+        """
+        Vigila el archivo del modelo (y su versión compilada) y recarga al cambiar
+
+        Args:
+            interval: Segundos entre comprobaciones
+        """
+        if self._watch_thread is not None and self._watch_thread.is_alive():
+            return
+
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(
+            target=self._watch_loop, args=(interval,),
+            name="nemesis-model-watch", daemon=True
+        )
+        self._watch_thread.start()
+        logger.info(f"👀 Vigilando {self.agent.model_path} (cada {interval}s)")
+
+    def _signature(self) -> tuple:
+        """Identidad de los archivos del modelo (inode, tamaño, mtime)"""
+        signature = []
+        for path in (Path(self.agent.model_path), compiled_path(self.agent.model_path)):
+            try:
+                st = os.stat(path)
+                signature.append((st.st_ino, st.st_size, st.st_mtime_ns))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _watch_loop(self, interval: float) -> None:
+        """Detecta cambios y recarga cuando el archivo deja de cambiar"""
+        last = self._signature()
+        changed = None
+
+        while not self._watch_stop.wait(interval):
+            current = self._signature()
+
+            if current != last:
+                # Esperar un intervalo sin cambios (copia a medio escribir)
+                last, changed = current, current
+                continue
+
+            if changed is not None and any(changed):
+                changed = None
+                self.reload().result()
+
+    def close(self) -> None:
+        """Detiene la vigilancia y el hilo de recarga"""
+        self._watch_stop.set()
+        if self._watch_thread is not None:
+            self._watch_thread.join(timeout=5)
+            self._watch_thread = None
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    @property
+    def stats(self) -> Dict:
+        """Retorna estadísticas de recarga"""
+        return {
+            "swaps": self.swaps,
+            "rejected": self.rejected,
+            "rollbacks": self.rollbacks,
+            "in_probation": self._probation > 0,
+            "last_report": dict(self.last_report),
+        }
+
@@ -16,14 +16,26 @@ the Free Software Foundation, either version 3 of the License, or
 
 import asyncio
 import logging
-import math
-from collections import Counter
+import signal
+import sys
+import time
+from concurrent.futures import Future
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
 import joblib
+import numpy as np
+
+from core.behavior_store import BEHAVIOR_FEATURES, BehaviorStore
+from core.model_reloader import ModelReloader
+from core.prefilter import PrefilterCascade
+from core.verdict_cache import VerdictCache
+from logs.log_parser import LogParser, ParsedLog
+from ml.batch_features import TEXT_FEATURES, shannon_entropy, text_statistics
+from ml.compiled_forest import CompiledForest, compiled_path
+from ml.pattern_matcher import identify_attack_type
 
 logging.basicConfig(
     level=logging.INFO,
@@ -32,14 +44,37 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-@dataclass
-class ThreatEvent:
-    """Representa un evento de amenaza detectado"""
-    timestamp: datetime
-    source_ip: str
-    payload: str
-    log_line: str
-    severity: str = "UNKNOWN"
+def _process_memory() -> dict:
+    """
+    Memoria residente del proceso en MB
+    
+    shared_mb son las páginas respaldadas por archivo (código, librerías
+    y modelos mapeados), que se comparten entre procesos.
+    """
+    memory = {"rss_mb": 0.0, "shared_mb": 0.0}
+    
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    memory["rss_mb"] = int(line.split()[1]) / 1024
+                elif line.startswith("RssFile:"):
+                    memory["shared_mb"] = int(line.split()[1]) / 1024
+    except OSError:
+        # Sin /proc (macOS, Windows): solo el pico de RSS
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            memory["rss_mb"] = peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+        except ImportError:
+            pass
+    
+    return memory
+
+
+# Evento de amenaza: es el mismo registro tipado que produce LogParser,
+# así cada línea se parsea una sola vez en todo el pipeline
+ThreatEvent = ParsedLog
 
 
 @dataclass
@@ -66,7 +101,11 @@ class NemesisAgent:
         self,
         model_path: str = "models/nemesis_brain.joblib",
         threshold: float = 0.9,
-        network_interface: str = "eth0"
+        network_interface: str = "eth0",
+        verdict_cache_size: int = VerdictCache.MAX_ENTRIES,
+        model_watch_interval: Optional[float] = None,
+        prefilter: Optional[PrefilterCascade] = None,
+        behavior_store: Optional[BehaviorStore] = None
     ) -> None:
         """
         Inicializa el Agente Némesis
@@ -75,16 +114,37 @@ class NemesisAgent:
             model_path: Ruta al modelo ML entrenado
             threshold: Umbral de confianza para detección
             network_interface: Interface de red a monitorear
+            verdict_cache_size: Veredictos cacheados por payload (0 = sin caché)
+            model_watch_interval: Segundos entre comprobaciones del archivo
+                del modelo para recargarlo en caliente (None = no vigilar)
+            prefilter: Cascada de primera etapa que resuelve el tráfico
+                obviamente legítimo sin ML (None = todo pasa por el modelo)
+            behavior_store: Features de comportamiento por IP; los modelos
+                entrenados con ellas (3 + 4 columnas) las reciben
+                tras las de payload (None = solo features de payload)
         """
+        # Caché de veredictos: se invalida al cambiar modelo o umbral
+        self._verdict_cache: Optional[VerdictCache] = (
+            VerdictCache(max_entries=verdict_cache_size)
+            if verdict_cache_size > 0 else None
+        )
+        self._model_version: int = 0
+        
         self.model_path = model_path
         self.threshold = threshold
         self._network_interface = network_interface
         
         # Estado interno
         self._ai_brain: Optional[object] = None
+        self.model_stats: dict = {}
+        self.model_watch_interval = model_watch_interval
+        self._reloader = ModelReloader(self)
+        self._prefilter = prefilter
+        self._behavior = behavior_store
         self._is_running: bool = False
         self._threats_detected: int = 0
         self._whitelist_ips: set = {"127.0.0.1", "::1"}
+        self._parser = LogParser()
         
         logger.info(
             f"Némesis Agent initialized on interface {network_interface} "
@@ -98,6 +158,14 @@ class NemesisAgent:
         # Cargar modelo ML
         self._load_ai_brain()
         
+        # Recarga en caliente: vigilar el archivo y/o SIGHUP
+        if self.model_watch_interval:
+            self.watch_model(self.model_watch_interval)
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, self.reload_model)
+        except (AttributeError, NotImplementedError, RuntimeError):
+            pass
+        
         self._is_running = True
         
         logger.info("✅ Agente Némesis activo y vigilante")
@@ -112,27 +180,172 @@ class NemesisAgent:
         """Detiene el agente"""
         logger.info("⏸️  Deteniendo Agente Némesis...")
         self._is_running = False
+        self._reloader.close()
         await asyncio.sleep(1)
         logger.info("✅ Agente detenido")
     
+    @property
+    def threshold(self) -> float:
+        """Umbral de confianza para BLOCK"""
+        return self._threshold
+    
+    @threshold.setter
+    def threshold(self, value: float) -> None:
+        self._threshold = value
+        self._invalidate_verdicts()
+    
+    @property
+    def cache_stats(self) -> dict:
+        """Estadísticas de la caché de veredictos"""
+        if self._verdict_cache is None:
+            return {}
+        return self._verdict_cache.stats
+    
+    @property
+    def prefilter_stats(self) -> dict:
+        """Estadísticas del prefiltro (fracción resuelta sin ML, auditoría)"""
+        if self._prefilter is None:
+            return {}
+        return self._prefilter.stats
+    
+    @property
+    def behavior_stats(self) -> dict:
+        """Estadísticas del almacén de comportamiento por IP"""
+        if self._behavior is None:
+            return {}
+        return self._behavior.stats
+    
+    def _uses_behavior(self, brain: Optional[object]) -> bool:
+        """True si el modelo espera también las features de comportamiento"""
+        return (
+            self._behavior is not None
+            and getattr(brain, "n_features_in_", None) == len(TEXT_FEATURES) + len(BEHAVIOR_FEATURES)
+        )
+    
+    def _invalidate_verdicts(self) -> None:
+        """Descarta los veredictos cacheados (nuevo modelo o umbral)"""
+        self._model_version += 1
+        if self._verdict_cache is not None:
+            self._verdict_cache.clear()
+    
     def _load_ai_brain(self) -> None:
-        """Carga el modelo de Machine Learning"""
+        """
+        Carga el modelo de Machine Learning
+        
+        Prefiere el bosque compilado (.forest.npz), que se mapea en memoria:
+        todos los procesos del host comparten sus páginas y la carga no
+        deserializa nada. El tiempo de carga y la memoria del proceso
+        quedan en model_stats.
+        """
         logger.info(f"🧠 Cargando cerebro AI desde {self.model_path}...")
         
-        model_file = Path(self.model_path)
+        memory_before = _process_memory()
+        start = time.perf_counter()
+        self._ai_brain, model_format = self._read_model(self.model_path)
+        load_seconds = time.perf_counter() - start
+        memory_after = _process_memory()
+        
+        self.model_stats = {
+            "format": model_format,
+            "load_ms": load_seconds * 1000,
+            "rss_mb": memory_after["rss_mb"],
+            "rss_delta_mb": memory_after["rss_mb"] - memory_before["rss_mb"],
+            "shared_mb": memory_after["shared_mb"],
+        }
+        
+        if model_format:
+            logger.info(
+                f"📏 Modelo ({model_format}) cargado en {self.model_stats['load_ms']:.1f} ms | "
+                f"RSS {self.model_stats['rss_mb']:.1f} MB "
+                f"({self.model_stats['rss_delta_mb']:+.1f} MB, "
+                f"{self.model_stats['shared_mb']:.1f} MB compartidos)"
+            )
+        
+        # Los veredictos del modelo anterior ya no valen
+        self._invalidate_verdicts()
+    
+    @staticmethod
+    def _read_model(model_path: str) -> Tuple[Optional[object], Optional[str]]:
+        """
+        Carga un modelo sin activarlo
+        
+        Args:
+            model_path: Ruta del modelo joblib (se prefiere su .forest.npz)
+            
+        Returns:
+            (modelo, "compiled-mmap" | "joblib"), o (None, None) para usar
+            detección basada en reglas
+        """
+        model_file = Path(model_path)
+        compiled_file = compiled_path(model_file)
+        
+        # Preferir el bosque compilado (sin sobrecarga de sklearn) si no es
+        # más antiguo que el modelo joblib
+        if compiled_file.exists() and (
+            not model_file.exists()
+            or compiled_file.stat().st_mtime >= model_file.stat().st_mtime
+        ):
+            try:
+                brain = CompiledForest.load(compiled_file, mmap=True)
+                logger.info(f"✅ Cerebro AI cargado (bosque compilado: {compiled_file})")
+                return brain, "compiled-mmap"
+            except Exception as e:
+                logger.warning(f"⚠️  Error cargando bosque compilado: {e}")
+        elif compiled_file.exists():
+            logger.warning(f"⚠️  Bosque compilado desactualizado, se ignora: {compiled_file}")
         
         if model_file.exists():
             try:
-                self._ai_brain = joblib.load(self.model_path)
+                brain = joblib.load(model_path)
                 logger.info("✅ Cerebro AI cargado")
+                return brain, "joblib"
             except Exception as e:
                 logger.warning(f"⚠️  Error cargando modelo: {e}")
                 logger.info("📋 Usando detección basada en reglas")
-                self._ai_brain = None
         else:
-            logger.warning(f"⚠️  Modelo no encontrado en {self.model_path}")
+            logger.warning(f"⚠️  Modelo no encontrado en {model_path}")
             logger.info("📋 Usando detección basada en reglas")
-            self._ai_brain = None
+        
+        return None, None
+    
+    def reload_model(self, model_path: Optional[str] = None) -> Future:
+        """
+        Recarga el modelo en caliente (hilo de fondo)
+        
+        El modelo nuevo se valida y se prueba con un lote canario antes de
+        sustituir al activo; la detección sigue con el modelo actual
+        mientras tanto.
+        
+        Args:
+            model_path: Nuevo modelo (None = recargar la ruta actual)
+            
+        Returns:
+            Future con el informe de la recarga ("accepted", "reason", ...)
+        """
+        return self._reloader.reload(model_path)
+    
+    def rollback_model(self) -> bool:
+        """
+        Vuelve al modelo anterior a la última recarga
+        
+        Returns:
+            True si había un modelo anterior
+        """
+        return self._reloader.rollback()
+    
+    def watch_model(self, interval: float = 5.0) -> None:
+        """
+        Recarga el modelo automáticamente cuando cambia su archivo
+        
+        Args:
+            interval: Segundos entre comprobaciones
+        """
+        self._reloader.watch(interval)
+    
+    @property
+    def reload_stats(self) -> dict:
+        """Estadísticas de recarga del modelo"""
+        return self._reloader.stats
     
     async def _observe_loop(self) -> None:
         """Loop principal de observación de logs"""
@@ -161,32 +374,104 @@ class NemesisAgent:
         Returns:
             ThreatVerdict si se detecta amenaza, None si es legítimo
         """
-        # OBSERVE: Parsear log
-        event = self._parse_log(log_line)
+        verdicts = await self.process_log_lines([log_line])
+        return verdicts[0]
+    
+    async def process_log_lines(
+        self,
+        log_lines: List[str]
+    ) -> List[Optional[ThreatVerdict]]:
+        """
+        Procesa un lote de líneas con una sola inferencia ML
         
-        if not event:
-            return None
+        Args:
+            log_lines: Líneas de log a analizar
+            
+        Returns:
+            Lista de veredictos alineada con log_lines (None si la línea
+            no se pudo parsear o la IP está en whitelist)
+        """
+        # OBSERVE: Parsear logs
+        events = [self._parse_log(log_line) for log_line in log_lines]
         
-        # Verificar whitelist
-        if event.source_ip in self._whitelist_ips:
-            return None
+        return await self.process_events(events)
+    
+    async def process_event(self, event: ThreatEvent) -> Optional[ThreatVerdict]:
+        """
+        Ejecuta el ciclo O.A.S. sobre un evento ya parseado
         
-        # ANALYZE: Analizar amenaza
-        verdict = await self._analyze_threat(event)
+        Args:
+            event: Evento producido por LogParser
+            
+        Returns:
+            ThreatVerdict o None si la IP está en whitelist
+        """
+        verdicts = await self.process_events([event])
+        return verdicts[0]
+    
+    async def process_events(
+        self,
+        events: List[Optional[ThreatEvent]]
+    ) -> List[Optional[ThreatVerdict]]:
+        """
+        Ejecuta el ciclo O.A.S. sobre un lote de eventos ya parseados
         
-        if verdict and verdict.is_malicious:
-            self._threats_detected += 1
+        Args:
+            events: Eventos producidos por LogParser (None se ignora)
             
-            # Log de amenaza detectada
-            logger.warning(
-                f"🚨 AMENAZA DETECTADA: {verdict.attack_type} "
-                f"desde {event.source_ip} (confianza: {verdict.confidence:.2%})"
-            )
+        Returns:
+            Lista de veredictos alineada con events
+        """
+        # ANALYZE: Analizar amenazas del lote
+        verdicts = await self.analyze_events(events)
+        
+        for event, verdict in zip(events, verdicts):
+            if verdict and verdict.is_malicious:
+                self._threats_detected += 1
+                
+                # Log de amenaza detectada
+                logger.warning(
+                    f"🚨 AMENAZA DETECTADA: {verdict.attack_type} "
+                    f"desde {event.source_ip} (confianza: {verdict.confidence:.2%})"
+                )
+                
+                # SENTENCE: Ejecutar acción defensiva
+                await self._execute_sentence(verdict, event)
+        
+        return verdicts
+    
+    async def analyze_events(
+        self,
+        events: List[Optional[ThreatEvent]]
+    ) -> List[Optional[ThreatVerdict]]:
+        """
+        Analiza un lote de eventos sin ejecutar acciones (solo ANALYZE)
+        
+        Útil para reprocesar logs históricos, donde bloquear no tiene sentido.
+        
+        Args:
+            events: Eventos producidos por LogParser (None se ignora)
             
-            # SENTENCE: Ejecutar acción defensiva
-            await self._execute_sentence(verdict, event)
+        Returns:
+            Lista de veredictos alineada con events (None si whitelist)
+        """
+        verdicts: List[Optional[ThreatVerdict]] = [None] * len(events)
         
-        return verdict
+        # Verificar whitelist
+        pending = [
+            (i, event) for i, event in enumerate(events)
+            if event and event.source_ip not in self._whitelist_ips
+        ]
+        
+        if not pending:
+            return verdicts
+        
+        analyzed = await self._analyze_threats([event for _, event in pending])
+        
+        for (i, _), verdict in zip(pending, analyzed):
+            verdicts[i] = verdict
+        
+        return verdicts
     
     def _parse_log(self, log_line: str) -> Optional[ThreatEvent]:
         """
@@ -195,12 +480,19 @@ class NemesisAgent:
         Formato esperado:
         IP - - [timestamp] "METHOD /path?query HTTP/1.1" status
         
+        Usa LogParser y, si la línea no encaja en ningún formato conocido,
+        recurre a una extracción tolerante (IP + petición entre comillas).
+        
         Args:
             log_line: Línea de log
             
         Returns:
             ThreatEvent o None si no se puede parsear
         """
+        event = self._parser.parse(log_line)
+        if event:
+            return event
+        
         try:
             # Extraer IP (primer campo)
             parts = log_line.split()
@@ -217,16 +509,29 @@ class NemesisAgent:
             request_end = log_line.index('"', request_start)
             request = log_line[request_start:request_end]
             
+            # Timestamp real del log si viene entre corchetes
+            timestamp = datetime.now()
+            if '[' in log_line and ']' in log_line:
+                timestamp_start = log_line.index('[') + 1
+                timestamp_end = log_line.index(']', timestamp_start)
+                timestamp = self._parser.parse_timestamp(
+                    log_line[timestamp_start:timestamp_end]
+                )
+            
+            request_parts = request.split()
+            
             # Crear evento
-            event = ThreatEvent(
-                timestamp=datetime.now(),
+            return ThreatEvent(
+                timestamp=timestamp,
                 source_ip=source_ip,
-                payload=request,
-                log_line=log_line
+                method=request_parts[0] if request_parts else "",
+                path=request_parts[1] if len(request_parts) > 1 else "",
+                status_code=0,
+                raw_line=log_line,
+                format_type="raw",
+                request=request
             )
             
-            return event
-            
         except Exception as e:
             logger.debug(f"Error parseando log: {e}")
             return None
@@ -241,12 +546,136 @@ class NemesisAgent:
         Returns:
             ThreatVerdict con el resultado del análisis
         """
+        verdicts = await self._analyze_threats([event])
+        return verdicts[0]
+    
+    async def _analyze_threats(self, events: List[ThreatEvent]) -> List[ThreatVerdict]:
+        """
+        Analiza un lote de eventos usando prefiltro, ML o reglas
+        
+        Args:
+            events: Eventos a analizar
+            
+        Returns:
+            Lista de ThreatVerdict alineada con events
+        """
+        # Todo el tráfico actualiza el comportamiento por IP, también lo
+        # que luego resuelvan el prefiltro o la caché
+        behavior = None
+        if self._behavior is not None:
+            behavior = self._behavior.observe(events)
+        
+        prefilter = self._prefilter
+        if prefilter is None:
+            return await self._analyze_cached(events, behavior)
+        
+        benign = prefilter.screen(events)
+        
+        # Modo sombra: todo pasa por el modelo y se audita la cascada
+        if prefilter.shadow:
+            verdicts = await self._analyze_cached(events, behavior)
+            prefilter.audit(events, benign, verdicts)
+            return verdicts
+        
+        verdicts: List[Optional[ThreatVerdict]] = [None] * len(events)
+        ambiguous = []
+        now = datetime.now()
+        
+        for i, is_benign in enumerate(benign):
+            if is_benign:
+                verdicts[i] = ThreatVerdict(False, prefilter.confidence, "BENIGN", now, "ALLOW")
+            else:
+                ambiguous.append(i)
+        
+        if ambiguous:
+            analyzed = await self._analyze_cached(
+                [events[i] for i in ambiguous],
+                behavior[ambiguous] if behavior is not None else None
+            )
+            for i, verdict in zip(ambiguous, analyzed):
+                verdicts[i] = verdict
+        
+        return verdicts
+    
+    async def _analyze_cached(
+        self,
+        events: List[ThreatEvent],
+        behavior: Optional[np.ndarray] = None
+    ) -> List[ThreatVerdict]:
+        """
+        Analiza un lote consultando antes la caché de veredictos
+        
+        Con un modelo de comportamiento el veredicto depende de la IP y no
+        solo del payload, así que no se usa la caché.
+        
+        Args:
+            events: Eventos a analizar
+            behavior: Features de comportamiento alineadas con events
+            
+        Returns:
+            Lista de ThreatVerdict alineada con events
+        """
+        cache = self._verdict_cache
+        if cache is None or (behavior is not None and self._uses_behavior(self._ai_brain)):
+            return await self._detect(events, behavior)
+        
+        version = self._model_version
+        verdicts: List[Optional[ThreatVerdict]] = [None] * len(events)
+        now = datetime.now()
+        
+        # Payloads sin veredicto en caché (cada uno se analiza una sola vez)
+        pending = {}
+        for i, event in enumerate(events):
+            payload = event.payload
+            waiting = pending.get(payload)
+            if waiting is not None:
+                waiting.append(i)
+                continue
+            
+            cached = cache.get(version, payload)
+            if cached is None:
+                pending[payload] = [i]
+            else:
+                verdicts[i] = ThreatVerdict(cached[0], cached[1], cached[2], now, cached[3])
+        
+        if pending:
+            indices = list(pending.values())
+            first = [idx[0] for idx in indices]
+            analyzed = await self._detect(
+                [events[i] for i in first],
+                behavior[first] if behavior is not None else None
+            )
+            
+            for idx, verdict in zip(indices, analyzed):
+                cache.put(version, events[idx[0]].payload, (
+                    verdict.is_malicious, verdict.confidence,
+                    verdict.attack_type, verdict.recommended_action
+                ))
+                verdicts[idx[0]] = verdict
+                for i in idx[1:]:
+                    verdicts[i] = ThreatVerdict(
+                        verdict.is_malicious, verdict.confidence,
+                        verdict.attack_type, verdict.timestamp,
+                        verdict.recommended_action
+                    )
+        
+        return verdicts
+    
+    async def _detect(
+        self,
+        events: List[ThreatEvent],
+        behavior: Optional[np.ndarray] = None
+    ) -> List[ThreatVerdict]:
+        """Analiza con ML o reglas, sin caché"""
+        # Tráfico reciente para el canario de la próxima recarga
+        self._reloader.record(events, behavior)
+        
         # Si hay modelo ML, usarlo
         if self._ai_brain is not None:
-            return await self._ml_detection(event)
+            return await self._ml_detection_batch(events, behavior=behavior)
         
         # Fallback a detección basada en reglas
-        return self._rule_based_detection(event)
+        return [self._rule_based_detection(event) for event in events]
     
     async def _ml_detection(self, event: ThreatEvent) -> ThreatVerdict:
         """
@@ -258,17 +687,58 @@ class NemesisAgent:
         Returns:
             ThreatVerdict basado en predicción ML
         """
+        verdicts = await self._ml_detection_batch([event])
+        return verdicts[0]
+    
+    async def _ml_detection_batch(
+        self,
+        events: List[ThreatEvent],
+        behavior: Optional[np.ndarray] = None
+    ) -> List[ThreatVerdict]:
+        """
+        Detección ML de un lote con una sola llamada a predict_proba
+        
+        La clase predicha es la de mayor probabilidad (lo mismo que hace
+        predict() en sklearn), así que no hace falta una segunda llamada.
+        
+        Args:
+            events: Eventos a analizar
+            behavior: Features de comportamiento alineadas con events
+                (solo se usan si el modelo las espera)
+            
+        Returns:
+            Lista de ThreatVerdict alineada con events
+        """
+        # Una sola lectura de la referencia: una recarga en caliente no
+        # puede cambiar el modelo a mitad de lote
+        brain = self._ai_brain
+        
         try:
-            # Extraer features
-            features = self._extract_features(event)
+            # Extraer features de todo el lote (vectorizado, mismo resultado
+            # que _extract_features evento a evento)
+            features = text_statistics([event.payload for event in events])
+            if behavior is not None and self._uses_behavior(brain):
+                features = np.hstack((features, behavior))
             
             # Predicción
-            prediction = self._ai_brain.predict([features])[0]
-            probability = self._ai_brain.predict_proba([features])[0]
+            probabilities = brain.predict_proba(features)
+            classes = brain.classes_
             
+        except Exception as e:
+            logger.error(f"Error en ML detection: {e}")
+            self._reloader.batch_failed(e)
+            return [self._rule_based_detection(event) for event in events]
+        
+        self._reloader.batch_succeeded()
+        
+        now = datetime.now()
+        verdicts = []
+        
+        for event, probability in zip(events, probabilities):
             # Interpretar resultado
-            is_malicious = (prediction == 1)
-            confidence = probability[1] if is_malicious else probability[0]
+            best = int(probability.argmax())
+            is_malicious = (classes[best] == 1)
+            confidence = float(probability[best])
             
             # Identificar tipo de ataque si es malicioso
             if is_malicious:
@@ -278,22 +748,23 @@ class NemesisAgent:
                 attack_type = "BENIGN"
                 action = "ALLOW"
             
-            return ThreatVerdict(
+            verdicts.append(ThreatVerdict(
                 is_malicious=is_malicious,
                 confidence=confidence,
                 attack_type=attack_type,
-                timestamp=datetime.now(),
+                timestamp=now,
                 recommended_action=action
-            )
-            
-        except Exception as e:
-            logger.error(f"Error en ML detection: {e}")
-            return self._rule_based_detection(event)
+            ))
+        
+        return verdicts
     
     def _extract_features(self, event: ThreatEvent) -> List[float]:
         """
         Extrae features del evento para ML
         
+        Con almacén de comportamiento se añaden las features actuales de
+        la IP (sin registrar el evento; eso lo hace el análisis).
+        
         Args:
             event: Evento a analizar
             
@@ -313,22 +784,15 @@ class NemesisAgent:
         # Feature 3: Entropía de Shannon
         entropy = self._calculate_entropy(payload)
         
-        return [length, special_ratio, entropy]
+        features = [length, special_ratio, entropy]
+        if self._behavior is not None:
+            features += self._behavior.features(event.source_ip)
+        
+        return features
     
     def _calculate_entropy(self, text: str) -> float:
         """Calcula entropía de Shannon"""
-        if not text:
-            return 0.0
-        
-        counts = Counter(text)
-        length = len(text)
-        
-        entropy = -sum(
-            (count / length) * math.log2(count / length)
-            for count in counts.values()
-        )
-        
-        return entropy
+        return shannon_entropy(text)
     
     def _identify_attack_type(self, event: ThreatEvent) -> str:
         """
@@ -340,28 +804,8 @@ class NemesisAgent:
         Returns:
             Tipo de ataque identificado
         """
-        payload = event.payload.lower()
-        
-        # SQL Injection patterns
-        sql_patterns = ["'", "or", "union", "select", "insert", "drop", "--", ";--"]
-        if any(pattern in payload for pattern in sql_patterns):
-            return "SQL_INJECTION"
-        
-        # XSS patterns
-        xss_patterns = ["<script", "javascript:", "onerror", "onload"]
-        if any(pattern in payload for pattern in xss_patterns):
-            return "XSS"
-        
-        # Path traversal
-        if "../" in event.payload or "..\\" in event.payload:
-            return "PATH_TRAVERSAL"
-        
-        # Command injection
-        cmd_chars = ["|", "&", ";", "`", "$"]
-        if any(c in event.payload for c in cmd_chars):
-            return "COMMAND_INJECTION"
-        
-        return "UNKNOWN"
+        # Una sola pasada del autómata de firmas (SQLi > XSS > traversal > CMD)
+        return identify_attack_type(event.payload)
     
     def _rule_based_detection(self, event: ThreatEvent) -> ThreatVerdict:
         """
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Némesis IA - Prefilter Cascade
+Capítulo 1: El Agente Némesis
+
+Primera etapa barata antes del modelo: la mayor parte del tráfico es
+obviamente legítimo (estáticos, health checks, query strings cortas y
+alfanuméricas) y no necesita entropía ni bosque. Cada petición pasa por:
+
+1. Forma: "MÉTODO /ruta[?query] HTTP/x" con un método conocido
+2. Puerta de longitud
+3. Clase de caracteres: ruta y query solo con caracteres seguros (sin
+   comillas, <>, ;, |, $, `, %, espacios...), sin "..", "//", "&&" ni "--"
+4. Palabras de ataque (UNION, SELECT, script, passwd...) con una regex, y
+   OR/AND sueltos en la query ("id=1+or+1=1" no lleva comillas)
+5. Ruta en lista blanca (estáticos, health checks) o petición corta
+
+Solo lo que pasa todas las comprobaciones se resuelve como legítimo sin
+ML; lo ambiguo sigue al modelo. Todo son regex y operaciones de str (en C).
+
+En modo sombra la cascada no decide nada: el agente analiza todo con el
+modelo y la cascada solo cuenta cuántas veces habría dicho "legítimo"
+a algo que el modelo considera malicioso.
+
+Copyright (C) 2025 Némesis AI Project Contributors
+Licensed under GPL-3.0
+"""
+
+import logging
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class PrefilterCascade:
+    """Filtro de primera etapa: resuelve lo obviamente legítimo sin ML"""
+
+    METHODS = ("GET", "HEAD", "OPTIONS")
+    ALLOW_PATHS = (
+        "/", "/health", "/healthz", "/ready", "/readyz", "/ping", "/status",
+        "/favicon.ico", "/robots.txt", "/sitemap.xml",
+    )
+    ALLOW_PREFIXES = ("/static/", "/assets/", "/images/", "/img/", "/css/", "/js/", "/fonts/")
+    STATIC_EXTENSIONS = (
+        ".css", ".js", ".map", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".ico",
+        ".webp", ".woff", ".woff2", ".ttf", ".eot",
+    )
+    MAX_LENGTH = 256
+    MAX_SHORT_TARGET = 64
+
+    # Ruta y query solo con caracteres seguros (grupos: método, ruta, query)
+    SAFE_REQUEST = re.compile(
+        r"([A-Z]+) (/[A-Za-z0-9/_.~-]*)(?:\?([A-Za-z0-9_.~=&+,-]*))? HTTP/[0-9.]+"
+    )
+    # Se busca sobre la petición en minúsculas: con re.IGNORECASE la
+    # alternancia es ~10x más lenta
+    ATTACK_WORDS = re.compile(
+        r"union|select|insert|update|delete|drop|sleep|waitfor|script|javascript|"
+        r"onerror|onload|passwd|shadow|whoami|wget|curl|bin/|cmd|exec|eval"
+    )
+    # Operadores booleanos como palabra completa en la query ("+" es un espacio)
+    QUERY_BOOLEANS = re.compile(r"(?<![a-z0-9_])(?:or|and|xor)(?![a-z0-9_])")
+
+    def __init__(
+        self,
+        methods: Sequence[str] = METHODS,
+        allow_paths: Iterable[str] = ALLOW_PATHS,
+        allow_prefixes: Sequence[str] = ALLOW_PREFIXES,
+        static_extensions: Sequence[str] = STATIC_EXTENSIONS,
+        max_length: int = MAX_LENGTH,
+        max_short_target: int = MAX_SHORT_TARGET,
+        shadow: bool = False,
+        confidence: float = 1.0,
+        max_samples: int = 20
+    ):
+        """
+        Inicializa la cascada
+
+        Args:
+            methods: Métodos HTTP que pueden resolverse sin ML
+            allow_paths: Rutas exactas conocidas (health checks, etc.)
+            allow_prefixes: Prefijos de estáticos
+            static_extensions: Extensiones de estáticos
+            max_length: Puerta de longitud de la petición completa
+            max_short_target: Rutas fuera de la lista blanca solo se
+                resuelven si la ruta+query es así de corta
+            shadow: Modo sombra (audita sin decidir)
+            confidence: Confianza de los veredictos resueltos por la cascada
+            max_samples: Desacuerdos guardados como ejemplo en modo sombra
+        """
+        self.methods = frozenset(methods)
+        self.allow_paths = frozenset(allow_paths)
+        self.allow_prefixes = tuple(allow_prefixes)
+        self.static_extensions = tuple(ext.lower() for ext in static_extensions)
+        self.max_length = max_length
+        self.max_short_target = max_short_target
+        self.shadow = shadow
+        self.confidence = confidence
+
+        self.checked = 0
+        self.short_circuited = 0
+        self.rejected_by: Dict[str, int] = {
+            "shape": 0, "length": 0, "charset": 0, "attack_words": 0, "not_allowed": 0,
+        }
+
+        # Auditoría del modo sombra
+        self.audited = 0
+        self.disagreements = 0
+        self.disagreement_samples: deque = deque(maxlen=max_samples)
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> Optional["PrefilterCascade"]:
+        """
+        Crea la cascada desde un diccionario de configuración (p. ej. YAML)
+
+        Args:
+            config: {"enabled": bool, "shadow": bool, "allow_paths": [...], ...}
+
+        Returns:
+            PrefilterCascade o None si no está habilitada
+        """
+        if not config or not config.get("enabled", True):
+            return None
+
+        options = {key: value for key, value in config.items() if key != "enabled"}
+        return cls(**options)
+
+    def _classify(self, payload: str) -> Optional[str]:
+        """
+        Motivo por el que la petición es ambigua, o None si es legítima
+
+        Args:
+            payload: Línea de petición ("GET /ruta?query HTTP/1.1")
+        """
+        if len(payload) > self.max_length:
+            return "length"
+
+        match = self.SAFE_REQUEST.fullmatch(payload)
+        if match is None:
+            return "shape" if payload.count(" ") != 2 else "charset"
+
+        method, path, query = match.groups()
+        if method not in self.methods:
+            return "shape"
+
+        if ".." in payload or "--" in payload or "//" in path or (query and "&&" in query):
+            return "charset"
+
+        end = match.end(3) if query else match.end(2)
+        lowered = payload[match.start(2):end].lower()
+        if self.ATTACK_WORDS.search(lowered):
+            return "attack_words"
+        if query and self.QUERY_BOOLEANS.search(query.lower()):
+            return "attack_words"
+
+        if (
+            path in self.allow_paths
+            or path.startswith(self.allow_prefixes)
+            or path.lower().endswith(self.static_extensions)
+            or len(lowered) <= self.max_short_target
+        ):
+            return None
+
+        return "not_allowed"
+
+    def screen(self, events: Sequence) -> List[bool]:
+        """
+        Decide qué eventos son obviamente legítimos
+
+        Args:
+            events: Eventos (con .payload)
+
+        Returns:
+            Lista alineada con events: True = legítimo sin pasar por ML
+        """
+        classify = self._classify
+        reasons = [classify(event.payload) for event in events]
+
+        rejected_by = self.rejected_by
+        for reason in reasons:
+            if reason is not None:
+                rejected_by[reason] += 1
+
+        benign = [reason is None for reason in reasons]
+        self.checked += len(benign)
+        self.short_circuited += sum(benign)
+        return benign
+
+    def audit(self, events: Sequence, benign: Sequence[bool], verdicts: Sequence) -> None:
+        """
+        Compara la decisión de la cascada con el veredicto del modelo (modo sombra)
+
+        Args:
+            events: Eventos analizados
+            benign: Resultado de screen()
+            verdicts: Veredictos del análisis completo
+        """
+        for event, is_benign, verdict in zip(events, benign, verdicts):
+            if not is_benign:
+                continue
+
+            self.audited += 1
+            if verdict.is_malicious:
+                self.disagreements += 1
+                self.disagreement_samples.append({
+                    "payload": event.payload,
+                    "attack_type": verdict.attack_type,
+                    "confidence": verdict.confidence,
+                })
+                logger.debug(f"🔍 Prefiltro en desacuerdo con el modelo: {event.payload}")
+
+    @property
+    def stats(self) -> Dict:
+        """Retorna estadísticas de la cascada"""
+        return {
+            "shadow": self.shadow,
+            "checked": self.checked,
+            "short_circuited": self.short_circuited,
+            "short_circuit_rate": self.short_circuited / self.checked if self.checked else 0.0,
+            "rejected_by": dict(self.rejected_by),
+            "audited": self.audited,
+            "disagreements": self.disagreements,
+            "disagreement_rate": self.disagreements / self.audited if self.audited else 0.0,
+            "disagreement_samples": list(self.disagreement_samples),
+        }
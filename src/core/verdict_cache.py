@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Némesis IA - Verdict Cache
+Capítulo 1: El Agente Némesis
+
+Caché LRU acotada de veredictos por (versión del modelo, payload).
+En producción muchas líneas repiten la misma petición (health checks,
+estáticos, escáneres que reenvían la misma sonda): con la caché esas
+líneas no vuelven a pasar por features ni inferencia.
+
+La clave es la línea de petición exacta, sin decodificar ni normalizar.
+El payload ya no lleva IP, fecha ni user agent, así que el tráfico
+repetido coincide byte a byte. Las features del modelo (longitud, ratio
+de caracteres especiales, entropía) y las reglas de tipo de ataque se
+calculan sobre esos bytes: con una clave canónica, una petición recibiría
+el veredicto calculado para otra. Además, quitar valores juntaría
+"?id=1" con "?id=1' OR 1=1--", y la codificación (%27, %3C) es en sí una
+señal de ofuscación. Las peticiones con valores únicos (cache busters,
+IDs de sesión) simplemente fallan en la caché y se analizan.
+
+Copyright (C) 2025 Némesis AI Project Contributors
+Licensed under GPL-3.0
+"""
+
+import logging
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class VerdictCache:
+    """LRU acotada en entradas y en tamaño de payload"""
+
+    MAX_ENTRIES = 65536
+    MAX_PAYLOAD_LENGTH = 2048
+
+    def __init__(
+        self,
+        max_entries: int = MAX_ENTRIES,
+        max_payload_length: int = MAX_PAYLOAD_LENGTH
+    ):
+        """
+        Inicializa la caché
+
+        Args:
+            max_entries: Máximo de veredictos guardados
+            max_payload_length: Payloads más largos no se cachean (suelen ser
+                únicos y ocuparían memoria sin aportar aciertos)
+        """
+        self.max_entries = max_entries
+        self.max_payload_length = max_payload_length
+
+        self._entries: "OrderedDict[Hashable, Tuple]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, version: Hashable, payload: str) -> Optional[Tuple]:
+        """
+        Busca un veredicto
+
+        Args:
+            version: Versión del modelo con la que se calculó
+            payload: Payload analizado
+
+        Returns:
+            Veredicto cacheado o None
+        """
+        key = (version, payload)
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, version: Hashable, payload: str, verdict: Tuple) -> None:
+        """
+        Guarda un veredicto, expulsando el menos usado si está llena
+
+        Args:
+            version: Versión del modelo con la que se calculó
+            payload: Payload analizado
+            verdict: Veredicto (inmutable)
+        """
+        if len(payload) > self.max_payload_length:
+            return
+
+        entries = self._entries
+        entries[(version, payload)] = verdict
+
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Invalida todos los veredictos (cambio de modelo o de umbral)"""
+        if self._entries:
+            logger.info(f"🧹 Caché de veredictos invalidada ({len(self._entries)} entradas)")
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def stats(self) -> Dict:
+        """Retorna estadísticas de la caché"""
+        lookups = self.hits + self.misses
+
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / lookups * 100) if lookups else 0,
+        }
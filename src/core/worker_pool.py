@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Némesis IA - Detection Worker Pool
+Capítulo 1: El Agente Némesis
+
+Reparte la detección entre N procesos, particionando los eventos por
+hash de la IP de origen: todo el estado por IP (whitelist y contadores
+de comportamiento del BehaviorStore) vive en un único worker. Cada worker tiene
+su propio NemesisAgent (y modelo); los veredictos vuelven en el orden
+original para que el centinela persista, alerte y haga broadcast.
+
+Copyright (C) 2025 Némesis AI Project Contributors
+Licensed under GPL-3.0
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import zlib
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from ml.compiled_forest import ensure_compiled
+
+from .behavior_store import BehaviorStore
+from .nemesis_agent import NemesisAgent, ThreatEvent, ThreatVerdict
+from .prefilter import PrefilterCascade
+
+logger = logging.getLogger(__name__)
+
+
+# Estado de cada proceso worker (lo crea _init_worker)
+_worker_agent: Optional[NemesisAgent] = None
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _init_worker(
+    model_path: Optional[str],
+    threshold: float,
+    whitelist: List[str],
+    prefilter: Optional[PrefilterCascade] = None,
+    behavior_store: Optional[BehaviorStore] = None
+):
+    """Inicializa el proceso worker: un agente con su modelo cargado"""
+    global _worker_agent, _worker_loop
+
+    agent = NemesisAgent(threshold=threshold, prefilter=prefilter, behavior_store=behavior_store)
+    if model_path:
+        agent.model_path = model_path
+        agent._load_ai_brain()
+
+    for ip in whitelist:
+        agent._whitelist_ips.add(ip)
+
+    _worker_agent = agent
+    _worker_loop = asyncio.new_event_loop()
+
+
+def _process_shard(events: List[ThreatEvent]) -> List[Optional[ThreatVerdict]]:
+    """Ejecuta el ciclo O.A.S. sobre los eventos de un shard"""
+    return _worker_loop.run_until_complete(_worker_agent.process_events(events))
+
+
+def _add_to_whitelist(ip: str) -> None:
+    """Añade una IP a la whitelist del worker"""
+    _worker_agent.add_to_whitelist(ip)
+
+
+def _reload_model(model_path: Optional[str]) -> None:
+    """Programa la recarga en caliente en el worker (no bloquea su cola)"""
+    _worker_agent.reload_model(model_path)
+
+
+def _reload_stats() -> Dict:
+    """Estadísticas de recarga del worker"""
+    return _worker_agent.reload_stats
+
+
+def _cache_stats() -> Dict:
+    """Estadísticas de la caché de veredictos del worker"""
+    return _worker_agent.cache_stats
+
+
+def _prefilter_stats() -> Dict:
+    """Estadísticas del prefiltro del worker"""
+    return _worker_agent.prefilter_stats
+
+
+def _behavior_stats() -> Dict:
+    """Estadísticas del almacén de comportamiento del worker"""
+    return _worker_agent.behavior_stats
+
+
+def _ping() -> Dict:
+    """Tarea vacía para arrancar el worker (y cargar el modelo)"""
+    return {"pid": os.getpid(), **_worker_agent.model_stats}
+
+
+class DetectionWorkerPool:
+    """Pool de procesos de detección particionado por IP de origen"""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        model_path: Optional[str] = None,
+        threshold: float = 0.9,
+        whitelist: Iterable[str] = (),
+        prefilter: Optional[PrefilterCascade] = None,
+        behavior_store: Optional[BehaviorStore] = None
+    ):
+        """
+        Inicializa el pool
+
+        Args:
+            workers: Número de procesos (por defecto, número de CPUs)
+            model_path: Modelo que carga cada worker (None = reglas)
+            threshold: Umbral de confianza de los agentes
+            whitelist: IPs adicionales en whitelist
+            prefilter: Cascada de primera etapa (cada worker recibe una copia)
+            behavior_store: Almacén de comportamiento por IP (cada worker
+                recibe una copia vacía y sigue solo las IPs de su shard)
+        """
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.model_path = model_path
+        self.threshold = threshold
+        self.whitelist = list(whitelist)
+        self.prefilter = prefilter
+        self.behavior_store = behavior_store
+
+        # Un ejecutor de un solo proceso por shard: la IP siempre cae
+        # en el mismo proceso
+        self._executors: List[ProcessPoolExecutor] = []
+        self._reload_executor: Optional[ThreadPoolExecutor] = None
+        self._start_lock = threading.Lock()
+        self._events_per_shard: List[int] = [0] * self.workers
+        self._worker_info: List[Dict] = []
+        self._batches = 0
+
+        logger.info(f"🧵 DetectionWorkerPool inicializado ({self.workers} worker(s))")
+
+    def start(self):
+        """
+        Arranca los procesos y espera a que carguen el agente (bloquea)
+
+        Desde un bucle de eventos, process_events lo llama en un hilo.
+        """
+        with self._start_lock:
+            if self._executors:
+                return
+
+            # Compilar el modelo una sola vez: cada worker mapea el mismo
+            # .forest.npz y comparte sus páginas en vez de cargar su copia
+            ensure_compiled(self.model_path)
+
+            initargs = (
+                self.model_path, self.threshold, self.whitelist,
+                self.prefilter, self.behavior_store
+            )
+            executors = [
+                ProcessPoolExecutor(
+                    max_workers=1, initializer=_init_worker, initargs=initargs
+                )
+                for _ in range(self.workers)
+            ]
+
+            self._worker_info = [f.result() for f in [e.submit(_ping) for e in executors]]
+            self._executors = executors
+
+        logger.info(f"✅ Workers de detección activos: {[w['pid'] for w in self._worker_info]}")
+
+        for shard, info in enumerate(self._worker_info):
+            if info.get("format"):
+                logger.info(
+                    f"   Worker {shard} (pid {info['pid']}): modelo {info['format']} "
+                    f"en {info['load_ms']:.1f} ms, RSS {info['rss_mb']:.1f} MB "
+                    f"({info['shared_mb']:.1f} MB compartidos)"
+                )
+
+    def close(self):
+        """Detiene los procesos"""
+        if self._reload_executor is not None:
+            self._reload_executor.shutdown(wait=True)
+            self._reload_executor = None
+        for executor in self._executors:
+            executor.shutdown(wait=True, cancel_futures=True)
+        self._executors = []
+        logger.info("⏹️  DetectionWorkerPool detenido")
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def shard_for(self, ip: str) -> int:
+        """
+        Shard (worker) responsable de una IP
+
+        Args:
+            ip: IP de origen
+
+        Returns:
+            Índice del worker (estable entre ejecuciones)
+        """
+        return zlib.crc32(ip.encode()) % self.workers
+
+    async def process_events(
+        self,
+        events: List[Optional[ThreatEvent]]
+    ) -> List[Optional[ThreatVerdict]]:
+        """
+        Ejecuta el ciclo O.A.S. repartiendo los eventos por IP
+
+        Misma interfaz que NemesisAgent.process_events. Si el pool no se
+        ha arrancado, se arranca en un hilo: lanzar los procesos y cargar
+        el modelo no detiene el bucle de eventos.
+
+        Args:
+            events: Eventos ya parseados (None se ignora)
+
+        Returns:
+            Lista de veredictos alineada con events
+        """
+        loop = asyncio.get_running_loop()
+        if not self._executors:
+            await loop.run_in_executor(None, self.start)
+
+        verdicts: List[Optional[ThreatVerdict]] = [None] * len(events)
+
+        shards: Dict[int, List[int]] = {}
+        for i, event in enumerate(events):
+            if event is not None:
+                shards.setdefault(self.shard_for(event.source_ip), []).append(i)
+
+        if not shards:
+            return verdicts
+
+        results = await asyncio.gather(*[
+            loop.run_in_executor(
+                self._executors[shard], _process_shard, [events[i] for i in idx]
+            )
+            for shard, idx in shards.items()
+        ])
+
+        for (shard, idx), shard_verdicts in zip(shards.items(), results):
+            self._events_per_shard[shard] += len(idx)
+            for i, verdict in zip(idx, shard_verdicts):
+                verdicts[i] = verdict
+
+        self._batches += 1
+        return verdicts
+
+    async def process_event(self, event: ThreatEvent) -> Optional[ThreatVerdict]:
+        """Procesa un solo evento"""
+        verdicts = await self.process_events([event])
+        return verdicts[0]
+
+    def add_to_whitelist(self, ip: str) -> None:
+        """
+        Añade una IP a la whitelist del worker que la gestiona
+
+        Args:
+            ip: IP a añadir
+        """
+        self.whitelist.append(ip)
+        if self._executors:
+            self._executors[self.shard_for(ip)].submit(_add_to_whitelist, ip).result()
+
+    def reload_model(self, model_path: Optional[str] = None) -> Future:
+        """
+        Recarga el modelo en caliente en todos los workers (hilo de fondo)
+
+        La compilación y el aviso a los workers no ocupan el hilo que
+        llama (el bucle de eventos con SIGHUP o watch_model). Cada worker
+        carga, valida y prueba el modelo en un hilo propio y sigue
+        procesando su shard con el modelo actual mientras tanto.
+
+        Args:
+            model_path: Nuevo modelo (None = recargar la ruta actual)
+
+        Returns:
+            Future que termina cuando todos los workers tienen la recarga
+            programada (su resultado, en reload_stats)
+        """
+        if model_path:
+            self.model_path = model_path
+
+        if self._reload_executor is None:
+            self._reload_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="nemesis-pool-reload"
+            )
+        return self._reload_executor.submit(self._reload_workers, model_path)
+
+    def _reload_workers(self, model_path: Optional[str]) -> None:
+        """Compila el modelo una vez y programa la recarga en cada worker"""
+        ensure_compiled(self.model_path)
+
+        for future in [e.submit(_reload_model, model_path) for e in self._executors]:
+            future.result()
+
+    def _per_worker(self, task) -> List[Dict]:
+        """Resultado de una tarea de estadísticas en cada worker"""
+        return [f.result() for f in [e.submit(task) for e in self._executors]]
+
+    @property
+    def reload_stats(self) -> List[Dict]:
+        """Estadísticas de recarga de cada worker"""
+        return self._per_worker(_reload_stats)
+
+    @property
+    def cache_stats(self) -> Dict:
+        """Estadísticas de la caché de veredictos sumadas de todos los workers"""
+        per_worker = [stats for stats in self._per_worker(_cache_stats) if stats]
+        if not per_worker:
+            return {}
+
+        total = {}
+        for key in ("size", "max_entries", "hits", "misses", "evictions"):
+            total[key] = sum(stats[key] for stats in per_worker)
+        lookups = total["hits"] + total["misses"]
+        total["hit_rate"] = (total["hits"] / lookups * 100) if lookups else 0
+        return total
+
+    @property
+    def prefilter_stats(self) -> Dict:
+        """Estadísticas del prefiltro sumadas de todos los workers"""
+        per_worker = [stats for stats in self._per_worker(_prefilter_stats) if stats]
+        if not per_worker:
+            return {}
+
+        total = {
+            "shadow": per_worker[0]["shadow"],
+            "rejected_by": {},
+            "disagreement_samples": [],
+        }
+        for stats in per_worker:
+            for key in ("checked", "short_circuited", "audited", "disagreements"):
+                total[key] = total.get(key, 0) + stats[key]
+            for reason, count in stats["rejected_by"].items():
+                total["rejected_by"][reason] = total["rejected_by"].get(reason, 0) + count
+            total["disagreement_samples"].extend(stats["disagreement_samples"])
+
+        total["short_circuit_rate"] = total["short_circuited"] / total["checked"] if total["checked"] else 0.0
+        total["disagreement_rate"] = total["disagreements"] / total["audited"] if total["audited"] else 0.0
+        return total
+
+    @property
+    def behavior_stats(self) -> Dict:
+        """Estadísticas de comportamiento sumadas de todos los workers"""
+        per_worker = [stats for stats in self._per_worker(_behavior_stats) if stats]
+        if not per_worker:
+            return {}
+
+        total = {"max_ips": sum(stats["max_ips"] for stats in per_worker)}
+        for key in ("tracked_ips", "updates", "expired", "evicted"):
+            total[key] = sum(stats[key] for stats in per_worker)
+        return total
+
+    @property
+    def stats(self) -> Dict:
+        """Retorna estadísticas del pool"""
+        return {
+            "workers": self.workers,
+            "batches": self._batches,
+            "events_per_worker": list(self._events_per_shard),
+            "worker_memory": [
+                {k: info.get(k) for k in ("pid", "format", "load_ms", "rss_mb", "shared_mb")}
+                for info in self._worker_info
+            ],
+        }
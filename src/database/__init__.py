@@ -3,6 +3,14 @@ Némesis IA - Database Module
 Sistema de persistencia
 """
 
+from .connection_manager import ConnectionManager
+from .partitions import ThreatPartitions, iter_archive
+from .rollups import ThreatRollups
+from .stats_aggregator import DailyStatsAggregator
 from .threat_database import ThreatDatabase, ThreatRecord
+from .write_behind import WriteBehindQueue
 
-__all__ = ['ThreatDatabase', 'ThreatRecord']
\ No newline at end of file
+__all__ = [
+    'ConnectionManager', 'DailyStatsAggregator', 'ThreatDatabase', 'ThreatPartitions',
+    'ThreatRecord', 'ThreatRollups', 'WriteBehindQueue', 'iter_archive'
+]
\ No newline at end of file
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Némesis IA - Connection Manager
+Una conexión de escritura y un pool de conexiones de solo lectura
+
+ThreatDatabase compartía una única conexión (check_same_thread=False)
+entre el sentinel de logs, el honeypot y los dashboards: las lecturas
+pesadas de un dashboard se serializaban con las escrituras de detección,
+y usar la misma conexión desde varios hilos a la vez no es seguro.
+
+ConnectionManager abre la BD en modo WAL y separa ambos caminos:
+
+- Escritura: una sola conexión, protegida por un lock (SQLite admite un
+  único escritor; así se espera en el lock en vez de en SQLITE_BUSY).
+  write() confirma la transacción al salir o la deshace si hay error.
+- Lectura: hasta `readers` conexiones `mode=ro` + query_only, prestadas
+  con read(). En WAL los lectores leen la última versión confirmada sin
+  bloquear al escritor ni ser bloqueados por él.
+
+Pragmas: journal_mode=WAL, synchronous=NORMAL (fsync en checkpoint, no
+en cada commit), busy_timeout, temp_store=MEMORY, cache_size y mmap_size.
+
+Copyright (C) 2025 Némesis AI Project Contributors
+Licensed under GPL-3.0
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionManager:
+    """Conexión de escritura única + pool de lectores en WAL"""
+
+    READERS = 4
+    BUSY_TIMEOUT_MS = 5000
+    CACHE_SIZE_KB = 16384
+    MMAP_SIZE = 256 * 1024 * 1024
+
+    def __init__(
+        self,
+        db_path: str,
+        readers: int = READERS,
+        busy_timeout_ms: int = BUSY_TIMEOUT_MS,
+        synchronous: str = "NORMAL",
+        cache_size_kb: int = CACHE_SIZE_KB,
+        mmap_size: int = MMAP_SIZE
+    ):
+        """
+        Abre la conexión de escritura (los lectores se abren bajo demanda)
+
+        Args:
+            db_path: Ruta al archivo de base de datos
+            readers: Conexiones de lectura como máximo
+            busy_timeout_ms: Espera máxima ante un bloqueo de SQLite (y de
+                un lector libre cuando el pool está agotado)
+            synchronous: PRAGMA synchronous de la conexión de escritura
+            cache_size_kb: Caché de páginas por conexión
+            mmap_size: Bytes del archivo mapeados en memoria (0 = sin mmap)
+        """
+        self.db_path = Path(db_path)
+        self.max_readers = max(readers, 1)
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+
+        self.writer = sqlite3.connect(
+            str(self.db_path), timeout=busy_timeout_ms / 1000, check_same_thread=False
+        )
+        self.writer.row_factory = sqlite3.Row
+        self.writer.execute("PRAGMA journal_mode=WAL")
+        self.writer.execute(f"PRAGMA synchronous={synchronous}")
+        self._tune(self.writer)
+
+        self._write_lock = threading.RLock()
+        self._depth = 0
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._closed = False
+
+        self.reads = 0
+        self.writes = 0
+        self.read_waits = 0
+
+    def _tune(self, conn: sqlite3.Connection) -> None:
+        """Pragmas comunes a todas las conexiones"""
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Connection]:
+        """
+        Conexión de escritura en exclusiva (una transacción)
+
+        Reentrante en el mismo hilo: el commit lo hace el bloque exterior.
+
+        Yields:
+            Conexión de escritura
+        """
+        with self._write_lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("ConnectionManager cerrado")
+
+            self._depth += 1
+            try:
+                yield self.writer
+            except BaseException:
+                if self._depth == 1:
+                    self.writer.rollback()
+                raise
+            else:
+                if self._depth == 1:
+                    self.writer.commit()
+                    self.writes += 1
+            finally:
+                self._depth -= 1
+
+    @contextmanager
+    def read(self) -> Iterator[sqlite3.Connection]:
+        """
+        Conexión de solo lectura prestada del pool
+
+        Yields:
+            Conexión de lectura (no ve lo que aún no se ha confirmado)
+        """
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            # Cerrar cualquier lectura a medias antes de devolverla
+            if conn.in_transaction:
+                conn.rollback()
+            self._release(conn)
+
+    def _acquire(self) -> sqlite3.Connection:
+        """Toma un lector libre, abre uno nuevo o espera a que se libere"""
+        if self._closed:
+            raise sqlite3.ProgrammingError("ConnectionManager cerrado")
+
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._readers_lock:
+                if len(self._readers) < self.max_readers:
+                    conn = self._open_reader()
+                    self._readers.append(conn)
+
+            if conn is None:
+                self.read_waits += 1
+                try:
+                    conn = self._idle.get(timeout=self.busy_timeout_ms / 1000)
+                except queue.Empty:
+                    raise sqlite3.OperationalError(
+                        f"Sin conexiones de lectura libres ({self.max_readers})"
+                    ) from None
+
+        self.reads += 1
+        return conn
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        """Devuelve un lector al pool (o lo cierra si el gestor se cerró)"""
+        if self._closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
+
+    def _open_reader(self) -> sqlite3.Connection:
+        """Conexión de solo lectura"""
+        uri = f"{self.db_path.resolve().as_uri()}?mode=ro"
+        conn = sqlite3.connect(
+            uri, uri=True, timeout=self.busy_timeout_ms / 1000, check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only=ON")
+        self._tune(conn)
+        return conn
+
+    def close(self) -> None:
+        """Cierra la conexión de escritura y los lectores libres (idempotente)"""
+        with self._write_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self.writer.close()
+
+        # Los lectores prestados se cierran al devolverse
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    @property
+    def stats(self) -> Dict:
+        """Retorna estadísticas de las conexiones"""
+        return {
+            "readers_open": len(self._readers),
+            "readers_idle": self._idle.qsize(),
+            "max_readers": self.max_readers,
+            "reads": self.reads,
+            "writes": self.writes,
+            "read_waits": self.read_waits,
+        }
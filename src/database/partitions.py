@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Némesis IA - Threat Partitions
+Tabla threats particionada por tiempo, con retención y archivo en frío
+
+Una única tabla threats crece sin límite: los índices y las consultas por
+rango se degradan con decenas de millones de filas, y borrar el histórico
+antiguo es un DELETE enorme. Ahora cada mes (o día) es una tabla propia:
+
+- threats_2025_12 (o threats_2025_12_04) con los mismos campos e índices
+- threat_partitions: catálogo con el rango [start, end) de cada partición
+  (prefijos ISO: '2025-12' <= timestamp < '2026-01')
+- threats: vista UNION ALL de las particiones vivas, para las lecturas
+  existentes (las escrituras van siempre por ThreatPartitions.insert)
+- threat_sequence: IDs globales (únicos entre particiones y procesos)
+
+Las consultas por rango (ThreatDatabase.get_threats / count_threats con
+since/until) solo tocan las particiones que se solapan con el rango.
+
+Retención: las particiones que terminan antes de `retention_days` se
+exportan a `archive_dir/<partición>_<fecha>.jsonl.gz` y se eliminan (DROP
+TABLE, instantáneo). Exportación y borrado van en la misma transacción de
+escritura: si el archivo no se puede escribir, la partición sigue viva. El
+archivo se escribe como .partial y solo se renombra tras el commit; si la
+transacción falla se borra, así que cada reintento no deja un archivo más.
+Si llegan amenazas tardías de un periodo ya archivado, la partición se
+vuelve a crear y se archivará de nuevo (en otro archivo).
+
+Cada proceso recuerda las particiones que ya ha comprobado. Si otro
+proceso archiva una, la inserción falla con "no such table": se olvida,
+se vuelve a consultar threat_partitions y se reintenta. apply_retention
+también relee el catálogo.
+
+Al abrir una BD con la tabla threats clásica, se migra a particiones.
+
+Copyright (C) 2025 Némesis AI Project Contributors
+Licensed under GPL-3.0
+"""
+
+import gzip
+import json
+import logging
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+THREAT_COLUMNS = (
+    "timestamp", "source_ip", "attack_type", "payload", "confidence", "action_taken", "blocked"
+)
+
+# Tipos de (id,) + THREAT_COLUMNS, para la vista sin particiones
+_COLUMN_TYPES = ("INTEGER", "TEXT", "TEXT", "TEXT", "TEXT", "REAL", "TEXT", "BOOLEAN")
+
+# SQLITE_MAX_COMPOUND_SELECT es 500: la vista anida grupos de UNION ALL
+_VIEW_GROUP = 400
+
+
+class ThreatPartitions:
+    """Particiones temporales de la tabla threats"""
+
+    GRANULARITIES = {"month": 7, "day": 10}
+
+    def __init__(
+        self,
+        connections,
+        partition_by: str = "month",
+        retention_days: Optional[int] = None,
+        archive_dir: Optional[str] = None
+    ):
+        """
+        Inicializa el gestor de particiones (el esquema se crea con setup)
+
+        Args:
+            connections: ConnectionManager de la BD
+            partition_by: "month" o "day"
+            retention_days: Días que se conservan en la BD (None = todos)
+            archive_dir: Directorio de los archivos comprimidos
+                (por defecto, archive/ junto a la BD)
+        """
+        if partition_by not in self.GRANULARITIES:
+            raise ValueError(f"partition_by inválido: {partition_by!r} (month o day)")
+
+        self.connections = connections
+        self.partition_by = partition_by
+        self.retention_days = retention_days
+        self.archive_dir = Path(archive_dir) if archive_dir else connections.db_path.parent / "archive"
+
+        self._prefix = self.GRANULARITIES[partition_by]
+        self._known: Dict[str, str] = {}
+
+        # Llamadas (conn, start, end) al archivar, en la misma transacción
+        self.on_archive: List[Callable[[sqlite3.Connection, str, str], None]] = []
+
+        self.archived = 0
+
+    # --- Claves y rangos ---
+
+    def key(self, timestamp: str) -> str:
+        """Partición de un timestamp ISO ('2025-12' o '2025-12-04')"""
+        return timestamp[:self._prefix]
+
+    def _bounds(self, key: str) -> tuple:
+        """Rango [start, end) de una partición como prefijos ISO"""
+        if self.partition_by == "day":
+            end = datetime.strptime(key, "%Y-%m-%d") + timedelta(days=1)
+            return key, end.strftime("%Y-%m-%d")
+
+        year, month = int(key[:4]), int(key[5:7])
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return key, f"{year:04d}-{month:02d}"
+
+    @staticmethod
+    def table(key: str) -> str:
+        """Nombre de la tabla de una partición"""
+        return "threats_" + key.replace("-", "_")
+
+    # --- Esquema ---
+
+    def setup(self, conn: sqlite3.Connection) -> None:
+        """
+        Crea catálogo y secuencia, migra la tabla clásica y crea la vista
+
+        Args:
+            conn: Conexión de escritura (el llamador confirma)
+        """
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS threat_partitions (
+                name TEXT PRIMARY KEY,
+                start TEXT NOT NULL,
+                end TEXT NOT NULL,
+                archived INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        conn.execute("CREATE TABLE IF NOT EXISTS threat_sequence (next_id INTEGER NOT NULL)")
+        if conn.execute("SELECT COUNT(*) FROM threat_sequence").fetchone()[0] == 0:
+            conn.execute("INSERT INTO threat_sequence (next_id) VALUES (1)")
+
+        kind = conn.execute("SELECT type FROM sqlite_master WHERE name = 'threats'").fetchone()
+        if kind and kind[0] == "table":
+            self._migrate(conn)
+
+        # Siempre hay al menos una partición viva (la actual)
+        self._ensure(conn, self.key(datetime.now().isoformat()), rebuild_view=False)
+        self._rebuild_view(conn)
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        """Reparte la tabla threats clásica en particiones (conserva los IDs)"""
+        conn.execute("ALTER TABLE threats RENAME TO threats_legacy")
+        for index in ("idx_threats_timestamp", "idx_threats_source_ip", "idx_threats_attack_type"):
+            conn.execute(f"DROP INDEX IF EXISTS {index}")
+
+        keys = [row[0] for row in conn.execute(
+            f"SELECT DISTINCT substr(timestamp, 1, {self._prefix}) FROM threats_legacy"
+        )]
+        columns = ", ".join(("id",) + THREAT_COLUMNS)
+        for key in keys:
+            name = self._ensure(conn, key, rebuild_view=False)
+            start, end = self._bounds(key)
+            conn.execute(
+                f"INSERT INTO {name} ({columns}) SELECT {columns} FROM threats_legacy "
+                f"WHERE timestamp >= ? AND timestamp < ?",
+                (start, end)
+            )
+
+        # AUTOINCREMENT: tampoco se reutilizan los IDs de filas ya borradas
+        last_id = conn.execute("""
+            SELECT MAX(COALESCE((SELECT MAX(id) FROM threats_legacy), 0),
+                       COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'threats_legacy'), 0))
+        """).fetchone()[0]
+        conn.execute("UPDATE threat_sequence SET next_id = MAX(next_id, ?)", (last_id + 1,))
+        conn.execute("DROP TABLE threats_legacy")
+        logger.info(f"🗂️  Tabla threats migrada a {len(keys)} particiones")
+
+    def _ensure(self, conn: sqlite3.Connection, key: str, rebuild_view: bool = True) -> str:
+        """Crea la partición si no existe (o si estaba archivada)"""
+        name = self._known.get(key)
+        if name is not None:
+            return name
+
+        name = self.table(key)
+        start, end = self._bounds(key)
+        live = conn.execute(
+            "SELECT 1 FROM threat_partitions WHERE name = ? AND archived = 0", (name,)
+        ).fetchone()
+
+        if not live:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {name} (
+                    id INTEGER PRIMARY KEY,
+                    timestamp TEXT NOT NULL,
+                    source_ip TEXT NOT NULL,
+                    attack_type TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    confidence REAL NOT NULL,
+                    action_taken TEXT NOT NULL,
+                    blocked BOOLEAN NOT NULL
+                )
+            """)
+            for column in ("timestamp", "source_ip", "attack_type"):
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_{column} ON {name}({column})")
+            conn.execute("""
+                INSERT INTO threat_partitions (name, start, end, archived) VALUES (?, ?, ?, 0)
+                ON CONFLICT(name) DO UPDATE SET archived = 0
+            """, (name, start, end))
+            if rebuild_view:
+                self._rebuild_view(conn)
+            logger.debug(f"🗂️  Partición creada: {name} [{start}, {end})")
+
+        self._known[key] = name
+        return name
+
+    def _rebuild_view(self, conn: sqlite3.Connection) -> None:
+        """Vista threats = UNION ALL de las particiones vivas (vacía si no hay)"""
+        names = [row[0] for row in conn.execute(
+            "SELECT name FROM threat_partitions WHERE archived = 0 ORDER BY start"
+        )]
+        columns = ", ".join(("id",) + THREAT_COLUMNS)
+
+        if not names:
+            # Todas archivadas (p. ej. por día con retención en un proceso inactivo)
+            empty = ", ".join(
+                f"CAST(NULL AS {kind}) AS {column}"
+                for column, kind in zip(("id",) + THREAT_COLUMNS, _COLUMN_TYPES)
+            )
+            conn.execute("DROP VIEW IF EXISTS threats")
+            conn.execute(f"CREATE VIEW threats AS SELECT {empty} WHERE 0")
+            return
+
+        groups = [
+            " UNION ALL ".join(f"SELECT {columns} FROM {name}" for name in names[i:i + _VIEW_GROUP])
+            for i in range(0, len(names), _VIEW_GROUP)
+        ]
+        body = groups[0] if len(groups) == 1 else " UNION ALL ".join(
+            f"SELECT * FROM ({group})" for group in groups
+        )
+
+        conn.execute("DROP VIEW IF EXISTS threats")
+        conn.execute(f"CREATE VIEW threats AS {body}")
+
+    # --- Escritura ---
+
+    def insert(self, conn: sqlite3.Connection, rows: Sequence[tuple]) -> List[int]:
+        """
+        Inserta amenazas en sus particiones (dentro de la transacción del llamador)
+
+        Args:
+            conn: Conexión de escritura
+            rows: Tuplas en el orden de THREAT_COLUMNS (timestamp ISO primero)
+
+        Returns:
+            IDs asignados, en el orden de rows
+        """
+        if not rows:
+            return []
+
+        # Reserva de IDs: el UPDATE toma el lock de escritura de SQLite
+        conn.execute("UPDATE threat_sequence SET next_id = next_id + ?", (len(rows),))
+        first = conn.execute("SELECT next_id FROM threat_sequence").fetchone()[0] - len(rows)
+
+        per_partition: Dict[str, List[tuple]] = {}
+        for offset, row in enumerate(rows):
+            per_partition.setdefault(self.key(row[0]), []).append((first + offset, *row))
+
+        for key, items in per_partition.items():
+            try:
+                self._insert_partition(conn, key, items)
+            except sqlite3.OperationalError as e:
+                # Otro proceso archivó la partición: el catálogo manda
+                if "no such table" not in str(e):
+                    raise
+                self._known.pop(key, None)
+                self._insert_partition(conn, key, items)
+
+        return list(range(first, first + len(rows)))
+
+    def _insert_partition(self, conn: sqlite3.Connection, key: str, items: List[tuple]) -> None:
+        """Inserta filas (id primero) en la partición de key, creándola si hace falta"""
+        name = self._ensure(conn, key)
+        columns = ", ".join(("id",) + THREAT_COLUMNS)
+        placeholders = ", ".join("?" for _ in range(len(THREAT_COLUMNS) + 1))
+        conn.executemany(f"INSERT INTO {name} ({columns}) VALUES ({placeholders})", items)
+
+    # --- Lectura ---
+
+    def overlapping(
+        self,
+        conn: sqlite3.Connection,
+        since: Optional[str] = None,
+        until: Optional[str] = None
+    ) -> List[str]:
+        """
+        Particiones vivas que se solapan con [since, until), de la más reciente a la más antigua
+
+        Args:
+            conn: Cualquier conexión
+            since: Timestamp ISO inicial (incluido); None = sin límite
+            until: Timestamp ISO final (excluido); None = sin límite
+        """
+        query = "SELECT name FROM threat_partitions WHERE archived = 0"
+        params = []
+        if since is not None:
+            query += " AND end > ?"
+            params.append(since)
+        if until is not None:
+            query += " AND start < ?"
+            params.append(until)
+        query += " ORDER BY start DESC"
+        return [row[0] for row in conn.execute(query, params)]
+
+    # --- Retención ---
+
+    def apply_retention(self, now: Optional[datetime] = None) -> List[Path]:
+        """
+        Archiva y elimina las particiones anteriores a retention_days
+
+        Args:
+            now: Referencia (por defecto, ahora)
+
+        Returns:
+            Archivos creados
+        """
+        if self.retention_days is None:
+            return []
+
+        # Otros procesos pueden haber archivado o recreado particiones
+        self._known = {}
+
+        cutoff = ((now or datetime.now()) - timedelta(days=self.retention_days)).isoformat()
+        with self.connections.read() as conn:
+            expired = [row[0] for row in conn.execute(
+                "SELECT name FROM threat_partitions WHERE archived = 0 AND end <= ? ORDER BY start",
+                (cutoff,)
+            )]
+
+        archives = []
+        for name in expired:
+            path = self._archive(name)
+            if path is not None:
+                archives.append(path)
+
+        if archives:
+            logger.info(f"🗄️  Retención: {len(archives)} particiones archivadas en {self.archive_dir}")
+        return archives
+
+    def _archive(self, name: str) -> Optional[Path]:
+        """Exporta una partición a .jsonl.gz y la elimina (una transacción)"""
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        path = self.archive_dir / f"{name}_{datetime.now():%Y%m%dT%H%M%S}.jsonl.gz"
+        partial = path.with_name(path.name + ".partial")
+
+        try:
+            with self.connections.write() as conn:
+                # Bloquea a otros escritores (también de otros procesos) durante la exportación
+                conn.execute("BEGIN IMMEDIATE")
+                bounds = conn.execute(
+                    "SELECT start, end FROM threat_partitions WHERE name = ? AND archived = 0", (name,)
+                ).fetchone()
+                if bounds is None:
+                    return None
+
+                cursor = conn.execute(f"SELECT * FROM {name} ORDER BY id")
+                columns = [column[0] for column in cursor.description]
+                rows = 0
+                with gzip.open(partial, "wt", encoding="utf-8") as archive:
+                    for row in cursor:
+                        archive.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n")
+                        rows += 1
+
+                conn.execute(f"DROP TABLE {name}")
+                conn.execute("UPDATE threat_partitions SET archived = 1 WHERE name = ?", (name,))
+                self._rebuild_view(conn)
+                for callback in self.on_archive:
+                    callback(conn, *bounds)
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+
+        # Solo con la transacción confirmada el archivo pasa a ser definitivo
+        os.replace(partial, path)
+
+        self._known = {key: table for key, table in self._known.items() if table != name}
+        self.archived += 1
+        logger.info(f"🗄️  {name}: {rows} amenazas archivadas en {path.name}")
+        return path
+
+    @property
+    def stats(self) -> Dict:
+        """Retorna estadísticas de las particiones"""
+        with self.connections.read() as conn:
+            live, archived = conn.execute(
+                "SELECT COALESCE(SUM(archived = 0), 0), COALESCE(SUM(archived = 1), 0) FROM threat_partitions"
+            ).fetchone()
+        return {
+            "partition_by": self.partition_by,
+            "live_partitions": live,
+            "archived_partitions": archived,
+            "retention_days": self.retention_days,
+            "archived_this_session": self.archived,
+        }
+
+
+def iter_archive(path: str) -> Iterator[Dict]:
+    """
+    Lee un archivo de partición (.jsonl.gz)
+
+    Args:
+        path: Archivo creado por apply_retention
+
+    Yields:
+        Filas de la partición (id, timestamp, source_ip, ...)
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        for line in archive:
+            yield json.loads(line)
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Némesis IA - Threat Rollups
+Agregados por minuto, hora y día para los dashboards
+
+El timeline de los dashboards leía todos los timestamps de las últimas
+24 h y los agrupaba en Python; las estadísticas se calculaban con
+agregados sobre la tabla completa. Con rollups el coste de una consulta
+depende del número de buckets, no del de amenazas:
+
+- threat_rollup_minute: (bucket 'YYYY-MM-DDTHH:MM', attack_type, source_ip) -> count
+  (solo las últimas `minute_retention_hours` horas)
+- threat_rollup_hour:   (bucket 'YYYY-MM-DDTHH', attack_type, source_ip) -> count
+- threat_rollup_day:    (bucket 'YYYY-MM-DD', attack_type, source_ip) -> count
+  (totales globales: tipos y top de IPs sin recorrer una fila por hora)
+
+Se mantienen en la misma transacción que las amenazas (upsert de los
+incrementos agregados del lote), así que son exactos también ante caídas.
+Al archivar una partición se borran sus buckets: los rollups cubren
+exactamente las amenazas vivas.
+
+Copyright (C) 2025 Némesis AI Project Contributors
+Licensed under GPL-3.0
+"""
+
+import logging
+import sqlite3
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# Longitud del prefijo ISO de cada bucket y su paso
+ROLLUP_GRANULARITIES = {
+    "minute": (16, timedelta(minutes=1)),
+    "hour": (13, timedelta(hours=1)),
+    "day": (10, timedelta(days=1)),
+}
+
+
+class ThreatRollups:
+    """Rollups por minuto y hora de (tipo de ataque, IP de origen)"""
+
+    MINUTE_RETENTION_HOURS = 48
+
+    def __init__(self, minute_retention_hours: int = MINUTE_RETENTION_HOURS):
+        """
+        Inicializa los rollups (las tablas se crean con setup)
+
+        Args:
+            minute_retention_hours: Horas que se conservan en el rollup por minuto
+        """
+        self.minute_retention_hours = minute_retention_hours
+        self._pruned_hour: Optional[str] = None
+
+    @staticmethod
+    def table(granularity: str) -> str:
+        """Tabla de una granularidad"""
+        if granularity not in ROLLUP_GRANULARITIES:
+            raise ValueError(f"Granularidad inválida: {granularity!r} (minute, hour o day)")
+        return f"threat_rollup_{granularity}"
+
+    def setup(self, conn: sqlite3.Connection) -> None:
+        """
+        Crea las tablas y las rellena si la BD ya tenía amenazas
+
+        Args:
+            conn: Conexión de escritura (el llamador confirma)
+        """
+        for granularity in ROLLUP_GRANULARITIES:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.table(granularity)} (
+                    bucket TEXT NOT NULL,
+                    attack_type TEXT NOT NULL,
+                    source_ip TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (bucket, attack_type, source_ip)
+                ) WITHOUT ROWID
+            """)
+
+        # El rollup por minuto se queda vacío tras 48 h sin amenazas nuevas:
+        # solo las tablas completas indican una BD sin rollups
+        empty = any(
+            conn.execute(f"SELECT 1 FROM {self.table(granularity)} LIMIT 1").fetchone() is None
+            for granularity in ("hour", "day")
+        )
+        if empty and conn.execute("SELECT 1 FROM threats LIMIT 1").fetchone():
+            self.rebuild(conn)
+
+    def record(self, conn: sqlite3.Connection, rows: Sequence[tuple], now: Optional[datetime] = None) -> None:
+        """
+        Suma amenazas a los rollups (dentro de la transacción del llamador)
+
+        Args:
+            conn: Conexión de escritura
+            rows: Tuplas (timestamp ISO, source_ip, attack_type, ...)
+            now: Referencia de la poda del rollup por minuto (por defecto, ahora)
+        """
+        if not rows:
+            return
+
+        for granularity, (length, _) in ROLLUP_GRANULARITIES.items():
+            counts = Counter((row[0][:length], row[2], row[1]) for row in rows)
+            conn.executemany(f"""
+                INSERT INTO {self.table(granularity)} (bucket, attack_type, source_ip, count)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(bucket, attack_type, source_ip) DO UPDATE SET
+                    count = count + excluded.count
+            """, [(*key, count) for key, count in counts.items()])
+
+        self._prune(conn, now or datetime.now())
+
+    def _prune(self, conn: sqlite3.Connection, now: datetime) -> None:
+        """Poda el rollup por minuto (como mucho una vez por hora)"""
+        hour = now.isoformat()[:13]
+        if hour == self._pruned_hour:
+            return
+
+        cutoff = (now - timedelta(hours=self.minute_retention_hours)).isoformat()[:16]
+        conn.execute("DELETE FROM threat_rollup_minute WHERE bucket < ?", (cutoff,))
+        self._pruned_hour = hour
+
+    def rebuild(self, conn: sqlite3.Connection, now: Optional[datetime] = None) -> None:
+        """
+        Recalcula los rollups desde la vista threats
+
+        Args:
+            conn: Conexión de escritura (el llamador confirma)
+            now: Referencia de la retención del rollup por minuto
+        """
+        cutoff = ((now or datetime.now()) - timedelta(hours=self.minute_retention_hours)).isoformat()[:16]
+
+        for granularity, (length, _) in ROLLUP_GRANULARITIES.items():
+            table = self.table(granularity)
+            conn.execute(f"DELETE FROM {table}")
+            conn.execute(f"""
+                INSERT INTO {table} (bucket, attack_type, source_ip, count)
+                SELECT substr(timestamp, 1, {length}), attack_type, source_ip, COUNT(*)
+                FROM threats WHERE timestamp >= ?
+                GROUP BY 1, 2, 3
+            """, (cutoff if granularity == "minute" else "",))
+
+        logger.info("📈 Rollups de amenazas recalculados")
+
+    def discard(self, conn: sqlite3.Connection, start: str, end: str) -> None:
+        """
+        Borra los buckets de [start, end) (partición archivada)
+
+        Args:
+            conn: Conexión de escritura
+            start: Prefijo ISO inicial (incluido)
+            end: Prefijo ISO final (excluido)
+        """
+        for granularity in ROLLUP_GRANULARITIES:
+            conn.execute(
+                f"DELETE FROM {self.table(granularity)} WHERE bucket >= ? AND bucket < ?", (start, end)
+            )
+
+    def timeline(
+        self,
+        conn: sqlite3.Connection,
+        since: datetime,
+        until: datetime,
+        granularity: str = "hour",
+        attack_type: Optional[str] = None
+    ) -> List[Tuple[str, int]]:
+        """
+        Amenazas por bucket entre since y until, vacíos a 0
+
+        Args:
+            conn: Cualquier conexión
+            since: Inicio (el bucket que lo contiene es el primero)
+            until: Fin (el bucket que lo contiene es el último)
+            granularity: "minute", "hour" o "day"
+            attack_type: Filtrar por tipo de ataque
+
+        Returns:
+            [(bucket, amenazas)] en orden cronológico
+        """
+        table = self.table(granularity)
+        length, step = ROLLUP_GRANULARITIES[granularity]
+
+        first = datetime.fromisoformat(since.isoformat()[:length])
+        end = datetime.fromisoformat(until.isoformat()[:length]) + step
+
+        query = f"SELECT bucket, SUM(count) FROM {table} WHERE bucket >= ? AND bucket < ?"
+        params = [first.isoformat()[:length], end.isoformat()[:length]]
+        if attack_type:
+            query += " AND attack_type = ?"
+            params.append(attack_type)
+        counts: Dict[str, int] = dict(conn.execute(query + " GROUP BY bucket", params).fetchall())
+
+        bucket = first
+        buckets = []
+        while bucket < end:
+            key = bucket.isoformat()[:length]
+            buckets.append((key, counts.get(key, 0)))
+            bucket += step
+        return buckets
+
+    @staticmethod
+    def totals(
+        conn: sqlite3.Connection, since: str, max_ips: Optional[int] = None
+    ) -> Tuple[int, Counter, Counter, Counter]:
+        """
+        Totales globales y amenazas por minuto desde since
+
+        Args:
+            conn: Cualquier conexión
+            since: Primer minuto ('YYYY-MM-DDTHH:MM') de by_minute
+            max_ips: IPs con más amenazas que se devuelven (None = todas)
+
+        Returns:
+            (total, por tipo, por IP, por minuto)
+        """
+        total = conn.execute("SELECT COALESCE(SUM(count), 0) FROM threat_rollup_day").fetchone()[0]
+        by_type = Counter(dict(conn.execute(
+            "SELECT attack_type, SUM(count) FROM threat_rollup_day GROUP BY attack_type"
+        ).fetchall()))
+        by_ip = Counter(dict(conn.execute(
+            "SELECT source_ip, SUM(count) AS n FROM threat_rollup_day GROUP BY source_ip ORDER BY n DESC LIMIT ?",
+            (-1 if max_ips is None else max_ips,)
+        ).fetchall()))
+        by_minute = Counter(dict(conn.execute(
+            "SELECT bucket, SUM(count) FROM threat_rollup_minute WHERE bucket >= ? GROUP BY bucket",
+            (since,)
+        ).fetchall()))
+        return total, by_type, by_ip, by_minute
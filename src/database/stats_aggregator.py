@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Némesis IA - Daily Stats Aggregator
+Estadísticas de amenazas agregadas en memoria
+
+Antes cada amenaza hacía un SELECT + UPDATE (o INSERT) + commit sobre
+daily_stats, y get_statistics recorría la tabla threats con cuatro
+consultas. Ahora los contadores viven en memoria:
+
+- Incrementos pendientes de daily_stats por (fecha, columna), volcados
+  cada `flush_interval` segundos con INSERT ... ON CONFLICT DO UPDATE
+  (una transacción para todos los días pendientes)
+- Totales, tipos, top de IPs, IPs bloqueadas y amenazas por minuto de
+  las últimas 24 h: get_statistics no recorre threats
+
+Consistencia ante caídas (la tabla threats es la fuente de verdad):
+
+- Las amenazas se confirman en threats antes de contarse, y los
+  incrementos solo salen de memoria cuando su upsert hace commit (si el
+  volcado falla vuelven a la cola): daily_stats nunca cuenta de más.
+- Una caída (kill -9, corte de luz) pierde como mucho los incrementos
+  del último `flush_interval`: daily_stats puede quedarse por debajo de
+  threats, nunca por encima.
+- close() vuelca todo: tras un cierre limpio daily_stats es exacta.
+- rebuild_daily_stats() recalcula daily_stats desde threats (días con
+  amenazas en la tabla; los archivados no se tocan) tras una caída.
+- Con WriteBehindQueue los incrementos van en la misma transacción que
+  sus amenazas: exactos también ante caídas.
+
+Los contadores de lectura parten de los rollups (ver rollups.py) al abrir
+la BD, sin recorrer threats, y después suman las escrituras de este
+proceso. Las de otros procesos (el sentinel escribiendo mientras un
+dashboard lee) solo se ven al recargar: get_statistics(max_age=...)
+llama a refresh() si los contadores son más antiguos (reconciliación
+ocasional, `MAX_AGE` = un minuto). Los dashboards que necesitan ver
+siempre a otros procesos usan ThreatDatabase.get_summary.
+
+Copyright (C) 2025 Némesis AI Project Contributors
+Licensed under GPL-3.0
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+from .rollups import ThreatRollups
+
+logger = logging.getLogger(__name__)
+
+
+ATTACK_COLUMNS = ("sql_injection", "xss", "path_traversal", "command_injection", "other")
+
+
+def attack_column(attack_type: str) -> str:
+    """Columna de daily_stats de un tipo de ataque"""
+    column = attack_type.lower()
+    return column if column in ATTACK_COLUMNS else "other"
+
+
+def upsert_daily_stats(conn: sqlite3.Connection, per_day: Dict[str, Dict[str, int]]) -> None:
+    """
+    Suma incrementos a daily_stats (dentro de la transacción del llamador)
+
+    Args:
+        conn: Conexión de escritura
+        per_day: {fecha: {columna de ataque: amenazas}}
+    """
+    if not per_day:
+        return
+
+    columns = ", ".join(ATTACK_COLUMNS)
+    placeholders = ", ".join("?" for _ in ATTACK_COLUMNS)
+    increments = ", ".join(f"{col} = {col} + excluded.{col}" for col in ATTACK_COLUMNS)
+    conn.executemany(f"""
+        INSERT INTO daily_stats (date, total_logs, threats_detected, {columns})
+        VALUES (?, ?, ?, {placeholders})
+        ON CONFLICT(date) DO UPDATE SET
+            total_logs = total_logs + excluded.total_logs,
+            threats_detected = threats_detected + excluded.threats_detected,
+            {increments}
+    """, [
+        (date, sum(counts.values()), sum(counts.values()),
+         *(counts.get(col, 0) for col in ATTACK_COLUMNS))
+        for date, counts in per_day.items()
+    ])
+
+
+def _minute(timestamp: datetime) -> str:
+    """Clave de minuto, con el mismo formato que los timestamps guardados"""
+    return timestamp.isoformat()[:16]
+
+
+class DailyStatsAggregator:
+    """Contadores de amenazas en memoria con volcado periódico a daily_stats"""
+
+    FLUSH_INTERVAL = 5.0
+    MAX_AGE = 60.0
+    MAX_TRACKED_IPS = 100000
+    TOP_IPS = 10
+
+    def __init__(
+        self,
+        connections,
+        flush_interval: Optional[float] = FLUSH_INTERVAL,
+        max_tracked_ips: int = MAX_TRACKED_IPS
+    ):
+        """
+        Inicializa el agregador
+
+        Args:
+            connections: ConnectionManager de la BD (volcado por la conexión
+                de escritura, refresh por un lector)
+            flush_interval: Segundos entre volcados (None = solo flush() y close())
+            max_tracked_ips: IPs contadas para el top; al superarlo se
+                conserva la mitad con más amenazas
+        """
+        self.connections = connections
+        self.flush_interval = flush_interval
+        self.max_tracked_ips = max_tracked_ips
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+        # Incrementos de daily_stats aún no volcados
+        self._pending: Dict[str, Counter] = {}
+
+        # Contadores de lectura (get_statistics)
+        self.total_threats = 0
+        self.by_type: Counter = Counter()
+        self.by_ip: Counter = Counter()
+        self.by_minute: Counter = Counter()
+        self.blocked_ips: set = set()
+        self._loaded_at: Optional[float] = None
+
+        self.flushes = 0
+        self.flush_errors = 0
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Arranca el volcado periódico"""
+        if self.flush_interval is None or self._thread is not None:
+            return
+
+        self._thread = threading.Thread(
+            target=self._flush_loop, name="nemesis-daily-stats", daemon=True
+        )
+        self._thread.start()
+
+    def load(self, conn: sqlite3.Connection, now: Optional[datetime] = None) -> None:
+        """
+        Inicializa los contadores de lectura desde los rollups (una sola vez)
+
+        Args:
+            conn: Conexión de lectura
+            now: Referencia de las últimas 24 h (por defecto, ahora)
+        """
+        since = _minute((now or datetime.now()) - timedelta(days=1))
+
+        total, by_type, by_ip, by_minute = ThreatRollups.totals(conn, since, self.max_tracked_ips)
+        blocked = {row[0] for row in conn.execute("SELECT ip FROM blocked_ips")}
+
+        with self._lock:
+            self.total_threats = total
+            self.by_type = by_type
+            self.by_ip = by_ip
+            self.by_minute = by_minute
+            self.blocked_ips = blocked
+            self._loaded_at = time.monotonic()
+
+    def refresh(self) -> None:
+        """Recarga los contadores de lectura desde la BD (incluye otros procesos)"""
+        with self.connections.read() as conn:
+            self.load(conn)
+
+    @property
+    def age(self) -> float:
+        """Segundos desde la última carga desde la BD (infinito si nunca)"""
+        if self._loaded_at is None:
+            return float("inf")
+        return time.monotonic() - self._loaded_at
+
+    def record(self, threats: Iterable, persist: bool = True) -> None:
+        """
+        Cuenta amenazas ya guardadas (o encoladas)
+
+        Args:
+            threats: ThreatRecord (timestamp, source_ip, attack_type)
+            persist: Si False, los incrementos de daily_stats los escribe
+                el llamador (WriteBehindQueue, en la transacción del lote)
+        """
+        since = _minute(datetime.now() - timedelta(days=1))
+
+        with self._lock:
+            for threat in threats:
+                self.total_threats += 1
+                self.by_type[threat.attack_type] += 1
+                self.by_ip[threat.source_ip] += 1
+
+                minute = _minute(threat.timestamp)
+                if minute >= since:
+                    self.by_minute[minute] += 1
+
+                if persist:
+                    day = self._pending.get(minute[:10])
+                    if day is None:
+                        day = self._pending[minute[:10]] = Counter()
+                    day[attack_column(threat.attack_type)] += 1
+
+            if len(self.by_ip) > self.max_tracked_ips:
+                self.by_ip = Counter(dict(self.by_ip.most_common(self.max_tracked_ips // 2)))
+
+    def record_block(self, ip: str) -> None:
+        """Cuenta una IP bloqueada (las repetidas no suman)"""
+        with self._lock:
+            self.blocked_ips.add(ip)
+
+    def flush(self) -> int:
+        """
+        Vuelca los incrementos pendientes a daily_stats
+
+        Returns:
+            Días actualizados
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+
+            if not pending:
+                return 0
+
+            try:
+                with self.connections.write() as conn:
+                    upsert_daily_stats(conn, pending)
+            except Exception as e:
+                # Sin commit: los incrementos vuelven a la cola
+                self.flush_errors += 1
+                with self._lock:
+                    for date, counts in pending.items():
+                        self._pending.setdefault(date, Counter()).update(counts)
+                logger.error(f"❌ Error volcando daily_stats: {e}")
+                return 0
+
+            self.flushes += 1
+            logger.debug(f"📊 daily_stats: {len(pending)} día(s) actualizados")
+            return len(pending)
+
+    def rebuild(self) -> int:
+        """
+        Recalcula daily_stats desde threats (sustituye, no suma)
+
+        Los incrementos pendientes se descartan: sus amenazas ya están en
+        threats. Los días sin amenazas en la tabla no se tocan.
+
+        Returns:
+            Días recalculados
+        """
+        columns = ", ".join(ATTACK_COLUMNS)
+        known = ", ".join(f"'{col}'" for col in ATTACK_COLUMNS[:-1])
+        counts = ", ".join(f"SUM(lower(attack_type) = '{col}')" for col in ATTACK_COLUMNS[:-1])
+        updates = ", ".join(
+            f"{col} = excluded.{col}" for col in ("total_logs", "threats_detected", *ATTACK_COLUMNS)
+        )
+
+        with self._flush_lock:
+            with self._lock:
+                self._pending = {}
+
+            with self.connections.write() as conn:
+                cursor = conn.execute(f"""
+                    INSERT INTO daily_stats (date, total_logs, threats_detected, {columns})
+                    SELECT substr(timestamp, 1, 10), COUNT(*), COUNT(*), {counts},
+                           SUM(lower(attack_type) NOT IN ({known}))
+                    FROM threats WHERE 1
+                    GROUP BY substr(timestamp, 1, 10)
+                    ON CONFLICT(date) DO UPDATE SET {updates}
+                """)
+            return cursor.rowcount
+
+    def _flush_loop(self) -> None:
+        """Hilo de volcado periódico"""
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self) -> None:
+        """Detiene el volcado periódico y vuelca lo pendiente"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        self.flush()
+
+    @property
+    def pending_threats(self) -> int:
+        """Amenazas contadas en memoria aún no volcadas a daily_stats"""
+        with self._lock:
+            return sum(sum(counts.values()) for counts in self._pending.values())
+
+    def snapshot(self, now: Optional[datetime] = None) -> Dict:
+        """
+        Estadísticas globales desde memoria (formato de get_statistics)
+
+        Args:
+            now: Referencia de las últimas 24 h (por defecto, ahora)
+        """
+        since = _minute((now or datetime.now()) - timedelta(days=1))
+
+        with self._lock:
+            stale = [minute for minute in self.by_minute if minute < since]
+            for minute in stale:
+                del self.by_minute[minute]
+
+            return {
+                'total_threats': self.total_threats,
+                'threats_by_type': dict(self.by_type),
+                'total_blocked_ips': len(self.blocked_ips),
+                'top_malicious_ips': self.by_ip.most_common(self.TOP_IPS),
+                'threats_last_24h': sum(self.by_minute.values())
+            }
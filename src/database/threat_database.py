@@ -4,15 +4,28 @@ Némesis IA - Threat Database
 Sistema de persistencia con SQLite
 
 Almacena amenazas, IPs bloqueadas y estadísticas
+
+Las estadísticas (daily_stats y get_statistics) se agregan en memoria y
+se vuelcan periódicamente: ver stats_aggregator.DailyStatsAggregator.
+Las escrituras usan una única conexión y las lecturas un pool de
+conexiones de solo lectura en WAL: ver connection_manager.ConnectionManager.
+La tabla threats está particionada por mes (o día), con retención y
+archivo comprimido: ver partitions.ThreatPartitions. Los dashboards leen
+rollups por minuto/hora/día mantenidos al escribir: ver rollups.ThreatRollups.
 """
 
 import sqlite3
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import List, Dict, Optional
 from dataclasses import dataclass
 
+from .connection_manager import ConnectionManager
+from .partitions import ThreatPartitions
+from .rollups import ThreatRollups
+from .stats_aggregator import DailyStatsAggregator
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,46 +40,89 @@ class ThreatRecord:
     confidence: float
     action_taken: str
     blocked: bool
+    
+    @classmethod
+    def from_event(cls, event, verdict) -> "ThreatRecord":
+        """
+        Crea el registro a partir del evento parseado y su veredicto
+        
+        Conserva el timestamp real del log (no la hora de inserción) y,
+        como payload, la línea de petición completa que analizó el agente:
+        el feedback sobre la amenaza y el reentrenamiento ven así la misma
+        entrada que el modelo en producción.
+        
+        Args:
+            event: Evento tipado (logs.ParsedLog)
+            verdict: ThreatVerdict del agente
+        """
+        return cls(
+            id=None,
+            timestamp=event.timestamp,
+            source_ip=event.source_ip,
+            attack_type=verdict.attack_type,
+            payload=event.payload or event.path,
+            confidence=verdict.confidence,
+            action_taken=verdict.recommended_action,
+            blocked=(verdict.recommended_action == "BLOCK")
+        )
 
 
 class ThreatDatabase:
     """Base de datos de amenazas con SQLite"""
     
-    def __init__(self, db_path: str = "data/nemesis.db"):
+    def __init__(
+        self,
+        db_path: str = "data/nemesis.db",
+        stats_flush_interval: Optional[float] = DailyStatsAggregator.FLUSH_INTERVAL,
+        readers: int = ConnectionManager.READERS,
+        partition_by: str = "month",
+        retention_days: Optional[int] = None,
+        archive_dir: Optional[str] = None
+    ):
         """
         Inicializa la base de datos
         
         Args:
             db_path: Ruta al archivo de base de datos
+            stats_flush_interval: Segundos entre volcados de daily_stats
+                (None = solo en flush_stats() y close())
+            readers: Conexiones de solo lectura para las consultas
+            partition_by: Particiones de threats ("month" o "day")
+            retention_days: Días de amenazas que se conservan en la BD; las
+                particiones anteriores se archivan (None = todas)
+            archive_dir: Directorio de las particiones archivadas
         """
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         
-        self.conn: Optional[sqlite3.Connection] = None
+        # Escritor único + lectores en WAL; conn es la conexión de escritura
+        self.connections = ConnectionManager(self.db_path, readers=readers)
+        self.conn: sqlite3.Connection = self.connections.writer
+        self.partitions = ThreatPartitions(
+            self.connections, partition_by=partition_by,
+            retention_days=retention_days, archive_dir=archive_dir
+        )
+        self.rollups = ThreatRollups()
+        self.partitions.on_archive.append(self.rollups.discard)
         self._init_database()
         
+        # Contadores en memoria: get_statistics sin SQL, daily_stats por lotes
+        self.counters = DailyStatsAggregator(self.connections, flush_interval=stats_flush_interval)
+        with self.connections.read() as conn:
+            self.counters.load(conn)
+        self.counters.start()
+        
+        self.apply_retention()
+        
         logger.info(f"💾 ThreatDatabase inicializada: {self.db_path}")
     
     def _init_database(self):
-        """Inicializa las tablas de la base de datos"""
-        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
-        
+        """Inicializa las tablas de la base de datos (antes de usarla desde otros hilos)"""
         cursor = self.conn.cursor()
         
-        # Tabla de amenazas
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS threats (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                source_ip TEXT NOT NULL,
-                attack_type TEXT NOT NULL,
-                payload TEXT NOT NULL,
-                confidence REAL NOT NULL,
-                action_taken TEXT NOT NULL,
-                blocked BOOLEAN NOT NULL
-            )
-        """)
+        # Amenazas: particiones por tiempo + vista threats + rollups
+        self.partitions.setup(self.conn)
+        self.rollups.setup(self.conn)
         
         # Tabla de IPs bloqueadas
         cursor.execute("""
@@ -93,20 +149,18 @@ class ThreatDatabase:
             )
         """)
         
-        # Índices para búsquedas rápidas
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_threats_timestamp 
-            ON threats(timestamp)
-        """)
-        
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_threats_source_ip 
-            ON threats(source_ip)
-        """)
-        
+        # Tabla de feedback de analistas (correcciones etiquetadas)
         cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_threats_attack_type 
-            ON threats(attack_type)
+            CREATE TABLE IF NOT EXISTS feedback (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                label INTEGER NOT NULL,
+                threat_id INTEGER,
+                source_ip TEXT,
+                analyst TEXT,
+                note TEXT
+            )
         """)
         
         self.conn.commit()
@@ -115,105 +169,227 @@ class ThreatDatabase:
     def save_threat(self, threat: ThreatRecord) -> int:
         """
         Guarda una amenaza en la BD
-        
+    
         Args:
             threat: Registro de amenaza
-            
+    
         Returns:
             ID del registro insertado
         """
-        cursor = self.conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO threats 
-            (timestamp, source_ip, attack_type, payload, confidence, action_taken, blocked)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
-            threat.timestamp.isoformat(),
-            threat.source_ip,
-            threat.attack_type,
-            threat.payload,
-            threat.confidence,
-            threat.action_taken,
-            threat.blocked
-        ))
-        
-        self.conn.commit()
-        threat_id = cursor.lastrowid
-        
-        # Actualizar estadísticas
-        self._update_daily_stats(threat)
-        
+        with self.connections.write() as conn:
+            threat_id, = self.insert_rows(conn, [(
+                threat.timestamp.isoformat(),
+                threat.source_ip,
+                threat.attack_type,
+                threat.payload,
+                threat.confidence,
+                threat.action_taken,
+                threat.blocked
+            )])
+    
+        # Estadísticas: en memoria (daily_stats se vuelca cada stats_flush_interval)
+        self.counters.record([threat])
+    
         logger.debug(f"💾 Amenaza guardada: ID={threat_id}")
         return threat_id
     
+    def save_threats(self, threats: List[ThreatRecord]) -> int:
+        """
+        Guarda un lote de amenazas en una sola transacción
+    
+        Args:
+            threats: Registros de amenaza
+    
+        Returns:
+            Número de registros insertados
+        """
+        if not threats:
+            return 0
+    
+        with self.connections.write() as conn:
+            self.insert_rows(conn, [
+                (
+                    threat.timestamp.isoformat(),
+                    threat.source_ip,
+                    threat.attack_type,
+                    threat.payload,
+                    threat.confidence,
+                    threat.action_taken,
+                    threat.blocked
+                )
+                for threat in threats
+            ])
+    
+        # Estadísticas diarias agregadas en memoria por (fecha, tipo)
+        self.counters.record(threats)
+    
+        logger.debug(f"💾 {len(threats)} amenazas guardadas en lote")
+        return len(threats)
+    
+    def insert_rows(self, conn: sqlite3.Connection, rows: List[tuple]) -> List[int]:
+        """
+        Inserta amenazas en sus particiones y rollups (transacción del llamador)
+        
+        Args:
+            conn: Conexión de escritura
+            rows: Tuplas (timestamp ISO, source_ip, attack_type, payload,
+                confidence, action_taken, blocked)
+        
+        Returns:
+            IDs asignados
+        """
+        ids = self.partitions.insert(conn, rows)
+        self.rollups.record(conn, rows)
+        return ids
+    
     def block_ip(self, ip: str, reason: str):
         """
         Registra una IP bloqueada
-        
+    
         Args:
             ip: Dirección IP
-            reason: Razón del bloqueo
+            reason: Razón del bloqueo (se conserva la del primer bloqueo)
         """
-        cursor = self.conn.cursor()
-        
-        # Verificar si ya existe
-        cursor.execute("SELECT threat_count FROM blocked_ips WHERE ip = ?", (ip,))
-        row = cursor.fetchone()
-        
-        if row:
-            # Incrementar contador
-            cursor.execute("""
-                UPDATE blocked_ips 
-                SET threat_count = threat_count + 1
-                WHERE ip = ?
-            """, (ip,))
-        else:
-            # Insertar nueva IP
-            cursor.execute("""
+        with self.connections.write() as conn:
+            # Nueva IP o incremento de su contador, en una sentencia
+            conn.execute("""
                 INSERT INTO blocked_ips (ip, blocked_at, reason, threat_count)
                 VALUES (?, ?, ?, 1)
+                ON CONFLICT(ip) DO UPDATE SET threat_count = threat_count + 1
             """, (ip, datetime.now().isoformat(), reason))
-        
-        self.conn.commit()
+    
+        self.counters.record_block(ip)
         logger.debug(f"🚫 IP bloqueada registrada: {ip}")
     
+    def save_feedback(
+        self,
+        payload: str,
+        label: int,
+        threat_id: Optional[int] = None,
+        source_ip: Optional[str] = None,
+        analyst: Optional[str] = None,
+        note: str = ""
+    ) -> int:
+        """
+        Guarda una corrección de un analista
+        
+        Args:
+            payload: Petición corregida (la que analiza el agente)
+            label: Etiqueta correcta (0 = legítimo, 1 = malicioso)
+            threat_id: Amenaza corregida, si viene de la tabla threats
+            source_ip: IP de origen
+            analyst: Quién corrige
+            note: Comentario libre
+            
+        Returns:
+            ID del feedback insertado
+        """
+        if label not in (0, 1):
+            raise ValueError(f"Etiqueta inválida: {label!r} (0 = legítimo, 1 = malicioso)")
+        
+        with self.connections.write() as conn:
+            cursor = conn.execute("""
+                INSERT INTO feedback
+                (timestamp, payload, label, threat_id, source_ip, analyst, note)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (
+                datetime.now().isoformat(),
+                payload,
+                int(label),
+                threat_id,
+                source_ip,
+                analyst,
+                note
+            ))
+            feedback_id = cursor.lastrowid
+        
+        logger.debug(f"📝 Feedback guardado: ID={feedback_id} label={label}")
+        return feedback_id
+    
+    def get_feedback(self, after_id: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Obtiene el feedback posterior a un ID (en orden de inserción)
+        
+        Args:
+            after_id: Último ID ya procesado
+            limit: Número máximo de registros
+            
+        Returns:
+            Lista de correcciones
+        """
+        query = "SELECT * FROM feedback WHERE id > ? ORDER BY id"
+        params = [after_id]
+        
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        
+        with self.connections.read() as conn:
+            return [dict(row) for row in conn.execute(query, params).fetchall()]
+    
+    def get_threat(self, threat_id: int) -> Optional[ThreatRecord]:
+        """
+        Obtiene una amenaza por ID
+        
+        Args:
+            threat_id: ID de la amenaza
+            
+        Returns:
+            ThreatRecord o None si no existe
+        """
+        with self.connections.read() as conn:
+            row = conn.execute("SELECT * FROM threats WHERE id = ?", (threat_id,)).fetchone()
+        
+        if row is None:
+            return None
+        
+        return ThreatRecord(
+            id=row['id'],
+            timestamp=datetime.fromisoformat(row['timestamp']),
+            source_ip=row['source_ip'],
+            attack_type=row['attack_type'],
+            payload=row['payload'],
+            confidence=row['confidence'],
+            action_taken=row['action_taken'],
+            blocked=bool(row['blocked'])
+        )
+    
     def get_threats(
-        self, 
-        limit: int = 100, 
+        self,
+        limit: int = 100,
         attack_type: Optional[str] = None,
-        source_ip: Optional[str] = None
+        source_ip: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
     ) -> List[ThreatRecord]:
         """
-        Obtiene amenazas de la BD
-        
+        Obtiene amenazas de la BD (las más recientes primero)
+    
+        Solo se consultan las particiones que se solapan con [since,
+        until), de la más reciente a la más antigua, hasta reunir `limit`.
+    
         Args:
             limit: Número máximo de registros
             attack_type: Filtrar por tipo de ataque
             source_ip: Filtrar por IP
-            
+            since: Desde este instante (incluido)
+            until: Hasta este instante (excluido)
+    
         Returns:
             Lista de amenazas
         """
-        cursor = self.conn.cursor()
-        
-        query = "SELECT * FROM threats WHERE 1=1"
-        params = []
-        
-        if attack_type:
-            query += " AND attack_type = ?"
-            params.append(attack_type)
-        
-        if source_ip:
-            query += " AND source_ip = ?"
-            params.append(source_ip)
-        
-        query += " ORDER BY timestamp DESC LIMIT ?"
-        params.append(limit)
-        
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        
+        where, params = self._threat_filters(attack_type, source_ip, since, until)
+    
+        rows = []
+        with self.connections.read() as conn:
+            for partition in self._partitions_for(conn, since, until):
+                rows += conn.execute(
+                    f"SELECT * FROM {partition} WHERE {where} ORDER BY timestamp DESC LIMIT ?",
+                    (*params, limit - len(rows))
+                ).fetchall()
+                if len(rows) >= limit:
+                    break
+    
         threats = []
         for row in rows:
             threat = ThreatRecord(
@@ -227,20 +403,108 @@ class ThreatDatabase:
                 blocked=bool(row['blocked'])
             )
             threats.append(threat)
-        
+    
         return threats
     
-    def get_blocked_ips(self) -> List[Dict]:
-        """Obtiene lista de IPs bloqueadas"""
-        cursor = self.conn.cursor()
+    def count_threats(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        attack_type: Optional[str] = None,
+        source_ip: Optional[str] = None
+    ) -> int:
+        """
+        Cuenta amenazas en un rango (solo en las particiones que lo solapan)
+    
+        Args:
+            since: Desde este instante (incluido)
+            until: Hasta este instante (excluido)
+            attack_type: Filtrar por tipo de ataque
+            source_ip: Filtrar por IP
+    
+        Returns:
+            Número de amenazas
+        """
+        where, params = self._threat_filters(attack_type, source_ip, since, until)
+    
+        with self.connections.read() as conn:
+            return sum(
+                conn.execute(f"SELECT COUNT(*) FROM {partition} WHERE {where}", params).fetchone()[0]
+                for partition in self._partitions_for(conn, since, until)
+            )
+    
+    def _partitions_for(self, conn, since: Optional[datetime], until: Optional[datetime]) -> List[str]:
+        """Particiones vivas que solapan [since, until), la más reciente primero"""
+        return self.partitions.overlapping(
+            conn,
+            since.isoformat() if since else None,
+            until.isoformat() if until else None
+        )
+    
+    @staticmethod
+    def _threat_filters(attack_type, source_ip, since, until) -> tuple:
+        """Condición WHERE y parámetros de los filtros de amenazas"""
+        conditions, params = ["1=1"], []
+    
+        if attack_type:
+            conditions.append("attack_type = ?")
+            params.append(attack_type)
+    
+        if source_ip:
+            conditions.append("source_ip = ?")
+            params.append(source_ip)
+    
+        if since:
+            conditions.append("timestamp >= ?")
+            params.append(since.isoformat())
+    
+        if until:
+            conditions.append("timestamp < ?")
+            params.append(until.isoformat())
+    
+        return " AND ".join(conditions), params
+    
+    def get_timeline(
+        self,
+        hours: int = 24,
+        granularity: str = "hour",
+        attack_type: Optional[str] = None,
+        now: Optional[datetime] = None
+    ) -> Dict:
+        """
+        Amenazas por hora (o minuto) de las últimas horas, desde los rollups
         
-        cursor.execute("""
-            SELECT ip, blocked_at, reason, threat_count 
-            FROM blocked_ips 
-            ORDER BY blocked_at DESC
-        """)
+        Args:
+            hours: Horas hacia atrás, incluida la actual
+            granularity: "hour" o "minute" (el rollup por minuto solo
+                cubre las últimas ThreatRollups.MINUTE_RETENTION_HOURS)
+            attack_type: Filtrar por tipo de ataque
+            now: Referencia (por defecto, ahora)
+        
+        Returns:
+            {'buckets': [...], 'counts': [...], 'total': int} en orden cronológico
+        """
+        until = now or datetime.now()
+        since = until.replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours - 1)
         
-        rows = cursor.fetchall()
+        with self.connections.read() as conn:
+            timeline = self.rollups.timeline(conn, since, until, granularity, attack_type)
+        
+        counts = [count for _, count in timeline]
+        return {
+            'buckets': [bucket for bucket, _ in timeline],
+            'counts': counts,
+            'total': sum(counts)
+        }
+    
+    def get_blocked_ips(self) -> List[Dict]:
+        """Obtiene lista de IPs bloqueadas"""
+        with self.connections.read() as conn:
+            rows = conn.execute("""
+                SELECT ip, blocked_at, reason, threat_count 
+                FROM blocked_ips 
+                ORDER BY blocked_at DESC
+            """).fetchall()
         
         blocked_ips = []
         for row in rows:
@@ -253,86 +517,100 @@ class ThreatDatabase:
         
         return blocked_ips
     
-    def get_statistics(self) -> Dict:
-        """Obtiene estadísticas globales"""
-        cursor = self.conn.cursor()
+    def get_statistics(self, max_age: Optional[float] = None) -> Dict:
+        """
+        Obtiene estadísticas globales
         
-        # Total de amenazas
-        cursor.execute("SELECT COUNT(*) as total FROM threats")
-        total_threats = cursor.fetchone()['total']
+        Se leen de los contadores en memoria, sin SQL: incluyen lo ya
+        guardado por este proceso aunque daily_stats aún no se haya
+        volcado. Con max_age, si tienen más de max_age segundos se
+        recargan de los rollups para ver también lo que escriben otros
+        procesos (reconciliación ocasional, p. ej.
+        DailyStatsAggregator.MAX_AGE; para leer siempre lo de otros
+        procesos, get_summary).
         
-        # Amenazas por tipo
-        cursor.execute("""
-            SELECT attack_type, COUNT(*) as count 
-            FROM threats 
-            GROUP BY attack_type
-        """)
-        threats_by_type = {row['attack_type']: row['count'] for row in cursor.fetchall()}
+        Args:
+            max_age: Antigüedad máxima de los contadores (None = solo memoria)
+        """
+        if max_age is not None and self.counters.age > max_age:
+            self.counters.refresh()
+        return self.counters.snapshot()
+    
+    def get_summary(self, now: Optional[datetime] = None) -> Dict:
+        """
+        Estadísticas globales consultadas a los rollups (formato de get_statistics)
         
-        # Total de IPs bloqueadas
-        cursor.execute("SELECT COUNT(*) as total FROM blocked_ips")
-        total_blocked_ips = cursor.fetchone()['total']
+        Para dashboards: siempre al día, también con lo que escriben otros
+        procesos, y con el mismo origen que get_timeline.
         
-        # Top 10 IPs más maliciosas
-        cursor.execute("""
-            SELECT source_ip, COUNT(*) as count 
-            FROM threats 
-            GROUP BY source_ip 
-            ORDER BY count DESC 
-            LIMIT 10
-        """)
-        top_ips = [(row['source_ip'], row['count']) for row in cursor.fetchall()]
+        Args:
+            now: Referencia de las últimas 24 h (por defecto, ahora)
+        """
+        since = ((now or datetime.now()) - timedelta(days=1)).isoformat()[:16]
         
-        # Amenazas últimas 24h
-        cursor.execute("""
-            SELECT COUNT(*) as count 
-            FROM threats 
-            WHERE timestamp > datetime('now', '-1 day')
-        """)
-        last_24h = cursor.fetchone()['count']
+        with self.connections.read() as conn:
+            total, by_type, by_ip, by_minute = ThreatRollups.totals(
+                conn, since, DailyStatsAggregator.TOP_IPS
+            )
+            blocked = conn.execute("SELECT COUNT(*) FROM blocked_ips").fetchone()[0]
         
         return {
-            'total_threats': total_threats,
-            'threats_by_type': threats_by_type,
-            'total_blocked_ips': total_blocked_ips,
-            'top_malicious_ips': top_ips,
-            'threats_last_24h': last_24h
+            'total_threats': total,
+            'threats_by_type': dict(by_type),
+            'total_blocked_ips': blocked,
+            'top_malicious_ips': by_ip.most_common(),
+            'threats_last_24h': sum(by_minute.values())
         }
     
-    def _update_daily_stats(self, threat: ThreatRecord):
-        """Actualiza estadísticas diarias"""
-        cursor = self.conn.cursor()
+    def flush_stats(self) -> int:
+        """
+        Vuelca ya a daily_stats los incrementos pendientes
         
-        date = threat.timestamp.date().isoformat()
+        Returns:
+            Días actualizados
+        """
+        return self.counters.flush()
+    
+    def rebuild_daily_stats(self) -> int:
+        """
+        Recalcula daily_stats desde la tabla threats
         
-        # Obtener o crear registro del día
-        cursor.execute("SELECT * FROM daily_stats WHERE date = ?", (date,))
-        row = cursor.fetchone()
+        Repara los incrementos perdidos en una caída (daily_stats solo
+        puede quedarse por debajo). Los días sin amenazas en threats no
+        se tocan.
         
-        if row:
-            # Actualizar existente
-            attack_col = threat.attack_type.lower()
-            if attack_col not in ['sql_injection', 'xss', 'path_traversal', 'command_injection']:
-                attack_col = 'other'
-            
-            cursor.execute(f"""
-                UPDATE daily_stats 
-                SET total_logs = total_logs + 1,
-                    threats_detected = threats_detected + 1,
-                    {attack_col} = {attack_col} + 1
-                WHERE date = ?
-            """, (date,))
-        else:
-            # Crear nuevo
-            cursor.execute("""
-                INSERT INTO daily_stats (date, total_logs, threats_detected)
-                VALUES (?, 1, 1)
-            """, (date,))
+        Returns:
+            Días recalculados
+        """
+        days = self.counters.rebuild()
+        logger.info(f"📊 daily_stats recalculada: {days} días")
+        return days
+    
+    def rebuild_rollups(self):
+        """Recalcula los rollups de minuto/hora desde la tabla threats"""
+        with self.connections.write() as conn:
+            self.rollups.rebuild(conn)
+    
+    def apply_retention(self, now: Optional[datetime] = None) -> List[Path]:
+        """
+        Archiva (.jsonl.gz) y elimina las particiones fuera de retention_days
         
-        self.conn.commit()
+        Se ejecuta al abrir la BD; llamarla periódicamente en procesos que
+        no se reinician. get_statistics pasa a contar solo lo que queda.
+        
+        Args:
+            now: Referencia de la retención (por defecto, ahora)
+        
+        Returns:
+            Archivos creados
+        """
+        archives = self.partitions.apply_retention(now)
+        if archives:
+            self.counters.refresh()
+        return archives
     
     def close(self):
-        """Cierra la conexión a la BD"""
-        if self.conn:
-            self.conn.close()
-            logger.info("💾 Conexión a BD cerrada")
\ No newline at end of file
+        """Vuelca las estadísticas pendientes y cierra la conexión a la BD"""
+        self.counters.close()
+        self.connections.close()
+        logger.info("💾 Conexión a BD cerrada")
\ No newline at end of file
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Némesis IA - Write-Behind Queue
+Persistencia por lotes para ThreatDatabase
+
+save_threat hace un INSERT y un commit por amenaza, más un SELECT +
+UPDATE + commit de estadísticas; block_ip otro SELECT, UPDATE/INSERT y
+commit. En una ráfaga de ataques eso son miles de fsync por segundo.
+
+WriteBehindQueue acepta las mismas escrituras sin tocar disco: las
+amenazas se encolan, los bloqueos de IP se agregan por IP y los
+incrementos de daily_stats por (fecha, columna). Un hilo de fondo los
+vuelca en una sola transacción (executemany + upserts) cada `max_rows`
+filas o `max_delay_ms` milisegundos, por la conexión de escritura de
+ThreatDatabase (en WAL, sus lectores no se bloquean).
+
+Garantías:
+- flush() espera a que todo lo encolado antes de la llamada esté en disco
+  y devuelve False si algún lote desde el flush anterior se descartó
+- close() (y atexit) vuelca lo pendiente antes de terminar
+- Las lecturas (delegadas a ThreatDatabase) ven lo ya volcado: como
+  mucho `max_delay_ms` de retraso. Los contadores de get_statistics se
+  actualizan al confirmar cada lote: un lote descartado no se cuenta
+- Los incrementos de daily_stats van en la transacción de sus amenazas
+- save_threat devuelve None: el ID se asigna al volcar el lote
+
+Copyright (C) 2025 Némesis AI Project Contributors
+Licensed under GPL-3.0
+"""
+
+import atexit
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from .stats_aggregator import attack_column, upsert_daily_stats
+from .threat_database import ThreatDatabase, ThreatRecord
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """Escrituras de ThreatDatabase agrupadas en transacciones por lotes"""
+
+    MAX_ROWS = 5000
+    MAX_DELAY_MS = 50.0
+    MAX_PENDING = 200000
+    MAX_RETRIES = 3
+
+    def __init__(
+        self,
+        database: ThreatDatabase,
+        max_rows: int = MAX_ROWS,
+        max_delay_ms: float = MAX_DELAY_MS,
+        max_pending: int = MAX_PENDING,
+        synchronous: str = "NORMAL"
+    ):
+        """
+        Inicializa la cola y arranca el hilo de volcado
+
+        Args:
+            database: Base de datos de destino (las lecturas se le delegan)
+            max_rows: Filas pendientes que disparan un volcado
+            max_delay_ms: Espera máxima de una fila antes de volcarse
+            max_pending: Filas pendientes máximas; por encima, las
+                escrituras esperan al volcado (backpressure)
+            synchronous: PRAGMA synchronous de la conexión de escritura
+                (NORMAL en WAL: sin fsync por commit, sí en checkpoint)
+        """
+        self.database = database
+        self.max_rows = max_rows
+        self.max_delay = max_delay_ms / 1000
+        self.max_pending = max_pending
+        self.synchronous = synchronous
+
+        self._cond = threading.Condition()
+        self._threats: List[ThreatRecord] = []
+        self._blocks: Dict[str, List] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._pending_rows = 0
+        self._oldest: Optional[float] = None
+
+        # Secuencia de escrituras encoladas / procesadas (para flush): un
+        # lote descartado también avanza _written, pero deja su secuencia
+        # en _dropped_upto; _mark es la del último flush completado
+        self._enqueued = 0
+        self._written = 0
+        self._dropped_upto = 0
+        self._mark = 0
+        self._flush_requested = False
+        self._closing = False
+
+        self.flushes = 0
+        self.rows_written = 0
+        self.threats_written = 0
+        self.errors = 0
+        self.dropped = 0
+        self.flush_ms = 0.0
+
+        with self.database.connections.write() as conn:
+            conn.execute(f"PRAGMA synchronous={synchronous}")
+
+        self._thread = threading.Thread(
+            target=self._run, name="nemesis-write-behind", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+        logger.info(
+            f"💾 WriteBehindQueue activa: lotes de {max_rows} filas o {max_delay_ms:.0f} ms"
+        )
+
+    def __getattr__(self, name):
+        # Lecturas y demás operaciones: directamente en la BD
+        if name == "database":
+            raise AttributeError(name)
+        return getattr(self.database, name)
+
+    # --- Escrituras (no bloquean salvo backpressure) ---
+
+    def save_threat(self, threat: ThreatRecord) -> None:
+        """
+        Encola una amenaza (y su incremento de estadísticas diarias)
+
+        Args:
+            threat: Registro de amenaza
+
+        Returns:
+            None: el ID se asigna al volcar el lote
+        """
+        self.save_threats([threat])
+
+    def save_threats(self, threats: List[ThreatRecord]) -> int:
+        """
+        Encola un lote de amenazas
+
+        Args:
+            threats: Registros de amenaza
+
+        Returns:
+            Número de amenazas encoladas
+        """
+        if not threats:
+            return 0
+
+        with self._cond:
+            self._wait_for_room(len(threats))
+            self._threats.extend(threats)
+            for threat in threats:
+                counts = self._stats.setdefault(threat.timestamp.date().isoformat(), {})
+                column = attack_column(threat.attack_type)
+                counts[column] = counts.get(column, 0) + 1
+            self._enqueued_rows(len(threats))
+
+        return len(threats)
+
+    def block_ip(self, ip: str, reason: str) -> None:
+        """
+        Encola el registro de una IP bloqueada
+
+        Varias llamadas para la misma IP dentro de un lote se agregan en
+        un único upsert (threat_count += n).
+
+        Args:
+            ip: Dirección IP
+            reason: Razón del bloqueo (se conserva la del primer bloqueo)
+        """
+        with self._cond:
+            self._wait_for_room(1)
+            block = self._blocks.get(ip)
+            if block is None:
+                self._blocks[ip] = [datetime.now().isoformat(), reason, 1]
+            else:
+                block[2] += 1
+            self._enqueued_rows(1)
+
+    def _wait_for_room(self, rows: int) -> None:
+        """Backpressure: espera al volcado si hay demasiado pendiente"""
+        while self._pending_rows + rows > self.max_pending and self._pending_rows and not self._closing:
+            self._cond.notify_all()
+            self._cond.wait()
+
+        if self._closing:
+            raise RuntimeError("WriteBehindQueue cerrada")
+
+    def _enqueued_rows(self, rows: int) -> None:
+        """Contabiliza filas nuevas y despierta al hilo si toca volcar"""
+        if self._pending_rows == 0:
+            self._oldest = time.monotonic()
+            self._cond.notify_all()
+        self._pending_rows += rows
+        self._enqueued += 1
+        if self._pending_rows >= self.max_rows:
+            self._cond.notify_all()
+
+    # --- Volcado ---
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Vuelca ya y espera a que lo encolado hasta ahora esté en disco
+
+        Args:
+            timeout: Segundos máximos de espera (None = sin límite)
+
+        Returns:
+            True si todo lo encolado antes de la llamada está en disco;
+            False si no acabó a tiempo o se descartó algún lote desde el
+            flush anterior
+        """
+        with self._cond:
+            target = self._enqueued
+            if self._written < target:
+                self._flush_requested = True
+                self._cond.notify_all()
+                self._cond.wait_for(
+                    lambda: self._written >= target or not self._thread.is_alive(),
+                    timeout
+                )
+                if self._written < target:
+                    return False
+
+            mark = self._mark
+            self._mark = max(mark, target)
+            return self._dropped_upto <= mark
+
+    def close(self) -> bool:
+        """
+        Vuelca lo pendiente y detiene el hilo (idempotente)
+
+        Returns:
+            True si no se descartó ningún lote desde el último flush
+        """
+        with self._cond:
+            closing = self._closing
+            self._closing = True
+            self._cond.notify_all()
+
+        if not closing:
+            self._thread.join()
+            atexit.unregister(self.close)
+            if self.dropped:
+                logger.error(
+                    f"❌ WriteBehindQueue cerrada con {self.dropped} filas descartadas "
+                    f"({self.rows_written} filas en {self.flushes} lotes)"
+                )
+            else:
+                logger.info(f"💾 WriteBehindQueue cerrada ({self.rows_written} filas en {self.flushes} lotes)")
+
+        return self._dropped_upto <= self._mark
+
+    def _run(self) -> None:
+        """Hilo de volcado: espera N filas o T ms y escribe el lote"""
+        while True:
+            with self._cond:
+                while not self._ready():
+                    if self._pending_rows == 0:
+                        self._cond.wait()
+                    else:
+                        self._cond.wait(max(self._oldest + self.max_delay - time.monotonic(), 0))
+
+                batch = self._take()
+                target = self._enqueued
+                closing = self._closing
+
+            written = self._write(batch) if batch[3] else True
+
+            with self._cond:
+                if not written:
+                    self._dropped_upto = target
+                self._written = target
+                self._cond.notify_all()
+
+            if closing:
+                with self._cond:
+                    if self._pending_rows == 0:
+                        break
+
+    def _ready(self) -> bool:
+        """True si toca volcar (llamar con el lock tomado)"""
+        if self._closing or self._flush_requested or self._pending_rows >= self.max_rows:
+            return True
+        return self._pending_rows > 0 and time.monotonic() - self._oldest >= self.max_delay
+
+    def _take(self) -> Tuple[List[ThreatRecord], Dict[str, List], Dict[str, Dict[str, int]], int]:
+        """Saca el lote pendiente (llamar con el lock tomado)"""
+        batch = (self._threats, self._blocks, self._stats, self._pending_rows)
+        self._threats, self._blocks, self._stats = [], {}, {}
+        self._pending_rows = 0
+        self._oldest = None
+        self._flush_requested = False
+        self._cond.notify_all()  # Escritores esperando sitio
+        return batch
+
+    def _write(self, batch) -> bool:
+        """
+        Escribe un lote en una transacción (reintenta si la BD está ocupada)
+
+        Returns:
+            False si el lote se descartó
+        """
+        threats, blocks, stats, rows = batch
+
+        for attempt in range(1, self.MAX_RETRIES + 1):
+            start = time.perf_counter()
+            try:
+                with self.database.connections.write() as conn:
+                    self._execute(conn, threats, blocks, stats)
+            except sqlite3.OperationalError as e:
+                if attempt < self.MAX_RETRIES:
+                    logger.warning(f"⚠️  Volcado fallido ({e}), reintento {attempt}")
+                    time.sleep(0.05 * attempt)
+                    continue
+                self.errors += 1
+                self.dropped += rows
+                logger.error(f"❌ Lote de {rows} filas descartado: {e}")
+                return False
+            except Exception as e:
+                self.errors += 1
+                self.dropped += rows
+                logger.error(f"❌ Lote de {rows} filas descartado: {e}")
+                return False
+
+            # Contadores de lectura solo con el lote confirmado (daily_stats
+            # ya iba en la transacción)
+            counters = self.database.counters
+            counters.record(threats, persist=False)
+            for ip in blocks:
+                counters.record_block(ip)
+
+            self.flush_ms += (time.perf_counter() - start) * 1000
+            self.flushes += 1
+            self.rows_written += rows
+            self.threats_written += len(threats)
+            logger.debug(f"💾 Lote volcado: {len(threats)} amenazas, {len(blocks)} IPs")
+            return True
+
+    def _execute(self, conn: sqlite3.Connection, threats, blocks, stats) -> None:
+        """Sentencias del lote (dentro de la transacción)"""
+        self.database.insert_rows(conn, [
+            (
+                threat.timestamp.isoformat(),
+                threat.source_ip,
+                threat.attack_type,
+                threat.payload,
+                threat.confidence,
+                threat.action_taken,
+                threat.blocked
+            )
+            for threat in threats
+        ])
+
+        if blocks:
+            conn.executemany("""
+                INSERT INTO blocked_ips (ip, blocked_at, reason, threat_count)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(ip) DO UPDATE SET
+                    threat_count = threat_count + excluded.threat_count
+            """, [(ip, blocked_at, reason, count) for ip, (blocked_at, reason, count) in blocks.items()])
+
+        upsert_daily_stats(conn, stats)
+
+    @property
+    def pending(self) -> int:
+        """Filas encoladas sin volcar"""
+        return self._pending_rows
+
+    @property
+    def stats(self) -> Dict:
+        """Retorna estadísticas de la cola"""
+        return {
+            "pending_rows": self._pending_rows,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "threats_written": self.threats_written,
+            "rows_per_flush": self.rows_written / self.flushes if self.flushes else 0.0,
+            "flush_ms_avg": self.flush_ms / self.flushes if self.flushes else 0.0,
+            "errors": self.errors,
+            "dropped": self.dropped,
+        }
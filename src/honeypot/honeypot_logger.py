@@ -81,7 +81,11 @@ class HoneypotLogger:
                 threat_id = self.database.save_threat(threat)
                 self.attempts_logged += 1
                 
-                logger.debug(f"💾 Intento guardado en BD: ID={threat_id}")
+                # Con WriteBehindQueue el ID se asigna al volcar el lote
+                if threat_id is not None:
+                    logger.debug(f"💾 Intento guardado en BD: ID={threat_id}")
+                else:
+                    logger.debug("💾 Intento encolado para la BD")
                 
                 # Si es un atacante peligroso, bloquearlo
                 if profile_data and profile_data.get('threat_score', 0) > 50:
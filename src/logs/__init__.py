@@ -4,7 +4,16 @@ Capítulo 3: El Centinela de Logs
 """
 
 from .log_reader import LogReader
+from .checkpoint import CheckpointStore
 from .log_parser import LogParser, ParsedLog
+from .log_formats import (
+    LogFormat, register_format, get_format, detect_format, available_formats
+)
 from .log_sentinel import LogSentinel
+from .backfill import Backfill
 
-__all__ = ['LogReader', 'LogParser', 'ParsedLog', 'LogSentinel']
\ No newline at end of file
+__all__ = [
+    'LogReader', 'LogParser', 'ParsedLog', 'LogSentinel',
+    'LogFormat', 'register_format', 'get_format', 'detect_format',
+    'available_formats', 'Backfill', 'CheckpointStore',
+]
\ No newline at end of file
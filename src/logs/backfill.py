@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Némesis IA - Log Backfill
+Capítulo 3: El Centinela de Logs
+
+Reprocesa archivos de log históricos (rotados y comprimidos) en paralelo:
+- gzip y zstd se leen en streaming, sin descomprimir a disco
+- Los archivos de texto plano grandes se reparten por rangos de bytes
+- Cada worker del pool de procesos carga su propio agente (y modelo)
+- Las amenazas se escriben en ThreatDatabase por lotes
+
+Uso:
+    PYTHONPATH=src python -m logs.backfill "/var/log/nginx/access.log*" \\
+        --db data/nemesis.db --workers 4
+"""
+
+import argparse
+import asyncio
+import glob
+import gzip
+import io
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Optional, Union
+
+from .log_formats import SAMPLE_LINES, detect_format, get_format
+
+logger = logging.getLogger(__name__)
+
+
+# Estado de cada proceso worker (lo crea _init_worker)
+_worker_agent = None
+_worker_loop = None
+
+
+def open_log_stream(path: str) -> BinaryIO:
+    """
+    Abre un log plano o comprimido como stream binario
+
+    Args:
+        path: Ruta al archivo (.gz, .zst/.zstd o texto plano)
+
+    Returns:
+        Archivo binario que descomprime al vuelo
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+
+    if path.endswith(('.zst', '.zstd')):
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError(
+                f"zstandard no instalado, no se puede leer {path} "
+                f"(pip install zstandard)"
+            ) from None
+
+        raw = open(path, 'rb')
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.BufferedReader(reader)
+
+    return open(path, 'rb')
+
+
+def is_compressed(path: str) -> bool:
+    """True si el archivo se lee descomprimiendo (no admite rangos de bytes)"""
+    return path.endswith(('.gz', '.zst', '.zstd'))
+
+
+@dataclass
+class BackfillTask:
+    """Unidad de trabajo: un archivo o un rango de bytes de un archivo plano"""
+    path: str
+    log_format: str
+    start: int = 0
+    end: Optional[int] = None  # None = hasta el final
+    size: int = 0              # Bytes en disco (para el progreso)
+
+
+@dataclass
+class BackfillResult:
+    """Resultado de una tarea"""
+    task: BackfillTask
+    lines: int = 0
+    parsed: int = 0
+    errors: int = 0
+    threats: list = field(default_factory=list)  # List[ThreatRecord]
+    elapsed: float = 0.0
+
+
+def _init_worker(model_path: Optional[str], threshold: float):
+    """Inicializa el proceso worker: un agente con su modelo cargado"""
+    global _worker_agent, _worker_loop
+
+    from core.nemesis_agent import NemesisAgent
+
+    # Los workers solo informan de errores; el progreso lo lleva el padre
+    logging.getLogger().setLevel(logging.WARNING)
+
+    agent = NemesisAgent(threshold=threshold)
+    if model_path:
+        agent.model_path = model_path
+        agent._load_ai_brain()
+
+    _worker_agent = agent
+    _worker_loop = asyncio.new_event_loop()
+
+
+def _iter_lines(task: BackfillTask) -> Iterator[bytes]:
+    """
+    Recorre las líneas de la tarea
+
+    En un rango [start, end) se procesan las líneas que empiezan dentro
+    del rango; la línea partida al inicio pertenece al rango anterior.
+    """
+    with open_log_stream(task.path) as f:
+        if task.end is None:
+            yield from f
+            return
+
+        position = task.start
+        if task.start > 0:
+            f.seek(task.start - 1)
+            position = task.start - 1 + len(f.readline())
+
+        while position < task.end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            yield line
+
+
+def _scan_task(task: BackfillTask, batch_size: int = 1024) -> BackfillResult:
+    """Analiza una tarea en el worker y devuelve solo las amenazas"""
+    from database.threat_database import ThreatRecord
+
+    started = time.perf_counter()
+    result = BackfillResult(task=task)
+    log_format = get_format(task.log_format)
+
+    def flush(events):
+        verdicts = _worker_loop.run_until_complete(
+            _worker_agent.analyze_events(events)
+        )
+        for event, verdict in zip(events, verdicts):
+            if verdict and verdict.is_malicious:
+                result.threats.append(ThreatRecord.from_event(event, verdict))
+
+    events = []
+    for raw in _iter_lines(task):
+        line = raw.decode('utf-8', errors='replace').strip()
+        if not line:
+            continue
+
+        result.lines += 1
+        event = log_format.parse(line)
+        if event is not None:
+            events.append(event)
+            if len(events) >= batch_size:
+                flush(events)
+                events = []
+
+    if events:
+        flush(events)
+
+    result.parsed = log_format.parsed
+    result.errors = log_format.errors
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+class Backfill:
+    """Reprocesa logs históricos con un pool de procesos"""
+
+    SPLIT_BYTES = 64 * 1024 * 1024
+
+    def __init__(
+        self,
+        paths: Union[str, Iterable[str]],
+        database=None,
+        workers: Optional[int] = None,
+        model_path: Optional[str] = None,
+        threshold: float = 0.9,
+        log_format: Optional[str] = None,
+        split_bytes: int = SPLIT_BYTES,
+        batch_size: int = 1024,
+        progress: Optional[Callable[[dict], None]] = None
+    ):
+        """
+        Inicializa el backfill
+
+        Args:
+            paths: Archivos o globs (p. ej. "/var/log/nginx/access.log*")
+            database: Instancia de ThreatDatabase (opcional)
+            workers: Procesos del pool (por defecto, número de CPUs)
+            model_path: Modelo que carga cada worker (None = reglas)
+            threshold: Umbral de confianza del agente
+            log_format: Formato fijo; None detecta el formato de cada archivo
+            split_bytes: Tamaño de los rangos en que se reparten los archivos planos
+            batch_size: Eventos analizados por llamada al agente
+            progress: Callback opcional que recibe el progreso tras cada tarea
+        """
+        patterns = [paths] if isinstance(paths, str) else list(paths)
+
+        self.paths: List[str] = []
+        for pattern in patterns:
+            matches = sorted(glob.glob(pattern)) if any(c in pattern for c in "*?[") else [pattern]
+            self.paths.extend(p for p in matches if os.path.isfile(p))
+        self.paths = list(dict.fromkeys(self.paths))
+
+        self.database = database
+        self.workers = workers or os.cpu_count() or 1
+        self.model_path = model_path
+        self.threshold = threshold
+        self.log_format = log_format
+        self.split_bytes = max(1, split_bytes)
+        self.batch_size = batch_size
+        self.progress = progress
+
+        self._stats = {
+            "files": len(self.paths),
+            "tasks": 0,
+            "lines": 0,
+            "parsed": 0,
+            "errors": 0,
+            "threats": 0,
+            "bytes_done": 0,
+            "bytes_total": 0,
+            "elapsed": 0.0,
+        }
+
+        logger.info(
+            f"🗄️  Backfill inicializado "
+            f"({len(self.paths)} archivo(s), {self.workers} worker(s))"
+        )
+
+    def _detect(self, path: str) -> str:
+        """Detecta el formato del archivo a partir de sus primeras líneas"""
+        if self.log_format:
+            return self.log_format
+
+        sample = []
+        try:
+            with open_log_stream(path) as f:
+                for raw in f:
+                    line = raw.decode('utf-8', errors='replace').strip()
+                    if line:
+                        sample.append(line)
+                        if len(sample) >= SAMPLE_LINES:
+                            break
+        except (OSError, RuntimeError, EOFError) as e:
+            logger.warning(f"⚠️  No se pudo muestrear {path}: {e}")
+
+        name = detect_format(sample).name
+        logger.info(f"🧩 Formato de {path}: {name}")
+        return name
+
+    def plan(self) -> List[BackfillTask]:
+        """
+        Reparte el trabajo en tareas
+
+        Returns:
+            Un archivo comprimido por tarea y rangos de split_bytes
+            para los archivos planos
+        """
+        tasks = []
+
+        for path in self.paths:
+            size = os.path.getsize(path)
+            if size == 0:
+                continue
+
+            log_format = self._detect(path)
+
+            if is_compressed(path) or size <= self.split_bytes:
+                tasks.append(BackfillTask(path, log_format, size=size))
+                continue
+
+            for start in range(0, size, self.split_bytes):
+                end = min(start + self.split_bytes, size)
+                tasks.append(BackfillTask(path, log_format, start, end, end - start))
+
+        # Las tareas grandes primero para equilibrar el pool
+        tasks.sort(key=lambda t: t.size, reverse=True)
+        return tasks
+
+    def run(self) -> dict:
+        """
+        Ejecuta el backfill
+
+        Returns:
+            Estadísticas finales (ver stats)
+        """
+        tasks = self.plan()
+        stats = self._stats
+        stats["tasks"] = len(tasks)
+        stats["bytes_total"] = sum(t.size for t in tasks)
+
+        logger.info(
+            f"🚀 Backfill: {len(tasks)} tarea(s), "
+            f"{stats['bytes_total'] / 1e6:.1f} MB"
+        )
+
+        # Todos los workers mapean el mismo modelo compilado
+        from ml.compiled_forest import ensure_compiled
+        ensure_compiled(self.model_path)
+
+        started = time.perf_counter()
+
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.model_path, self.threshold)
+        ) as pool:
+            futures = {
+                pool.submit(_scan_task, task, self.batch_size): task
+                for task in tasks
+            }
+
+            for future in as_completed(futures):
+                task = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"❌ Error en backfill de {task.path}: {e}")
+                    stats["bytes_done"] += task.size
+                    continue
+
+                self._collect(result)
+                stats["elapsed"] = time.perf_counter() - started
+                self._report()
+
+        stats["elapsed"] = time.perf_counter() - started
+
+        # Las estadísticas diarias se agregan en memoria: persistirlas ya
+        flush_stats = getattr(self.database, "flush_stats", None)
+        if flush_stats:
+            flush_stats()
+
+        logger.info(
+            f"✅ Backfill completado: {stats['lines']:,} líneas, "
+            f"{stats['threats']:,} amenazas en {stats['elapsed']:.1f}s "
+            f"({self.stats['lines_per_second']:,.0f} líneas/s)"
+        )
+        return self.stats
+
+    def _collect(self, result: BackfillResult):
+        """Acumula el resultado de una tarea y guarda sus amenazas"""
+        stats = self._stats
+        stats["lines"] += result.lines
+        stats["parsed"] += result.parsed
+        stats["errors"] += result.errors
+        stats["threats"] += len(result.threats)
+        stats["bytes_done"] += result.task.size
+
+        if self.database and result.threats:
+            self.database.save_threats(result.threats)
+
+    def _report(self):
+        """Informa del progreso"""
+        stats = self.stats
+
+        logger.info(
+            f"📊 Backfill {stats['percent']:.0f}% - "
+            f"{stats['lines']:,} líneas, {stats['threats']:,} amenazas, "
+            f"{stats['lines_per_second']:,.0f} líneas/s, "
+            f"{stats['mb_per_second']:.1f} MB/s"
+        )
+
+        if self.progress:
+            self.progress(stats)
+
+    @property
+    def stats(self) -> dict:
+        """Retorna estadísticas (progreso y throughput)"""
+        stats = dict(self._stats)
+        elapsed = stats["elapsed"]
+
+        stats["percent"] = (
+            stats["bytes_done"] / stats["bytes_total"] * 100
+            if stats["bytes_total"] else 100.0
+        )
+        stats["lines_per_second"] = stats["lines"] / elapsed if elapsed else 0
+        stats["mb_per_second"] = stats["bytes_done"] / 1e6 / elapsed if elapsed else 0
+
+        return stats
+
+
+def main():
+    """Punto de entrada de línea de comandos"""
+    parser = argparse.ArgumentParser(
+        description="Reprocesa logs históricos (rotados, .gz, .zst) en paralelo"
+    )
+    parser.add_argument("paths", nargs="+", help="Archivos o globs de logs")
+    parser.add_argument("--db", default="data/nemesis.db", help="Base de datos de amenazas")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos del pool")
+    parser.add_argument("--model", default=None, help="Modelo ML para los workers")
+    parser.add_argument("--threshold", type=float, default=0.9, help="Umbral de confianza")
+    parser.add_argument("--format", dest="log_format", default=None, help="Formato fijo de log")
+    parser.add_argument(
+        "--split-mb", type=int, default=Backfill.SPLIT_BYTES // (1024 * 1024),
+        help="Tamaño de los rangos de archivos planos (MB)"
+    )
+    args = parser.parse_args()
+
+    from database.threat_database import ThreatDatabase
+
+    database = ThreatDatabase(args.db)
+    try:
+        Backfill(
+            args.paths,
+            database=database,
+            workers=args.workers,
+            model_path=args.model,
+            threshold=args.threshold,
+            log_format=args.log_format,
+            split_bytes=args.split_mb * 1024 * 1024
+        ).run()
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Némesis IA - Reader Checkpoints
+Capítulo 3: El Centinela de Logs
+
+Guarda por archivo el inode, el offset y el hash de la última línea
+procesada, con escritura atómica (archivo temporal + fsync + rename).
+Al reiniciar, el LogReader continúa exactamente donde se quedó, también
+si el archivo rotó mientras el agente estaba parado.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def line_hash(line: str) -> str:
+    """Hash corto de una línea (para validar el punto de reanudación)"""
+    return hashlib.blake2b(line.encode('utf-8', errors='replace'), digest_size=8).hexdigest()
+
+
+class CheckpointStore:
+    """Checkpoints de lectura por archivo, persistidos en JSON"""
+
+    FLUSH_INTERVAL = 5.0
+
+    def __init__(
+        self,
+        path: str = "data/reader_checkpoints.json",
+        flush_interval: float = FLUSH_INTERVAL
+    ):
+        """
+        Inicializa el almacén de checkpoints
+
+        Args:
+            path: Archivo JSON de checkpoints
+            flush_interval: Segundos mínimos entre escrituras a disco
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+
+        # Checkpoints en disco (con hash) y pendientes de escribir (con la línea)
+        self._saved: Dict[str, dict] = self._load()
+        self._pending: Dict[str, Tuple[tuple, int, str]] = {}
+        self._last_flush = time.monotonic()
+        self._flushes = 0
+
+        logger.info(f"📌 CheckpointStore: {self.path} ({len(self._saved)} archivo(s))")
+
+    def _load(self) -> Dict[str, dict]:
+        """Lee los checkpoints (un archivo dañado equivale a no tener ninguno)"""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️  Checkpoints ilegibles en {self.path}: {e}")
+            return {}
+
+        return data.get("files", {}) if isinstance(data, dict) else {}
+
+    def get(self, log_file: str) -> Optional[dict]:
+        """
+        Último checkpoint de un archivo
+
+        Args:
+            log_file: Ruta del log
+
+        Returns:
+            {"inode": (dev, ino), "offset": int, "line_hash": str} o None
+        """
+        key = str(log_file)
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            inode, offset, line = pending
+            return {"inode": tuple(inode), "offset": offset, "line_hash": line_hash(line)}
+
+        saved = self._saved.get(key)
+        if saved is None:
+            return None
+
+        return {
+            "inode": tuple(saved["inode"]),
+            "offset": saved["offset"],
+            "line_hash": saved["line_hash"],
+        }
+
+    def update(self, log_file: str, inode: tuple, offset: int, line: str):
+        """
+        Registra la última línea procesada (se escribe en el próximo flush)
+
+        Args:
+            log_file: Ruta del log
+            inode: (st_dev, st_ino) del archivo al que pertenece el offset
+            offset: Offset justo después de la línea
+            line: Línea procesada
+        """
+        self._pending[str(log_file)] = (inode, offset, line)
+
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Escribe los checkpoints de forma atómica"""
+        self._last_flush = time.monotonic()
+
+        if not self._pending:
+            return
+
+        now = datetime.now().isoformat()
+        for key, (inode, offset, line) in self._pending.items():
+            self._saved[key] = {
+                "inode": list(inode),
+                "offset": offset,
+                "line_hash": line_hash(line),
+                "updated": now,
+            }
+        self._pending.clear()
+
+        tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({"version": 1, "files": self._saved}, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+
+            os.replace(tmp_path, self.path)
+            self._fsync_directory()
+            self._flushes += 1
+
+        except OSError as e:
+            logger.error(f"❌ Error guardando checkpoints: {e}")
+
+    def _fsync_directory(self):
+        """Persiste el rename (entrada de directorio)"""
+        try:
+            fd = os.open(self.path.parent, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    @property
+    def stats(self):
+        """Retorna estadísticas"""
+        return {
+            "files": len(set(self._saved) | set(self._pending)),
+            "pending": len(self._pending),
+            "flushes": self._flushes,
+        }
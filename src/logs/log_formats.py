@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""
+Némesis IA - Log Formats
+Capítulo 3: El Centinela de Logs
+
+Registro de formatos de log con parsers compilados:
+- combined: Apache/Nginx Common y Combined (LogParser)
+- nginx_json: access log de Nginx con log_format escape=json
+- syslog: RFC 3164 y timestamps ISO 8601 de rsyslog
+- auth: /var/log/auth.log (fallos de autenticación SSH)
+
+El formato se detecta una sola vez por archivo a partir de una muestra
+y el parser queda asociado al archivo; cada parser lleva sus propias
+tasas de parseo y de error.
+"""
+
+import json
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Type
+
+from .log_parser import LogParser, ParsedLog
+
+logger = logging.getLogger(__name__)
+
+
+# Formatos registrados, en orden de registro
+_FORMATS: Dict[str, Type["LogFormat"]] = {}
+
+# Formato usado cuando la detección no es concluyente
+DEFAULT_FORMAT = "combined"
+
+# Líneas y bytes leídos de un archivo para detectar su formato
+SAMPLE_LINES = 50
+SAMPLE_BYTES = 64 * 1024
+
+# Fracción mínima de líneas reconocidas para aceptar un formato
+MIN_DETECTION_SCORE = 0.6
+
+# Línea válida para el formato pero sin evento que analizar
+IGNORED = object()
+
+
+def register_format(cls: Type["LogFormat"]) -> Type["LogFormat"]:
+    """
+    Registra un formato de log (usable como decorador)
+
+    Args:
+        cls: Subclase de LogFormat con un `name` único
+
+    Returns:
+        La misma clase
+    """
+    if not cls.name:
+        raise ValueError(f"{cls.__name__} no define name")
+
+    _FORMATS[cls.name] = cls
+    return cls
+
+
+def available_formats() -> List[str]:
+    """Nombres de los formatos registrados"""
+    return list(_FORMATS)
+
+
+def get_format(name: str) -> "LogFormat":
+    """
+    Crea una instancia nueva del formato indicado
+
+    Args:
+        name: Nombre del formato registrado
+
+    Returns:
+        Instancia de LogFormat con contadores propios
+    """
+    try:
+        return _FORMATS[name]()
+    except KeyError:
+        raise ValueError(
+            f"Formato de log desconocido: {name} "
+            f"(disponibles: {', '.join(_FORMATS)})"
+        ) from None
+
+
+def detect_format(sample: Iterable[str]) -> "LogFormat":
+    """
+    Detecta el formato de una muestra de líneas
+
+    Gana el formato que reconoce más líneas; a igualdad, el más
+    específico (mayor prioridad).
+
+    Args:
+        sample: Líneas de muestra del archivo
+
+    Returns:
+        Instancia del formato detectado (DEFAULT_FORMAT si no hay consenso)
+    """
+    lines = [line.strip() for line in sample if line.strip()]
+
+    best = None
+    best_key = (MIN_DETECTION_SCORE, float("-inf"))
+
+    if lines:
+        for cls in _FORMATS.values():
+            candidate = cls()
+            key = (candidate.detect(lines), cls.priority)
+            if key > best_key:
+                best, best_key = candidate, key
+
+    if best is None:
+        logger.debug("Formato no detectado, usando el formato por defecto")
+        return get_format(DEFAULT_FORMAT)
+
+    return best
+
+
+def sample_file(
+    path: str,
+    max_lines: int = SAMPLE_LINES,
+    max_bytes: int = SAMPLE_BYTES
+) -> List[str]:
+    """
+    Lee las primeras líneas completas de un archivo
+
+    Args:
+        path: Ruta al archivo
+        max_lines: Máximo de líneas
+        max_bytes: Máximo de bytes leídos
+
+    Returns:
+        Lista de líneas (vacía si el archivo no existe o está vacío)
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read(max_bytes)
+    except OSError:
+        return []
+
+    lines = data.split(b'\n')
+    if len(data) == max_bytes and len(lines) > 1:
+        lines.pop()  # Última línea cortada por max_bytes
+
+    sample = []
+    for raw in lines:
+        line = raw.decode('utf-8', errors='replace').strip()
+        if line:
+            sample.append(line)
+            if len(sample) >= max_lines:
+                break
+
+    return sample
+
+
+class LogFormat:
+    """
+    Formato de log: parser compilado con sus propias estadísticas
+
+    Las subclases implementan _parse(), que devuelve un ParsedLog,
+    IGNORED (línea válida sin evento) o None (error de parseo).
+    """
+
+    name = ""
+    priority = 0
+
+    def __init__(self):
+        self.parsed = 0
+        self.ignored = 0
+        self.errors = 0
+
+    def parse(self, log_line: str) -> Optional[ParsedLog]:
+        """
+        Parsea una línea y actualiza los contadores
+
+        Args:
+            log_line: Línea de log
+
+        Returns:
+            ParsedLog o None si no hay evento
+        """
+        event = self._parse(log_line)
+
+        if event is None:
+            self.errors += 1
+            return None
+        if event is IGNORED:
+            self.ignored += 1
+            return None
+
+        self.parsed += 1
+        return event
+
+    def _parse(self, log_line: str):
+        raise NotImplementedError
+
+    def detect(self, sample: List[str]) -> float:
+        """
+        Puntúa una muestra (sin tocar los contadores)
+
+        Returns:
+            Fracción de líneas reconocidas (0.0 - 1.0)
+        """
+        if not sample:
+            return 0.0
+
+        recognized = sum(1 for line in sample if self._parse(line) is not None)
+        return recognized / len(sample)
+
+    @property
+    def stats(self) -> Dict:
+        """Retorna estadísticas del parser"""
+        total = self.parsed + self.ignored + self.errors
+
+        return {
+            "format": self.name,
+            "parsed": self.parsed,
+            "ignored": self.ignored,
+            "errors": self.errors,
+            "parse_rate": (self.parsed / total * 100) if total else 0,
+            "error_rate": (self.errors / total * 100) if total else 0,
+        }
+
+
+@register_format
+class CombinedLogFormat(LogFormat):
+    """Apache/Nginx Common y Combined Log Format"""
+
+    name = "combined"
+    priority = 10
+
+    def __init__(self):
+        super().__init__()
+        self.parser = LogParser()
+
+    def _parse(self, log_line: str) -> Optional[ParsedLog]:
+        return self.parser.parse(log_line)
+
+
+@register_format
+class NginxJsonFormat(LogFormat):
+    """Access log de Nginx en JSON (log_format ... escape=json)"""
+
+    name = "nginx_json"
+    priority = 10
+
+    def __init__(self):
+        super().__init__()
+        self._timestamps = LogParser()
+
+    def _parse(self, log_line: str) -> Optional[ParsedLog]:
+        if not log_line.startswith('{'):
+            return None
+
+        try:
+            record = json.loads(log_line)
+        except ValueError:
+            return None
+
+        if not isinstance(record, dict):
+            return None
+
+        ip = record.get("remote_addr") or record.get("client")
+        request = record.get("request") or ""
+        method = record.get("request_method") or ""
+        path = record.get("request_uri") or record.get("uri") or ""
+        protocol = record.get("server_protocol") or ""
+
+        if request:
+            req_method, _, rest = request.partition(' ')
+            req_path, _, req_protocol = rest.rpartition(' ')
+            if not req_path:
+                req_path, req_protocol = req_protocol, ""
+            method = method or req_method
+            path = path or req_path
+            protocol = protocol or req_protocol
+        elif method and path:
+            request = f"{method} {path} {protocol}".rstrip()
+
+        if not ip or not method:
+            return None
+
+        try:
+            status_code = int(record.get("status") or 0)
+            bytes_sent = int(
+                record.get("body_bytes_sent") or record.get("bytes_sent") or 0
+            )
+        except (TypeError, ValueError):
+            return None
+
+        return ParsedLog(
+            self._parse_time(record), ip, method, path, status_code, log_line,
+            self.name, request, protocol, bytes_sent,
+            record.get("http_referer") or "",
+            record.get("http_user_agent") or ""
+        )
+
+    def _parse_time(self, record: Dict) -> datetime:
+        """time_iso8601 o time_local (hora local sin zona, como LogParser)"""
+        iso = record.get("time_iso8601")
+        if iso:
+            try:
+                return datetime.fromisoformat(iso).replace(tzinfo=None)
+            except ValueError:
+                pass
+
+        return self._timestamps.parse_timestamp(record.get("time_local") or "")
+
+
+@register_format
+class SyslogFormat(LogFormat):
+    """Syslog RFC 3164 (y timestamps ISO 8601 de rsyslog)"""
+
+    name = "syslog"
+    priority = 10
+
+    # [<PRI>]Mmm dd HH:MM:SS host programa[pid]: mensaje
+    BSD_PATTERN = re.compile(
+        r'(?:<\d+>)?([A-Z][a-z]{2} [ \d]\d \d{2}:\d{2}:\d{2}) (\S+) '
+        r'([^\s:\[]+)(?:\[\d+\])?: ?(.*)'
+    )
+
+    # [<PRI>]2025-12-04T10:00:00.123456+00:00 host programa[pid]: mensaje
+    ISO_PATTERN = re.compile(
+        r'(?:<\d+>)?(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(?:\.\d+)?'
+        r'(?:Z|[+-]\d{2}:?\d{2})? (\S+) ([^\s:\[]+)(?:\[\d+\])?: ?(.*)'
+    )
+
+    IP_PATTERN = re.compile(r'\b(\d{1,3}(?:\.\d{1,3}){3})\b')
+
+    TIMESTAMP_CACHE_SIZE = 4096
+
+    def __init__(self):
+        super().__init__()
+        self._timestamp_cache: Dict[str, datetime] = {}
+
+    def _parse(self, log_line: str) -> Optional[ParsedLog]:
+        fields = self._split(log_line)
+        if fields is None:
+            return None
+
+        timestamp, host, program, message = fields
+        ip_match = self.IP_PATTERN.search(message)
+
+        return ParsedLog(
+            timestamp,
+            ip_match.group(1) if ip_match else host,
+            program,
+            message,
+            0,
+            log_line,
+            self.name,
+            message
+        )
+
+    def _split(self, log_line: str) -> Optional[tuple]:
+        """
+        Separa cabecera y mensaje
+
+        Returns:
+            (timestamp, host, programa, mensaje) o None
+        """
+        match = self.BSD_PATTERN.match(log_line)
+        if match is None:
+            match = self.ISO_PATTERN.match(log_line)
+            if match is None:
+                return None
+
+        timestamp_str, host, program, message = match.groups()
+
+        timestamp = self._timestamp_cache.get(timestamp_str)
+        if timestamp is None:
+            timestamp = self._parse_timestamp(timestamp_str)
+            if timestamp is None:
+                return None
+            if len(self._timestamp_cache) >= self.TIMESTAMP_CACHE_SIZE:
+                self._timestamp_cache.clear()
+            self._timestamp_cache[timestamp_str] = timestamp
+
+        return timestamp, host, program, message
+
+    @staticmethod
+    def _parse_timestamp(timestamp_str: str) -> Optional[datetime]:
+        """Parsea el timestamp; RFC 3164 no trae año y se asume el actual"""
+        try:
+            if timestamp_str[4:5] == '-':
+                return datetime.fromisoformat(timestamp_str)
+
+            now = datetime.now()
+            timestamp = datetime(
+                now.year,
+                LogParser.MONTHS[timestamp_str[0:3]],
+                int(timestamp_str[4:6]),
+                int(timestamp_str[7:9]),
+                int(timestamp_str[10:12]),
+                int(timestamp_str[13:15])
+            )
+        except (KeyError, ValueError):
+            return None
+
+        # Logs de diciembre leídos en enero: son del año anterior
+        if timestamp > now + timedelta(days=1):
+            timestamp = timestamp.replace(year=now.year - 1)
+
+        return timestamp
+
+
+@register_format
+class AuthLogFormat(SyslogFormat):
+    """/var/log/auth.log: fallos de autenticación SSH"""
+
+    name = "auth"
+    priority = 20
+
+    AUTH_PROGRAMS = frozenset({"sshd", "sudo", "su", "login", "systemd-logind"})
+
+    # Failed password for [invalid user ]root from 1.2.3.4 port 22 ssh2
+    FAILED_PATTERN = re.compile(
+        r'Failed \S+ for (?:invalid user )?(.*) from (\S+) port \d+'
+    )
+
+    # Invalid user admin from 1.2.3.4 [port 22]
+    INVALID_PATTERN = re.compile(r'Invalid user (.*) from (\S+)')
+
+    def _parse(self, log_line: str):
+        fields = self._split(log_line)
+        if fields is None:
+            return None
+
+        timestamp, host, program, message = fields
+
+        if program != "sshd":
+            return IGNORED
+
+        match = (
+            self.FAILED_PATTERN.match(message)
+            or self.INVALID_PATTERN.match(message)
+        )
+        if match is None:
+            return IGNORED
+
+        return ParsedLog(
+            timestamp, match.group(2), "SSH", message, 0, log_line,
+            self.name, message
+        )
+
+    def detect(self, sample: List[str]) -> float:
+        """Solo cuenta si la muestra tiene líneas de autenticación"""
+        has_auth = False
+        recognized = 0
+
+        for line in sample:
+            fields = self._split(line)
+            if fields is not None:
+                recognized += 1
+                has_auth = has_auth or fields[2] in self.AUTH_PROGRAMS
+
+        if not has_auth:
+            return 0.0
+
+        return recognized / len(sample)
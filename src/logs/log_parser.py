@@ -4,20 +4,32 @@ Némesis IA - Log Parser
 Capítulo 3: El Centinela de Logs
 
 Parsea diferentes formatos de logs
+
+Parser rápido para Common y Combined Log Format (Apache/Nginx): una
+sola regex anclada cubre las líneas bien formadas (incluidos referer y
+user-agent), un tokenizador con str.find recupera las líneas parciales
+(truncadas, sin status o con comillas dentro del payload) y los
+timestamps se memoizan, ya que las líneas consecutivas comparten segundo.
 """
 
-import re
 import logging
+import re
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class ParsedLog:
-    """Log parseado"""
+    """
+    Log parseado
+
+    Es el evento tipado que recorre todo el pipeline: lo produce el
+    parser una sola vez y lo consumen el agente (analyze/sentence) y la
+    persistencia, conservando el timestamp real del log.
+    """
     timestamp: datetime
     source_ip: str
     method: str
@@ -25,110 +37,265 @@ class ParsedLog:
     status_code: int
     raw_line: str
     format_type: str
+    request: str = ""
+    protocol: str = ""
+    bytes_sent: int = 0
+    referer: str = ""
+    user_agent: str = ""
+    severity: str = "UNKNOWN"
+
+    @property
+    def payload(self) -> str:
+        """Línea de petición completa que analiza el agente"""
+        return self.request
+
+    @property
+    def log_line(self) -> str:
+        """Línea original (alias usado por el agente)"""
+        return self.raw_line
 
 
 class LogParser:
     """Parsea logs de diferentes formatos"""
-    
-    # Regex para Apache/Nginx Common Log Format
-    APACHE_PATTERN = re.compile(
-        r'^(?P<ip>[\d\.]+) - - \[(?P<timestamp>[^\]]+)\] '
-        r'"(?P<method>\w+) (?P<path>[^\s]+) HTTP/[\d\.]+" '
-        r'(?P<status>\d+)'
-    )
-    
-    # Regex para formato alternativo
-    NGINX_PATTERN = re.compile(
-        r'^(?P<ip>[\d\.]+) - - \[(?P<timestamp>[^\]]+)\] '
-        r'"(?P<method>\w+) (?P<path>[^\s"]+)'
+
+    MONTHS = {
+        'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+        'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12,
+    }
+
+    # Common/Combined bien formado:
+    # ip ident user [ts] "METHOD path ... HTTP/x" status bytes "referer" "ua"
+    # (los campos entre comillas admiten comillas escapadas: \")
+    COMBINED_PATTERN = re.compile(
+        r'([^ ]+) [^ ]+ [^ ]+ \[([^\]]+)\] '
+        r'"(([^ "]+) ([^ "]*)(?:[^"]* (HTTP/[0-9.]+)|[^"]*))" (\d{3}|-)'
+        r'(?: (\d+|-)(?: "([^"\\]*(?:\\.[^"\\]*)*)" "([^"\\]*(?:\\.[^"\\]*)*)")?)?'
     )
-    
+
+    # Timestamps distintos recordados antes de vaciar la caché
+    TIMESTAMP_CACHE_SIZE = 4096
+
+    def __init__(self):
+        self._timestamp_cache: Dict[str, datetime] = {}
+
+        # Referencias locales para el camino rápido
+        self._match_combined = self.COMBINED_PATTERN.match
+        self._cached_timestamp = self._timestamp_cache.get
+
     def parse(self, log_line: str) -> Optional[ParsedLog]:
         """
         Parsea una línea de log
-        
+
+        Formato esperado (Common / Combined):
+        IP ident user [timestamp] "METHOD /path HTTP/1.1" status bytes "referer" "user-agent"
+
         Args:
             log_line: Línea de log a parsear
-            
+
         Returns:
             ParsedLog o None si no se puede parsear
         """
-        # Intentar Apache/Nginx format
-        parsed = self._parse_apache(log_line)
-        if parsed:
-            return parsed
-        
-        # Intentar formato alternativo
-        parsed = self._parse_nginx(log_line)
-        if parsed:
-            return parsed
-        
-        logger.debug(f"⚠️  No se pudo parsear: {log_line[:50]}...")
-        return None
-    
-    def _parse_apache(self, log_line: str) -> Optional[ParsedLog]:
-        """Parsea formato Apache/Nginx"""
-        match = self.APACHE_PATTERN.match(log_line)
-        
-        if not match:
-            return None
-        
-        try:
-            groups = match.groupdict()
-            
-            # Parsear timestamp
-            timestamp_str = groups['timestamp']
-            timestamp = self._parse_timestamp(timestamp_str)
-            
-            return ParsedLog(
-                timestamp=timestamp,
-                source_ip=groups['ip'],
-                method=groups['method'],
-                path=groups['path'],
-                status_code=int(groups['status']),
-                raw_line=log_line,
-                format_type="apache"
-            )
-        
-        except Exception as e:
-            logger.debug(f"Error parseando Apache log: {e}")
-            return None
-    
-    def _parse_nginx(self, log_line: str) -> Optional[ParsedLog]:
-        """Parsea formato Nginx alternativo"""
-        match = self.NGINX_PATTERN.match(log_line)
-        
-        if not match:
-            return None
-        
-        try:
-            groups = match.groupdict()
-            
-            timestamp_str = groups['timestamp']
-            timestamp = self._parse_timestamp(timestamp_str)
-            
+        match = self._match_combined(log_line)
+        if match is None:
+            return self._parse_partial(log_line)
+
+        (ip, timestamp_str, request, method, path, protocol,
+         status, size, referer, user_agent) = match.groups()
+
+        timestamp = self._cached_timestamp(timestamp_str)
+        if timestamp is None:
+            timestamp = self.parse_timestamp(timestamp_str)
+
+        status_code = int(status) if status != '-' else 0
+
+        if user_agent is None:
             return ParsedLog(
-                timestamp=timestamp,
-                source_ip=groups['ip'],
-                method=groups['method'],
-                path=groups['path'],
-                status_code=200,  # Default
-                raw_line=log_line,
-                format_type="nginx"
+                timestamp, ip, method, path, status_code, log_line,
+                "apache", request, protocol or ""
             )
-        
-        except Exception as e:
-            logger.debug(f"Error parseando Nginx log: {e}")
-            return None
-    
-    def _parse_timestamp(self, timestamp_str: str) -> datetime:
-        """Parsea timestamp de log"""
-        # Formato: 04/Dec/2025:10:00:00 +0000
+
+        return ParsedLog(
+            timestamp, ip, method, path, status_code, log_line,
+            "combined", request, protocol or "",
+            int(size) if size != '-' else 0, referer, user_agent
+        )
+
+    def _parse_partial(self, log_line: str) -> Optional[ParsedLog]:
+        """
+        Tokenizador de recuperación para líneas que no encajan completas
+
+        Args:
+            log_line: Línea de log a parsear
+
+        Returns:
+            ParsedLog o None si no se puede parsear
+        """
+        find = log_line.find
+
+        # IP (primer campo)
+        ip_end = find(' ')
+        if ip_end <= 0:
+            return self._unparsed(log_line)
+
+        # Timestamp entre corchetes
+        ts_start = find('[', ip_end)
+        if ts_start == -1:
+            return self._unparsed(log_line)
+        ts_end = find(']', ts_start)
+        if ts_end == -1:
+            return self._unparsed(log_line)
+
+        # Petición entre comillas
+        req_start = find('"', ts_end)
+        if req_start == -1:
+            return self._unparsed(log_line)
+        req_start += 1
+        req_end = self._find_closing_quote(log_line, req_start)
+
+        if req_end == -1:
+            # Línea truncada: recuperar lo que haya de la petición
+            request = log_line[req_start:]
+            tail = ""
+        else:
+            request = log_line[req_start:req_end]
+            tail = log_line[req_end + 1:]
+
+        method, _, rest = request.partition(' ')
+        if not method:
+            return self._unparsed(log_line)
+
+        path, _, protocol = rest.partition(' ')
+        if protocol:
+            # Payloads con espacios: el protocolo es el último token
+            head, _, last = rest.rpartition(' ')
+            if last.startswith('HTTP/'):
+                protocol = last
+                path = head.split(' ', 1)[0]
+            else:
+                protocol = ""
+
+        status_code = 200  # Default si falta el status (línea parcial)
+        bytes_sent = 0
+        referer = ""
+        user_agent = ""
+        format_type = "nginx"
+
+        fields = tail.split(' ', 3)
+        if len(fields) >= 2 and fields[1].isdigit():
+            status_code = int(fields[1])
+            format_type = "apache"
+
+            if len(fields) >= 3 and fields[2].isdigit():
+                bytes_sent = int(fields[2])
+
+            if len(fields) >= 4 and fields[3].startswith('"'):
+                referer, user_agent = self._parse_combined_tail(fields[3])
+                format_type = "combined"
+
+        return ParsedLog(
+            timestamp=self.parse_timestamp(log_line[ts_start + 1:ts_end]),
+            source_ip=log_line[:ip_end],
+            method=method,
+            path=path,
+            status_code=status_code,
+            raw_line=log_line,
+            format_type=format_type,
+            request=request,
+            protocol=protocol,
+            bytes_sent=bytes_sent,
+            referer=referer,
+            user_agent=user_agent
+        )
+
+    @staticmethod
+    def _unparsed(log_line: str) -> None:
+        """Registra una línea que no se pudo parsear"""
+        logger.debug(f"⚠️  No se pudo parsear: {log_line[:50]}...")
+        return None
+
+    @staticmethod
+    def _find_closing_quote(log_line: str, start: int) -> int:
+        """
+        Busca las comillas que cierran la petición
+
+        Ignora comillas escapadas (\\") y comillas internas del payload
+        que no van seguidas de un status o del final de la línea.
+        """
+        find = log_line.find
+        end = find('"', start)
+
+        while end != -1:
+            if log_line[end - 1] != '\\':
+                following = log_line[end + 1:end + 3]
+                if not following or following == ' -' or (
+                    following[0] == ' ' and following[1:].isdigit()
+                ):
+                    return end
+            end = find('"', end + 1)
+
+        return -1
+
+    @staticmethod
+    def _parse_combined_tail(tail: str) -> tuple:
+        """Extrae referer y user-agent de '"referer" "user-agent"'"""
+        referer_end = tail.find('"', 1)
+        if referer_end == -1:
+            return tail[1:], ""
+
+        referer = tail[1:referer_end]
+
+        ua_start = tail.find('"', referer_end + 1)
+        if ua_start == -1:
+            return referer, ""
+
+        ua_end = tail.rfind('"')
+        if ua_end <= ua_start:
+            return referer, tail[ua_start + 1:]
+
+        return referer, tail[ua_start + 1:ua_end]
+
+    def parse_timestamp(self, timestamp_str: str) -> datetime:
+        """
+        Parsea timestamp de log (memoizado)
+
+        Formato: 04/Dec/2025:10:00:00 +0000
+        """
+        cached = self._timestamp_cache.get(timestamp_str)
+        if cached is not None:
+            return cached
+
+        timestamp = self._parse_timestamp_uncached(timestamp_str)
+        if timestamp is None:
+            # No se cachea: la hora actual cambia en cada llamada
+            return datetime.now()
+
+        if len(self._timestamp_cache) >= self.TIMESTAMP_CACHE_SIZE:
+            self._timestamp_cache.clear()
+        self._timestamp_cache[timestamp_str] = timestamp
+
+        return timestamp
+
+    def _parse_timestamp_uncached(self, timestamp_str: str) -> Optional[datetime]:
+        """Parsea el timestamp por posición, con strptime como respaldo"""
+        if timestamp_str[2:3] == '/' and timestamp_str[6:7] == '/' and timestamp_str[11:12] == ':':
+            try:
+                # dd/Mon/yyyy:HH:MM:SS (la zona horaria se ignora)
+                return datetime(
+                    int(timestamp_str[7:11]),
+                    self.MONTHS[timestamp_str[3:6]],
+                    int(timestamp_str[0:2]),
+                    int(timestamp_str[12:14]),
+                    int(timestamp_str[15:17]),
+                    int(timestamp_str[18:20])
+                )
+            except (KeyError, ValueError):
+                pass
+
         try:
             # Remover timezone si existe
             if '+' in timestamp_str or '-' in timestamp_str:
                 timestamp_str = timestamp_str.split()[0]
-            
+
             return datetime.strptime(timestamp_str, "%d/%b/%Y:%H:%M:%S")
-        except:
-            return datetime.now()
\ No newline at end of file
+        except Exception:
+            return None
@@ -3,95 +3,469 @@
 Némesis IA - Log Reader
 Capítulo 3: El Centinela de Logs
 
-Lee logs en tiempo real usando tail -f
+Lee logs en tiempo real con un follower nativo (sin subprocesos):
+- Lectura por bloques grandes y separación de líneas en un buffer reutilizable
+- Detección de rotación (inode) y truncado (tamaño)
+- Espera con inotify en Linux, con fallback a polling
+- Checkpoints opcionales (inode, offset, hash de línea) para reanudar
+  tras un reinicio, incluso si el archivo rotó mientras estaba parado
 """
 
 import asyncio
+import ctypes
+import ctypes.util
 import logging
+import os
 from pathlib import Path
 from typing import AsyncGenerator, Optional
 
+from .checkpoint import CheckpointStore, line_hash
+
 logger = logging.getLogger(__name__)
 
 
+class _InotifyWatcher:
+    """Despierta al follower cuando cambia el directorio del log (solo Linux)"""
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    WATCH_MASK = (
+        IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM |
+        IN_MOVED_TO | IN_CREATE | IN_DELETE
+    )
+
+    def __init__(self, directory: Path):
+        self._fd = -1
+        self._event = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc no disponible")
+
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falló")
+
+        wd = libc.inotify_add_watch(fd, str(directory).encode(), self.WATCH_MASK)
+        if wd < 0:
+            os.close(fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch falló")
+
+        self._fd = fd
+        self._loop.add_reader(fd, self._on_readable)
+
+    def _on_readable(self):
+        """Vacía la cola de eventos de inotify y despierta al follower"""
+        try:
+            while os.read(self._fd, 4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+        self._event.set()
+
+    async def wait(self, timeout: float):
+        """Espera un evento o el timeout (que actúa como red de seguridad)"""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._event.clear()
+
+    def wake(self):
+        """Despierta a quien esté esperando (usado por stop)"""
+        self._event.set()
+
+    def close(self):
+        """Libera el descriptor de inotify"""
+        if self._fd >= 0:
+            self._loop.remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = -1
+
+
 class LogReader:
     """Lee logs en tiempo real"""
-    
-    def __init__(self, log_file: str, follow: bool = True):
+
+    CHUNK_SIZE = 256 * 1024
+    POLL_INTERVAL = 0.5
+
+    def __init__(
+        self,
+        log_file: str,
+        follow: bool = True,
+        chunk_size: int = CHUNK_SIZE,
+        poll_interval: float = POLL_INTERVAL,
+        checkpoint: Optional[CheckpointStore] = None,
+        auto_commit: bool = True
+    ):
         """
         Inicializa el lector de logs
-        
+
         Args:
             log_file: Ruta al archivo de log
-            follow: Si True, hace tail -f (sigue el archivo)
+            follow: Si True, sigue el archivo (como tail -f)
+            chunk_size: Bytes leídos por cada llamada a read()
+            poll_interval: Segundos entre comprobaciones si no hay inotify
+            checkpoint: Almacén de checkpoints; si existe uno para este
+                archivo, la lectura continúa desde ahí
+            auto_commit: Si True, cada línea cuenta como procesada cuando el
+                consumidor pide la siguiente; con False el consumidor
+                confirma con commit()
         """
         self.log_file = Path(log_file)
         self.follow = follow
-        self._process: Optional[asyncio.subprocess.Process] = None
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+        self.checkpoint = checkpoint
+        self._auto_commit = checkpoint is not None and auto_commit
+
+        self._file = None
+        self._inode: Optional[tuple] = None
+        self._offset = 0
+        self._buffer = bytearray()
+        self._watcher: Optional[_InotifyWatcher] = None
         self._is_running = False
-        
+
+        self._rotations = 0
+        self._truncations = 0
+
         logger.info(f"📖 LogReader inicializado: {self.log_file}")
-    
+
     async def start(self) -> AsyncGenerator[str, None]:
         """
         Inicia la lectura de logs
-        
+
         Yields:
             Líneas de log
         """
         if not self.log_file.exists():
             logger.error(f"❌ Archivo no existe: {self.log_file}")
             return
-        
+
         self._is_running = True
-        
-        if self.follow:
-            # Usar tail -f para seguir el archivo
-            cmd = ["tail", "-f", str(self.log_file)]
-            logger.info(f"🚀 Iniciando tail -f en {self.log_file}")
-        else:
-            # Leer archivo completo
-            cmd = ["cat", str(self.log_file)]
-            logger.info(f"📄 Leyendo archivo completo: {self.log_file}")
-        
+
         try:
-            self._process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
+            rotated = self._resume()
+
+            if self.follow:
+                logger.info(f"🚀 Siguiendo {self.log_file}")
+                self._watcher = self._create_watcher()
+            else:
+                logger.info(f"📄 Leyendo archivo completo: {self.log_file}")
+
+            if rotated is not None:
+                # Rotó durante la parada: terminar el archivo viejo primero
+                async for line in self._drain():
+                    yield line
+                    self._delivered(line)
+                tail = self._take_remainder()
+                if tail:
+                    yield tail
+                    self._delivered(tail)
+                self._reopen()
+
             while self._is_running:
-                line = await self._process.stdout.readline()
-                
-                if not line:
+                got_data = False
+
+                async for line in self._drain():
+                    got_data = True
+                    yield line
+                    self._delivered(line)
+
+                if not self.follow:
+                    break
+
+                if not self._is_running:
                     break
-                
-                decoded_line = line.decode('utf-8').strip()
-                
-                if decoded_line:
-                    yield decoded_line
-        
+
+                change = self._check_rotation()
+                if change == "rotated":
+                    # Drenar lo escrito en el archivo viejo antes de reabrir
+                    async for line in self._drain():
+                        yield line
+                        self._delivered(line)
+                    tail = self._take_remainder()
+                    if tail:
+                        yield tail
+                        self._delivered(tail)
+                    self._reopen()
+                    continue
+                if change == "truncated":
+                    continue
+
+                if not got_data:
+                    await self._wait_for_change()
+
+            if not self.follow:
+                # Última línea sin salto de línea final
+                tail = self._take_remainder()
+                if tail:
+                    yield tail
+                    self._delivered(tail)
+
         except Exception as e:
             logger.error(f"❌ Error leyendo logs: {e}")
-        
+
         finally:
             await self.stop()
-    
+
     async def stop(self):
         """Detiene la lectura de logs"""
+        was_running = self._is_running
         self._is_running = False
-        
-        if self._process and self._process.returncode is None:
+
+        if self._watcher:
+            self._watcher.wake()
+            self._watcher.close()
+            self._watcher = None
+
+        if self._file:
+            self._file.close()
+            self._file = None
+
+        if self.checkpoint:
+            self.checkpoint.flush()
+
+        if was_running:
+            logger.info("✅ LogReader detenido")
+
+    @property
+    def offset(self) -> int:
+        """Offset (en bytes) de la última línea entregada"""
+        return self._offset
+
+    @property
+    def position(self) -> tuple:
+        """(inode, offset) de la última línea entregada, para commit()"""
+        return self._inode, self._offset
+
+    def commit(self, inode: tuple, offset: int, line: str):
+        """
+        Confirma que todo hasta offset está procesado
+
+        Args:
+            inode: Inode al que pertenece el offset (ver position)
+            offset: Offset justo después de la línea
+            line: Última línea procesada
+        """
+        if self.checkpoint:
+            self.checkpoint.update(str(self.log_file), inode, offset, line)
+
+    def _delivered(self, line: str):
+        """El consumidor pidió la siguiente línea: la anterior está procesada"""
+        if self._auto_commit:
+            self.checkpoint.update(str(self.log_file), self._inode, self._offset, line)
+
+    @property
+    def lag_bytes(self) -> int:
+        """Bytes escritos en el archivo que aún no se han entregado"""
+        try:
+            return max(os.stat(self.log_file).st_size - self._offset, 0)
+        except OSError:
+            return 0
+
+    @property
+    def stats(self):
+        """Retorna estadísticas del lector"""
+        return {
+            "offset": self._offset,
+            "rotations": self._rotations,
+            "truncations": self._truncations,
+            "inotify": self._watcher is not None,
+        }
+
+    def _open(self, seek_end: bool = False):
+        """Abre el archivo y se posiciona al inicio o al final"""
+        self._file = open(self.log_file, 'rb', buffering=0)
+        st = os.fstat(self._file.fileno())
+        self._inode = (st.st_dev, st.st_ino)
+        self._offset = st.st_size if seek_end else 0
+        self._file.seek(self._offset)
+        self._buffer.clear()
+
+    def _resume(self) -> Optional[Path]:
+        """
+        Abre el archivo en el punto del checkpoint (si lo hay)
+
+        Returns:
+            Ruta del archivo rotado abierto (a terminar antes de reabrir
+            el actual) o None
+        """
+        saved = self.checkpoint.get(str(self.log_file)) if self.checkpoint else None
+        if saved is None:
+            self._open(seek_end=self.follow)
+            return None
+
+        st = os.stat(self.log_file)
+        if (st.st_dev, st.st_ino) == saved["inode"]:
+            if self._open_at(self.log_file, saved):
+                logger.info(f"📌 Reanudando {self.log_file} en el offset {self._offset}")
+            else:
+                logger.warning(
+                    f"⚠️  El checkpoint de {self.log_file} no coincide "
+                    f"(truncado o reescrito), leyendo desde el inicio"
+                )
+                self._open(seek_end=False)
+            return None
+
+        rotated = self._find_by_inode(saved["inode"])
+        if rotated is not None and self._open_at(rotated, saved):
+            logger.info(f"📌 {self.log_file} rotó durante la parada, terminando {rotated}")
+            return rotated
+
+        logger.warning(
+            f"⚠️  {self.log_file} rotó y el archivo anterior ya no está; "
+            f"puede haber un hueco, leyendo el nuevo desde el inicio"
+        )
+        self._open(seek_end=False)
+        return None
+
+    def _open_at(self, path: Path, saved: dict) -> bool:
+        """Abre path en el offset guardado si la última línea coincide"""
+        offset = saved["offset"]
+        f = open(path, 'rb', buffering=0)
+
+        try:
+            st = os.fstat(f.fileno())
+            if st.st_size < offset:
+                f.close()
+                return False
+
+            # Última línea entregada: la que termina justo antes del offset
+            start = max(0, offset - 65536)
+            f.seek(start)
+            data = f.read(offset - start).rstrip(b'\n')
+            last = data.rsplit(b'\n', 1)[-1].decode('utf-8', errors='replace').strip()
+
+            # Una línea más larga que la ventana no se puede verificar
+            verifiable = offset > 0 and (start == 0 or b'\n' in data)
+            if verifiable and line_hash(last) != saved["line_hash"]:
+                f.close()
+                return False
+
+        except OSError:
+            f.close()
+            return False
+
+        f.seek(offset)
+        self._file = f
+        self._inode = (st.st_dev, st.st_ino)
+        self._offset = offset
+        self._buffer.clear()
+        return True
+
+    def _find_by_inode(self, inode: tuple) -> Optional[Path]:
+        """Busca en el directorio del log el archivo rotado con ese inode"""
+        try:
+            entries = list(os.scandir(self.log_file.parent))
+        except OSError:
+            return None
+
+        for entry in entries:
             try:
-                self._process.terminate()
-                await asyncio.wait_for(self._process.wait(), timeout=2.0)
-                logger.info("✅ LogReader detenido")
-            except asyncio.TimeoutError:
-                self._process.kill()
-                await self._process.wait()
-                logger.warning("⚠️  LogReader forzado a terminar")
-            except ProcessLookupError:
-                logger.info("✅ LogReader ya estaba detenido")
+                if entry.inode() == inode[1] and entry.is_file():
+                    if entry.stat().st_dev == inode[0]:
+                        return Path(entry.path)
+            except OSError:
+                continue
+
+        return None
+
+    def _create_watcher(self) -> Optional[_InotifyWatcher]:
+        """Crea el watcher de inotify o None para usar polling"""
+        try:
+            return _InotifyWatcher(self.log_file.parent)
+        except (OSError, AttributeError, NotImplementedError) as e:
+            logger.debug(f"inotify no disponible ({e}), usando polling")
+            return None
+
+    async def _drain(self) -> AsyncGenerator[str, None]:
+        """Lee todos los bloques disponibles y entrega las líneas completas"""
+        while self._is_running and self._file:
+            chunk = self._file.read(self.chunk_size)
+            if not chunk:
+                return
+
+            buffer = self._buffer
+            buffer += chunk
+
+            start = 0
+            find = buffer.find
+            while True:
+                end = find(b'\n', start)
+                if end == -1:
+                    break
+
+                line = buffer[start:end].decode('utf-8', errors='replace').strip()
+                self._offset += end + 1 - start
+                start = end + 1
+
+                if line:
+                    yield line
+                    if not self._is_running:
+                        break
+
+            del buffer[:start]
+
+            # Ceder el control entre bloques para no acaparar el event loop
+            await asyncio.sleep(0)
+
+    def _take_remainder(self) -> str:
+        """Consume el fragmento final sin salto de línea"""
+        if not self._buffer:
+            return ""
+        line = self._buffer.decode('utf-8', errors='replace').strip()
+        self._offset += len(self._buffer)
+        self._buffer.clear()
+        return line
+
+    def _check_rotation(self) -> Optional[str]:
+        """
+        Detecta rotación o truncado del archivo
+
+        Returns:
+            "rotated", "truncated" o None si no hubo cambios
+        """
+        try:
+            st = os.stat(self.log_file)
+        except FileNotFoundError:
+            # Rotado y aún no recreado: seguir esperando
+            return None
+
+        if (st.st_dev, st.st_ino) != self._inode:
+            self._rotations += 1
+            logger.info(f"🔄 Rotación detectada en {self.log_file}")
+            return "rotated"
+
+        if st.st_size < self._offset + len(self._buffer):
+            self._truncations += 1
+            logger.info(f"✂️  Truncado detectado en {self.log_file}")
+            self._file.seek(0)
+            self._offset = 0
+            self._buffer.clear()
+            return "truncated"
+
+        return None
+
+    def _reopen(self):
+        """Cierra el archivo rotado y abre el nuevo desde el principio"""
+        if self._file:
+            self._file.close()
+        self._open(seek_end=False)
+
+    async def _wait_for_change(self):
+        """Espera con inotify o hace polling"""
+        if self._watcher:
+            await self._watcher.wait(self.poll_interval)
         else:
-            logger.info("✅ LogReader detenido")
\ No newline at end of file
+            await asyncio.sleep(self.poll_interval)
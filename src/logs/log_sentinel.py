@@ -2,142 +2,409 @@
 """
 Némesis IA - Log Sentinel
 Con integración a Dashboard V2
+
+Un solo centinela puede vigilar muchos archivos (lista o glob): cada
+archivo tiene su follower y todos alimentan una cola acotada que drena
+un pool fijo de tareas de análisis con un único agente (un solo modelo).
+Las líneas se analizan en micro-lotes (hasta N líneas o T milisegundos)
+para amortizar el coste por llamada del modelo. El formato de cada
+archivo se detecta una vez y su parser queda asociado al archivo.
+Con un DetectionWorkerPool el análisis se reparte por IP entre procesos
+y los veredictos vuelven al centinela para persistir y alertar.
 """
 
 import asyncio
+import glob
 import logging
-from typing import Optional
-from datetime import datetime
+from collections import deque
+from contextlib import aclosing
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
 from .log_reader import LogReader
-from .log_parser import LogParser
+from .checkpoint import CheckpointStore
+from .log_formats import (
+    DEFAULT_FORMAT, LogFormat, detect_format, get_format, sample_file
+)
 
 logger = logging.getLogger(__name__)
 
 
 class LogSentinel:
     """Centinela de Logs que monitorea y analiza en tiempo real"""
-    
-    def __init__(self, agent, log_file: str, follow: bool = True, database=None, alert_manager=None, dashboard=None):
+
+    def __init__(
+        self,
+        agent,
+        log_file: Union[str, Iterable[str]],
+        follow: bool = True,
+        database=None,
+        alert_manager=None,
+        dashboard=None,
+        queue_size: int = 10000,
+        workers: int = 1,
+        drop_when_full: bool = False,
+        batch_size: int = 64,
+        batch_timeout_ms: float = 20.0,
+        log_format: Optional[str] = None,
+        worker_pool=None,
+        checkpoint_path: Optional[str] = None
+    ):
         """
         Inicializa el Centinela
-        
+
         Args:
             agent: Instancia de NemesisAgent
-            log_file: Archivo de log a monitorear
-            follow: Si True, hace tail -f
+            log_file: Archivo, glob (p. ej. "/var/log/nginx/*.log") o lista de archivos
+            follow: Si True, sigue los archivos (como tail -f)
             database: Instancia de ThreatDatabase (opcional)
             alert_manager: Instancia de AlertManager (opcional)
             dashboard: Instancia de DashboardV2 (opcional)
+            queue_size: Capacidad de la cola compartida entre followers y análisis
+            workers: Número de tareas de análisis que drenan la cola
+            drop_when_full: Si True, descarta líneas con la cola llena en lugar
+                de frenar al follower (backpressure)
+            batch_size: Máximo de líneas analizadas juntas por el agente
+            batch_timeout_ms: Espera máxima para completar un lote
+            log_format: Formato fijo para todos los archivos (p. ej. "auth");
+                None detecta el formato de cada archivo
+            worker_pool: DetectionWorkerPool (opcional); si se indica, los
+                lotes se analizan en sus procesos (usar workers >= sus procesos
+                para mantenerlos ocupados)
+            checkpoint_path: Archivo JSON de checkpoints (opcional); al reiniciar
+                cada archivo continúa tras la última línea ya procesada
         """
         self.agent = agent
-        self.reader = LogReader(log_file, follow=follow)
-        self.parser = LogParser()
+        self.worker_pool = worker_pool
+        self.follow = follow
+        self.log_format = log_format
         self.database = database
         self.alert_manager = alert_manager
         self.dashboard = dashboard  # ← NUEVO
-        
+
+        self.queue_size = queue_size
+        self.workers = max(1, workers)
+        self.drop_when_full = drop_when_full
+        self.batch_size = max(1, batch_size)
+        self.batch_timeout = batch_timeout_ms / 1000
+
+        # Checkpoints: se confirman al terminar de procesar cada línea
+        self.checkpoints: Optional[CheckpointStore] = (
+            CheckpointStore(checkpoint_path) if checkpoint_path else None
+        )
+
+        self.readers: Dict[str, LogReader] = {
+            path: LogReader(
+                path, follow=follow, checkpoint=self.checkpoints, auto_commit=False
+            )
+            for path in self._resolve_paths(log_file)
+        }
+
+        # Líneas en vuelo por archivo, en orden de lectura
+        self._in_flight: Dict[str, deque] = {path: deque() for path in self.readers}
+        self._file_stats: Dict[str, Dict[str, int]] = {
+            path: {"lines_read": 0, "lines_dropped": 0}
+            for path in self.readers
+        }
+
+        # Parser por archivo (None hasta ver la primera línea si está vacío)
+        self.formats: Dict[str, Optional[LogFormat]] = {
+            path: self._bind_format(path, sample_file(path))
+            for path in self.readers
+        }
+
+        self._queue: Optional[asyncio.Queue] = None
         self._is_running = False
         self._logs_processed = 0
         self._threats_detected = 0
-        
-        logger.info(f"👁️  LogSentinel inicializado")
+
+        logger.info(
+            f"👁️  LogSentinel inicializado "
+            f"({len(self.readers)} archivo(s), {self.workers} worker(s))"
+        )
         if self.database:
             logger.info("💾 Base de datos habilitada")
         if self.alert_manager:
             logger.info("📢 Sistema de alertas habilitado")
         if self.dashboard:  # ← NUEVO
             logger.info("🌐 Dashboard real-time habilitado")
-    
+        if self.worker_pool:
+            logger.info(f"🧵 Detección en {self.worker_pool.workers} proceso(s)")
+
+    @staticmethod
+    def _resolve_paths(log_file: Union[str, Iterable[str]]) -> List[str]:
+        """Expande globs y elimina duplicados conservando el orden"""
+        patterns = [log_file] if isinstance(log_file, str) else list(log_file)
+
+        paths: List[str] = []
+        for pattern in patterns:
+            if any(c in pattern for c in "*?["):
+                matches = sorted(glob.glob(pattern))
+                if not matches:
+                    logger.warning(f"⚠️  El glob no coincide con ningún archivo: {pattern}")
+                paths.extend(matches)
+            else:
+                paths.append(pattern)
+
+        return list(dict.fromkeys(paths))
+
+    @property
+    def reader(self) -> Optional[LogReader]:
+        """Primer lector (compatibilidad con el centinela de un solo archivo)"""
+        return next(iter(self.readers.values()), None)
+
+    @property
+    def parser(self) -> Optional[LogFormat]:
+        """Parser del primer archivo (compatibilidad con el centinela de un solo archivo)"""
+        return next(iter(self.formats.values()), None)
+
+    def _bind_format(self, path: str, sample: List[str]) -> Optional[LogFormat]:
+        """
+        Elige el parser de un archivo
+
+        Args:
+            path: Ruta al archivo
+            sample: Primeras líneas del archivo
+
+        Returns:
+            LogFormat asociado o None si aún no hay muestra
+        """
+        if self.log_format:
+            return get_format(self.log_format)
+
+        if not sample:
+            return None
+
+        log_format = detect_format(sample)
+        logger.info(f"🧩 Formato de {path}: {log_format.name}")
+        return log_format
+
     async def start(self):
         """Inicia el monitoreo de logs"""
         logger.info("🚀 LogSentinel iniciando...")
         self._is_running = True
-        
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+
+        followers = [
+            asyncio.create_task(self._follow(path, reader))
+            for path, reader in self.readers.items()
+        ]
+        analyzers = [
+            asyncio.create_task(self._analyze_queue())
+            for _ in range(self.workers)
+        ]
+
         try:
-            async for log_line in self.reader.start():
-                if not self._is_running:
-                    break
-                
-                # Procesar línea
-                await self._process_log_line(log_line)
-        
+            await asyncio.gather(*followers, return_exceptions=True)
+
+            # Señal de fin para cada worker (tras drenar lo pendiente)
+            for _ in analyzers:
+                await self._queue.put(None)
+
+            await asyncio.gather(*analyzers, return_exceptions=True)
+
         except Exception as e:
             logger.error(f"❌ Error en LogSentinel: {e}")
-        
+
         finally:
+            for task in followers + analyzers:
+                task.cancel()
+
+            if self.checkpoints:
+                self.checkpoints.flush()
+
             logger.info("⏹️  Deteniendo LogSentinel...")
             self._is_running = False
-            
+
             logger.info(
                 f"📊 LogSentinel detenido - "
                 f"Logs procesados: {self._logs_processed}, "
                 f"Amenazas: {self._threats_detected}"
             )
-    
-    async def _process_log_line(self, log_line: str):
+
+    async def _follow(self, path: str, reader: LogReader):
+        """Follower de un archivo: lee líneas y las encola"""
+        counters = self._file_stats[path]
+        queue = self._queue
+        log_format = self.formats.get(path)
+        in_flight = self._in_flight[path] if self.checkpoints else None
+
+        try:
+            async with aclosing(reader.start()) as lines:
+                async for log_line in lines:
+                    if not self._is_running:
+                        break
+
+                    counters["lines_read"] += 1
+
+                    if log_format is None:
+                        # Archivo vacío al arrancar: detectar con la primera línea
+                        log_format = self._bind_format(path, [log_line])
+                        self.formats[path] = log_format
+
+                    ticket = None
+                    if in_flight is not None:
+                        # [archivo, inode, offset, línea, procesada]
+                        inode, offset = reader.position
+                        ticket = [path, inode, offset, log_line, False]
+                        in_flight.append(ticket)
+
+                    item = (log_format, log_line, ticket)
+
+                    if self.drop_when_full:
+                        try:
+                            queue.put_nowait(item)
+                        except asyncio.QueueFull:
+                            counters["lines_dropped"] += 1
+                            if ticket:
+                                self._commit([ticket])
+                    else:
+                        # Backpressure: el follower espera y el archivo hace de buffer
+                        await queue.put(item)
+
+        except Exception as e:
+            logger.error(f"❌ Error siguiendo {path}: {e}")
+
+    async def _analyze_queue(self):
+        """Worker de análisis: drena la cola compartida en micro-lotes"""
+        queue = self._queue
+        loop = asyncio.get_running_loop()
+        finished = False
+
+        while not finished:
+            item = await queue.get()
+
+            if item is None:
+                break
+
+            # Completar el lote hasta batch_size líneas o batch_timeout
+            batch = [item]
+            deadline = loop.time() + self.batch_timeout
+
+            while len(batch) < self.batch_size:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+
+                if item is None:
+                    finished = True
+                    break
+
+                batch.append(item)
+
+            try:
+                await self._process_batch(batch)
+            except Exception as e:
+                logger.error(f"❌ Error procesando lote: {e}")
+            finally:
+                if self.checkpoints:
+                    self._commit([ticket for _, _, ticket in batch if ticket])
+
+    async def _process_log_line(
+        self,
+        log_line: str,
+        log_format: Optional[LogFormat] = None
+    ):
         """Procesa una línea de log"""
-        self._logs_processed += 1
-        
-        # Parsear log
-        parsed = self.parser.parse(log_line)
-        
-        if not parsed:
+        if log_format is None:
+            log_format = self.parser or get_format(self.log_format or DEFAULT_FORMAT)
+        await self._process_batch([(log_format, log_line, None)])
+
+    async def _process_batch(self, items: List[Tuple[LogFormat, str, Optional[list]]]):
+        """Procesa un lote de (parser, línea, ticket) con una sola llamada al agente"""
+        self._logs_processed += len(items)
+
+        # Parsear logs (una sola vez: el evento tipado llega hasta la BD)
+        events = []
+        for log_format, log_line, _ in items:
+            parsed = log_format.parse(log_line)
+            if parsed:
+                events.append(parsed)
+
+        if not events:
             return
-        
-        # Analizar con Agente Némesis
-        verdict = await self.agent.process_log_line(log_line)
-        
-        if verdict and verdict.is_malicious:
+
+        # Analizar con Agente Némesis (o con el pool particionado por IP)
+        analyzer = self.worker_pool or self.agent
+        verdicts = await analyzer.process_events(events)
+
+        for parsed, verdict in zip(events, verdicts):
+            if not (verdict and verdict.is_malicious):
+                continue
+
             self._threats_detected += 1
-            
+
             logger.warning(
                 f"🚨 AMENAZA #{self._threats_detected}: "
                 f"{verdict.attack_type} desde {parsed.source_ip}"
             )
-            
+
             # Guardar en base de datos, enviar alertas y actualizar dashboard
             if self.database or self.alert_manager or self.dashboard:
                 await self._save_and_alert(parsed, verdict)
-    
+
+    def _commit(self, tickets: List[list]):
+        """
+        Marca líneas como procesadas y avanza el checkpoint de cada archivo
+
+        El checkpoint solo avanza sobre el prefijo contiguo de líneas
+        terminadas: con varios workers los lotes acaban en desorden y una
+        línea pendiente no puede quedar detrás del offset guardado.
+        """
+        paths = set()
+        for ticket in tickets:
+            ticket[4] = True
+            paths.add(ticket[0])
+
+        for path in paths:
+            in_flight = self._in_flight[path]
+            last = None
+            while in_flight and in_flight[0][4]:
+                last = in_flight.popleft()
+
+            if last is not None:
+                _, inode, offset, line, _ = last
+                self.readers[path].commit(inode, offset, line)
+
     async def _save_and_alert(self, parsed, verdict):
         """Guarda amenaza en BD, envía alertas y actualiza dashboard"""
         try:
             threat_data = {
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": parsed.timestamp.isoformat(),
                 "source_ip": parsed.source_ip,
                 "attack_type": verdict.attack_type,
                 "payload": parsed.path,
                 "confidence": verdict.confidence,
                 "action_taken": verdict.recommended_action
             }
-            
+
             # Guardar en base de datos
             if self.database:
                 from database.threat_database import ThreatRecord
-                
-                threat = ThreatRecord(
-                    id=None,
-                    timestamp=datetime.now(),
-                    source_ip=parsed.source_ip,
-                    attack_type=verdict.attack_type,
-                    payload=parsed.path,
-                    confidence=verdict.confidence,
-                    action_taken=verdict.recommended_action,
-                    blocked=(verdict.recommended_action == "BLOCK")
-                )
-                
+
+                threat = ThreatRecord.from_event(parsed, verdict)
+
                 threat_id = self.database.save_threat(threat)
-                
+
                 # Registrar IP bloqueada
                 if verdict.recommended_action == "BLOCK":
                     self.database.block_ip(
                         parsed.source_ip,
                         f"{verdict.attack_type} attack"
                     )
-                
-                logger.debug(f"💾 Amenaza guardada en BD: ID={threat_id}")
-            
+
+                # Con WriteBehindQueue el ID se asigna al volcar el lote
+                if threat_id is not None:
+                    logger.debug(f"💾 Amenaza guardada en BD: ID={threat_id}")
+                else:
+                    logger.debug("💾 Amenaza encolada para la BD")
+
             # Enviar alerta
             if self.alert_manager:
                 await self.alert_manager.send_threat_alert(
@@ -147,20 +414,39 @@ class LogSentinel:
                     payload=parsed.path,
                     action_taken=verdict.recommended_action
                 )
-            
+
             # Broadcast a dashboard (NUEVO)
             if self.dashboard:
                 await self.dashboard.broadcast_threat(threat_data)
                 logger.debug("🌐 Amenaza enviada al dashboard")
-        
+
         except Exception as e:
             logger.error(f"❌ Error en save_and_alert: {e}")
-    
+
     async def stop(self):
         """Detiene el Centinela manualmente"""
         self._is_running = False
-        await self.reader.stop()
-    
+        for reader in self.readers.values():
+            await reader.stop()
+
+        # Escrituras diferidas (WriteBehindQueue): volcar lo pendiente
+        flush = getattr(self.database, "flush", None)
+        if flush:
+            await asyncio.get_running_loop().run_in_executor(None, flush)
+
+    @property
+    def file_stats(self) -> Dict[str, Dict]:
+        """Estadísticas por archivo: líneas leídas, descartadas, lag y parser"""
+        return {
+            path: {
+                "lines_read": counters["lines_read"],
+                "lines_dropped": counters["lines_dropped"],
+                "lag_bytes": self.readers[path].lag_bytes,
+                "format": self.formats[path].stats if self.formats[path] else None,
+            }
+            for path, counters in self._file_stats.items()
+        }
+
     @property
     def stats(self):
         """Retorna estadísticas"""
@@ -170,5 +456,7 @@ class LogSentinel:
             "detection_rate": (
                 (self._threats_detected / self._logs_processed * 100)
                 if self._logs_processed > 0 else 0
-            )
-        }
\ No newline at end of file
+            ),
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "files": self.file_stats
+        }
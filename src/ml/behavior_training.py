@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Némesis IA - Behavior Training
+Entrenamiento con features de payload + comportamiento por IP
+
+El modelo base solo ve un payload cada vez: "POST /login" o "GET /admin"
+son idénticos vengan de un usuario o de un escáner. Aquí cada evento
+lleva además las features de su IP (core.behavior_store), calculadas
+reproduciendo el tráfico en orden con el mismo BehaviorStore que usa el
+agente, así que entrenamiento e inferencia ven exactamente lo mismo.
+
+El modelo resultante tiene 3 + 4 columnas (TEXT_FEATURES +
+BEHAVIOR_FEATURES); un NemesisAgent con behavior_store las detecta por
+n_features_in_ y le pasa ambas.
+
+Uso:
+    python -m ml.behavior_training --output models/nemesis_brain_behavior.joblib
+
+Copyright (C) 2025 Némesis AI Project Contributors
+Licensed under GPL-3.0
+"""
+
+import argparse
+import logging
+import random
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import f1_score, precision_score, recall_score
+from sklearn.model_selection import GroupShuffleSplit
+
+from core.behavior_store import BEHAVIOR_FEATURES, replay_features
+from logs.log_parser import ParsedLog
+from ml.batch_features import TEXT_FEATURES, text_statistics
+from ml.compiled_forest import CompiledForest, compiled_path
+from ml.train_brain import DatasetGeneratorV2
+
+logger = logging.getLogger(__name__)
+
+
+# Rutas de reconocimiento: payloads inocentes que solo delata el ritmo
+RECON_PATHS = [
+    "/admin", "/administrator", "/wp-login.php", "/wp-admin/", "/.env", "/.git/config",
+    "/phpmyadmin/", "/backup.zip", "/config.php", "/server-status", "/api/v1/debug",
+    "/console", "/actuator/health", "/.aws/credentials", "/db.sql", "/old/", "/test.php",
+]
+
+STATIC_PATHS = ["/static/css/main.css", "/static/js/app.js", "/favicon.ico", "/images/logo.png"]
+
+
+class SessionGenerator:
+    """
+    Tráfico sintético por IP con ritmo, rutas y códigos de respuesta
+
+    Perfiles legítimos (navegación normal, usuarios intensivos que
+    recorren muchas páginas) y maliciosos (escáneres de rutas, fuerza
+    bruta de login, inyecciones lentas). Las peticiones de un escáner o
+    de la fuerza bruta se etiquetan maliciosas aunque el payload sea
+    inocente: es el comportamiento lo que las delata.
+    """
+
+    def __init__(self, n_ips: int = 400, duration: float = 3600.0, seed: Optional[int] = None) -> None:
+        """
+        Args:
+            n_ips: IPs de origen
+            duration: Segundos de tráfico
+            seed: Semilla (None = no reproducible)
+        """
+        self.n_ips = n_ips
+        self.duration = duration
+        self._random = random.Random(seed)
+
+        payloads, labels = DatasetGeneratorV2(n_samples=4000, seed=seed).generate_dataset()
+        self._legitimate = [p for p, label in zip(payloads, labels) if label == 0]
+        self._attacks = [p for p, label in zip(payloads, labels) if label == 1]
+
+    def _session(self, ip: str, start: float, mean_gap: float, count: int, request) -> List[Tuple]:
+        """Peticiones de una IP con llegadas de Poisson"""
+        rows = []
+        t = start
+        for _ in range(count):
+            t += self._random.expovariate(1.0 / mean_gap)
+            if t > self.duration:
+                break
+            rows.append((t, ip, *request()))
+        return rows
+
+    def _browse(self) -> Tuple[str, int, int]:
+        if self._random.random() < 0.3:
+            return f"GET {self._random.choice(STATIC_PATHS)} HTTP/1.1", 200, 0
+        status = 404 if self._random.random() < 0.04 else 200
+        return self._random.choice(self._legitimate), status, 0
+
+    def _scan(self) -> Tuple[str, int, int]:
+        if self._random.random() < 0.2:
+            return self._random.choice(self._attacks), 400, 1
+        path = self._random.choice(RECON_PATHS)
+        if self._random.random() < 0.5:
+            path = f"{path}{self._random.randint(0, 999)}"
+        return f"GET {path} HTTP/1.1", self._random.choice((403, 404, 404, 404)), 1
+
+    def _brute_force(self) -> Tuple[str, int, int]:
+        return "POST /login HTTP/1.1", 401, 1
+
+    def _slow_injection(self) -> Tuple[str, int, int]:
+        if self._random.random() < 0.5:
+            return self._random.choice(self._attacks), self._random.choice((200, 500)), 1
+        return self._random.choice(self._legitimate), 200, 0
+
+    def _login(self) -> Tuple[str, int, int]:
+        return "POST /login HTTP/1.1", 401 if self._random.random() < 0.2 else 200, 0
+
+    def generate(self) -> Tuple[List[ParsedLog], List[int]]:
+        """
+        Genera el tráfico de todas las IPs, ordenado por tiempo
+
+        Returns:
+            (eventos, etiquetas)
+        """
+        profiles = [
+            # (peso, intervalo medio, peticiones, generador de peticiones)
+            (0.45, (10.0, 60.0), (5, 80), self._browse),
+            (0.15, (1.0, 4.0), (100, 400), self._browse),
+            (0.10, (20.0, 120.0), (2, 10), self._login),
+            (0.12, (0.1, 1.0), (100, 600), self._scan),
+            (0.08, (0.5, 3.0), (50, 300), self._brute_force),
+            (0.10, (10.0, 60.0), (5, 60), self._slow_injection),
+        ]
+        weights = [profile[0] for profile in profiles]
+
+        rows = []
+        for n in range(self.n_ips):
+            _, gap, count, request = self._random.choices(profiles, weights=weights)[0]
+            ip = f"10.{n // 65536}.{n // 256 % 256}.{n % 256}"
+            rows.extend(self._session(
+                ip,
+                start=self._random.uniform(0, self.duration * 0.8),
+                mean_gap=self._random.uniform(*gap),
+                count=self._random.randint(*count),
+                request=request
+            ))
+
+        rows.sort(key=lambda row: row[0])
+        epoch = datetime(2025, 12, 1)
+
+        events = []
+        for t, ip, request, status, _ in rows:
+            method, path, protocol = request.split(" ", 2) if request.count(" ") >= 2 else (request, "", "")
+            events.append(ParsedLog(
+                timestamp=epoch + timedelta(seconds=t),
+                source_ip=ip,
+                method=method,
+                path=path,
+                status_code=status,
+                raw_line="",
+                format_type="synthetic",
+                request=request,
+                protocol=protocol
+            ))
+
+        labels = [row[4] for row in rows]
+        logger.info(
+            f"✅ Tráfico sintético: {len(events)} eventos de {self.n_ips} IPs "
+            f"({sum(labels)} maliciosos)"
+        )
+        return events, labels
+
+
+def behavior_dataset(events: Sequence, **store_options) -> np.ndarray:
+    """
+    Features de payload + comportamiento de un histórico de eventos
+
+    Args:
+        events: Eventos (con payload, source_ip, path, status_code, timestamp)
+        **store_options: Parámetros de BehaviorStore (los mismos que el agente)
+
+    Returns:
+        Array (n, 7): TEXT_FEATURES + BEHAVIOR_FEATURES
+    """
+    text = text_statistics([event.payload for event in events])
+    return np.hstack((text, replay_features(events, **store_options)))
+
+
+def train_behavior_model(
+    output_path: str = "models/nemesis_brain_behavior.joblib",
+    n_ips: int = 400,
+    seed: Optional[int] = 42,
+    test_size: float = 0.25,
+    store_options: Optional[Dict] = None
+) -> Dict:
+    """
+    Entrena el bosque con features de payload y de comportamiento
+
+    El split es por IP (ninguna IP aparece en train y en test). Se
+    entrena también un bosque solo con payload sobre el mismo split
+    para medir lo que aporta el comportamiento.
+
+    Args:
+        output_path: Destino del modelo joblib (y su .forest.npz)
+        n_ips: IPs del tráfico sintético
+        seed: Semilla del tráfico y del split
+        test_size: Fracción de IPs de test
+        store_options: Parámetros de BehaviorStore (deben coincidir con
+            los del agente que use el modelo)
+
+    Returns:
+        Métricas del modelo y del modelo solo-payload
+    """
+    logger.info("🚀 Entrenando modelo con features de comportamiento...")
+
+    events, labels = SessionGenerator(n_ips=n_ips, seed=seed).generate()
+    X = behavior_dataset(events, **(store_options or {}))
+    y = np.array(labels)
+    groups = [event.source_ip for event in events]
+
+    splitter = GroupShuffleSplit(n_splits=1, test_size=test_size, random_state=seed)
+    train, test = next(splitter.split(X, y, groups))
+
+    def fit(columns):
+        model = RandomForestClassifier(
+            n_estimators=100, max_depth=20, min_samples_split=5,
+            random_state=42, n_jobs=-1, class_weight='balanced'
+        )
+        model.fit(X[train][:, columns], y[train])
+        return model, model.predict(X[test][:, columns])
+
+    n_text = len(TEXT_FEATURES)
+    model, predictions = fit(slice(None))
+    _, baseline = fit(slice(0, n_text))
+
+    feature_names = list(TEXT_FEATURES) + list(BEHAVIOR_FEATURES)
+    metrics = {
+        'events': len(events),
+        'test_precision': precision_score(y[test], predictions),
+        'test_recall': recall_score(y[test], predictions),
+        'test_f1': f1_score(y[test], predictions),
+        'payload_only_f1': f1_score(y[test], baseline),
+        'feature_importances': dict(zip(feature_names, model.feature_importances_)),
+    }
+
+    logger.info(f"F1 payload + comportamiento: {metrics['test_f1']:.4f}")
+    logger.info(f"F1 solo payload:             {metrics['payload_only_f1']:.4f}")
+    for feature, importance in metrics['feature_importances'].items():
+        logger.info(f"  {feature:20s}: {importance:.4f}")
+
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(model, output_path)
+    compiled_file = CompiledForest.from_sklearn(model).save(compiled_path(output_path))
+    logger.info(f"💾 Modelo guardado en {output_path} (compilado: {compiled_file})")
+
+    return metrics
+
+
+def main(argv=None):
+    """Entrena y guarda el modelo de comportamiento"""
+    parser = argparse.ArgumentParser(
+        description="Entrena el modelo con features de payload y de comportamiento por IP"
+    )
+    parser.add_argument("--output", default="models/nemesis_brain_behavior.joblib", help="Modelo de salida")
+    parser.add_argument("--ips", type=int, default=400, help="IPs del tráfico sintético")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    metrics = train_behavior_model(args.output, n_ips=args.ips, seed=args.seed)
+    print(f"\n⚖️  F1: {metrics['test_f1']:.2%} (solo payload: {metrics['payload_only_f1']:.2%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+Némesis IA - Model Benchmark
+Barrido de configuraciones del RandomForest: latencia, throughput, tamaño y F1
+
+Para cada combinación de n_estimators, max_depth y conjunto de features
+entrena un bosque con los mismos parámetros que train_model_v2 y mide,
+con sklearn y con el bosque compilado (lo que carga el agente):
+
+- latencia de una sola fila (p50/p99/media, en µs)
+- throughput por lotes (filas/s) con varios tamaños de lote
+- tamaño en disco (joblib y .forest.npz) y en memoria (arrays de nodos)
+- F1, precision, recall y accuracy sobre el split de test
+
+El informe es un JSON que permite elegir modelo según el presupuesto de
+latencia (best_within_budget) en vez de usar siempre 100 árboles de
+profundidad 20.
+
+Uso:
+    python -m ml.benchmark --n-estimators 10 50 100 --max-depth 8 20 0 \\
+        --feature-sets agent v2 --budget-us 500 -o models/benchmark_report.json
+
+Copyright (C) 2025 Némesis AI Project Contributors
+Licensed under GPL-3.0
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import joblib
+import numpy as np
+import sklearn
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+from sklearn.model_selection import train_test_split
+
+from ml.batch_features import text_statistics
+from ml.compiled_forest import CompiledForest
+from ml.train_brain import DatasetGeneratorV2, FeatureExtractorV2
+
+logger = logging.getLogger(__name__)
+
+
+def _v2_columns(*columns: int) -> Callable[[List[str]], np.ndarray]:
+    """Subconjunto de las 5 features V2"""
+    def extract(payloads: List[str]) -> np.ndarray:
+        return FeatureExtractorV2.extract_features_batch(payloads)[:, list(columns)]
+    return extract
+
+
+# Conjuntos de features: nombre -> extractor de un lote de payloads
+FEATURE_SETS: Dict[str, Callable[[List[str]], np.ndarray]] = {
+    # Lo que extrae hoy NemesisAgent: length, special_ratio, entropy (sin normalizar)
+    "agent": text_statistics,
+    # FeatureExtractorV2 completo (train_model_v2)
+    "v2": FeatureExtractorV2.extract_features_batch,
+    # V2 sin entropía (la feature más cara de calcular)
+    "v2_no_entropy": _v2_columns(0, 1, 3, 4),
+    # Solo las firmas del autómata + longitud
+    "v2_signatures": _v2_columns(0, 3, 4),
+}
+
+N_ESTIMATORS = (10, 50, 100)
+MAX_DEPTHS = (8, 20, None)
+BATCH_SIZES = (1, 16, 128, 1024)
+LATENCY_ROWS = 500
+
+
+def _percentile_us(samples_ns: np.ndarray, q: float) -> float:
+    return float(np.percentile(samples_ns, q)) / 1000
+
+
+def measure_latency(model, X: np.ndarray, n_rows: int = LATENCY_ROWS) -> Dict:
+    """
+    Latencia de predict_proba con una sola fila
+
+    Args:
+        model: Modelo con predict_proba
+        X: Filas de las que se toman las muestras
+        n_rows: Número de llamadas medidas
+
+    Returns:
+        p50_us, p99_us, mean_us
+    """
+    rows = [X[i % len(X)].reshape(1, -1) for i in range(n_rows)]
+
+    # Calentamiento
+    for row in rows[:10]:
+        model.predict_proba(row)
+
+    samples = np.empty(n_rows, dtype=np.int64)
+    for i, row in enumerate(rows):
+        start = time.perf_counter_ns()
+        model.predict_proba(row)
+        samples[i] = time.perf_counter_ns() - start
+
+    return {
+        "p50_us": _percentile_us(samples, 50),
+        "p99_us": _percentile_us(samples, 99),
+        "mean_us": float(samples.mean()) / 1000,
+    }
+
+
+def measure_throughput(
+    model,
+    X: np.ndarray,
+    batch_sizes: Sequence[int] = BATCH_SIZES,
+    min_seconds: float = 0.2
+) -> Dict[str, float]:
+    """
+    Filas por segundo con cada tamaño de lote
+
+    Args:
+        model: Modelo con predict_proba
+        X: Filas de entrada (se repiten si el lote es mayor)
+        batch_sizes: Tamaños de lote
+        min_seconds: Tiempo mínimo de medida por tamaño
+
+    Returns:
+        {tamaño de lote: filas/s}
+    """
+    throughput = {}
+
+    for batch_size in batch_sizes:
+        batch = X[np.arange(batch_size) % len(X)]
+        model.predict_proba(batch)
+
+        rows, elapsed = 0, 0.0
+        start = time.perf_counter()
+        while elapsed < min_seconds:
+            model.predict_proba(batch)
+            rows += batch_size
+            elapsed = time.perf_counter() - start
+
+        throughput[str(batch_size)] = rows / elapsed
+
+    return throughput
+
+
+def sklearn_memory_bytes(model) -> int:
+    """Bytes de los arrays de nodos y valores de todos los árboles"""
+    total = 0
+    for estimator in model.estimators_:
+        state = estimator.tree_.__getstate__()
+        total += state["nodes"].nbytes + state["values"].nbytes
+    return total
+
+
+def compiled_memory_bytes(forest: CompiledForest) -> int:
+    """Bytes de los arrays del bosque compilado"""
+    return sum(
+        array.nbytes for array in (
+            forest.feature, forest.threshold, forest.left, forest.right,
+            forest.missing_left, forest.value, forest.roots,
+        )
+    )
+
+
+def benchmark_config(
+    X_train: np.ndarray,
+    X_test: np.ndarray,
+    y_train: np.ndarray,
+    y_test: np.ndarray,
+    n_estimators: int,
+    max_depth: Optional[int],
+    random_state: int = 42,
+    batch_sizes: Sequence[int] = BATCH_SIZES,
+    latency_rows: int = LATENCY_ROWS
+) -> Dict:
+    """
+    Entrena y mide una configuración
+
+    Returns:
+        Resultado: calidad, tamaño y rendimiento con sklearn y compilado
+    """
+    model = RandomForestClassifier(
+        n_estimators=n_estimators,
+        max_depth=max_depth,
+        min_samples_split=5,
+        random_state=random_state,
+        n_jobs=-1,
+        class_weight='balanced'
+    )
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    training_time = time.perf_counter() - start
+
+    # Inferencia en un solo hilo (como en el agente y en cada worker)
+    model.set_params(n_jobs=1)
+    forest = CompiledForest.from_sklearn(model)
+
+    predictions = model.predict(X_test)
+    result = {
+        "training_time_s": training_time,
+        "node_count": forest.node_count,
+        "actual_max_depth": forest.max_depth,
+        "quality": {
+            "f1": float(f1_score(y_test, predictions)),
+            "precision": float(precision_score(y_test, predictions, zero_division=0)),
+            "recall": float(recall_score(y_test, predictions)),
+            "accuracy": float(accuracy_score(y_test, predictions)),
+        },
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        joblib_path = Path(tmp) / "model.joblib"
+        joblib.dump(model, joblib_path)
+        compiled_file = forest.save(Path(tmp) / "model.forest.npz")
+
+        result["size"] = {
+            "joblib_bytes": joblib_path.stat().st_size,
+            "compiled_bytes": compiled_file.stat().st_size,
+            "sklearn_memory_bytes": sklearn_memory_bytes(model),
+            "compiled_memory_bytes": compiled_memory_bytes(forest),
+        }
+
+        # El agente carga el artefacto mapeado: medir ese mismo objeto
+        compiled = CompiledForest.load(compiled_file, mmap=True)
+
+        for runtime, runtime_model in (("sklearn", model), ("compiled", compiled)):
+            result[runtime] = {
+                "latency": measure_latency(runtime_model, X_test, latency_rows),
+                "throughput_rows_per_s": measure_throughput(runtime_model, X_test, batch_sizes),
+            }
+
+        del compiled
+
+    return result
+
+
+def run_sweep(
+    n_estimators: Sequence[int] = N_ESTIMATORS,
+    max_depths: Sequence[Optional[int]] = MAX_DEPTHS,
+    feature_sets: Sequence[str] = ("agent", "v2"),
+    n_samples: int = 10000,
+    seed: int = 42,
+    test_size: float = 0.2,
+    batch_sizes: Sequence[int] = BATCH_SIZES,
+    latency_rows: int = LATENCY_ROWS,
+    budget_us: Optional[float] = None
+) -> Dict:
+    """
+    Barre todas las combinaciones y devuelve el informe
+
+    Args:
+        n_estimators: Valores de n_estimators
+        max_depths: Valores de max_depth (None = sin límite)
+        feature_sets: Nombres de FEATURE_SETS
+        n_samples: Muestras del dataset sintético (semilla fija)
+        seed: Semilla del dataset, del split y de los bosques
+        test_size: Fracción de test
+        batch_sizes: Tamaños de lote para el throughput
+        latency_rows: Llamadas de una fila medidas por configuración
+        budget_us: Presupuesto de latencia p99 (opcional) para elegir modelo
+
+    Returns:
+        Informe serializable a JSON
+    """
+    unknown = set(feature_sets) - set(FEATURE_SETS)
+    if unknown:
+        raise ValueError(f"Conjuntos de features desconocidos: {sorted(unknown)}")
+
+    payloads, labels = DatasetGeneratorV2(n_samples=n_samples, seed=seed).generate_dataset()
+    y = np.array(labels)
+    train_idx, test_idx = train_test_split(
+        np.arange(len(y)), test_size=test_size, random_state=seed, stratify=y
+    )
+
+    results = []
+    for feature_set in feature_sets:
+        start = time.perf_counter()
+        X = np.asarray(FEATURE_SETS[feature_set](payloads), dtype=np.float64)
+        extraction_us = (time.perf_counter() - start) / len(payloads) * 1e6
+
+        for trees, depth in itertools.product(n_estimators, max_depths):
+            logger.info(f"⏱️  {feature_set}: n_estimators={trees}, max_depth={depth}")
+            result = benchmark_config(
+                X[train_idx], X[test_idx], y[train_idx], y[test_idx],
+                trees, depth, random_state=seed,
+                batch_sizes=batch_sizes, latency_rows=latency_rows
+            )
+            results.append({
+                "feature_set": feature_set,
+                "n_features": X.shape[1],
+                "n_estimators": trees,
+                "max_depth": depth,
+                "feature_extraction_us_per_row": extraction_us,
+                **result,
+            })
+
+    report = {
+        "generated_at": datetime.now().isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "sklearn": sklearn.__version__,
+            "cpu_count": os.cpu_count(),
+            "platform": platform.platform(),
+        },
+        "parameters": {
+            "n_samples": n_samples,
+            "seed": seed,
+            "test_size": test_size,
+            "batch_sizes": list(batch_sizes),
+            "latency_rows": latency_rows,
+        },
+        "results": results,
+    }
+
+    if budget_us is not None:
+        report["budget_us"] = budget_us
+        report["recommended"] = best_within_budget(results, budget_us)
+
+    return report
+
+
+def best_within_budget(
+    results: List[Dict],
+    budget_us: float,
+    runtime: str = "compiled"
+) -> Optional[Dict]:
+    """
+    Configuración con mejor F1 cuya latencia p99 cabe en el presupuesto
+
+    La latencia incluye el coste medio por fila de extraer las features
+    (en lote, como hace el agente). A igual F1 gana la más rápida.
+
+    Args:
+        results: Resultados de run_sweep
+        budget_us: Presupuesto p99 en µs
+        runtime: "compiled" o "sklearn"
+
+    Returns:
+        Resumen de la configuración elegida, o None si ninguna cabe
+    """
+    candidates = []
+    for result in results:
+        p99 = result[runtime]["latency"]["p99_us"] + result["feature_extraction_us_per_row"]
+        if p99 <= budget_us:
+            candidates.append((-result["quality"]["f1"], p99, result))
+
+    if not candidates:
+        return None
+
+    _, p99, best = min(candidates, key=lambda c: (c[0], c[1]))
+    return {
+        "feature_set": best["feature_set"],
+        "n_estimators": best["n_estimators"],
+        "max_depth": best["max_depth"],
+        "runtime": runtime,
+        "f1": best["quality"]["f1"],
+        "p99_us": p99,
+    }
+
+
+def write_report(report: Dict, output_path: str) -> Path:
+    """Escribe el informe JSON"""
+    path = Path(output_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def print_summary(report: Dict) -> None:
+    """Tabla resumen por consola"""
+    print(f"\n{'features':<15} {'trees':>5} {'depth':>5} {'F1':>7} "
+          f"{'p50 µs':>8} {'p99 µs':>8} {'rows/s@1024':>12} {'npz KB':>8}")
+    print("-" * 76)
+    for r in report["results"]:
+        compiled = r["compiled"]
+        largest = compiled["throughput_rows_per_s"][max(compiled["throughput_rows_per_s"], key=int)]
+        print(
+            f"{r['feature_set']:<15} {r['n_estimators']:>5} {str(r['max_depth']):>5} "
+            f"{r['quality']['f1']:>7.4f} {compiled['latency']['p50_us']:>8.1f} "
+            f"{compiled['latency']['p99_us']:>8.1f} {largest:>12,.0f} "
+            f"{r['size']['compiled_bytes'] / 1024:>8.0f}"
+        )
+
+    if "budget_us" in report:
+        best = report["recommended"]
+        if best:
+            print(f"\n🎯 Presupuesto p99 {report['budget_us']:.0f} µs: {best}")
+        else:
+            print(f"\n⚠️  Ninguna configuración cabe en {report['budget_us']:.0f} µs")
+
+
+def main(argv=None):
+    """Ejecuta el barrido desde la línea de comandos"""
+    parser = argparse.ArgumentParser(
+        description="Barrido de latencia/calidad de modelos RandomForest"
+    )
+    parser.add_argument("--n-estimators", type=int, nargs="+", default=list(N_ESTIMATORS))
+    parser.add_argument("--max-depth", type=int, nargs="+", default=[8, 20, 0],
+                        help="Profundidades (0 = sin límite)")
+    parser.add_argument("--feature-sets", nargs="+", default=["agent", "v2"],
+                        choices=sorted(FEATURE_SETS))
+    parser.add_argument("--samples", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=list(BATCH_SIZES))
+    parser.add_argument("--latency-rows", type=int, default=LATENCY_ROWS)
+    parser.add_argument("--budget-us", type=float, help="Presupuesto de latencia p99 (µs)")
+    parser.add_argument("-o", "--output", default="models/benchmark_report.json")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    report = run_sweep(
+        n_estimators=args.n_estimators,
+        max_depths=[depth or None for depth in args.max_depth],
+        feature_sets=args.feature_sets,
+        n_samples=args.samples,
+        seed=args.seed,
+        batch_sizes=args.batch_sizes,
+        latency_rows=args.latency_rows,
+        budget_us=args.budget_us,
+    )
+
+    path = write_report(report, args.output)
+    print_summary(report)
+    print(f"\n💾 Informe: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""
+Némesis IA - Compiled Forest
+RandomForest aplanado en arrays NumPy contiguos
+
+Exporta un RandomForestClassifier entrenado a un .npz con los nodos de
+todos los árboles (feature, threshold, hijos, probabilidades de hoja) y
+lo evalúa sin la sobrecarga de sklearn (validación, joblib.Parallel,
+un predict por árbol). Es la ruta de baja latencia para una sola fila.
+
+Las probabilidades son idénticas bit a bit a predict_proba de sklearn:
+las features se redondean a float32 antes de comparar (como hace el
+árbol de sklearn), las hojas guardan los mismos valores y los árboles se
+suman en el orden de estimators_ antes de dividir por su número (el orden
+de sklearn con n_jobs=1).
+
+Uso:
+    python -m ml.compiled_forest models/nemesis_brain_v2.joblib
+
+Copyright (C) 2025 Némesis AI Project Contributors
+Licensed under GPL-3.0
+"""
+
+import argparse
+import logging
+import os
+import struct
+import sys
+import zipfile
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+COMPILED_SUFFIX = ".forest.npz"
+FORMAT_VERSION = 1
+
+
+def compiled_path(model_path: Union[str, Path]) -> Path:
+    """
+    Ruta del artefacto compilado de un modelo joblib
+
+    Args:
+        model_path: Ruta del .joblib
+
+    Returns:
+        models/x.joblib -> models/x.forest.npz
+    """
+    model_path = Path(model_path)
+    return model_path.with_name(model_path.stem + COMPILED_SUFFIX)
+
+
+def _scalar_view(array: np.ndarray) -> memoryview:
+    """memoryview 1-D con formato nativo (indexable desde Python)"""
+    array = np.ascontiguousarray(array)
+    if not array.dtype.isnative:
+        array = array.astype(array.dtype.newbyteorder('='))
+    return memoryview(array).cast('B').cast(array.dtype.char)
+
+
+class CompiledForest:
+    """
+    Bosque aplanado: un array por atributo de nodo, todos los árboles seguidos
+
+    Las hojas apuntan a sí mismas (left = right = nodo, threshold = +inf),
+    así que recorrer max_depth niveles deja cada fila en su hoja sin
+    ramas especiales.
+    """
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        missing_left: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        classes: np.ndarray,
+        n_features: int,
+        max_depth: int
+    ):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.n_features_in_ = n_features
+        self.max_depth = max_depth
+
+        # Vistas de memoria para la ruta de una sola fila: el acceso escalar
+        # devuelve int/float de Python (mucho más rápido que indexar arrays
+        # NumPy) sin copiar los nodos, que pueden estar mapeados en memoria
+        self._nodes = tuple(
+            _scalar_view(array)
+            for array in (feature, threshold, left, right, missing_left)
+        )
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.feature)
+
+    @classmethod
+    def from_sklearn(cls, model) -> "CompiledForest":
+        """
+        Aplana un RandomForestClassifier (o ExtraTreesClassifier) entrenado
+
+        Args:
+            model: Bosque de sklearn con una sola salida
+
+        Returns:
+            CompiledForest equivalente
+        """
+        if getattr(model, "n_outputs_", 1) != 1:
+            raise ValueError("Solo se soportan bosques de una salida")
+
+        n_classes = len(model.classes_)
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset = 0
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            leaf = tree.children_left == -1
+
+            ids = np.arange(offset, offset + n_nodes)
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(np.where(leaf, np.inf, tree.threshold))
+            lefts.append(np.where(leaf, ids, tree.children_left + offset))
+            rights.append(np.where(leaf, ids, tree.children_right + offset))
+
+            missing_go_to_left = getattr(tree, "missing_go_to_left", None)
+            if missing_go_to_left is None:
+                missing_go_to_left = np.zeros(n_nodes, dtype=np.uint8)
+            missing.append(np.asarray(missing_go_to_left, dtype=bool) & ~leaf)
+
+            # sklearn >= 1.4 guarda fracciones en tree_.value; versiones
+            # anteriores guardan conteos y predict_proba los normaliza
+            proba = np.array(tree.value[:, 0, :n_classes], dtype=np.float64)
+            normalizer = proba.sum(axis=1)
+            if normalizer.max() > 1.0 + 1e-9:
+                normalizer[normalizer == 0.0] = 1.0
+                proba /= normalizer[:, np.newaxis]
+            values.append(proba)
+
+            roots.append(offset)
+            offset += n_nodes
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.int32),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            left=np.ascontiguousarray(np.concatenate(lefts), dtype=np.int32),
+            right=np.ascontiguousarray(np.concatenate(rights), dtype=np.int32),
+            missing_left=np.ascontiguousarray(np.concatenate(missing)),
+            value=np.ascontiguousarray(np.concatenate(values)),
+            roots=np.array(roots, dtype=np.int32),
+            classes=np.asarray(model.classes_),
+            n_features=int(model.n_features_in_),
+            max_depth=max(int(e.tree_.max_depth) for e in model.estimators_),
+        )
+
+    def save(self, path: Union[str, Path]) -> Path:
+        """
+        Guarda el bosque compilado (.npz sin comprimir, mapeable en memoria)
+
+        Se escribe en un archivo temporal y se renombra: los procesos que
+        tienen mapeado el artefacto anterior siguen leyendo su inode intacto.
+
+        Args:
+            path: Ruta de destino
+
+        Returns:
+            Ruta escrita
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                format_version=np.int32(FORMAT_VERSION),
+                feature=self.feature,
+                threshold=self.threshold,
+                left=self.left,
+                right=self.right,
+                missing_left=self.missing_left,
+                value=self.value,
+                roots=self.roots,
+                classes=self.classes_,
+                n_features=np.int32(self.n_features_in_),
+                max_depth=np.int32(self.max_depth),
+            )
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path: Union[str, Path], mmap: bool = True) -> "CompiledForest":
+        """
+        Carga un bosque compilado
+
+        Args:
+            path: Ruta del .npz
+            mmap: Mapear los arrays en memoria (solo lectura) en vez de
+                copiarlos: todos los procesos que cargan el mismo archivo
+                comparten las páginas físicas y la carga es casi instantánea
+
+        Returns:
+            CompiledForest
+        """
+        data = _mmap_npz(path) if mmap else _read_npz(path)
+
+        version = int(data["format_version"])
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Versión de bosque compilado no soportada: {version}")
+
+        return cls(
+            feature=data["feature"],
+            threshold=data["threshold"],
+            left=data["left"],
+            right=data["right"],
+            missing_left=data["missing_left"],
+            value=data["value"],
+            roots=data["roots"],
+            classes=np.array(data["classes"]),
+            n_features=int(data["n_features"]),
+            max_depth=int(data["max_depth"]),
+        )
+
+    def _check_input(self, X) -> np.ndarray:
+        """Convierte la entrada a float32 (como el árbol de sklearn)"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X tiene {X.shape[-1]} features, pero el modelo espera "
+                f"{self.n_features_in_}"
+            )
+
+        return X
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """Hoja alcanzada por cada fila en cada árbol: (n_filas, n_árboles)"""
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots))).copy()
+        rows = np.arange(X.shape[0])[:, np.newaxis]
+        has_nan = bool(np.isnan(X).any())
+
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[nodes]]
+            go_left = x <= self.threshold[nodes]
+            if has_nan:
+                go_left |= np.isnan(x) & self.missing_left[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        return nodes
+
+    def _predict_row(self, row: list) -> np.ndarray:
+        """Recorre los árboles para una sola fila (ya en float32)"""
+        feature, threshold, left, right, missing_left = self._nodes
+        leaves = []
+
+        for node in self.roots.tolist():
+            while True:
+                x = row[feature[node]]
+                if x <= threshold[node] or (x != x and missing_left[node]):
+                    child = left[node]
+                else:
+                    child = right[node]
+
+                # Las hojas apuntan a sí mismas
+                if child == node:
+                    break
+                node = child
+
+            leaves.append(node)
+
+        return self.value[leaves]
+
+    def predict_proba(self, X) -> np.ndarray:
+        """
+        Probabilidad de cada clase
+
+        Args:
+            X: Features (n_filas, n_features) o una sola fila
+
+        Returns:
+            Array (n_filas, n_clases), igual que sklearn
+        """
+        X = self._check_input(X)
+
+        if X.shape[0] == 1:
+            leaf_values = self._predict_row(X[0].tolist())[np.newaxis]
+        else:
+            leaf_values = self.value[self._leaves(X)]
+
+        # Suma secuencial en el orden de los árboles (cumsum no reordena,
+        # a diferencia de sum, que usa suma por pares)
+        proba = np.cumsum(leaf_values, axis=1)[:, -1]
+        proba /= len(self.roots)
+
+        return proba
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Clase predicha (la de mayor probabilidad)
+
+        Args:
+            X: Features (n_filas, n_features) o una sola fila
+
+        Returns:
+            Array (n_filas,) de clases
+        """
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def _read_npz(path: Union[str, Path]) -> Dict[str, np.ndarray]:
+    """Lee todos los arrays de un .npz a memoria"""
+    with np.load(path, allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+
+def _mmap_npz(path: Union[str, Path]) -> Dict[str, np.ndarray]:
+    """
+    Mapea en memoria los arrays de un .npz sin comprimir
+
+    np.load ignora mmap_mode con .npz, pero np.savez guarda cada .npy sin
+    comprimir (ZIP_STORED): basta con localizar el inicio de sus datos
+    dentro del zip y crear un np.memmap en ese offset.
+
+    Args:
+        path: Ruta del .npz
+
+    Returns:
+        Nombre -> array (np.memmap de solo lectura; escalares en memoria)
+    """
+    arrays = {}
+
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path}: '{name}' está comprimido, no se puede mapear")
+
+            # Cabecera local del zip: 30 bytes + nombre + campo extra
+            f.seek(info.header_offset)
+            local_header = f.read(30)
+            name_length, extra_length = struct.unpack('<HH', local_header[26:30])
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+
+            if dtype.hasobject:
+                raise ValueError(f"{path}: '{name}' contiene objetos Python")
+
+            if shape == () or 0 in shape:
+                arrays[name] = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+            else:
+                arrays[name] = np.memmap(
+                    path, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                    order='F' if fortran_order else 'C'
+                )
+
+    return arrays
+
+
+def compile_model(model_path: Union[str, Path], output_path: Union[str, Path, None] = None) -> Path:
+    """
+    Compila un modelo joblib a su artefacto .forest.npz
+
+    Args:
+        model_path: Ruta del RandomForest en joblib
+        output_path: Destino (por defecto, junto al modelo)
+
+    Returns:
+        Ruta del artefacto compilado
+    """
+    import joblib
+
+    model = joblib.load(model_path)
+    forest = CompiledForest.from_sklearn(model)
+    path = forest.save(output_path or compiled_path(model_path))
+
+    logger.info(
+        f"🌲 Bosque compilado: {forest.n_estimators} árboles, "
+        f"{forest.node_count:,} nodos -> {path}"
+    )
+    return path
+
+
+def ensure_compiled(model_path: Union[str, Path, None]) -> Optional[Path]:
+    """
+    Compila el modelo si falta su artefacto o está desactualizado
+
+    Se llama una vez en el proceso padre antes de arrancar workers, para
+    que todos mapeen el mismo archivo en vez de deserializar el joblib.
+
+    Args:
+        model_path: Ruta del modelo joblib (None = sin modelo)
+
+    Returns:
+        Ruta del artefacto compilado, o None si no se pudo compilar
+    """
+    if not model_path:
+        return None
+
+    model_file = Path(model_path)
+    compiled_file = compiled_path(model_file)
+
+    if compiled_file.exists() and (
+        not model_file.exists()
+        or compiled_file.stat().st_mtime >= model_file.stat().st_mtime
+    ):
+        return compiled_file
+
+    if not model_file.exists():
+        return None
+
+    try:
+        return compile_model(model_file)
+    except Exception as e:
+        logger.warning(f"⚠️  No se pudo compilar {model_file}: {e}")
+        return None
+
+
+def main(argv=None):
+    """Exporta modelos joblib a bosques compilados"""
+    parser = argparse.ArgumentParser(
+        description="Compila un RandomForest (joblib) a arrays NumPy planos"
+    )
+    parser.add_argument("models", nargs="+", help="Modelos .joblib")
+    parser.add_argument("-o", "--output", help="Destino (solo con un modelo)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.output and len(args.models) > 1:
+        parser.error("--output solo se admite con un único modelo")
+
+    for model_path in args.models:
+        compile_model(model_path, args.output)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Némesis IA - Dataset Pipeline
+Generación paralela del dataset y caché de features para train_brain
+
+- El dataset sintético se divide en shards de tamaño fijo; cada shard se
+  genera y se pasa por FeatureExtractorV2 en un proceso del pool con su
+  propia semilla (derivada de la semilla global con SeedSequence). El
+  resultado es el mismo con cualquier número de procesos.
+- Las matrices de features se guardan en disco (.npy) con una clave que
+  incluye la versión del generador y del extractor, y se cargan con
+  mmap: un barrido de hiperparámetros reutiliza las features en vez de
+  recalcular cientos de miles de payloads en cada ejecución.
+- models/training_dataset.csv y el histórico de ThreatDatabase se leen
+  por trozos, sin cargar todos los payloads en memoria a la vez.
+
+Copyright (C) 2025 Némesis AI Project Contributors
+Licensed under GPL-3.0
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+SHARD_SIZE = 5000
+CHUNK_SIZE = 50_000
+
+# Tipos de ataque del histórico que no cuentan como maliciosos
+BENIGN_ATTACK_TYPES = ("BENIGN", "UNKNOWN")
+
+
+def _training_classes():
+    """DatasetGeneratorV2 y FeatureExtractorV2 (import diferido: train_brain importa este módulo)"""
+    try:
+        from ml.train_brain import DatasetGeneratorV2, FeatureExtractorV2
+    except ImportError:  # Ejecutado como script: python3 src/ml/train_brain.py
+        from train_brain import DatasetGeneratorV2, FeatureExtractorV2
+    return DatasetGeneratorV2, FeatureExtractorV2
+
+
+def shard_seeds(seed: Optional[int], n_shards: int) -> List[int]:
+    """
+    Semillas independientes por shard
+
+    Args:
+        seed: Semilla global (None = entropía del sistema)
+        n_shards: Número de shards
+
+    Returns:
+        Una semilla de 64 bits por shard
+    """
+    children = np.random.SeedSequence(seed).spawn(n_shards)
+    return [int(child.generate_state(1, dtype=np.uint64)[0]) for child in children]
+
+
+def _generate_shard(args: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Genera un shard y extrae sus features (se ejecuta en el pool)"""
+    n_samples, seed = args
+    DatasetGeneratorV2, FeatureExtractorV2 = _training_classes()
+
+    payloads, labels = DatasetGeneratorV2(n_samples=n_samples, seed=seed).generate_dataset()
+    return FeatureExtractorV2.extract_features_batch(payloads), np.array(labels, dtype=np.int64)
+
+
+def _n_workers(n_jobs: Optional[int], n_tasks: int) -> int:
+    """Procesos a usar (-1/None = todas las CPUs)"""
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    return max(1, min(n_jobs, n_tasks))
+
+
+def generate_features(
+    n_samples: int,
+    seed: Optional[int] = None,
+    n_jobs: Optional[int] = 1,
+    shard_size: int = SHARD_SIZE
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Dataset sintético V2 y sus features, por shards en paralelo
+
+    Args:
+        n_samples: Número total de muestras
+        seed: Semilla global (mismo resultado con cualquier n_jobs)
+        n_jobs: Procesos del pool (1 = en este proceso, -1 = todas las CPUs)
+        shard_size: Muestras por shard
+
+    Returns:
+        (X, y): features (n, 5) y etiquetas
+    """
+    sizes = [shard_size] * (n_samples // shard_size)
+    if n_samples % shard_size:
+        sizes.append(n_samples % shard_size)
+
+    tasks = list(zip(sizes, shard_seeds(seed, len(sizes))))
+    workers = _n_workers(n_jobs, len(tasks))
+
+    if workers == 1:
+        shards = [_generate_shard(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            shards = list(pool.map(_generate_shard, tasks))
+
+    logger.info(f"🧪 {n_samples} muestras en {len(tasks)} shards ({workers} procesos)")
+
+    if not shards:
+        return np.empty((0, 5)), np.empty(0, dtype=np.int64)
+    return np.concatenate([X for X, _ in shards]), np.concatenate([y for _, y in shards])
+
+
+def iter_csv_chunks(
+    csv_path: Union[str, Path],
+    chunksize: int = CHUNK_SIZE
+) -> Iterator[Tuple[List[str], np.ndarray]]:
+    """
+    Lee un dataset CSV (columnas payload, label) por trozos
+
+    Args:
+        csv_path: Ruta del CSV (p. ej. models/training_dataset.csv)
+        chunksize: Filas por trozo
+
+    Yields:
+        (payloads, labels) de cada trozo
+    """
+    import pandas as pd
+
+    for chunk in pd.read_csv(
+        csv_path, usecols=["payload", "label"], chunksize=chunksize,
+        dtype={"payload": str}, keep_default_na=False
+    ):
+        yield chunk["payload"].tolist(), chunk["label"].to_numpy(dtype=np.int64)
+
+
+def iter_database_chunks(
+    db_path: Union[str, Path],
+    chunksize: int = CHUNK_SIZE,
+    include_threats: bool = False
+) -> Iterator[Tuple[List[str], np.ndarray]]:
+    """
+    Lee el histórico de ThreatDatabase por trozos (paginación por id)
+
+    El feedback de analistas se usa siempre, con la última etiqueta de
+    cada payload. Las amenazas son opcionales: su etiqueta es el propio
+    veredicto del agente (maliciosas salvo BENIGN/UNKNOWN) y las
+    guardadas antes de registrar la línea de petición completa solo
+    tienen la ruta, que no es lo que el modelo analiza en producción.
+    Si se incluyen, las que tienen feedback se descartan: manda la
+    corrección del analista.
+
+    Args:
+        db_path: Ruta de la BD SQLite
+        chunksize: Filas por trozo
+        include_threats: Añadir también las amenazas guardadas
+
+    Yields:
+        (payloads, labels) de cada trozo
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+        queries = []
+        corrected = set()
+        if "feedback" in tables:
+            corrected = {row[0] for row in conn.execute("SELECT DISTINCT payload FROM feedback")}
+            queries.append((
+                "SELECT id, payload, label FROM feedback "
+                "WHERE id IN (SELECT MAX(id) FROM feedback GROUP BY payload) "
+                "AND id > ? ORDER BY id LIMIT ?", (), set()
+            ))
+
+        if include_threats:
+            # threats particionada: se pagina cada partición (la vista threats
+            # tendría que ordenar todas las filas en cada página)
+            if "threat_partitions" in tables:
+                threat_tables = [row[0] for row in conn.execute(
+                    "SELECT name FROM threat_partitions WHERE archived = 0 ORDER BY start"
+                )]
+            else:
+                threat_tables = ["threats"] if "threats" in tables else []
+
+            placeholders = ", ".join("?" for _ in BENIGN_ATTACK_TYPES)
+            for table in threat_tables:
+                queries.append((
+                    f"SELECT id, payload, attack_type NOT IN ({placeholders}) "
+                    f"FROM {table} WHERE id > ? ORDER BY id LIMIT ?",
+                    BENIGN_ATTACK_TYPES, corrected
+                ))
+
+        for query, params, skip in queries:
+            last_id = 0
+            while True:
+                rows = conn.execute(query, (*params, last_id, chunksize)).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                if skip:
+                    rows = [row for row in rows if row[1] not in skip]
+                    if not rows:
+                        continue
+                yield [row[1] for row in rows], np.array([row[2] for row in rows], dtype=np.int64)
+    finally:
+        conn.close()
+
+
+def extract_chunks(
+    chunks: Iterator[Tuple[List[str], np.ndarray]],
+    extract: Optional[Callable[[List[str]], np.ndarray]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Extrae features trozo a trozo (solo un trozo de payloads en memoria)
+
+    Args:
+        chunks: Iterador de (payloads, labels)
+        extract: Extractor de features (por defecto FeatureExtractorV2)
+
+    Returns:
+        (X, y) concatenados
+    """
+    if extract is None:
+        extract = _training_classes()[1].extract_features_batch
+
+    features, labels = [], []
+    for payloads, chunk_labels in chunks:
+        features.append(extract(payloads))
+        labels.append(chunk_labels)
+
+    if not features:
+        return np.empty((0, 5)), np.empty(0, dtype=np.int64)
+    return np.concatenate(features), np.concatenate(labels)
+
+
+def _file_identity(path: Union[str, Path]) -> Dict:
+    """
+    Identidad de un archivo fuente para la clave de caché
+
+    En una BD en modo WAL las filas nuevas están en el -wal hasta el
+    siguiente checkpoint, sin tocar el archivo principal: también cuenta.
+    """
+    st = os.stat(path)
+    identity = {"path": str(Path(path).resolve()), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    wal = Path(f"{path}-wal")
+    if wal.exists():
+        wal_st = wal.stat()
+        identity["wal"] = {"size": wal_st.st_size, "mtime_ns": wal_st.st_mtime_ns}
+    return identity
+
+
+class FeatureCache:
+    """Matrices de features en disco (.npy), cargadas con mmap"""
+
+    def __init__(self, cache_dir: Union[str, Path] = "models/cache"):
+        """
+        Args:
+            cache_dir: Directorio de la caché
+        """
+        self.cache_dir = Path(cache_dir)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(**params) -> str:
+        """Clave estable de los parámetros + versiones de generador y extractor"""
+        DatasetGeneratorV2, FeatureExtractorV2 = _training_classes()
+        params = dict(
+            params, generator=DatasetGeneratorV2.VERSION, extractor=FeatureExtractorV2.VERSION
+        )
+        encoded = json.dumps(params, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()[:16]
+
+    def path(self, name: str, key: str) -> Path:
+        """Directorio de una entrada"""
+        return self.cache_dir / f"{name}-{key}"
+
+    def load(self, name: str, key: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Carga una entrada (mmap, solo lectura)
+
+        Returns:
+            (X, y) o None si no está en caché
+        """
+        entry = self.path(name, key)
+        try:
+            return (
+                np.load(entry / "X.npy", mmap_mode="r"),
+                np.load(entry / "y.npy", mmap_mode="r"),
+            )
+        except (OSError, ValueError):
+            return None
+
+    def save(self, name: str, key: str, X: np.ndarray, y: np.ndarray, meta: Dict) -> Path:
+        """Guarda una entrada (directorio temporal + rename atómico)"""
+        entry = self.path(name, key)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        tmp = Path(tempfile.mkdtemp(prefix=f".{name}-", dir=self.cache_dir))
+        try:
+            np.save(tmp / "X.npy", np.ascontiguousarray(X))
+            np.save(tmp / "y.npy", np.ascontiguousarray(y))
+            with open(tmp / "meta.json", "w") as f:
+                json.dump(dict(meta, rows=len(y)), f, indent=2, default=str)
+            os.replace(tmp, entry)
+        except OSError:
+            # Otro proceso la guardó antes (el directorio destino ya existe)
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not entry.exists():
+                raise
+        return entry
+
+    def get_or_build(
+        self,
+        name: str,
+        build: Callable[[], Tuple[np.ndarray, np.ndarray]],
+        **params
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Devuelve las features cacheadas o las construye y guarda
+
+        Args:
+            name: Prefijo legible de la entrada (synthetic, csv, db)
+            build: Función que calcula (X, y)
+            **params: Parámetros que determinan el resultado (forman la clave)
+
+        Returns:
+            (X, y) mapeados desde la caché
+        """
+        key = self.key(**params)
+        cached = self.load(name, key)
+        if cached is not None:
+            self.hits += 1
+            logger.info(f"📦 Features en caché: {self.path(name, key)} ({len(cached[1])} filas)")
+            return cached
+
+        self.misses += 1
+        X, y = build()
+        entry = self.save(name, key, X, y, params)
+        logger.info(f"💾 Features cacheadas en {entry}")
+        return self.load(name, key)
+
+
+def load_training_features(
+    n_samples: int = 10000,
+    seed: Optional[int] = None,
+    n_jobs: Optional[int] = 1,
+    cache_dir: Union[str, Path, None] = None,
+    csv_path: Union[str, Path, None] = None,
+    db_path: Union[str, Path, None] = None,
+    chunksize: int = CHUNK_SIZE,
+    include_threats: bool = False
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Features de entrenamiento: sintético + CSV + histórico de la BD
+
+    Args:
+        n_samples: Muestras sintéticas (0 = ninguna)
+        seed: Semilla del sintético; sin semilla no se cachea (no es reproducible)
+        n_jobs: Procesos para generar el sintético
+        cache_dir: Directorio de la caché de features (None = sin caché)
+        csv_path: Dataset CSV adicional (payload, label)
+        db_path: BD de amenazas cuyo feedback (y opcionalmente histórico) se añade
+        chunksize: Filas por trozo al leer CSV y BD
+        include_threats: Añadir también las amenazas de la BD (ver
+            iter_database_chunks)
+
+    Returns:
+        (X, y) con las features V2
+    """
+    cache = FeatureCache(cache_dir) if cache_dir else None
+    parts = []
+
+    if n_samples:
+        build = lambda: generate_features(n_samples, seed=seed, n_jobs=n_jobs)
+        if cache is not None and seed is not None:
+            parts.append(cache.get_or_build("synthetic", build, n_samples=n_samples, seed=seed))
+        else:
+            parts.append(build())
+
+    read_database = lambda source, size: iter_database_chunks(source, size, include_threats)
+    for name, source, reader, params in (
+        ("csv", csv_path, iter_csv_chunks, {}),
+        ("db", db_path, read_database, {"include_threats": include_threats}),
+    ):
+        if not source:
+            continue
+        build = lambda source=source, reader=reader: extract_chunks(reader(source, chunksize))
+        if cache is not None:
+            parts.append(cache.get_or_build(name, build, source=_file_identity(source), **params))
+        else:
+            parts.append(build())
+
+    if not parts:
+        raise ValueError("No hay datos de entrenamiento (n_samples=0 y sin CSV ni BD)")
+
+    if len(parts) == 1:
+        return parts[0]
+    return np.concatenate([X for X, _ in parts]), np.concatenate([y for _, y in parts])
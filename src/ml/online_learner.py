@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Némesis IA - Online Learner
+Aprendizaje incremental a partir del feedback de los analistas
+
+Corregir un falso positivo ya no exige reentrenar el bosque entero con
+train_model_v2. Un corrector lineal (SGDClassifier, log-loss) se apila
+sobre el bosque: recibe las features del agente más la probabilidad
+maliciosa del bosque y se actualiza con partial_fit cada vez que llegan
+correcciones nuevas de la tabla feedback. Para no olvidar lo que el
+bosque ya sabe, cada actualización repasa también una muestra de payloads
+de referencia etiquetados por el propio bosque.
+
+El modelo apilado (StackedModel) se publica como un joblib pequeño (el
+bosque no se copia: se carga desde su ruta) que los agentes recargan en
+caliente (reload_model / watch_model), pasando por su canario.
+
+Uso:
+    python -m ml.online_learner --db data/nemesis.db --model models/nemesis_brain_v2.joblib
+
+Copyright (C) 2025 Némesis AI Project Contributors
+Licensed under GPL-3.0
+"""
+
+import argparse
+import copy
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+import joblib
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+
+from ml.batch_features import text_statistics
+from ml.compiled_forest import CompiledForest, compiled_path
+
+logger = logging.getLogger(__name__)
+
+
+def load_base_model(model_path: Union[str, Path]):
+    """
+    Carga el bosque base (prefiere el .forest.npz mapeado si está al día)
+
+    Args:
+        model_path: Ruta del modelo joblib
+
+    Returns:
+        Modelo con predict_proba y classes_
+    """
+    model_file = Path(model_path)
+    compiled_file = compiled_path(model_file)
+
+    if compiled_file.exists() and (
+        not model_file.exists()
+        or compiled_file.stat().st_mtime >= model_file.stat().st_mtime
+    ):
+        return CompiledForest.load(compiled_file, mmap=True)
+
+    return joblib.load(model_file)
+
+
+def featurizer_for(model) -> Callable[[List[str]], np.ndarray]:
+    """
+    Features con las que se entrenó un bosque, según su n_features_in_
+
+    Args:
+        model: Modelo con n_features_in_
+
+    Returns:
+        text_statistics (3 features, las del agente) o
+        FeatureExtractorV2.extract_features_batch (5, train_model_v2)
+    """
+    n_features = getattr(model, "n_features_in_", None)
+    if n_features == 3:
+        return text_statistics
+    if n_features == 5:
+        from ml.train_brain import FeatureExtractorV2
+        return FeatureExtractorV2.extract_features_batch
+
+    raise ValueError(
+        f"No hay featurizador para un modelo de {n_features} features "
+        f"(3 = text_statistics, 5 = FeatureExtractorV2): pasa featurize"
+    )
+
+
+def _malicious_probability(model, X: np.ndarray) -> np.ndarray:
+    """Columna de probabilidad de la clase 1"""
+    probabilities = np.asarray(model.predict_proba(X))
+    classes = list(np.asarray(model.classes_))
+    if 1 not in classes:
+        return np.zeros(len(X))
+    return probabilities[:, classes.index(1)]
+
+
+class StackedModel:
+    """
+    Bosque base + corrector lineal entrenado con feedback
+
+    Expone predict_proba/classes_ como un clasificador de sklearn, así que
+    el agente lo usa igual que al bosque. Al serializarlo solo se guarda
+    la ruta del bosque; se vuelve a cargar (mapeado) la primera vez que
+    se usa.
+    """
+
+    def __init__(
+        self,
+        base_path: Union[str, Path],
+        scaler: StandardScaler,
+        corrector: SGDClassifier,
+        version: int = 0,
+        base=None
+    ):
+        """
+        Args:
+            base_path: Ruta del bosque base (joblib)
+            scaler: Normalización de [features, probabilidad del bosque]
+            corrector: Clasificador lineal entrenado con partial_fit
+            version: Número de actualización que produjo el modelo
+            base: Bosque ya cargado (opcional)
+        """
+        self.base_path = str(base_path)
+        self.scaler = scaler
+        self.corrector = corrector
+        self.version = version
+        self.classes_ = corrector.classes_
+        self.n_features_in_ = scaler.n_features_in_ - 1
+        self._base = base
+
+    @property
+    def base(self):
+        """Bosque base (carga perezosa)"""
+        if self._base is None:
+            self._base = load_base_model(self.base_path)
+        return self._base
+
+    def stack(self, X) -> np.ndarray:
+        """Entrada del corrector: features + probabilidad del bosque, normalizadas"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        stacked = np.column_stack([X, _malicious_probability(self.base, X)])
+        return self.scaler.transform(stacked)
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Probabilidades corregidas, columnas en el orden de classes_"""
+        return self.corrector.predict_proba(self.stack(X))
+
+    def predict(self, X) -> np.ndarray:
+        """Clase de mayor probabilidad"""
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def __getstate__(self) -> Dict:
+        state = self.__dict__.copy()
+        state["_base"] = None
+        return state
+
+
+class FeedbackLearner:
+    """Absorbe el feedback de la BD y publica el modelo corregido"""
+
+    FEEDBACK_WEIGHT = 10.0
+    REPLAY_SIZE = 500
+    EPOCHS = 10
+    ANCHOR_SAMPLES = 2000
+
+    def __init__(
+        self,
+        database,
+        base_model_path: Union[str, Path],
+        output_path: Union[str, Path] = "models/nemesis_brain_online.joblib",
+        featurize: Optional[Callable[[List[str]], np.ndarray]] = None,
+        anchor_payloads: Optional[Sequence[str]] = None,
+        targets: Sequence = (),
+        feedback_weight: float = FEEDBACK_WEIGHT,
+        replay_size: int = REPLAY_SIZE,
+        epochs: int = EPOCHS,
+        random_state: int = 42
+    ):
+        """
+        Inicializa el aprendiz
+
+        Args:
+            database: ThreatDatabase con la tabla feedback
+            base_model_path: Bosque entrenado con train_model_v2
+            output_path: Donde se publica el modelo apilado
+            featurize: Features de un lote de payloads; deben ser las mismas
+                con las que se entrenó el bosque (por defecto, según su
+                n_features_in_: ver featurizer_for)
+            anchor_payloads: Payloads de referencia que el corrector aprende
+                a etiquetar como el bosque (por defecto, dataset sintético)
+            targets: Agentes o DetectionWorkerPool a los que se pide
+                reload_model() tras cada publicación
+            feedback_weight: Peso de cada corrección frente a la referencia
+            replay_size: Payloads de referencia repasados por actualización
+            epochs: Pasadas de partial_fit por actualización
+            random_state: Semilla (muestreo de la referencia y SGD)
+        """
+        self.database = database
+        self.base_model_path = str(base_model_path)
+        self.output_path = Path(output_path)
+        self.featurize = featurize
+        self.targets = list(targets)
+        self.feedback_weight = feedback_weight
+        self.replay_size = replay_size
+        self.epochs = epochs
+        self.random_state = random_state
+        self._anchor_payloads = anchor_payloads
+
+        self._rng = np.random.default_rng(random_state)
+        self._base = None
+        self._scaler: Optional[StandardScaler] = None
+        self._corrector: Optional[SGDClassifier] = None
+        self._anchor_X: Optional[np.ndarray] = None
+        self._anchor_y: Optional[np.ndarray] = None
+
+        # Todo el feedback absorbido (se repasa en cada actualización para
+        # no olvidar correcciones anteriores)
+        self._feedback_X: deque = deque(maxlen=100_000)
+        self._feedback_y: deque = deque(maxlen=100_000)
+        self._last_feedback_id = 0
+
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+        self.version = 0
+        self.last_report: Dict = {}
+
+    def _bootstrap(self) -> None:
+        """Carga el bosque y entrena el corrector para que lo reproduzca"""
+        start = time.perf_counter()
+        self._base = load_base_model(self.base_model_path)
+        if self.featurize is None:
+            self.featurize = featurizer_for(self._base)
+
+        payloads = self._anchor_payloads
+        if payloads is None:
+            from ml.train_brain import DatasetGeneratorV2
+            payloads, _ = DatasetGeneratorV2(n_samples=self.ANCHOR_SAMPLES).generate_dataset()
+
+        X = np.asarray(self.featurize(list(payloads)), dtype=np.float64)
+        expected = getattr(self._base, "n_features_in_", X.shape[1])
+        if X.shape[1] != expected:
+            raise ValueError(
+                f"El featurizador produce {X.shape[1]} features y {self.base_model_path} "
+                f"espera {expected}"
+            )
+        probability = _malicious_probability(self._base, X)
+        stacked = np.column_stack([X, probability])
+
+        self._anchor_X = stacked
+        self._anchor_y = (probability >= 0.5).astype(int)
+        self._scaler = StandardScaler().fit(stacked)
+        self._corrector = SGDClassifier(
+            loss="log_loss", alpha=1e-4, random_state=self.random_state
+        )
+
+        scaled = self._scaler.transform(stacked)
+        for _ in range(self.epochs):
+            self._corrector.partial_fit(scaled, self._anchor_y, classes=[0, 1])
+
+        agreement = float(np.mean(self._corrector.predict(scaled) == self._anchor_y))
+        logger.info(
+            f"🧩 Corrector inicializado sobre {self.base_model_path}: "
+            f"{len(payloads)} payloads de referencia, {agreement:.1%} de acuerdo "
+            f"con el bosque ({(time.perf_counter() - start) * 1000:.0f} ms)"
+        )
+
+    def update(self, publish: bool = True) -> Dict:
+        """
+        Absorbe el feedback nuevo y, si lo hay, publica el modelo
+
+        Args:
+            publish: Escribir el modelo y avisar a los agentes
+
+        Returns:
+            Informe (feedback nuevo, total, tiempo, versión publicada)
+        """
+        with self._lock:
+            start = time.perf_counter()
+            if self._corrector is None:
+                self._bootstrap()
+
+            rows = self.database.get_feedback(after_id=self._last_feedback_id)
+            report = {"new_feedback": len(rows), "published": False, "version": self.version}
+
+            if rows:
+                self._last_feedback_id = rows[-1]["id"]
+
+                X = np.asarray(self.featurize([row["payload"] for row in rows]), dtype=np.float64)
+                stacked = np.column_stack([X, _malicious_probability(self._base, X)])
+                self._feedback_X.extend(stacked)
+                self._feedback_y.extend(int(row["label"]) for row in rows)
+
+                self._partial_fit()
+                self.version += 1
+                report["version"] = self.version
+
+                if publish:
+                    self.publish()
+                    report["published"] = True
+
+            report["feedback_total"] = len(self._feedback_y)
+            report["update_ms"] = (time.perf_counter() - start) * 1000
+            self.last_report = report
+
+        if rows:
+            logger.info(
+                f"📝 {len(rows)} correcciones absorbidas en {report['update_ms']:.0f} ms "
+                f"(versión {self.version}, {report['feedback_total']} en total)"
+            )
+        return report
+
+    def _partial_fit(self) -> None:
+        """Pasadas de partial_fit: todo el feedback + muestra de referencia"""
+        feedback_X = np.asarray(self._feedback_X)
+        feedback_y = np.asarray(self._feedback_y)
+
+        for _ in range(self.epochs):
+            sample = self._rng.choice(
+                len(self._anchor_X), size=min(self.replay_size, len(self._anchor_X)), replace=False
+            )
+            X = np.vstack([feedback_X, self._anchor_X[sample]])
+            y = np.concatenate([feedback_y, self._anchor_y[sample]])
+            weights = np.concatenate([
+                np.full(len(feedback_y), self.feedback_weight), np.ones(len(sample))
+            ])
+
+            order = self._rng.permutation(len(y))
+            self._corrector.partial_fit(
+                self._scaler.transform(X[order]), y[order], sample_weight=weights[order]
+            )
+
+    def model(self) -> StackedModel:
+        """Copia del modelo apilado actual"""
+        return StackedModel(
+            self.base_model_path, self._scaler, copy.deepcopy(self._corrector),
+            self.version, base=self._base
+        )
+
+    def publish(self) -> Path:
+        """
+        Escribe el modelo apilado (reemplazo atómico) y avisa a los agentes
+
+        Returns:
+            Ruta del modelo publicado
+        """
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.output_path.with_name(self.output_path.name + ".tmp")
+        joblib.dump(self.model(), tmp_path)
+        os.replace(tmp_path, self.output_path)
+
+        for target in self.targets:
+            try:
+                target.reload_model(str(self.output_path))
+            except Exception as e:
+                logger.warning(f"⚠️  No se pudo publicar el modelo en {target}: {e}")
+
+        logger.info(f"📤 Modelo corregido v{self.version} publicado en {self.output_path}")
+        return self.output_path
+
+    def start(self, interval: float = 30.0) -> None:
+        """
+        Actualiza periódicamente en un hilo de fondo
+
+        Args:
+            interval: Segundos entre comprobaciones de feedback nuevo
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, args=(interval,), name="nemesis-online-learner", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"🔁 Aprendizaje online activo (cada {interval}s)")
+
+    def request_update(self) -> None:
+        """Adelanta la próxima actualización (p. ej. al recibir feedback)"""
+        self._wake.set()
+
+    def _loop(self, interval: float) -> None:
+        """Bucle periódico de actualización"""
+        while not self._stop.is_set():
+            self._wake.wait(interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.update()
+            except Exception as e:
+                logger.error(f"Error en aprendizaje online: {e}")
+
+    def close(self) -> None:
+        """Detiene el hilo de actualización"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    @property
+    def stats(self) -> Dict:
+        """Retorna estadísticas del aprendizaje online"""
+        return {
+            "version": self.version,
+            "feedback_total": len(self._feedback_y),
+            "last_feedback_id": self._last_feedback_id,
+            "last_report": dict(self.last_report),
+        }
+
+
+def main(argv=None):
+    """Ejecuta el aprendizaje online contra una BD de amenazas"""
+    parser = argparse.ArgumentParser(
+        description="Absorbe el feedback de analistas y publica el modelo corregido"
+    )
+    parser.add_argument("--db", default="data/nemesis.db", help="Base de datos de amenazas")
+    parser.add_argument("--model", default="models/nemesis_brain_v2.joblib", help="Bosque base")
+    parser.add_argument("--output", default="models/nemesis_brain_online.joblib", help="Modelo publicado")
+    parser.add_argument("--interval", type=float, default=30.0, help="Segundos entre actualizaciones")
+    parser.add_argument("--once", action="store_true", help="Una sola actualización y salir")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    from database.threat_database import ThreatDatabase
+    learner = FeedbackLearner(ThreatDatabase(args.db), args.model, args.output)
+
+    if args.once:
+        learner.update()
+        return 0
+
+    learner.start(args.interval)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        learner.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
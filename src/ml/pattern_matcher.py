@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Némesis IA - Pattern Matcher
+Autómata Aho-Corasick para firmas de ataque
+
+Un solo autómata precompilado encuentra en una pasada todas las firmas
+SQL, XSS, CMD y de path traversal de un payload. El coste por payload
+depende de su longitud, no del número de firmas. Lo usan tanto el
+clasificador del agente (_identify_attack_type) como FeatureExtractorV2.
+
+Copyright (C) 2025 Némesis AI Project Contributors
+Licensed under GPL-3.0
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# Firmas de las features (FeatureExtractorV2)
+SQL_KEYWORDS = [
+    'select', 'union', 'insert', 'update', 'delete', 'drop',
+    'create', 'alter', 'exec', 'execute', 'script', 'declare',
+    'waitfor', 'delay', 'benchmark', 'sleep'
+]
+
+XSS_PATTERNS = [
+    '<script', 'javascript:', 'onerror', 'onload', 'onclick',
+    'onmouseover', '<iframe', '<embed', '<object', 'document.cookie'
+]
+
+CMD_PATTERNS = [
+    'cat ', 'ls ', 'pwd', 'whoami', 'id', 'uname', 'wget',
+    'curl', 'nc ', 'netcat', 'bash', 'sh ', '/bin/', '/etc/passwd',
+    '/etc/shadow', 'ping ', 'nslookup'
+]
+
+# Operadores de command injection y comandos que cuentan tras ellos
+CMD_OPERATORS = [';', '|', '&', '`', '$']
+CMD_WORDS = ['cat', 'ls', 'whoami', 'id', 'pwd']
+
+TRAVERSAL_PATTERNS = ['../', '..\\']
+TRAVERSAL_ENCODED = ['..%2f']
+
+# Marcadores del clasificador del agente (por orden de prioridad)
+SQLI_MARKERS = ["'", "or", "union", "select", "insert", "drop", "--", ";--"]
+XSS_MARKERS = ["<script", "javascript:", "onerror", "onload"]
+
+ATTACK_SIGNATURES = {
+    "sql": SQL_KEYWORDS,
+    "xss": XSS_PATTERNS,
+    "cmd": CMD_PATTERNS,
+    "cmd_op": CMD_OPERATORS,
+    "cmd_word": CMD_WORDS,
+    "traversal": TRAVERSAL_PATTERNS,
+    "traversal_encoded": TRAVERSAL_ENCODED,
+    "sqli_marker": SQLI_MARKERS,
+    "xss_marker": XSS_MARKERS,
+}
+
+
+class PatternMatcher:
+    """
+    Autómata Aho-Corasick (compilado a DFA) con firmas por categoría
+
+    Las firmas se comparan sin distinguir mayúsculas. Una misma cadena
+    puede pertenecer a varias categorías.
+    """
+
+    def __init__(self, signatures: Dict[str, Iterable[str]]):
+        """
+        Compila el autómata
+
+        Args:
+            signatures: Categoría -> lista de firmas
+        """
+        self.categories: List[str] = list(signatures)
+
+        # Cada firma (categoría, cadena) tiene un id
+        self.patterns: List[str] = []
+        self.pattern_category: List[int] = []
+        for category_id, category in enumerate(self.categories):
+            for pattern in dict.fromkeys(p.lower() for p in signatures[category]):
+                if pattern:
+                    self.patterns.append(pattern)
+                    self.pattern_category.append(category_id)
+
+        self._delta, self._output = self._compile(self.patterns)
+
+    @staticmethod
+    def _compile(patterns: List[str]) -> Tuple[List[Dict[str, int]], List[Optional[tuple]]]:
+        """Construye el trie, los enlaces de fallo y la tabla de transiciones"""
+        goto: List[Dict[str, int]] = [{}]
+        output: List[tuple] = [()]
+
+        for pattern_id, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                nxt = goto[state].get(char)
+                if nxt is None:
+                    goto.append({})
+                    output.append(())
+                    nxt = goto[state][char] = len(goto) - 1
+                state = nxt
+            output[state] += (pattern_id,)
+
+        # Enlaces de fallo en anchura (BFS)
+        fail = [0] * len(goto)
+        order = []
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            order.append(state)
+            for char, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and char not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(char, 0) if state else 0
+                output[nxt] += output[fail[nxt]]
+
+        # DFA completo sobre el alfabeto de las firmas: un dict por estado;
+        # cualquier carácter fuera del alfabeto vuelve a la raíz
+        alphabet = {char for pattern in patterns for char in pattern}
+        delta: List[Dict[str, int]] = [{} for _ in goto]
+        delta[0] = {char: goto[0].get(char, 0) for char in alphabet}
+        for state in order:
+            row = delta[fail[state]]
+            delta[state] = {
+                char: goto[state][char] if char in goto[state] else row[char]
+                for char in alphabet
+            }
+
+        return delta, [out or None for out in output]
+
+    def scan(self, text: str) -> List[Tuple[int, tuple]]:
+        """
+        Recorre el texto una sola vez
+
+        Args:
+            text: Texto a analizar
+
+        Returns:
+            Lista de (posición final, ids de firma) en orden de aparición
+        """
+        delta = self._delta
+        output = self._output
+        state = 0
+        hits = []
+
+        for position, char in enumerate(text.lower()):
+            state = delta[state].get(char, 0)
+            if output[state] is not None:
+                hits.append((position, output[state]))
+
+        return hits
+
+    def found(self, text: str) -> Dict[str, set]:
+        """
+        Firmas distintas encontradas por categoría
+
+        Args:
+            text: Texto a analizar
+
+        Returns:
+            Categoría -> conjunto de firmas encontradas (solo categorías con
+            alguna coincidencia)
+        """
+        result: Dict[str, set] = {}
+        patterns = self.patterns
+        categories = self.categories
+        pattern_category = self.pattern_category
+
+        for _, pattern_ids in self.scan(text):
+            for pattern_id in pattern_ids:
+                category = categories[pattern_category[pattern_id]]
+                result.setdefault(category, set()).add(patterns[pattern_id])
+
+        return result
+
+
+# Autómata compartido por el agente y el extractor de features
+ATTACK_MATCHER = PatternMatcher(ATTACK_SIGNATURES)
+
+_CATEGORY_ID = {name: i for i, name in enumerate(ATTACK_MATCHER.categories)}
+_SQL = _CATEGORY_ID["sql"]
+_XSS = _CATEGORY_ID["xss"]
+_CMD = _CATEGORY_ID["cmd"]
+_CMD_OP = _CATEGORY_ID["cmd_op"]
+_CMD_WORD = _CATEGORY_ID["cmd_word"]
+_TRAVERSAL = _CATEGORY_ID["traversal"]
+_TRAVERSAL_ENCODED = _CATEGORY_ID["traversal_encoded"]
+_SQLI_MARKER = _CATEGORY_ID["sqli_marker"]
+_XSS_MARKER = _CATEGORY_ID["xss_marker"]
+
+
+def signature_counts(text: str) -> Tuple[int, int]:
+    """
+    Cuenta de firmas para las features 4 y 5 en una sola pasada
+
+    - SQL: keywords SQL distintas
+    - Sospechosos: patrones XSS y CMD distintos, +2 si hay path
+      traversal y +3 por cada tramo tras un operador (; | & ` $) que
+      contiene un comando (cat, ls, whoami, id, pwd)
+
+    Args:
+        text: Payload normalizado
+
+    Returns:
+        (sql_keywords_count, suspicious_patterns_count)
+    """
+    category_of = ATTACK_MATCHER.pattern_category
+    seen = set()
+    traversal = False
+    suspicious_ops = 0
+
+    # Operadores cuyo tramo actual aún no tiene un comando
+    open_segments = set()
+
+    for _, pattern_ids in ATTACK_MATCHER.scan(text):
+        for pattern_id in pattern_ids:
+            category = category_of[pattern_id]
+
+            if category == _CMD_OP:
+                open_segments.add(pattern_id)
+            elif category == _CMD_WORD:
+                suspicious_ops += len(open_segments)
+                open_segments.clear()
+            elif category == _TRAVERSAL or category == _TRAVERSAL_ENCODED:
+                traversal = True
+            elif category == _SQL or category == _XSS or category == _CMD:
+                seen.add(pattern_id)
+
+    sql_count = 0
+    suspicious = 0
+    for pattern_id in seen:
+        if category_of[pattern_id] == _SQL:
+            sql_count += 1
+        else:
+            suspicious += 1
+
+    suspicious += 2 if traversal else 0
+    suspicious += 3 * suspicious_ops
+
+    return sql_count, suspicious
+
+
+def identify_attack_type(payload: str) -> str:
+    """
+    Clasifica el payload por la primera categoría de marcadores presente
+
+    Prioridad: SQL injection, XSS, path traversal, command injection.
+
+    Args:
+        payload: Petición completa
+
+    Returns:
+        Tipo de ataque o "UNKNOWN"
+    """
+    category_of = ATTACK_MATCHER.pattern_category
+    present = set()
+
+    for _, pattern_ids in ATTACK_MATCHER.scan(payload):
+        for pattern_id in pattern_ids:
+            present.add(category_of[pattern_id])
+
+    if _SQLI_MARKER in present:
+        return "SQL_INJECTION"
+    if _XSS_MARKER in present:
+        return "XSS"
+    if _TRAVERSAL in present:
+        return "PATH_TRAVERSAL"
+    if _CMD_OP in present:
+        return "COMMAND_INJECTION"
+
+    return "UNKNOWN"
+
+
+def signature_counts_batch(texts: Iterable[str]) -> List[Tuple[int, int]]:
+    """
+    signature_counts() de un lote (los payloads repetidos se cuentan una vez)
+
+    Args:
+        texts: Payloads normalizados
+
+    Returns:
+        Lista de (sql_keywords_count, suspicious_patterns_count)
+    """
+    seen: Dict[str, Tuple[int, int]] = {}
+    result = []
+
+    for text in texts:
+        counts = seen.get(text)
+        if counts is None:
+            counts = seen[text] = signature_counts(text)
+        result.append(counts)
+
+    return result
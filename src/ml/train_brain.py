@@ -15,11 +15,9 @@ Licensed under GPL-3.0
 
 import logging
 import random
-import math
 import re
-from collections import Counter
 from pathlib import Path
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional
 from datetime import datetime
 from urllib.parse import unquote
 
@@ -36,6 +34,23 @@ from sklearn.metrics import (
     confusion_matrix,
 )
 
+try:
+    from ml.batch_features import shannon_entropy, text_statistics
+    from ml.compiled_forest import CompiledForest, compiled_path
+    from ml.dataset_pipeline import load_training_features
+    from ml.pattern_matcher import (
+        SQL_KEYWORDS, XSS_PATTERNS, CMD_PATTERNS,
+        signature_counts, signature_counts_batch
+    )
+except ImportError:  # Ejecutado como script: python3 src/ml/train_brain.py
+    from batch_features import shannon_entropy, text_statistics
+    from compiled_forest import CompiledForest, compiled_path
+    from dataset_pipeline import load_training_features
+    from pattern_matcher import (
+        SQL_KEYWORDS, XSS_PATTERNS, CMD_PATTERNS,
+        signature_counts, signature_counts_batch
+    )
+
 logger = logging.getLogger(__name__)
 
 
@@ -51,23 +66,13 @@ class FeatureExtractorV2:
     5. Suspicious Patterns: Patrones de ataque (XSS, CMD, etc)
     """
     
-    # Keywords sospechosos
-    SQL_KEYWORDS = [
-        'select', 'union', 'insert', 'update', 'delete', 'drop',
-        'create', 'alter', 'exec', 'execute', 'script', 'declare',
-        'waitfor', 'delay', 'benchmark', 'sleep'
-    ]
-    
-    XSS_PATTERNS = [
-        '<script', 'javascript:', 'onerror', 'onload', 'onclick',
-        'onmouseover', '<iframe', '<embed', '<object', 'document.cookie'
-    ]
+    # Subir al cambiar las features (invalida las features cacheadas)
+    VERSION = 1
     
-    CMD_PATTERNS = [
-        'cat ', 'ls ', 'pwd', 'whoami', 'id', 'uname', 'wget',
-        'curl', 'nc ', 'netcat', 'bash', 'sh ', '/bin/', '/etc/passwd',
-        '/etc/shadow', 'ping ', 'nslookup'
-    ]
+    # Keywords sospechosos (definidos junto al autómata de firmas)
+    SQL_KEYWORDS = SQL_KEYWORDS
+    XSS_PATTERNS = XSS_PATTERNS
+    CMD_PATTERNS = CMD_PATTERNS
     
     @staticmethod
     def normalize_payload(payload: str) -> str:
@@ -89,43 +94,17 @@ class FeatureExtractorV2:
     @staticmethod
     def count_sql_keywords(text: str) -> int:
         """Cuenta palabras clave SQL en el texto"""
-        text_lower = text.lower()
-        count = sum(1 for keyword in FeatureExtractorV2.SQL_KEYWORDS 
-                   if keyword in text_lower)
-        return count
+        return signature_counts(text)[0]
     
     @staticmethod
     def count_suspicious_patterns(text: str) -> int:
         """
         Cuenta patrones sospechosos (XSS, CMD, Path Traversal)
+        
+        Path traversal suma 2 y cada operador de command injection (; | & ` $)
+        seguido de un comando común suma 3.
         """
-        text_lower = text.lower()
-        count = 0
-        
-        # XSS patterns
-        count += sum(1 for pattern in FeatureExtractorV2.XSS_PATTERNS 
-                    if pattern.lower() in text_lower)
-        
-        # CMD patterns
-        count += sum(1 for pattern in FeatureExtractorV2.CMD_PATTERNS 
-                    if pattern.lower() in text_lower)
-        
-        # Path traversal
-        if '../' in text or '..\\' in text or '..%2f' in text_lower:
-            count += 2  # Peso mayor para path traversal
-        
-        # Command injection operators
-        cmd_operators = [';', '|', '&', '`', '$']
-        # Solo contar si están seguidos de comandos comunes
-        for op in cmd_operators:
-            if op in text:
-                # Verificar si hay comando después
-                parts = text.split(op)
-                for part in parts[1:]:  # Partes después del operador
-                    if any(cmd in part.lower() for cmd in ['cat', 'ls', 'whoami', 'id', 'pwd']):
-                        count += 3  # Peso alto para command injection
-        
-        return count
+        return signature_counts(text)[1]
     
     @staticmethod
     def extract_features(payload: str) -> List[float]:
@@ -153,10 +132,9 @@ class FeatureExtractorV2:
         entropy = FeatureExtractorV2.calculate_entropy(normalized)
         
         # Feature 4: Número de SQL keywords
-        sql_keywords_count = FeatureExtractorV2.count_sql_keywords(normalized)
-        
         # Feature 5: Patrones sospechosos (XSS, CMD, Path Traversal)
-        suspicious_patterns_count = FeatureExtractorV2.count_suspicious_patterns(normalized)
+        # Ambas salen de una sola pasada del autómata de firmas
+        sql_keywords_count, suspicious_patterns_count = signature_counts(normalized)
         
         return [
             length,
@@ -169,27 +147,32 @@ class FeatureExtractorV2:
     @staticmethod
     def calculate_entropy(text: str) -> float:
         """Calcula entropía de Shannon"""
-        if not text:
-            return 0.0
-        
-        counts = Counter(text)
-        length = len(text)
-        
-        entropy = -sum(
-            (count / length) * math.log2(count / length)
-            for count in counts.values()
-        )
-        
-        return entropy
+        return shannon_entropy(text)
     
     @staticmethod
     def extract_features_batch(payloads: List[str]) -> np.ndarray:
-        """Extrae features de múltiples payloads"""
-        features = [
-            FeatureExtractorV2.extract_features(payload) 
-            for payload in payloads
-        ]
-        return np.array(features)
+        """
+        Extrae features de múltiples payloads (vectorizado)
+        
+        Mismo resultado que extract_features() payload a payload: longitud,
+        ratio de especiales y entropía salen de histogramas NumPy del lote
+        y las features 4 y 5 del autómata de firmas.
+        
+        Args:
+            payloads: Lista de requests HTTP
+            
+        Returns:
+            Array (n, 5) de features
+        """
+        normalized = [FeatureExtractorV2.normalize_payload(p) for p in payloads]
+        
+        features = np.empty((len(normalized), 5), dtype=np.float64)
+        features[:, :3] = text_statistics(normalized)
+        features[:, 3:] = np.array(
+            signature_counts_batch(normalized), dtype=np.float64
+        ).reshape(-1, 2)
+        
+        return features
 
 
 class DatasetGeneratorV2:
@@ -197,8 +180,18 @@ class DatasetGeneratorV2:
     Generador mejorado con más variedad en command injection
     """
     
-    def __init__(self, n_samples: int = 10000) -> None:
+    # Subir al cambiar los generadores (invalida las features cacheadas)
+    VERSION = 1
+    
+    def __init__(self, n_samples: int = 10000, seed: Optional[int] = None) -> None:
+        """
+        Args:
+            n_samples: Número total de muestras
+            seed: Semilla propia (None = generador global de random)
+        """
         self.n_samples = n_samples
+        self.seed = seed
+        self._random = random.Random(seed) if seed is not None else random
         self.n_legitimate = int(n_samples * 0.6)
         self.n_malicious = n_samples - self.n_legitimate
         
@@ -232,10 +225,10 @@ class DatasetGeneratorV2:
         ]
         
         for _ in range(self.n_legitimate):
-            path = random.choice(legitimate_paths)
+            path = self._random.choice(legitimate_paths)
             
-            if random.random() < 0.7:
-                params = random.sample(legitimate_params, random.randint(1, 3))
+            if self._random.random() < 0.7:
+                params = self._random.sample(legitimate_params, self._random.randint(1, 3))
                 payload = f"GET {path}?{'&'.join(params)} HTTP/1.1"
             else:
                 payload = f"GET {path} HTTP/1.1"
@@ -286,15 +279,15 @@ class DatasetGeneratorV2:
         ]
         
         for _ in range(self.n_cmd_injection):
-            path = random.choice(paths)
+            path = self._random.choice(paths)
             
             # 50% con host + comando, 50% solo comando
-            if random.random() < 0.5:
-                host = random.choice(hosts)
-                cmd = random.choice(cmd_patterns)
+            if self._random.random() < 0.5:
+                host = self._random.choice(hosts)
+                cmd = self._random.choice(cmd_patterns)
                 payload = f"GET {path}?host={host}{cmd} HTTP/1.1"
             else:
-                cmd = random.choice(cmd_patterns)
+                cmd = self._random.choice(cmd_patterns)
                 payload = f"GET {path}?cmd=hostname{cmd} HTTP/1.1"
             
             samples.append(payload)
@@ -316,10 +309,10 @@ class DatasetGeneratorV2:
         paths = ["/login", "/search", "/profile", "/api/user"]
         
         for _ in range(self.n_sqli):
-            path = random.choice(paths)
-            pattern = random.choice(sqli_patterns)
+            path = self._random.choice(paths)
+            pattern = self._random.choice(sqli_patterns)
             
-            if random.random() < 0.3:
+            if self._random.random() < 0.3:
                 pattern = pattern.replace("'", "%27").replace(" ", "%20")
             
             payload = f"GET {path}?user={pattern} HTTP/1.1"
@@ -346,10 +339,10 @@ class DatasetGeneratorV2:
         paths = ["/search", "/comment", "/profile", "/post"]
         
         for _ in range(self.n_xss):
-            path = random.choice(paths)
-            pattern = random.choice(xss_patterns)
+            path = self._random.choice(paths)
+            pattern = self._random.choice(xss_patterns)
             
-            if random.random() < 0.3:
+            if self._random.random() < 0.3:
                 pattern = pattern.replace("<", "%3C").replace(">", "%3E")
             
             payload = f"GET {path}?q={pattern} HTTP/1.1"
@@ -373,8 +366,8 @@ class DatasetGeneratorV2:
         paths = ["/download", "/file", "/image", "/document"]
         
         for _ in range(self.n_path_traversal):
-            path = random.choice(paths)
-            pattern = random.choice(traversal_patterns)
+            path = self._random.choice(paths)
+            pattern = self._random.choice(traversal_patterns)
             payload = f"GET {path}?file={pattern} HTTP/1.1"
             samples.append(payload)
         
@@ -408,7 +401,7 @@ class DatasetGeneratorV2:
         labels.extend([1] * len(cmd_inj))
         
         combined = list(zip(payloads, labels))
-        random.shuffle(combined)
+        self._random.shuffle(combined)
         payloads, labels = zip(*combined)
         
         logger.info(
@@ -422,24 +415,45 @@ class DatasetGeneratorV2:
 def train_model_v2(
     output_path: str = "models/nemesis_brain_v2.joblib",
     n_samples: int = 10000,
-    test_size: float = 0.2
+    test_size: float = 0.2,
+    seed: Optional[int] = None,
+    n_jobs: Optional[int] = 1,
+    cache_dir: Optional[str] = None,
+    csv_path: Optional[str] = None,
+    db_path: Optional[str] = None,
+    include_threats: bool = False
 ) -> Dict:
     """
     Entrena modelo V2 con features mejoradas
+    
+    Args:
+        output_path: Destino del modelo joblib
+        n_samples: Muestras sintéticas
+        test_size: Fracción de test
+        seed: Semilla del dataset sintético (necesaria para cachearlo)
+        n_jobs: Procesos para generar el dataset (-1 = todas las CPUs)
+        cache_dir: Caché de features .npy (None = recalcular siempre)
+        csv_path: Dataset CSV adicional (models/training_dataset.csv)
+        db_path: BD de amenazas cuyo feedback se añade
+        include_threats: Añadir también las amenazas de db_path (etiquetadas
+            por el propio agente; ver dataset_pipeline.iter_database_chunks)
     """
     logger.info("=" * 60)
     logger.info("🚀 ENTRENAMIENTO V2 CON FEATURES MEJORADAS")
     logger.info("=" * 60)
     
-    # Generar dataset
-    generator = DatasetGeneratorV2(n_samples=n_samples)
-    payloads, labels = generator.generate_dataset()
-    
-    # Extraer features (V2 con 5 features)
+    # Generar dataset y extraer features (V2 con 5 features): shards en
+    # paralelo, CSV/BD por trozos y caché en disco si se indica
     logger.info("🔧 Extrayendo features V2 (5 features)...")
-    extractor = FeatureExtractorV2()
-    X = extractor.extract_features_batch(payloads)
-    y = np.array(labels)
+    X, y = load_training_features(
+        n_samples=n_samples,
+        seed=seed,
+        n_jobs=n_jobs,
+        cache_dir=cache_dir,
+        csv_path=csv_path,
+        db_path=db_path,
+        include_threats=include_threats
+    )
     
     # Split
     X_train, X_test, y_train, y_test = train_test_split(
@@ -516,6 +530,10 @@ def train_model_v2(
     joblib.dump(model, output_path)
     logger.info(f"💾 Modelo V2 guardado en {output_path}")
     
+    # Exportar el bosque compilado (lo prefiere el agente al cargar)
+    compiled_file = CompiledForest.from_sklearn(model).save(compiled_path(output_path))
+    logger.info(f"🌲 Bosque compilado guardado en {compiled_file}")
+    
     return metrics
 
 
@@ -528,7 +546,10 @@ def main():
     
     metrics = train_model_v2(
         output_path="models/nemesis_brain_v2.joblib",
-        n_samples=10000
+        n_samples=10000,
+        seed=42,
+        n_jobs=-1,
+        cache_dir="models/cache"
     )
     
     print("\n🎉 Modelo V2 entrenado exitosamente!")
@@ -75,7 +75,8 @@ class DashboardUnified:
         
         @self.app.get("/api/stats")
         async def get_stats():
-            return self.database.get_statistics()
+            """Estadísticas globales (desde los rollups, como el timeline)"""
+            return self.database.get_summary()
         
         @self.app.get("/api/threats")
         async def get_threats(limit: int = 50):
@@ -97,6 +98,43 @@ class DashboardUnified:
         async def get_blocked_ips():
             return self.database.get_blocked_ips()
         
+        @self.app.post("/api/feedback")
+        async def submit_feedback(data: dict):
+            """Corrección de un analista (falso positivo / falso negativo)"""
+            label = data.get('label')
+            if isinstance(label, str):
+                label = {'benign': 0, 'malicious': 1}.get(label.lower(), label)
+            
+            payload = data.get('payload')
+            threat_id = data.get('threat_id')
+            source_ip = data.get('source_ip')
+            
+            if not payload and threat_id is not None:
+                threat = self.database.get_threat(int(threat_id))
+                if threat is None:
+                    return {"success": False, "message": f"Threat {threat_id} not found"}
+                payload = threat.payload  # línea de petición completa (ThreatRecord.from_event)
+                source_ip = source_ip or threat.source_ip
+            
+            if not payload:
+                return {"success": False, "message": "payload or threat_id required"}
+            
+            try:
+                feedback_id = self.database.save_feedback(
+                    payload=payload,
+                    label=label,
+                    threat_id=threat_id,
+                    source_ip=source_ip,
+                    analyst=data.get('analyst'),
+                    note=data.get('note', '')
+                )
+            except ValueError as e:
+                return {"success": False, "message": str(e)}
+            
+            # El aprendiz online (python -m ml.online_learner) lee la tabla
+            # feedback en su propio proceso
+            return {"success": True, "feedback_id": feedback_id}
+         
         @self.app.get("/api/honeypot_stats")
         async def get_honeypot_stats():
             import sqlite3
@@ -158,39 +196,13 @@ class DashboardUnified:
         
         @self.app.get("/api/threat_timeline")
         async def get_threat_timeline():
-            import sqlite3
-            from datetime import datetime, timedelta
-            
-            conn = sqlite3.connect('data/nemesis_honeypot.db')
-            cursor = conn.cursor()
-            
-            # Obtener amenazas de las últimas 24 horas
-            cursor.execute('''
-                SELECT timestamp 
-                FROM threats 
-                WHERE timestamp >= datetime('now', '-24 hours')
-                ORDER BY timestamp
-            ''')
-            
-            threats = cursor.fetchall()
-            conn.close()
-            
-            # Inicializar contadores por hora (0-23)
-            hourly_counts = [0] * 24
-            
-            # Contar amenazas por hora
-            for threat in threats:
-                try:
-                    dt = datetime.fromisoformat(threat[0])
-                    hour = dt.hour
-                    hourly_counts[hour] += 1
-                except:
-                    pass
+            """Amenazas por hora de las últimas 24 h (desde los rollups)"""
+            timeline = self.database.get_timeline(hours=24)
             
             return {
-                "hours": [f"{i}:00" for i in range(24)],
-                "counts": hourly_counts,
-                "total": sum(hourly_counts)
+                "hours": [f"{int(bucket[11:13])}:00" for bucket in timeline["buckets"]],
+                "counts": timeline["counts"],
+                "total": timeline["total"]
             }
         
         @self.app.get("/api/blockchain_stats")
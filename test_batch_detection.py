@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Test de detección en micro-lotes (process_log_lines)
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, 'src')
+
+import joblib
+from sklearn.ensemble import RandomForestClassifier
+
+from core.nemesis_agent import NemesisAgent
+
+
+BENIGN = [
+    '192.168.1.{i} - - [04/Dec/2025:10:00:00] "GET /index.html HTTP/1.1" 200',
+    '192.168.1.{i} - - [04/Dec/2025:10:00:05] "GET /api/users?page=1&limit=10 HTTP/1.1" 200',
+    '192.168.1.{i} - - [04/Dec/2025:10:00:10] "GET /search?q=python+tutorial HTTP/1.1" 200',
+]
+
+MALICIOUS = [
+    '10.0.0.{i} - - [04/Dec/2025:10:00:15] "GET /login?user=admin\' OR \'1\'=\'1\'-- HTTP/1.1" 403',
+    '10.0.0.{i} - - [04/Dec/2025:10:00:25] "GET /search?q=<script>alert(\'XSS\')</script> HTTP/1.1" 403',
+    '10.0.0.{i} - - [04/Dec/2025:10:00:35] "GET /download?file=../../../etc/passwd HTTP/1.1" 403',
+]
+
+
+def build_agent(model_path: str, **kwargs) -> NemesisAgent:
+    """Entrena un modelo pequeño con las 3 features del agente"""
+    agent = NemesisAgent(model_path=model_path, **kwargs)
+
+    X, y = [], []
+    for i in range(200):
+        for template in BENIGN:
+            event = agent._parse_log(template.format(i=i))
+            X.append(agent._extract_features(event))
+            y.append(0)
+        for template in MALICIOUS:
+            event = agent._parse_log(template.format(i=i))
+            X.append(agent._extract_features(event))
+            y.append(1)
+
+    model = RandomForestClassifier(n_estimators=50, random_state=42, n_jobs=1)
+    model.fit(X, y)
+    joblib.dump(model, model_path)
+
+    agent._load_ai_brain()
+    return agent
+
+
+async def test_batch_matches_single():
+    """El lote debe dar los mismos veredictos que línea a línea"""
+    print("=" * 70)
+    print("TEST 1: LOTE == LÍNEA A LÍNEA")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = build_agent(os.path.join(tmp, "brain.joblib"), verdict_cache_size=0)
+
+        lines = [t.format(i=i) for i in range(2, 50) for t in BENIGN + MALICIOUS]
+        lines.append("línea basura sin formato")
+
+        single = [await agent.process_log_line(line) for line in lines]
+        batch = await agent.process_log_lines(lines)
+
+        same = all(
+            (a is None and b is None) or (
+                a.is_malicious == b.is_malicious
+                and a.attack_type == b.attack_type
+                and abs(a.confidence - b.confidence) < 1e-12
+            )
+            for a, b in zip(single, batch)
+        )
+        print(f"   Líneas: {len(lines)}")
+        print(f"   {'✅' if same else '❌'} Veredictos idénticos")
+    print()
+
+
+async def test_batch_throughput():
+    """Compara throughput línea a línea contra lotes de 256"""
+    print("=" * 70)
+    print("TEST 2: THROUGHPUT")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Sin caché de veredictos: se mide el coste real de la inferencia
+        agent = build_agent(os.path.join(tmp, "brain.joblib"), verdict_cache_size=0)
+        agent_logger = logging.getLogger("core.nemesis_agent")
+        previous_level = agent_logger.level
+        agent_logger.setLevel(logging.ERROR)
+
+        lines = [t.format(i=i % 250) for i in range(2000) for t in BENIGN[:1]]
+
+        start = time.perf_counter()
+        for line in lines[:500]:
+            await agent.process_log_line(line)
+        single_rate = 500 / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for i in range(0, len(lines), 256):
+            await agent.process_log_lines(lines[i:i + 256])
+        batch_rate = len(lines) / (time.perf_counter() - start)
+
+        agent_logger.setLevel(previous_level)
+
+        print(f"   Línea a línea: {single_rate:10.0f} líneas/s")
+        print(f"   Lotes de 256:  {batch_rate:10.0f} líneas/s")
+        print(f"   Speedup:       {batch_rate / single_rate:10.1f}x")
+    print()
+
+
+async def main():
+    print()
+    print("╔" + "═" * 68 + "╗")
+    print("║" + " " * 18 + "DETECCIÓN EN MICRO-LOTES - TESTS" + " " * 18 + "║")
+    print("╚" + "═" * 68 + "╝")
+    print()
+
+    await test_batch_matches_single()
+    await test_batch_throughput()
+
+    print("=" * 70)
+    print("✅ TODOS LOS TESTS COMPLETADOS")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test de la extracción de features vectorizada (NumPy)
+"""
+
+import random
+import sys
+import time
+from types import SimpleNamespace
+sys.path.insert(0, 'src')
+
+import numpy as np
+
+from core.nemesis_agent import NemesisAgent
+from ml.batch_features import text_statistics
+from ml.train_brain import DatasetGeneratorV2, FeatureExtractorV2
+
+
+def sample_payloads(n_samples=4000):
+    """Dataset de entrenamiento + casos límite"""
+    random.seed(3)
+    payloads, _ = DatasetGeneratorV2(n_samples=n_samples).generate_dataset()
+    payloads += [
+        "", "a", "aaaa", "%", "%27%20OR%201=1--", "ñandú%C3%B1<script>",
+        "İstanbul ß 日本語 😀😀", "x" * 5000, "../..\\..%2f;cat /etc/passwd",
+    ]
+    return payloads
+
+
+def test_identical_features():
+    """Batch y escalar dan exactamente los mismos valores"""
+    print("=" * 70)
+    print("TEST 1: RESULTADOS IDÉNTICOS AL CAMINO ESCALAR")
+    print("=" * 70)
+
+    payloads = sample_payloads()
+
+    scalar = np.array([FeatureExtractorV2.extract_features(p) for p in payloads])
+    batch = FeatureExtractorV2.extract_features_batch(payloads)
+
+    print(f"   Payloads: {len(payloads):,} | shape {batch.shape}")
+    ok = batch.shape == scalar.shape and np.array_equal(batch, scalar)
+    print(f"   {'✅' if ok else '❌'} FeatureExtractorV2: 5 features bit a bit iguales")
+
+    agent = NemesisAgent()
+    events = [SimpleNamespace(payload=p) for p in payloads]
+    scalar = np.array([agent._extract_features(e) for e in events], dtype=np.float64)
+    batch = text_statistics([e.payload for e in events])
+    print(f"   {'✅' if np.array_equal(batch, scalar) else '❌'} NemesisAgent: 3 features bit a bit iguales")
+
+    ok = FeatureExtractorV2.extract_features_batch([]).shape == (0, 5)
+    print(f"   {'✅' if ok else '❌'} Lote vacío")
+    print()
+
+
+def test_throughput():
+    """Payloads por segundo del batch frente al bucle escalar"""
+    print("=" * 70)
+    print("TEST 2: THROUGHPUT")
+    print("=" * 70)
+
+    payloads = sample_payloads(20000)
+
+    start = time.perf_counter()
+    for payload in payloads:
+        FeatureExtractorV2.extract_features(payload)
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    FeatureExtractorV2.extract_features_batch(payloads)
+    batch_time = time.perf_counter() - start
+
+    print(f"   Escalar:     {len(payloads) / scalar_time:>10,.0f} payloads/s")
+    print(f"   Vectorizado: {len(payloads) / batch_time:>10,.0f} payloads/s")
+    print(f"   {'✅' if batch_time < scalar_time else '❌'} Speedup x{scalar_time / batch_time:.1f}")
+    print()
+
+
+def main():
+    print("""
+╔═══════════════════════════════════════════════════════════════════╗
+║                                                                   ║
+║             🧪 TEST DE FEATURES VECTORIZADAS (NUMPY) 🧪            ║
+║                                                                   ║
+╚═══════════════════════════════════════════════════════════════════╝
+    """)
+
+    test_identical_features()
+    test_throughput()
+
+    print("=" * 70)
+    print("✅ TODOS LOS TESTS COMPLETADOS")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
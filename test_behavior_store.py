@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Test del almacén de comportamiento por IP (features incrementales)
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+sys.path.insert(0, 'src')
+
+import numpy as np
+
+from core.behavior_store import BEHAVIOR_FEATURES, BehaviorStore, replay_features
+from core.nemesis_agent import NemesisAgent
+from core.worker_pool import DetectionWorkerPool
+from logs.log_parser import ParsedLog
+from ml.behavior_training import SessionGenerator, train_behavior_model
+
+
+START = datetime(2025, 12, 4, 10, 0, 0)
+
+
+def event(ip, request, status=200, seconds=0.0):
+    method, path, protocol = request.split(" ")
+    return ParsedLog(
+        timestamp=START + timedelta(seconds=seconds), source_ip=ip, method=method,
+        path=path, status_code=status, raw_line="", format_type="test",
+        request=request, protocol=protocol
+    )
+
+
+def test_features():
+    """Ritmo, rutas distintas, errores e intervalo por IP"""
+    print("=" * 70)
+    print("TEST 1: FEATURES DE COMPORTAMIENTO")
+    print("=" * 70)
+
+    store = BehaviorStore(half_life=60.0, window=300.0)
+
+    # Escáner: 2 peticiones/s durante 10 minutos, 120 rutas, todo 404
+    scanner = [event("10.0.0.66", f"GET /admin{i % 120} HTTP/1.1", 404, i * 0.5) for i in range(1200)]
+    # Usuario: una petición cada 20 s sobre 3 páginas
+    user = [event("10.0.0.7", f"GET /page{i % 3}?id={i} HTTP/1.1", 200, i * 20.0) for i in range(30)]
+
+    rows = store.observe(sorted(scanner + user, key=lambda e: e.timestamp))
+    scan = dict(zip(BEHAVIOR_FEATURES, store.features("10.0.0.66")))
+    browse = dict(zip(BEHAVIOR_FEATURES, store.features("10.0.0.7")))
+
+    print(f"   Escáner: {', '.join(f'{k}={v:.2f}' for k, v in scan.items())}")
+    print(f"   Usuario: {', '.join(f'{k}={v:.2f}' for k, v in browse.items())}")
+
+    ok = rows.shape == (1230, 4) and 1.9 < scan["request_rate"] < 2.1 and browse["request_rate"] < 0.1
+    print(f"   {'✅' if ok else '❌'} Ritmo con decaimiento (escáner ~2/s, usuario <0.1/s)")
+
+    ok = 100 <= scan["distinct_paths"] <= 140 and 2.5 < browse["distinct_paths"] < 3.5
+    print(f"   {'✅' if ok else '❌'} Rutas distintas estimadas (120 y 3, la query no cuenta)")
+
+    ok = scan["error_ratio"] > 0.99 and browse["error_ratio"] == 0.0
+    ok = ok and abs(scan["mean_interarrival"] - 0.5) < 0.01 and abs(browse["mean_interarrival"] - 20.0) < 0.01
+    print(f"   {'✅' if ok else '❌'} Ratio de errores e intervalo entre peticiones")
+
+    # Una hora después: el ritmo decae y la IP caduca al llegar tráfico nuevo
+    later = store.features("10.0.0.66", (START + timedelta(hours=1)).timestamp())
+    store.update("10.0.0.1", "/", 200, (START + timedelta(hours=1)).timestamp())
+    ok = later[0] < 1e-3 and later[1] == 0.0 and len(store) == 1 and store.stats["expired"] == 2
+    print(f"   {'✅' if ok else '❌'} Decae con el tiempo y las IPs inactivas caducan (TTL)")
+    print()
+
+
+def test_bounded_memory():
+    """O(1) por evento y memoria acotada a max_ips"""
+    print("=" * 70)
+    print("TEST 2: COSTE Y MEMORIA ACOTADA")
+    print("=" * 70)
+
+    store = BehaviorStore(max_ips=1000)
+    events = [event(f"10.{i // 65536}.{i // 256 % 256}.{i % 256}", "GET /x HTTP/1.1", 200, i * 0.001)
+              for i in range(50000)]
+
+    start = time.perf_counter()
+    store.observe(events)
+    per_event = (time.perf_counter() - start) / len(events) * 1e6
+
+    print(f"   {per_event:.1f} µs/evento")
+    ok = len(store) == 1000 and store.stats["evicted"] == 49000
+    print(f"   {'✅' if ok else '❌'} 50000 IPs, solo {len(store)} en memoria (LRU)")
+
+    store = BehaviorStore.from_config({"enabled": True, "max_ips": 10, "ttl": 60})
+    ok = store.max_ips == 10 and store.ttl == 60 and BehaviorStore.from_config({"enabled": False}) is None
+    print(f"   {'✅' if ok else '❌'} Configurable (max_ips, ttl, enabled)")
+    print()
+
+
+async def test_agent_behavior_model():
+    """El agente pasa las features de comportamiento al modelo entrenado con ellas"""
+    print("=" * 70)
+    print("TEST 3: AGENTE CON MODELO DE COMPORTAMIENTO")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "behavior.joblib")
+        metrics = train_behavior_model(model_path, n_ips=300, seed=1)
+        print(f"   F1 con comportamiento: {metrics['test_f1']:.3f} | solo payload: {metrics['payload_only_f1']:.3f}")
+        print(f"   {'✅' if metrics['test_f1'] > metrics['payload_only_f1'] else '❌'} El comportamiento mejora la detección")
+
+        # Entrenamiento e inferencia ven las mismas features
+        events, _ = SessionGenerator(n_ips=100, seed=5).generate()
+        store = BehaviorStore()
+        online = np.vstack([store.observe(events[i:i + 500]) for i in range(0, len(events), 500)])
+        ok = np.array_equal(online, replay_features(events))
+        print(f"   {'✅' if ok else '❌'} Features en lotes del agente == replay del entrenamiento")
+
+        agent = NemesisAgent(model_path=model_path, behavior_store=BehaviorStore())
+        agent._load_ai_brain()
+
+        # Mismo payload: un login ocasional y una fuerza bruta
+        login = [event("10.9.0.1", "POST /login HTTP/1.1", 200, 0.0)]
+        brute = [event("10.9.0.2", "POST /login HTTP/1.1", 401, i * 0.8) for i in range(60)]
+        await agent.analyze_events(login)
+        verdicts = await agent.analyze_events(brute)
+        normal = await agent.analyze_events([event("10.9.0.1", "POST /login HTTP/1.1", 200, 60.0)])
+
+        ok = verdicts[-1].is_malicious and not normal[0].is_malicious
+        print(f"   {'✅' if ok else '❌'} Mismo payload: fuerza bruta maliciosa, login normal legítimo")
+
+        ok = len(agent._extract_features(brute[0])) == 7 and agent.cache_stats["hits"] == 0
+        print(f"   {'✅' if ok else '❌'} _extract_features con 7 columnas; sin caché por payload")
+
+        report = agent.reload_model(model_path).result(timeout=30)
+        print(f"   {'✅' if report['accepted'] else '❌'} Canario con features de comportamiento "
+              f"({report['agreement']:.0%} de acuerdo)")
+    print()
+
+
+async def test_worker_pool_behavior():
+    """Cada worker sigue solo las IPs de su shard"""
+    print("=" * 70)
+    print("TEST 4: COMPORTAMIENTO EN EL POOL DE WORKERS")
+    print("=" * 70)
+
+    events, _ = SessionGenerator(n_ips=60, seed=3).generate()
+    with DetectionWorkerPool(workers=2, behavior_store=BehaviorStore()) as pool:
+        await pool.process_events(events)
+        stats = pool.behavior_stats
+
+    ips = len({e.source_ip for e in events})
+    ok = stats["updates"] == len(events) and stats["tracked_ips"] + stats["expired"] == ips
+    print(f"   {'✅' if ok else '❌'} {stats['updates']} eventos, {ips} IPs repartidas entre 2 workers")
+    print()
+
+
+async def main():
+    print("""
+╔═══════════════════════════════════════════════════════════════════╗
+║                                                                   ║
+║          🧪 TEST DEL ALMACÉN DE COMPORTAMIENTO POR IP 🧪           ║
+║                                                                   ║
+╚═══════════════════════════════════════════════════════════════════╝
+    """)
+
+    logging.getLogger().setLevel(logging.ERROR)
+
+    test_features()
+    test_bounded_memory()
+    await test_agent_behavior_model()
+    await test_worker_pool_behavior()
+
+    print("=" * 70)
+    print("✅ TODOS LOS TESTS COMPLETADOS")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Test de checkpoints del LogReader (reanudación tras reinicio y rotación)
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from contextlib import aclosing
+sys.path.insert(0, 'src')
+
+from core.nemesis_agent import NemesisAgent
+from logs.checkpoint import CheckpointStore
+from logs.log_reader import LogReader
+from logs.log_sentinel import LogSentinel
+
+
+def _line(i: int) -> str:
+    return f'192.168.1.{i % 255} - - [04/Dec/2025:10:00:00] "GET /page/{i} HTTP/1.1" 200\n'
+
+
+def write_lines(path, numbers, mode='a'):
+    with open(path, mode) as f:
+        for i in numbers:
+            f.write(_line(i))
+
+
+def page(line: str) -> int:
+    return int(line.split("/page/")[1].split()[0])
+
+
+async def read_some(log_file, store_path, limit=None):
+    """Lee (como mucho limit líneas) con un reader nuevo, como tras un reinicio"""
+    reader = LogReader(log_file, follow=False, checkpoint=CheckpointStore(store_path))
+    pages = []
+    async with aclosing(reader.start()) as lines:
+        async for line in lines:
+            pages.append(page(line))
+            if limit and len(pages) >= limit:
+                break
+    return pages
+
+
+async def test_resume_after_restart():
+    """Tras reiniciar, el reader continúa donde se quedó"""
+    print("=" * 70)
+    print("TEST 1: REANUDACIÓN TRAS REINICIO")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = os.path.join(tmp, "access.log")
+        store_path = os.path.join(tmp, "checkpoints.json")
+        write_lines(log_file, range(200), 'w')
+
+        first = await read_some(log_file, store_path, limit=100)
+        write_lines(log_file, range(200, 250))
+        second = await read_some(log_file, store_path)
+
+        print(f"   Primera ejecución: {first[0]}..{first[-1]}")
+        print(f"   Segunda ejecución: {second[0]}..{second[-1]}")
+
+        # La última línea entregada y no confirmada se vuelve a entregar
+        ok = second == list(range(first[-1], 250))
+        print(f"   {'✅' if ok else '❌'} Sin huecos ni reprocesado masivo")
+        ok = not os.path.exists(os.path.join(tmp, ".checkpoints.json.tmp"))
+        print(f"   {'✅' if ok else '❌'} Escritura atómica (sin temporales)")
+    print()
+
+
+async def test_rotation_during_downtime():
+    """El archivo rota mientras el agente está parado"""
+    print("=" * 70)
+    print("TEST 2: ROTACIÓN DURANTE LA PARADA")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = os.path.join(tmp, "access.log")
+        store_path = os.path.join(tmp, "checkpoints.json")
+        write_lines(log_file, range(100), 'w')
+
+        first = await read_some(log_file, store_path, limit=50)
+
+        # Parado: llegan más líneas, logrotate renombra y se crea uno nuevo
+        write_lines(log_file, range(100, 120))
+        os.rename(log_file, log_file + ".1")
+        write_lines(log_file, range(120, 150), 'w')
+
+        second = await read_some(log_file, store_path)
+        print(f"   Primera ejecución: {first[0]}..{first[-1]}")
+        print(f"   Segunda ejecución: {second[0]}..{second[-1]} ({len(second)} líneas)")
+
+        ok = second == list(range(first[-1], 150))
+        print(f"   {'✅' if ok else '❌'} Termina el rotado y sigue con el nuevo")
+    print()
+
+
+async def test_invalid_checkpoint():
+    """Checkpoint que no coincide o archivo de checkpoints dañado"""
+    print("=" * 70)
+    print("TEST 3: CHECKPOINT INVÁLIDO")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = os.path.join(tmp, "access.log")
+        store_path = os.path.join(tmp, "checkpoints.json")
+        write_lines(log_file, range(100), 'w')
+
+        await read_some(log_file, store_path, limit=50)
+
+        # Reescrito en el mismo inode con otro contenido (copytruncate + escritura)
+        write_lines(log_file, range(1000, 1100), 'r+')
+        pages = await read_some(log_file, store_path)
+        ok = pages[0] == 1000 and len(pages) == 100
+        print(f"   {'✅' if ok else '❌'} Hash distinto: lectura desde el inicio")
+
+        with open(store_path, 'w') as f:
+            f.write("{ roto")
+        pages = await read_some(log_file, store_path)
+        ok = len(pages) == 100
+        print(f"   {'✅' if ok else '❌'} Archivo de checkpoints dañado: se ignora")
+
+        with open(store_path) as f:
+            saved = json.load(f)["files"][log_file]
+        print(f"   Checkpoint: offset={saved['offset']} hash={saved['line_hash']}")
+    print()
+
+
+async def test_sentinel_resume():
+    """El centinela confirma tras procesar: un reinicio no repite ni pierde"""
+    print("=" * 70)
+    print("TEST 4: CENTINELA CON CHECKPOINTS")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = os.path.join(tmp, "access.log")
+        store_path = os.path.join(tmp, "checkpoints.json")
+        write_lines(log_file, range(300), 'w')
+
+        processed = []
+        for new_lines in (None, range(300, 400)):
+            if new_lines:
+                write_lines(log_file, new_lines)
+
+            sentinel = LogSentinel(
+                NemesisAgent(), log_file, follow=False, workers=3,
+                batch_size=16, checkpoint_path=store_path
+            )
+            await sentinel.start()
+            processed.append(sentinel.stats["logs_processed"])
+
+        print(f"   Procesadas por ejecución: {processed}")
+        ok = processed == [300, 100]
+        print(f"   {'✅' if ok else '❌'} Cada línea procesada una sola vez")
+    print()
+
+
+async def main():
+    print()
+    print("╔" + "═" * 68 + "╗")
+    print("║" + " " * 19 + "CHECKPOINTS DEL READER - TESTS" + " " * 19 + "║")
+    print("╚" + "═" * 68 + "╝")
+    print()
+
+    await test_resume_after_restart()
+    await test_rotation_during_downtime()
+    await test_invalid_checkpoint()
+    await test_sentinel_resume()
+
+    print("=" * 70)
+    print("✅ TODOS LOS TESTS COMPLETADOS")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
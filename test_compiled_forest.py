@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Test del RandomForest compilado (arrays NumPy planos)
+"""
+
+import os
+import sys
+import tempfile
+import time
+import warnings
+from types import SimpleNamespace
+sys.path.insert(0, 'src')
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from core.nemesis_agent import NemesisAgent
+from ml.compiled_forest import CompiledForest, compile_model, compiled_path
+from ml.train_brain import DatasetGeneratorV2, FeatureExtractorV2
+
+
+def training_data(n_samples=3000):
+    """Features V2 del dataset sintético"""
+    payloads, labels = DatasetGeneratorV2(n_samples=n_samples).generate_dataset()
+    return FeatureExtractorV2.extract_features_batch(payloads), np.array(labels)
+
+
+def test_bit_exact():
+    """Mismas probabilidades que sklearn, bit a bit"""
+    print("=" * 70)
+    print("TEST 1: PROBABILIDADES IDÉNTICAS A SKLEARN")
+    print("=" * 70)
+
+    X, y = training_data()
+    model = RandomForestClassifier(n_estimators=60, random_state=7, n_jobs=1).fit(X, y)
+    forest = CompiledForest.from_sklearn(model)
+
+    rng = np.random.default_rng(0)
+    X_test = np.vstack([X, X * rng.uniform(0.9, 1.1, X.shape)])
+
+    expected = model.predict_proba(X_test)
+    ok = np.array_equal(forest.predict_proba(X_test), expected)
+    print(f"   Árboles: {forest.n_estimators} | nodos: {forest.node_count:,} | filas: {len(X_test):,}")
+    print(f"   {'✅' if ok else '❌'} Lote: predict_proba bit a bit igual")
+
+    ok = all(
+        np.array_equal(forest.predict_proba(X_test[i]), expected[i:i + 1])
+        for i in range(0, len(X_test), 37)
+    )
+    print(f"   {'✅' if ok else '❌'} Fila única: predict_proba bit a bit igual")
+
+    ok = np.array_equal(forest.predict(X_test), model.predict(X_test))
+    print(f"   {'✅' if ok else '❌'} predict coincide")
+
+    # Valores faltantes (sklearn >= 1.4 los enruta por missing_go_to_left)
+    X_nan = X.copy()
+    X_nan[::5, 2] = np.nan
+    model = RandomForestClassifier(n_estimators=20, random_state=1, n_jobs=1).fit(X_nan, y)
+    forest = CompiledForest.from_sklearn(model)
+    ok = np.array_equal(forest.predict_proba(X_nan), model.predict_proba(X_nan))
+    ok = ok and np.array_equal(forest.predict_proba(X_nan[0]), model.predict_proba(X_nan[:1]))
+    print(f"   {'✅' if ok else '❌'} Features NaN enrutadas igual que sklearn")
+
+    try:
+        forest.predict_proba([[1.0, 2.0, 3.0]])
+        ok = False
+    except ValueError:
+        ok = True
+    print(f"   {'✅' if ok else '❌'} Número de features incorrecto -> ValueError")
+    print()
+
+
+def test_export_and_agent():
+    """Export a .npz y carga preferente en el agente"""
+    print("=" * 70)
+    print("TEST 2: EXPORT Y CARGA EN EL AGENTE")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "brain.joblib")
+
+        agent = NemesisAgent(model_path=model_path)
+        payload_features = []
+        labels = []
+        for i in range(300):
+            for payload, label in (
+                (f"GET /products?page={i} HTTP/1.1", 0),
+                (f"GET /login?user=admin' OR '1'='{i}'-- HTTP/1.1", 1),
+            ):
+                payload_features.append(agent._extract_features(SimpleNamespace(payload=payload)))
+                labels.append(label)
+
+        model = RandomForestClassifier(n_estimators=30, random_state=3, n_jobs=1)
+        model.fit(payload_features, labels)
+        joblib.dump(model, model_path)
+
+        path = compile_model(model_path)
+        print(f"   Artefacto: {os.path.basename(path)} ({os.path.getsize(path):,} bytes)")
+        print(f"   {'✅' if path == compiled_path(model_path) else '❌'} Guardado junto al modelo")
+
+        loaded = CompiledForest.load(path)
+        ok = np.array_equal(loaded.predict_proba(payload_features), model.predict_proba(payload_features))
+        print(f"   {'✅' if ok else '❌'} Ida y vuelta por .npz sin cambios")
+
+        agent._load_ai_brain()
+        print(f"   {'✅' if isinstance(agent._ai_brain, CompiledForest) else '❌'} El agente prefiere el bosque compilado")
+
+        # Un joblib más reciente invalida el artefacto compilado
+        future = os.path.getmtime(path) + 10
+        os.utime(model_path, (future, future))
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            agent._load_ai_brain()
+        ok = isinstance(agent._ai_brain, RandomForestClassifier)
+        print(f"   {'✅' if ok else '❌'} Artefacto desactualizado -> se usa el joblib")
+    print()
+
+
+def test_memory_mapped():
+    """Carga con mmap: páginas compartidas entre workers y carga casi instantánea"""
+    print("=" * 70)
+    print("TEST 3: MODELO MAPEADO EN MEMORIA")
+    print("=" * 70)
+
+    X, y = training_data(3000)
+    model = RandomForestClassifier(n_estimators=100, random_state=5, n_jobs=1).fit(X, y)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "brain.joblib")
+        joblib.dump(model, model_path)
+        path = compile_model(model_path)
+
+        start = time.perf_counter()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            joblib.load(model_path)
+        joblib_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        forest = CompiledForest.load(path)
+        mmap_time = time.perf_counter() - start
+
+        print(f"   joblib.load:        {joblib_time * 1000:7.1f} ms")
+        print(f"   CompiledForest mmap: {mmap_time * 1000:6.1f} ms")
+        print(f"   {'✅' if mmap_time < joblib_time else '❌'} Carga más rápida que deserializar el joblib")
+
+        ok = isinstance(forest.threshold, np.memmap) and not forest.threshold.flags.writeable
+        print(f"   {'✅' if ok else '❌'} Nodos mapeados desde el archivo (solo lectura)")
+
+        ok = np.array_equal(forest.predict_proba(X), model.predict_proba(X))
+        ok = ok and np.array_equal(forest.predict_proba(X[0]), model.predict_proba(X[:1]))
+        print(f"   {'✅' if ok else '❌'} Mismas probabilidades que sklearn")
+
+        # Recompilar reemplaza el archivo sin tocar el inode ya mapeado
+        CompiledForest.from_sklearn(
+            RandomForestClassifier(n_estimators=5, random_state=0, n_jobs=1).fit(X, y)
+        ).save(path)
+        ok = np.array_equal(forest.predict_proba(X), model.predict_proba(X))
+        print(f"   {'✅' if ok else '❌'} Reescribir el artefacto no corrompe el modelo mapeado")
+
+        agent = NemesisAgent(model_path=model_path)
+        agent._load_ai_brain()
+        stats = agent.model_stats
+        print(f"   Agente: {stats}")
+        ok = stats.get("format") == "compiled-mmap" and stats["rss_mb"] > 0
+        print(f"   {'✅' if ok else '❌'} Formato, tiempo de carga y memoria reportados")
+    print()
+
+
+def test_latency():
+    """Latencia de una sola fila frente a sklearn"""
+    print("=" * 70)
+    print("TEST 4: LATENCIA")
+    print("=" * 70)
+
+    X, y = training_data(2000)
+    model = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=1).fit(X, y)
+    forest = CompiledForest.from_sklearn(model)
+    rows = X[:200]
+
+    start = time.perf_counter()
+    for row in rows:
+        model.predict_proba(row.reshape(1, -1))
+    sklearn_time = (time.perf_counter() - start) / len(rows)
+
+    start = time.perf_counter()
+    for row in rows:
+        forest.predict_proba(row)
+    compiled_time = (time.perf_counter() - start) / len(rows)
+
+    print(f"   sklearn:   {sklearn_time * 1e6:8.1f} µs/fila")
+    print(f"   compilado: {compiled_time * 1e6:8.1f} µs/fila")
+    print(f"   {'✅' if compiled_time < sklearn_time else '❌'} Speedup x{sklearn_time / compiled_time:.1f}")
+
+    start = time.perf_counter()
+    forest.predict_proba(X)
+    batch_time = time.perf_counter() - start
+    print(f"   Lote de {len(X):,} filas: {len(X) / batch_time:,.0f} filas/s")
+    print()
+
+
+def main():
+    print("""
+╔═══════════════════════════════════════════════════════════════════╗
+║                                                                   ║
+║               🧪 TEST DEL RANDOM FOREST COMPILADO 🧪               ║
+║                                                                   ║
+╚═══════════════════════════════════════════════════════════════════╝
+    """)
+
+    test_bit_exact()
+    test_export_and_agent()
+    test_memory_mapped()
+    test_latency()
+
+    print("=" * 70)
+    print("✅ TODOS LOS TESTS COMPLETADOS")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
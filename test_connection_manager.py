@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Test del gestor de conexiones (escritor único + lectores en WAL)
+"""
+
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+sys.path.insert(0, 'src')
+
+from database.threat_database import ThreatDatabase, ThreatRecord
+
+
+def make_threats(n, start=datetime(2025, 12, 4, 10, 0, 0)):
+    return [
+        ThreatRecord(
+            None, start + timedelta(seconds=i), f"10.0.{i % 7}.{i % 50}",
+            "SQL_INJECTION", f"/login?id={i}' OR 1=1--", 0.95, "BLOCK", True
+        )
+        for i in range(n)
+    ]
+
+
+def test_pragmas():
+    """WAL, lectores de solo lectura y pool acotado"""
+    print("=" * 70)
+    print("TEST 1: CONFIGURACIÓN DE LAS CONEXIONES")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ThreatDatabase(os.path.join(tmp, "nemesis.db"), readers=2)
+        manager = db.connections
+
+        with manager.read() as conn:
+            mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            timeout = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+            query_only = conn.execute("PRAGMA query_only").fetchone()[0]
+        sync = db.conn.execute("PRAGMA synchronous").fetchone()[0]
+        ok = mode == "wal" and timeout == manager.busy_timeout_ms and query_only == 1 and sync == 1
+        print(f"   {'✅' if ok else '❌'} journal_mode={mode}, busy_timeout={timeout} ms, "
+              f"query_only={query_only}, synchronous=NORMAL")
+
+        # threats es una vista (no admite DELETE en ninguna conexión): se
+        # prueba con una tabla real que el escritor sí puede modificar
+        db.block_ip("10.0.0.1", "test")
+        try:
+            with manager.read() as conn:
+                conn.execute("DELETE FROM blocked_ips")
+            ok = False
+        except sqlite3.OperationalError as e:
+            ok = "readonly" in str(e)
+        ok = ok and db.conn.execute("SELECT COUNT(*) FROM blocked_ips").fetchone()[0] == 1
+        with manager.write() as conn:
+            conn.execute("DELETE FROM blocked_ips")
+        print(f"   {'✅' if ok else '❌'} Los lectores no pueden escribir")
+
+        with manager.read(), manager.read():
+            pass
+        threads = [threading.Thread(target=db.get_threats) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = manager.stats
+        ok = stats["readers_open"] == 2 and stats["readers_idle"] == 2
+        print(f"   {'✅' if ok else '❌'} Pool acotado: {stats['readers_open']} lectores para "
+              f"{stats['reads']} lecturas ({stats['read_waits']} esperas)")
+        db.close()
+    print()
+
+
+def test_isolation():
+    """Una lectura larga no bloquea escrituras, ni al revés"""
+    print("=" * 70)
+    print("TEST 2: LECTURAS Y ESCRITURAS SIN BLOQUEARSE")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ThreatDatabase(os.path.join(tmp, "nemesis.db"), stats_flush_interval=None)
+        db.save_threats(make_threats(5000))
+
+        # Lectura de dashboard a medias: snapshot abierto en un lector
+        with db.connections.read() as conn:
+            cursor = conn.execute("SELECT * FROM threats")
+            cursor.fetchmany(10)
+
+            start = time.perf_counter()
+            for threat in make_threats(200):
+                db.save_threat(threat)
+            write_ms = (time.perf_counter() - start) * 1000
+            rest = len(cursor.fetchall()) + 10
+
+        ok = rest == 5000 and len(db.get_threats(limit=10000)) == 5200
+        print(f"   {'✅' if ok else '❌'} 200 escrituras en {write_ms:.0f} ms con una lectura abierta "
+              f"(que ve su snapshot: {rest})")
+
+        # Transacción de escritura sin confirmar: las lecturas siguen
+        with db.connections.write() as conn:
+            conn.executemany(
+                "INSERT INTO blocked_ips (ip, blocked_at, reason) VALUES (?, ?, ?)",
+                [(f"10.1.0.{i}", "2025-12-04", "test") for i in range(100)]
+            )
+            start = time.perf_counter()
+            during = len(db.get_blocked_ips())
+            read_ms = (time.perf_counter() - start) * 1000
+        after = len(db.get_blocked_ips())
+
+        ok = during == 0 and after == 100
+        print(f"   {'✅' if ok else '❌'} Lectura en {read_ms:.1f} ms durante una escritura "
+              f"(ve {during}, tras el commit {after})")
+        db.close()
+    print()
+
+
+def test_concurrent_threads():
+    """Detección y dashboards desde varios hilos a la vez"""
+    print("=" * 70)
+    print("TEST 3: HILOS CONCURRENTES")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ThreatDatabase(os.path.join(tmp, "nemesis.db"), stats_flush_interval=0.05)
+        errors = []
+        done = threading.Event()
+        reads = [0]
+
+        def writer(offset):
+            try:
+                for threat in make_threats(500, datetime(2025, 12, 4) + timedelta(hours=offset)):
+                    db.save_threat(threat)
+                    db.block_ip(threat.source_ip, "test")
+            except Exception as e:
+                errors.append(e)
+
+        def dashboard():
+            try:
+                while not done.is_set():
+                    db.get_threats(limit=100)
+                    db.get_blocked_ips()
+                    db.get_statistics()
+                    reads[0] += 1
+            except Exception as e:
+                errors.append(e)
+
+        writers = [threading.Thread(target=writer, args=(i,)) for i in range(3)]
+        readers = [threading.Thread(target=dashboard) for _ in range(3)]
+        for thread in writers + readers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        done.set()
+        for thread in readers:
+            thread.join()
+
+        stored = len(db.get_threats(limit=10000))
+        blocked = sum(ip["threat_count"] for ip in db.get_blocked_ips())
+        db.close()
+
+        ok = not errors and stored == 1500 and blocked == 1500
+        print(f"   {'✅' if ok else '❌'} 3 escritores + 3 dashboards ({reads[0]} lecturas): "
+              f"{stored} amenazas, {len(errors)} errores")
+    print()
+
+
+def main():
+    print("""
+╔═══════════════════════════════════════════════════════════════════╗
+║                                                                   ║
+║              🧪 TEST DEL GESTOR DE CONEXIONES 🧪                   ║
+║                                                                   ║
+╚═══════════════════════════════════════════════════════════════════╝
+    """)
+
+    logging.getLogger().setLevel(logging.ERROR)
+
+    test_pragmas()
+    test_isolation()
+    test_concurrent_threads()
+
+    print("=" * 70)
+    print("✅ TODOS LOS TESTS COMPLETADOS")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Test del pipeline de dataset (shards en paralelo, caché de features, lectura por trozos)
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+sys.path.insert(0, 'src')
+
+import numpy as np
+
+from database.threat_database import ThreatDatabase, ThreatRecord
+from ml.dataset_pipeline import (
+    FeatureCache, extract_chunks, generate_features,
+    iter_csv_chunks, iter_database_chunks, load_training_features
+)
+from ml.train_brain import DatasetGeneratorV2, FeatureExtractorV2, train_model_v2
+
+
+CSV_PATH = "models/training_dataset.csv"
+
+
+def test_deterministic_shards():
+    """Mismas semillas -> mismo dataset, con cualquier número de procesos"""
+    print("=" * 70)
+    print("TEST 1: SHARDS DETERMINISTAS")
+    print("=" * 70)
+
+    first = DatasetGeneratorV2(n_samples=500, seed=7).generate_dataset()
+    second = DatasetGeneratorV2(n_samples=500, seed=7).generate_dataset()
+    other = DatasetGeneratorV2(n_samples=500, seed=8).generate_dataset()
+    ok = first == second and first != other
+    print(f"   {'✅' if ok else '❌'} DatasetGeneratorV2 con semilla es reproducible")
+
+    start = time.perf_counter()
+    X1, y1 = generate_features(20000, seed=42, n_jobs=1, shard_size=2500)
+    serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    X2, y2 = generate_features(20000, seed=42, n_jobs=2, shard_size=2500)
+    parallel = time.perf_counter() - start
+
+    print(f"   1 proceso: {serial:.2f}s | 2 procesos: {parallel:.2f}s ({os.cpu_count()} CPUs)")
+    ok = np.array_equal(X1, X2) and np.array_equal(y1, y2)
+    print(f"   {'✅' if ok else '❌'} Mismo resultado en serie y en el pool")
+
+    ok = X1.shape == (20000, 5) and abs(y1.mean() - 0.4) < 0.01
+    print(f"   {'✅' if ok else '❌'} 20000 muestras, {y1.mean():.0%} maliciosas")
+
+    X3, _ = generate_features(20000, seed=43, n_jobs=1, shard_size=2500)
+    print(f"   {'✅' if not np.array_equal(X1, X3) else '❌'} Otra semilla -> otro dataset")
+    print()
+
+
+def test_feature_cache():
+    """Las features se calculan una vez y luego se mapean desde disco"""
+    print("=" * 70)
+    print("TEST 2: CACHÉ DE FEATURES")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        X1, y1 = load_training_features(n_samples=20000, seed=1, cache_dir=tmp)
+        cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        X2, y2 = load_training_features(n_samples=20000, seed=1, cache_dir=tmp)
+        warm = time.perf_counter() - start
+
+        print(f"   Sin caché: {cold * 1000:.0f} ms | con caché: {warm * 1000:.1f} ms")
+        print(f"   {'✅' if warm < cold / 10 else '❌'} Reutiliza las features (x{cold / warm:.0f})")
+
+        ok = isinstance(X2, np.memmap) and not X2.flags.writeable
+        ok = ok and np.array_equal(X1, X2) and np.array_equal(y1, y2)
+        print(f"   {'✅' if ok else '❌'} Cargadas con mmap y sin cambios")
+
+        cache = FeatureCache(tmp)
+        key = cache.key(n_samples=20000, seed=1)
+        FeatureExtractorV2.VERSION += 1
+        try:
+            ok = cache.key(n_samples=20000, seed=1) != key
+        finally:
+            FeatureExtractorV2.VERSION -= 1
+        print(f"   {'✅' if ok else '❌'} Nueva versión del extractor -> nueva clave")
+
+        X3, _ = load_training_features(n_samples=20000, seed=None, cache_dir=tmp)
+        entries = [p for p in os.listdir(tmp) if p.startswith("synthetic-")]
+        print(f"   {'✅' if len(entries) == 1 else '❌'} Sin semilla no se cachea ({len(entries)} entrada)")
+    print()
+
+
+def test_chunked_ingestion():
+    """CSV e histórico de la BD se leen por trozos"""
+    print("=" * 70)
+    print("TEST 3: LECTURA POR TROZOS (CSV Y BD)")
+    print("=" * 70)
+
+    import pandas as pd
+    full = pd.read_csv(CSV_PATH)
+    chunks = list(iter_csv_chunks(CSV_PATH, chunksize=3000))
+    ok = [len(p) for p, _ in chunks] == [3000, 3000, 3000, 1000]
+    print(f"   {'✅' if ok else '❌'} CSV en {len(chunks)} trozos de 3000 filas")
+
+    X, y = extract_chunks(iter_csv_chunks(CSV_PATH, chunksize=3000))
+    expected = FeatureExtractorV2.extract_features_batch(full['payload'].tolist())
+    ok = np.array_equal(X, expected) and np.array_equal(y, full['label'].to_numpy())
+    print(f"   {'✅' if ok else '❌'} Mismas features que procesando el CSV entero")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "nemesis.db")
+        db = ThreatDatabase(db_path)
+        db.save_threats([
+            ThreatRecord(None, datetime.now(), f"10.0.0.{i % 250}", attack_type, payload, 0.9, "BLOCK", True)
+            for i, (attack_type, payload) in enumerate(
+                [("SQL_INJECTION", "/login?user=' OR 1=1--"), ("UNKNOWN", "/index.html")] * 1500
+            )
+        ])
+        db.save_feedback("/index.html?q=O'Brien", 0)
+
+        chunks = list(iter_database_chunks(db_path, chunksize=1000, include_threats=True))
+        payloads = [p for chunk, _ in chunks for p in chunk]
+        labels = np.concatenate([labels for _, labels in chunks])
+        ok = len(chunks) == 4 and len(payloads) == 3001
+        print(f"   {'✅' if ok else '❌'} BD en {len(chunks)} trozos ({len(payloads)} filas: feedback + amenazas)")
+
+        ok = labels[0] == 0 and labels[1:].sum() == 1500
+        print(f"   {'✅' if ok else '❌'} Etiquetas: feedback legítimo, amenazas maliciosas y UNKNOWN")
+
+        # Falso positivo corregido (dos veces): manda la última corrección
+        db.save_feedback("/login?user=' OR 1=1--", 1)
+        db.save_feedback("/login?user=' OR 1=1--", 0)
+        rows = [
+            (p, label) for chunk, labels in iter_database_chunks(db_path, include_threats=True)
+            for p, label in zip(chunk, labels)
+        ]
+        corrected = [label for p, label in rows if p == "/login?user=' OR 1=1--"]
+        ok = corrected == [0] and len(rows) == 2 + 1500
+        print(f"   {'✅' if ok else '❌'} El feedback sustituye a las amenazas del mismo payload "
+              f"({len(rows)} filas)")
+
+        default = [p for chunk, _ in iter_database_chunks(db_path) for p in chunk]
+        print(f"   {'✅' if len(default) == 2 else '❌'} Por defecto solo el feedback ({len(default)} filas)")
+
+        X, y = load_training_features(n_samples=1000, seed=3, csv_path=CSV_PATH, db_path=db_path, cache_dir=tmp)
+        ok = X.shape == (1000 + 10000 + 2, 5) and len(y) == len(X)
+        print(f"   {'✅' if ok else '❌'} Sintético + CSV + BD combinados: {len(X)} filas")
+
+        # Feedback nuevo aún en el -wal (sin checkpoint): la caché no vale
+        db.save_feedback("/search?q=(jazz)", 0)
+        X, _ = load_training_features(n_samples=0, db_path=db_path, cache_dir=tmp)
+        print(f"   {'✅' if len(X) == 3 else '❌'} La clave de caché incluye el -wal ({len(X)} filas)")
+        db.close()
+    print()
+
+
+def test_train_with_cache():
+    """train_model_v2 reutiliza la caché entre ejecuciones"""
+    print("=" * 70)
+    print("TEST 4: ENTRENAMIENTO CON CACHÉ")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "brain.joblib")
+        cache_dir = os.path.join(tmp, "cache")
+
+        first = train_model_v2(output, n_samples=3000, seed=5, n_jobs=2, cache_dir=cache_dir)
+        second = train_model_v2(output, n_samples=3000, seed=5, n_jobs=2, cache_dir=cache_dir)
+
+        ok = first['confusion_matrix'] == second['confusion_matrix']
+        print(f"   F1: {first['test_f1']:.4f} / {second['test_f1']:.4f}")
+        print(f"   {'✅' if ok else '❌'} Misma semilla y caché -> mismo resultado")
+        print(f"   {'✅' if len(os.listdir(cache_dir)) == 1 else '❌'} Una sola entrada de caché")
+    print()
+
+
+def main():
+    print("""
+╔═══════════════════════════════════════════════════════════════════╗
+║                                                                   ║
+║               🧪 TEST DEL PIPELINE DE DATASET 🧪                   ║
+║                                                                   ║
+╚═══════════════════════════════════════════════════════════════════╝
+    """)
+
+    logging.getLogger().setLevel(logging.ERROR)
+
+    test_deterministic_shards()
+    test_feature_cache()
+    test_chunked_ingestion()
+    test_train_with_cache()
+
+    print("=" * 70)
+    print("✅ TODOS LOS TESTS COMPLETADOS")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
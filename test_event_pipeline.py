@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test del pipeline de eventos tipados (parse una sola vez)
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime
+sys.path.insert(0, 'src')
+
+from core.nemesis_agent import NemesisAgent
+from database.threat_database import ThreatDatabase
+from logs.log_parser import LogParser
+from logs.log_sentinel import LogSentinel
+
+
+LOGS = [
+    '192.168.1.100 - - [04/Dec/2025:10:00:00] "GET /index.html HTTP/1.1" 200\n',
+    '192.168.1.102 - - [04/Dec/2025:10:00:10] "GET /login?user=admin\' OR \'1\'=\'1\'-- HTTP/1.1" 403\n',
+    '192.168.1.104 - - [04/Dec/2025:10:00:20] "GET /download?file=../../../etc/passwd HTTP/1.1" 403\n',
+]
+
+
+def test_parsed_event():
+    """El evento tipado trae la petición completa y es compacto"""
+    print("=" * 70)
+    print("TEST 1: EVENTO TIPADO")
+    print("=" * 70)
+
+    event = LogParser().parse(LOGS[1].strip())
+
+    print(f"   Payload:   {event.payload}")
+    print(f"   Timestamp: {event.timestamp}")
+    ok = (
+        event.payload == "GET /login?user=admin' OR '1'='1'-- HTTP/1.1"
+        and event.timestamp == datetime(2025, 12, 4, 10, 0, 10)
+        and not hasattr(event, "__dict__")
+    )
+    print(f"   {'✅' if ok else '❌'} Petición completa, hora del log y __slots__")
+    print()
+
+
+async def test_parse_once_to_database():
+    """Cada línea se parsea una vez y la BD guarda la hora del log"""
+    print("=" * 70)
+    print("TEST 2: PARSE ÚNICO HASTA LA BASE DE DATOS")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = os.path.join(tmp, "access.log")
+        with open(log_file, 'w') as f:
+            f.writelines(LOGS)
+
+        agent = NemesisAgent()
+        database = ThreatDatabase(os.path.join(tmp, "threats.db"))
+        sentinel = LogSentinel(agent, log_file, follow=False, database=database)
+
+        calls = {"sentinel": 0, "agent": 0}
+        sentinel_parse = sentinel.parser.parse
+        agent_parse = agent._parse_log
+
+        def count_sentinel(line):
+            calls["sentinel"] += 1
+            return sentinel_parse(line)
+
+        def count_agent(line):
+            calls["agent"] += 1
+            return agent_parse(line)
+
+        sentinel.parser.parse = count_sentinel
+        agent._parse_log = count_agent
+
+        await sentinel.start()
+
+        threats = database.get_threats(limit=10)
+        timestamps = sorted(t.timestamp for t in threats)
+        print(f"   Parseos en sentinel: {calls['sentinel']}, en agente: {calls['agent']}")
+        print(f"   Timestamps en BD:    {[t.isoformat() for t in timestamps]}")
+
+        ok = (
+            calls == {"sentinel": len(LOGS), "agent": 0}
+            and timestamps == [
+                datetime(2025, 12, 4, 10, 0, 10),
+                datetime(2025, 12, 4, 10, 0, 20),
+            ]
+        )
+        print(f"   {'✅' if ok else '❌'} Un parseo por línea y hora real del evento")
+
+        # El payload guardado es lo que analizó el agente (el feedback entrena con él)
+        ok = all(t.payload.startswith("GET ") and t.payload.endswith("HTTP/1.1") for t in threats)
+        print(f"   {'✅' if ok else '❌'} Payload en BD = línea de petición completa")
+        database.close()
+    print()
+
+
+async def main():
+    print()
+    print("╔" + "═" * 68 + "╗")
+    print("║" + " " * 18 + "PIPELINE DE EVENTOS - TESTS" + " " * 23 + "║")
+    print("╚" + "═" * 68 + "╝")
+    print()
+
+    test_parsed_event()
+    await test_parse_once_to_database()
+
+    print("=" * 70)
+    print("✅ TODOS LOS TESTS COMPLETADOS")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
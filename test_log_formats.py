@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Test del registro de formatos de log y la detección por archivo
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+sys.path.insert(0, 'src')
+
+from core.nemesis_agent import NemesisAgent
+from logs.log_formats import detect_format, get_format, available_formats
+from logs.log_sentinel import LogSentinel
+
+
+ACCESS = [
+    '10.0.0.1 - - [04/Dec/2025:10:00:00 +0000] "GET /index.html HTTP/1.1" 200 512',
+    '10.0.0.2 - - [04/Dec/2025:10:00:01 +0000] "GET /q?id=1\' OR \'1\'=\'1 HTTP/1.1" 403 0',
+]
+
+NGINX_JSON = [
+    json.dumps({
+        "time_iso8601": "2025-12-04T10:00:00+00:00", "remote_addr": "10.0.0.3",
+        "request": "GET /health HTTP/1.1", "status": "200",
+        "body_bytes_sent": "12", "http_referer": "", "http_user_agent": "curl/8.0",
+    }),
+    json.dumps({
+        "time_local": "04/Dec/2025:10:00:02 +0000", "remote_addr": "10.0.0.4",
+        "request_method": "GET", "request_uri": "/download?file=../../../etc/passwd",
+        "server_protocol": "HTTP/1.1", "status": 403,
+    }),
+]
+
+SYSLOG = [
+    'Dec  4 10:00:00 web01 nginx[812]: worker process 813 exited on signal 9',
+    '2025-12-04T10:00:01.123456+00:00 web01 kernel: UFW BLOCK SRC=10.0.0.5 DST=10.0.0.1',
+]
+
+AUTH = [
+    'Dec  4 10:00:00 web01 sshd[1001]: Failed password for invalid user admin from 10.0.0.6 port 52311 ssh2',
+    'Dec  4 10:00:01 web01 sshd[1001]: Connection closed by 10.0.0.6 port 52311 [preauth]',
+    'Dec  4 10:00:02 web01 sshd[1002]: Invalid user oracle from 10.0.0.7 port 40022',
+    'Dec  4 10:00:03 web01 sudo: pam_unix(sudo:session): session opened for user root',
+]
+
+
+def check(label, ok):
+    print(f"   {'✅' if ok else '❌'} {label}")
+
+
+def test_detection():
+    """Cada muestra se asigna a su formato"""
+    print("=" * 70)
+    print("TEST 1: DETECCIÓN DE FORMATO")
+    print("=" * 70)
+
+    print(f"   Registrados: {available_formats()}")
+
+    cases = [
+        (ACCESS, "combined"),
+        (NGINX_JSON, "nginx_json"),
+        (SYSLOG, "syslog"),
+        (AUTH, "auth"),
+        (["texto sin formato", "otra línea"], "combined"),
+    ]
+    for sample, expected in cases:
+        detected = detect_format(sample).name
+        check(f"{expected:<11} -> {detected}", detected == expected)
+    print()
+
+
+def test_parsers():
+    """Campos extraídos y tasas por parser"""
+    print("=" * 70)
+    print("TEST 2: PARSERS Y TASAS")
+    print("=" * 70)
+
+    nginx = get_format("nginx_json")
+    events = [nginx.parse(line) for line in NGINX_JSON]
+    check("nginx JSON: request completa y path", (
+        events[0].request == "GET /health HTTP/1.1"
+        and events[0].user_agent == "curl/8.0"
+        and events[1].path == "/download?file=../../../etc/passwd"
+        and events[1].status_code == 403
+    ))
+
+    syslog = get_format("syslog")
+    event = syslog.parse(SYSLOG[1])
+    check("syslog: IP del mensaje como origen", event.source_ip == "10.0.0.5")
+
+    auth = get_format("auth")
+    events = [auth.parse(line) for line in AUTH + ["basura"]]
+    failures = [e for e in events if e]
+    check("auth: fallos SSH con IP y método SSH", (
+        [e.source_ip for e in failures] == ["10.0.0.6", "10.0.0.7"]
+        and all(e.method == "SSH" for e in failures)
+    ))
+
+    stats = auth.stats
+    print(f"   Stats auth: {stats}")
+    check("auth: parseadas, ignoradas y errores", (
+        stats["parsed"] == 2 and stats["ignored"] == 2 and stats["errors"] == 1
+        and stats["error_rate"] == 20.0
+    ))
+    print()
+
+
+async def test_sentinel_binding():
+    """El centinela asocia un parser por archivo"""
+    print("=" * 70)
+    print("TEST 3: UN PARSER POR ARCHIVO EN EL CENTINELA")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {"access.log": ACCESS, "json.log": NGINX_JSON, "auth.log": AUTH}
+        for name, lines in files.items():
+            with open(os.path.join(tmp, name), 'w') as f:
+                f.write("\n".join(lines) + "\n")
+
+        agent = NemesisAgent()
+        sentinel = LogSentinel(agent, os.path.join(tmp, "*.log"), follow=False)
+
+        # La detección no se repite por línea
+        calls = {"detect": 0}
+        original = sentinel._bind_format
+
+        def count_bind(path, sample):
+            calls["detect"] += 1
+            return original(path, sample)
+
+        sentinel._bind_format = count_bind
+
+        await sentinel.start()
+
+        for path, stats in sentinel.file_stats.items():
+            fmt = stats["format"]
+            print(f"   {os.path.basename(path):<11} {fmt['format']:<11} "
+                  f"parse={fmt['parse_rate']:.0f}% error={fmt['error_rate']:.0f}%")
+
+        formats = {
+            os.path.basename(p): s["format"]["format"]
+            for p, s in sentinel.file_stats.items()
+        }
+        check("Formato asociado a cada archivo", formats == {
+            "access.log": "combined", "json.log": "nginx_json", "auth.log": "auth"
+        })
+        check("Sin detección durante el seguimiento", calls["detect"] == 0)
+        check("Ataques web detectados (SQLi y traversal)", sentinel.stats["threats_detected"] >= 2)
+    print()
+
+
+async def main():
+    print()
+    print("╔" + "═" * 68 + "╗")
+    print("║" + " " * 19 + "FORMATOS DE LOG - TESTS" + " " * 26 + "║")
+    print("╚" + "═" * 68 + "╝")
+    print()
+
+    test_detection()
+    test_parsers()
+    await test_sentinel_binding()
+
+    print("=" * 70)
+    print("✅ TODOS LOS TESTS COMPLETADOS")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test del tokenizador de logs (Common/Combined y líneas parciales)
+"""
+
+import sys
+from datetime import datetime
+sys.path.insert(0, 'src')
+
+from logs.log_parser import LogParser
+
+
+def check(label, ok):
+    print(f"   {'✅' if ok else '❌'} {label}")
+
+
+def test_combined():
+    """Common y Combined bien formados por el camino rápido"""
+    print("=" * 70)
+    print("TEST 1: COMMON / COMBINED")
+    print("=" * 70)
+
+    parser = LogParser()
+
+    common = parser.parse(
+        '10.0.0.1 - frank [10/Oct/2025:13:55:36 -0700] "GET /a.gif HTTP/1.0" 200 2326'
+    )
+    check("Common Log Format", (
+        common.source_ip == "10.0.0.1"
+        and common.method == "GET"
+        and common.path == "/a.gif"
+        and common.protocol == "HTTP/1.0"
+        and common.status_code == 200
+        and common.format_type == "apache"
+        and common.timestamp == datetime(2025, 10, 10, 13, 55, 36)
+    ))
+
+    combined = parser.parse(
+        '10.0.0.2 - - [10/Oct/2025:13:55:37 +0000] "POST /login HTTP/1.1" 302 512 '
+        '"https://example.com/" "Mozilla/5.0 (X11; Linux) \\"quoted\\""'
+    )
+    check("Combined con referer y user-agent", (
+        combined.format_type == "combined"
+        and combined.bytes_sent == 512
+        and combined.referer == "https://example.com/"
+        and combined.user_agent == 'Mozilla/5.0 (X11; Linux) \\"quoted\\"'
+    ))
+
+    spaced = parser.parse(
+        '10.0.0.3 - - [10/Oct/2025:13:55:38] "GET /q?id=1 UNION SELECT 1 HTTP/1.1" 403 -'
+    )
+    check("Payload con espacios conserva la petición", (
+        spaced.request == "GET /q?id=1 UNION SELECT 1 HTTP/1.1"
+        and spaced.path == "/q?id=1"
+        and spaced.protocol == "HTTP/1.1"
+        and spaced.bytes_sent == 0
+    ))
+    print()
+
+
+def test_partial_lines():
+    """Líneas truncadas, sin status o basura"""
+    print("=" * 70)
+    print("TEST 2: LÍNEAS PARCIALES")
+    print("=" * 70)
+
+    parser = LogParser()
+
+    truncated = parser.parse('10.0.0.4 - - [10/Oct/2025:13:55:39] "GET /truncad')
+    check("Línea truncada recupera la petición", (
+        truncated is not None
+        and truncated.path == "/truncad"
+        and truncated.status_code == 200
+    ))
+
+    quoted = parser.parse(
+        '10.0.0.5 - - [10/Oct/2025:13:55:40] "GET /s?q="><script>alert(1)</script> HTTP/1.1" 403'
+    )
+    check("Comillas dentro del payload", (
+        quoted is not None
+        and quoted.request == 'GET /s?q="><script>alert(1)</script> HTTP/1.1'
+        and quoted.status_code == 403
+    ))
+
+    check("Basura devuelve None", parser.parse("esto no es un log") is None)
+    print()
+
+
+def test_timestamp_cache():
+    """Los timestamps repetidos se memoizan"""
+    print("=" * 70)
+    print("TEST 3: MEMOIZACIÓN DE TIMESTAMPS")
+    print("=" * 70)
+
+    parser = LogParser()
+    first = parser.parse_timestamp("04/Dec/2025:10:00:00 +0000")
+    second = parser.parse_timestamp("04/Dec/2025:10:00:00 +0000")
+
+    check("Misma instancia para el mismo segundo", first is second)
+    check("Timestamp inválido no se cachea", (
+        isinstance(parser.parse_timestamp("basura"), datetime)
+        and "basura" not in parser._timestamp_cache
+    ))
+    print()
+
+
+def main():
+    print("""
+╔═══════════════════════════════════════════════════════════════════╗
+║                                                                   ║
+║              🧪 TEST DEL TOKENIZADOR DE LOGS 🧪                    ║
+║                                                                   ║
+╚═══════════════════════════════════════════════════════════════════╝
+    """)
+
+    test_combined()
+    test_partial_lines()
+    test_timestamp_cache()
+
+    print("=" * 70)
+    print("✅ TODOS LOS TESTS COMPLETADOS")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
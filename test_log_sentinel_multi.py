@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test del LogSentinel multi-archivo (glob + cola compartida)
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+sys.path.insert(0, 'src')
+
+from core.nemesis_agent import NemesisAgent
+from logs.log_sentinel import LogSentinel
+
+
+LOGS = [
+    '192.168.1.100 - - [04/Dec/2025:10:00:00] "GET /index.html HTTP/1.1" 200\n',
+    '192.168.1.101 - - [04/Dec/2025:10:00:05] "GET /api/users HTTP/1.1" 200\n',
+    '192.168.1.102 - - [04/Dec/2025:10:00:10] "GET /login?user=admin\' OR \'1\'=\'1\'-- HTTP/1.1" 403\n',
+    '192.168.1.103 - - [04/Dec/2025:10:00:15] "GET /search?q=<script>alert(1)</script> HTTP/1.1" 403\n',
+]
+
+
+async def test_glob_fan_in():
+    """Varios vhosts con un único agente"""
+    print("=" * 70)
+    print("TEST 1: FAN-IN DE VARIOS ARCHIVOS (GLOB)")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for vhost in ("shop", "blog", "api"):
+            with open(os.path.join(tmp, f"{vhost}.access.log"), 'w') as f:
+                f.writelines(LOGS * 50)
+
+        agent = NemesisAgent()
+        sentinel = LogSentinel(
+            agent, os.path.join(tmp, "*.access.log"),
+            follow=False, workers=4, queue_size=64
+        )
+
+        await sentinel.start()
+
+        stats = sentinel.stats
+        print(f"   Archivos:           {len(stats['files'])}")
+        print(f"   Logs procesados:    {stats['logs_processed']}")
+        print(f"   Amenazas:           {stats['threats_detected']}")
+        for path, file_stats in stats['files'].items():
+            print(f"   • {os.path.basename(path)}: {file_stats}")
+
+        ok = stats['logs_processed'] == 3 * 200 and stats['threats_detected'] == 3 * 100
+        print(f"   {'✅' if ok else '❌'} Todas las líneas analizadas")
+    print()
+
+
+async def test_drop_when_full():
+    """Con drop_when_full las líneas sobrantes se cuentan como descartadas"""
+    print("=" * 70)
+    print("TEST 2: DESCARTE CON COLA LLENA")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = os.path.join(tmp, "burst.log")
+        with open(log_file, 'w') as f:
+            f.writelines(LOGS * 500)
+
+        agent = NemesisAgent()
+        sentinel = LogSentinel(
+            agent, [log_file], follow=False,
+            queue_size=8, drop_when_full=True
+        )
+
+        await sentinel.start()
+
+        file_stats = sentinel.stats['files'][log_file]
+        processed = sentinel.stats['logs_processed']
+        print(f"   Leídas: {file_stats['lines_read']}, "
+              f"descartadas: {file_stats['lines_dropped']}, procesadas: {processed}")
+
+        ok = file_stats['lines_read'] == processed + file_stats['lines_dropped']
+        print(f"   {'✅' if ok else '❌'} Contadores consistentes")
+    print()
+
+
+async def main():
+    print()
+    print("╔" + "═" * 68 + "╗")
+    print("║" + " " * 17 + "LOG SENTINEL MULTI-ARCHIVO - TESTS" + " " * 17 + "║")
+    print("╚" + "═" * 68 + "╝")
+    print()
+
+    await test_glob_fan_in()
+    await test_drop_when_full()
+
+    print("=" * 70)
+    print("✅ TODOS LOS TESTS COMPLETADOS")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
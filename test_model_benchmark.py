@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test del barrido de latencia/calidad de modelos
+"""
+
+import json
+import logging
+import os
+import sys
+import tempfile
+sys.path.insert(0, 'src')
+
+from ml.benchmark import best_within_budget, main as benchmark_main, run_sweep
+
+
+def test_sweep_report():
+    """Cada configuración reporta latencia, throughput, tamaño y F1"""
+    print("=" * 70)
+    print("TEST 1: INFORME DEL BARRIDO")
+    print("=" * 70)
+
+    report = run_sweep(
+        n_estimators=[5, 20], max_depths=[6, None], feature_sets=["agent", "v2"],
+        n_samples=2000, batch_sizes=[1, 64, 512], latency_rows=100, budget_us=1e6
+    )
+    results = report["results"]
+    print(f"   Configuraciones: {len(results)}")
+    print(f"   {'✅' if len(results) == 8 else '❌'} 2 x 2 x 2 combinaciones")
+
+    ok = all(
+        r["quality"]["f1"] > 0
+        and r[runtime]["latency"]["p50_us"] <= r[runtime]["latency"]["p99_us"]
+        and set(r[runtime]["throughput_rows_per_s"]) == {"1", "64", "512"}
+        and r["size"]["joblib_bytes"] > 0 and r["size"]["compiled_memory_bytes"] > 0
+        for r in results for runtime in ("sklearn", "compiled")
+    )
+    print(f"   {'✅' if ok else '❌'} p50/p99, throughput por lote, tamaños y F1")
+
+    deep = [r for r in results if r["max_depth"] is None and r["n_estimators"] == 20]
+    shallow = [r for r in results if r["max_depth"] == 6 and r["n_estimators"] == 5]
+    ok = all(d["node_count"] > s["node_count"] for d, s in zip(deep, shallow))
+    print(f"   {'✅' if ok else '❌'} Más árboles y profundidad -> más nodos")
+
+    ok = all(
+        r["compiled"]["throughput_rows_per_s"]["512"] > r["compiled"]["throughput_rows_per_s"]["1"]
+        for r in results
+    )
+    print(f"   {'✅' if ok else '❌'} Los lotes grandes aumentan el throughput")
+
+    best = report["recommended"]
+    ok = best is not None and best["f1"] == max(r["quality"]["f1"] for r in results)
+    print(f"   {'✅' if ok else '❌'} Presupuesto holgado -> mejor F1 ({best['feature_set']}, "
+          f"{best['n_estimators']} árboles, depth {best['max_depth']})")
+
+    fastest = min(r["compiled"]["latency"]["p99_us"] for r in results)
+    ok = best_within_budget(results, fastest / 2) is None
+    print(f"   {'✅' if ok else '❌'} Presupuesto imposible -> sin recomendación")
+    print()
+
+
+def test_cli_json():
+    """La CLI escribe un informe JSON legible por máquina"""
+    print("=" * 70)
+    print("TEST 2: CLI E INFORME JSON")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "report.json")
+        benchmark_main([
+            "--n-estimators", "5", "--max-depth", "0", "--feature-sets", "v2_signatures",
+            "--samples", "1000", "--batch-sizes", "1", "32", "--latency-rows", "50",
+            "--budget-us", "100000", "-o", output,
+        ])
+
+        with open(output) as f:
+            report = json.load(f)
+
+        ok = report["results"][0]["max_depth"] is None and report["results"][0]["n_features"] == 3
+        print(f"   {'✅' if ok else '❌'} max_depth 0 -> sin límite, 3 features")
+        ok = {"environment", "parameters", "results", "recommended"} <= set(report)
+        print(f"   {'✅' if ok else '❌'} Entorno, parámetros, resultados y recomendación")
+    print()
+
+
+def main():
+    print("""
+╔═══════════════════════════════════════════════════════════════════╗
+║                                                                   ║
+║              🧪 TEST DEL BENCHMARK DE MODELOS 🧪                   ║
+║                                                                   ║
+╚═══════════════════════════════════════════════════════════════════╝
+    """)
+
+    logging.getLogger().setLevel(logging.ERROR)
+
+    test_sweep_report()
+    test_cli_json()
+
+    print("=" * 70)
+    print("✅ TODOS LOS TESTS COMPLETADOS")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Test de la recarga en caliente del modelo (validación, canario, swap y rollback)
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, 'src')
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from core.model_reloader import ModelReloader
+from core.nemesis_agent import NemesisAgent
+from logs.log_parser import LogParser
+
+
+BENIGN = '10.0.0.{i} - - [04/Dec/2025:10:00:00] "GET /products?page={i} HTTP/1.1" 200 512'
+ATTACK = '10.0.1.{i} - - [04/Dec/2025:10:00:00] "GET /login?user=admin\' OR \'1\'=\'{i}\'-- HTTP/1.1" 403 0'
+
+
+class FlakyModel:
+    """Modelo que pasa el canario y falla en producción"""
+
+    # Validación + ejecuciones cronometradas del canario
+    def __init__(self, model, healthy_calls=1 + ModelReloader.CANARY_RUNS):
+        self.model = model
+        self.classes_ = model.classes_
+        self.calls = 0
+        self.healthy_calls = healthy_calls
+
+    def predict_proba(self, X):
+        self.calls += 1
+        if self.calls > self.healthy_calls:
+            raise RuntimeError("modelo corrupto")
+        return self.model.predict_proba(X)
+
+
+class SlowModel:
+    """Modelo correcto pero muy por encima del límite de latencia"""
+
+    def __init__(self, model, delay=0.2):
+        self.model = model
+        self.classes_ = model.classes_
+        self.n_features_in_ = model.n_features_in_
+        self.delay = delay
+
+    def predict_proba(self, X):
+        time.sleep(self.delay)
+        return self.model.predict_proba(X)
+
+
+def make_events(n=400):
+    parser = LogParser()
+    return [
+        parser.parse((ATTACK if i % 4 == 0 else BENIGN).format(i=i))
+        for i in range(n)
+    ]
+
+
+def train(events, n_estimators, random_state):
+    """RandomForest con las 3 features del agente"""
+    agent = NemesisAgent(verdict_cache_size=0)
+    X = [agent._extract_features(e) for e in events]
+    y = [int(e.status_code == 403) for e in events]
+    return RandomForestClassifier(
+        n_estimators=n_estimators, random_state=random_state, n_jobs=1
+    ).fit(X, y)
+
+
+async def test_hot_swap():
+    """La detección sigue durante la carga y el cambio es atómico"""
+    print("=" * 70)
+    print("TEST 1: SWAP SIN PAUSAR LA DETECCIÓN")
+    print("=" * 70)
+
+    events = make_events()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path_a = os.path.join(tmp, "brain_a.joblib")
+        path_b = os.path.join(tmp, "brain_b.joblib")
+        joblib.dump(train(events, 30, 1), path_a)
+        model_b = train(events, 40, 2)   # coste parecido: lejos del límite de latencia
+        joblib.dump(model_b, path_b)
+
+        agent = NemesisAgent(model_path=path_a, verdict_cache_size=0)
+        agent._load_ai_brain()
+        await agent.analyze_events(events)
+
+        future = agent.reload_model(path_b)
+        batches, slowest = 0, 0.0
+        while not future.done():
+            started = time.perf_counter()
+            await agent.analyze_events(events[:50])
+            slowest = max(slowest, time.perf_counter() - started)
+            batches += 1
+            await asyncio.sleep(0)
+
+        report = future.result()
+        print(f"   Informe: accepted={report['accepted']} format={report['format']} "
+              f"load={report['load_ms']:.0f} ms canario={report['canary_size']} "
+              f"acuerdo={report['agreement']:.0%} latencia x{report['latency_ratio']:.1f}")
+        print(f"   Lotes procesados durante la recarga: {batches} (el más lento {slowest * 1000:.1f} ms)")
+        print(f"   {'✅' if batches > 0 else '❌'} La detección no espera a la carga")
+
+        ok = report['accepted'] and agent._ai_brain is not None and agent.model_path == path_b
+        print(f"   {'✅' if ok else '❌'} Modelo nuevo activo tras validar el canario")
+
+        verdicts = await agent.analyze_events(events)
+        expected = model_b.predict_proba([agent._extract_features(e) for e in events])
+        ok = [v.confidence for v in verdicts] == [float(p.max()) for p in expected]
+        print(f"   {'✅' if ok else '❌'} Veredictos del modelo nuevo")
+
+        ok = agent.rollback_model() and agent.model_path == path_a
+        print(f"   {'✅' if ok else '❌'} Rollback manual al modelo anterior")
+        agent._reloader.close()
+    print()
+
+
+async def test_rejected_models():
+    """Modelos inválidos no sustituyen al activo"""
+    print("=" * 70)
+    print("TEST 2: VALIDACIÓN Y RECHAZO")
+    print("=" * 70)
+
+    events = make_events()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "brain.joblib")
+        joblib.dump(train(events, 10, 1), path)
+
+        agent = NemesisAgent(model_path=path, verdict_cache_size=0)
+        agent._load_ai_brain()
+        await agent.analyze_events(events)
+        active = agent._ai_brain
+
+        corrupt = os.path.join(tmp, "corrupt.joblib")
+        with open(corrupt, 'wb') as f:
+            f.write(b"no es un modelo")
+
+        # Modelo con otro número de features (como los V2 de 5 features)
+        wrong_shape = os.path.join(tmp, "five_features.joblib")
+        joblib.dump(RandomForestClassifier(n_estimators=5).fit(np.random.rand(40, 5), [0, 1] * 20), wrong_shape)
+
+        # Modelo que discrepa en todo con el activo
+        inverted = os.path.join(tmp, "inverted.joblib")
+        X = [agent._extract_features(e) for e in events]
+        joblib.dump(RandomForestClassifier(n_estimators=5, random_state=0).fit(
+            X, [int(e.status_code != 403) for e in events]), inverted)
+
+        # Mismos veredictos, pero 200 ms por lote (el activo tarda ~1 ms)
+        slow = os.path.join(tmp, "slow.joblib")
+        joblib.dump(SlowModel(active), slow)
+
+        for name, candidate in (("archivo corrupto", corrupt), ("5 features", wrong_shape),
+                                ("veredictos invertidos", inverted), ("latencia", slow)):
+            report = agent.reload_model(candidate).result()
+            ok = not report['accepted'] and agent._ai_brain is active and agent.model_path == path
+            print(f"   {'✅' if ok else '❌'} Rechazado ({name}): {report['reason']}")
+
+        print(f"   Estadísticas: {agent.reload_stats['rejected']} rechazados, {agent.reload_stats['swaps']} swaps")
+        agent._reloader.close()
+    print()
+
+
+async def test_rollback_on_failure():
+    """Un modelo que falla tras el swap se revierte solo"""
+    print("=" * 70)
+    print("TEST 3: ROLLBACK AUTOMÁTICO")
+    print("=" * 70)
+
+    events = make_events()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "brain.joblib")
+        model = train(events, 10, 1)
+        joblib.dump(model, path)
+
+        flaky = os.path.join(tmp, "flaky.joblib")
+        joblib.dump(FlakyModel(model), flaky)
+
+        agent = NemesisAgent(model_path=path, verdict_cache_size=0)
+        agent._load_ai_brain()
+        await agent.analyze_events(events)
+        active = agent._ai_brain
+
+        report = agent.reload_model(flaky).result()
+        print(f"   {'✅' if report['accepted'] else '❌'} Canario superado")
+
+        verdicts = await agent.analyze_events(events)   # el modelo nuevo falla -> reglas
+        ok = all(v is not None for v in verdicts)
+        print(f"   {'✅' if ok else '❌'} El lote fallido se resuelve con reglas")
+
+        ok = agent._ai_brain is active and agent.model_path == path
+        print(f"   {'✅' if ok else '❌'} Vuelta automática al modelo anterior")
+        print(f"   Rollbacks: {agent.reload_stats['rollbacks']}")
+        agent._reloader.close()
+    print()
+
+
+async def test_watch_model_file():
+    """Un modelo nuevo copiado en la ruta se carga solo"""
+    print("=" * 70)
+    print("TEST 4: VIGILANCIA DEL ARCHIVO DEL MODELO")
+    print("=" * 70)
+
+    events = make_events()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "nemesis_brain_v2.joblib")
+        joblib.dump(train(events, 10, 1), path)
+
+        agent = NemesisAgent(model_path=path, verdict_cache_size=0)
+        agent._load_ai_brain()
+        await agent.analyze_events(events)
+        agent.watch_model(interval=0.05)
+        active = agent._ai_brain
+
+        # Despliegue: escribir aparte y renombrar
+        tmp_path = os.path.join(tmp, "new.joblib")
+        joblib.dump(train(events, 30, 9), tmp_path)
+        os.replace(tmp_path, path)
+
+        deadline = time.monotonic() + 10
+        while agent._ai_brain is active and time.monotonic() < deadline:
+            await agent.analyze_events(events[:20])
+            await asyncio.sleep(0.05)
+
+        ok = agent._ai_brain is not active and agent.reload_stats['swaps'] == 1
+        print(f"   {'✅' if ok else '❌'} Cambio detectado y modelo recargado en caliente")
+        agent._reloader.close()
+    print()
+
+
+async def main():
+    print("""
+╔═══════════════════════════════════════════════════════════════════╗
+║                                                                   ║
+║            🧪 TEST DE RECARGA EN CALIENTE DEL MODELO 🧪            ║
+║                                                                   ║
+╚═══════════════════════════════════════════════════════════════════╝
+    """)
+
+    logging.getLogger().setLevel(logging.ERROR)
+
+    await test_hot_swap()
+    await test_rejected_models()
+    await test_rollback_on_failure()
+    await test_watch_model_file()
+
+    print("=" * 70)
+    print("✅ TODOS LOS TESTS COMPLETADOS")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
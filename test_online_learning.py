@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Test del aprendizaje online con feedback de analistas
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, 'src')
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from core.nemesis_agent import NemesisAgent
+from database.threat_database import ThreatDatabase
+from logs.log_parser import LogParser
+from ml.batch_features import text_statistics
+from ml.online_learner import FeedbackLearner, StackedModel, main as learner_main
+from ml.train_brain import DatasetGeneratorV2
+
+
+# Búsquedas legítimas con comillas y paréntesis: el bosque las marca
+FALSE_POSITIVE = "GET /search?q=O'Brien+({i})+\"jazz\"&sort=[asc] HTTP/1.1"
+LOG_LINE = '10.0.2.{i} - - [04/Dec/2025:10:00:00] "{request}" 200 512'
+
+
+def train_base(path, n_samples=3000):
+    """Bosque con las 3 features del agente sobre el dataset sintético"""
+    payloads, labels = DatasetGeneratorV2(n_samples=n_samples).generate_dataset()
+    model = RandomForestClassifier(n_estimators=30, random_state=0, n_jobs=1)
+    model.fit(text_statistics(payloads), labels)
+    joblib.dump(model, path)
+    return model, payloads, np.array(labels)
+
+
+def test_feedback_table():
+    """Las correcciones se guardan y se leen en orden"""
+    print("=" * 70)
+    print("TEST 1: TABLA DE FEEDBACK")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ThreatDatabase(os.path.join(tmp, "nemesis.db"))
+
+        first = db.save_feedback("GET /search?q=O'Brien HTTP/1.1", 0, source_ip="10.0.0.1", analyst="ana")
+        second = db.save_feedback("GET /a?id=1 UNION SELECT 1 HTTP/1.1", 1, note="falso negativo")
+
+        rows = db.get_feedback()
+        ok = [r['id'] for r in rows] == [first, second] and [r['label'] for r in rows] == [0, 1]
+        print(f"   {'✅' if ok else '❌'} Feedback guardado y leído en orden de inserción")
+
+        ok = [r['id'] for r in db.get_feedback(after_id=first)] == [second]
+        print(f"   {'✅' if ok else '❌'} Lectura incremental desde el último ID")
+
+        try:
+            db.save_feedback("GET / HTTP/1.1", 2)
+            ok = False
+        except ValueError:
+            ok = True
+        print(f"   {'✅' if ok else '❌'} Etiqueta inválida -> ValueError")
+        db.close()
+    print()
+
+
+def test_incremental_correction():
+    """El feedback corrige falsos positivos en segundos sin reentrenar"""
+    print("=" * 70)
+    print("TEST 2: CORRECCIÓN INCREMENTAL")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base_path = os.path.join(tmp, "brain.joblib")
+        output_path = os.path.join(tmp, "brain_online.joblib")
+        model, payloads, labels = train_base(base_path)
+
+        false_positives = [FALSE_POSITIVE.format(i=i) for i in range(40)]
+        reported, unseen = false_positives[:20], false_positives[20:]
+        flagged = model.predict(text_statistics(false_positives)).mean()
+        print(f"   Falsos positivos marcados por el bosque: {flagged:.0%}")
+
+        db = ThreatDatabase(os.path.join(tmp, "nemesis.db"))
+        learner = FeedbackLearner(db, base_path, output_path, anchor_payloads=payloads)
+
+        report = learner.update()
+        ok = report['new_feedback'] == 0 and not report['published'] and not os.path.exists(output_path)
+        print(f"   {'✅' if ok else '❌'} Sin feedback no se publica nada")
+
+        for payload in reported:
+            db.save_feedback(payload, 0)
+
+        report = learner.update()
+        print(f"   Actualización: {report['new_feedback']} correcciones en {report['update_ms']:.0f} ms")
+        print(f"   {'✅' if report['update_ms'] < 5000 else '❌'} Adaptación en segundos")
+
+        stacked = joblib.load(output_path)
+        ok = report['published'] and isinstance(stacked, StackedModel) and stacked.version == 1
+        print(f"   {'✅' if ok else '❌'} Modelo corregido publicado ({os.path.getsize(output_path):,} bytes)")
+
+        still_flagged = stacked.predict(text_statistics(unseen)).mean()
+        print(f"   {'✅' if still_flagged < flagged else '❌'} Falsos positivos similares no reportados: "
+              f"{flagged:.0%} -> {still_flagged:.0%}")
+
+        X = text_statistics(payloads)
+        agreement = np.mean(stacked.predict(X) == model.predict(X))
+        accuracy = np.mean(stacked.predict(X) == labels)
+        print(f"   Acuerdo con el bosque: {agreement:.1%} | accuracy: {accuracy:.1%}")
+        print(f"   {'✅' if agreement > 0.9 else '❌'} No olvida lo que el bosque ya sabía")
+
+        # Un feedback posterior no deshace las correcciones anteriores
+        db.save_feedback("GET /admin?cmd=;cat%20/etc/passwd HTTP/1.1", 1)
+        report = learner.update()
+        stacked = joblib.load(output_path)
+        ok = report['version'] == 2 and stacked.predict(text_statistics(reported)).mean() < flagged
+        print(f"   {'✅' if ok else '❌'} Las correcciones anteriores se conservan (versión {report['version']})")
+        db.close()
+    print()
+
+
+async def test_publish_to_agent():
+    """Los agentes en marcha recargan el modelo corregido en caliente"""
+    print("=" * 70)
+    print("TEST 3: PUBLICACIÓN EN AGENTES EN MARCHA")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base_path = os.path.join(tmp, "brain.joblib")
+        output_path = os.path.join(tmp, "brain_online.joblib")
+        _, payloads, _ = train_base(base_path)
+
+        agent = NemesisAgent(model_path=base_path)
+        agent._load_ai_brain()
+
+        parser = LogParser()
+        events = [
+            parser.parse(LOG_LINE.format(i=i, request=FALSE_POSITIVE.format(i=i)))
+            for i in range(40)
+        ]
+        # Tráfico variado antes (es el lote canario de la recarga)
+        traffic = [
+            parser.parse(LOG_LINE.format(i=i % 250, request=payload))
+            for i, payload in enumerate(payloads[:500])
+        ]
+        await agent.analyze_events(traffic)
+        before = await agent.analyze_events(events)
+        blocked_before = sum(v.is_malicious for v in before)
+
+        db = ThreatDatabase(os.path.join(tmp, "nemesis.db"))
+        learner = FeedbackLearner(db, base_path, output_path, anchor_payloads=payloads, targets=[agent])
+        learner.start(interval=0.05)
+
+        start = time.perf_counter()
+        for event in events[:20]:
+            db.save_feedback(event.payload, 0, source_ip=event.source_ip)
+        learner.request_update()
+
+        deadline = time.monotonic() + 30
+        while agent.model_path != output_path and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - start
+        learner.close()
+
+        ok = agent.model_path == output_path and isinstance(agent._ai_brain, StackedModel)
+        print(f"   {'✅' if ok else '❌'} Modelo corregido activo en el agente ({elapsed:.2f} s desde el feedback)")
+        print(f"   Canario: acuerdo {agent.reload_stats['last_report'].get('agreement', 0):.0%}")
+
+        after = await agent.analyze_events(events)
+        blocked_after = sum(v.is_malicious for v in after)
+        print(f"   {'✅' if blocked_after < blocked_before else '❌'} Falsos positivos: "
+              f"{blocked_before} -> {blocked_after} de {len(events)}")
+
+        agent._reloader.close()
+        db.close()
+    print()
+
+
+def test_base_model_features():
+    """El featurizador se ajusta al bosque base (modelos v2 de 5 features)"""
+    print("=" * 70)
+    print("TEST 4: FEATURES DEL BOSQUE BASE")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "nemesis.db")
+        output_path = os.path.join(tmp, "brain_online.joblib")
+        db = ThreatDatabase(db_path)
+        for i in range(10):
+            db.save_feedback(FALSE_POSITIVE.format(i=i), 0)
+        db.close()
+
+        # CLI con sus valores por defecto: models/nemesis_brain_v2.joblib
+        try:
+            code = learner_main(["--db", db_path, "--output", output_path, "--once"])
+            stacked = joblib.load(output_path)
+            ok = code == 0 and stacked.n_features_in_ == 5
+        except Exception as e:
+            print(f"   {e}")
+            ok = False
+        print(f"   {'✅' if ok else '❌'} La CLI publica sobre el modelo v2 (5 features)")
+
+        base_path = os.path.join(tmp, "brain.joblib")
+        _, payloads, _ = train_base(base_path, n_samples=500)
+        db = ThreatDatabase(db_path)
+        learner = FeedbackLearner(
+            db, base_path, output_path, anchor_payloads=payloads,
+            featurize=lambda batch: np.zeros((len(batch), 5))
+        )
+        try:
+            learner.update()
+            ok = False
+        except ValueError as e:
+            ok = "espera 3" in str(e)
+        print(f"   {'✅' if ok else '❌'} Featurizador incompatible -> ValueError al arrancar")
+        db.close()
+    print()
+
+
+async def main():
+    print("""
+╔═══════════════════════════════════════════════════════════════════╗
+║                                                                   ║
+║            🧪 TEST DE APRENDIZAJE ONLINE CON FEEDBACK 🧪           ║
+║                                                                   ║
+╚═══════════════════════════════════════════════════════════════════╝
+    """)
+
+    logging.getLogger().setLevel(logging.ERROR)
+
+    test_feedback_table()
+    test_incremental_correction()
+    await test_publish_to_agent()
+    test_base_model_features()
+
+    print("=" * 70)
+    print("✅ TODOS LOS TESTS COMPLETADOS")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
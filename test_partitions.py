@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Test del almacenamiento particionado de amenazas (retención y archivo)
+"""
+
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+sys.path.insert(0, 'src')
+
+from database.partitions import iter_archive
+from database.threat_database import ThreatDatabase, ThreatRecord
+from ml.dataset_pipeline import iter_database_chunks
+
+
+START = datetime(2025, 10, 1)
+
+
+def make_threats(n, start=START, step=timedelta(minutes=30)):
+    return [
+        ThreatRecord(
+            None, start + i * step, f"10.0.{i % 7}.{i % 50}",
+            "SQL_INJECTION" if i % 3 else "XSS", f"/login?id={i}' OR 1=1--", 0.95, "BLOCK", True
+        )
+        for i in range(n)
+    ]
+
+
+def partition_tables(db_path):
+    conn = sqlite3.connect(db_path)
+    names = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB 'threats_[0-9]*' ORDER BY name"
+    )]
+    conn.close()
+    return names
+
+
+def test_partitioning():
+    """Una tabla por mes, vista threats e IDs globales"""
+    print("=" * 70)
+    print("TEST 1: PARTICIONES POR MES")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "nemesis.db")
+        db = ThreatDatabase(db_path, stats_flush_interval=None)
+
+        # Octubre a diciembre de 2025, cada 30 minutos
+        threats = make_threats(4000)
+        db.save_threats(threats[:3000])
+        ids = [db.save_threat(threat) for threat in threats[3000:]]
+
+        tables = partition_tables(db_path)
+        print(f"   Particiones: {', '.join(tables)}")
+        ok = {"threats_2025_10", "threats_2025_11", "threats_2025_12"} <= set(tables)
+        print(f"   {'✅' if ok else '❌'} Una tabla por mes (más la del mes actual)")
+
+        total = db.conn.execute("SELECT COUNT(*) FROM threats").fetchone()[0]
+        ok = total == 4000 and ids == list(range(3001, 4001))
+        print(f"   {'✅' if ok else '❌'} Vista threats con {total} filas, IDs globales consecutivos")
+
+        latest = db.get_threats(limit=5)
+        threat = db.get_threat(ids[0])
+        ok = [t.timestamp for t in latest] == sorted((t.timestamp for t in threats), reverse=True)[:5]
+        ok = ok and threat is not None and threat.timestamp == threats[3000].timestamp
+        print(f"   {'✅' if ok else '❌'} get_threats y get_threat sobre varias particiones")
+        db.close()
+    print()
+
+
+def test_pruning():
+    """Las consultas por rango solo tocan las particiones que lo solapan"""
+    print("=" * 70)
+    print("TEST 2: CONSULTAS QUE SOLO TOCAN SUS PARTICIONES")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ThreatDatabase(os.path.join(tmp, "nemesis.db"), stats_flush_interval=None, readers=1)
+        db.save_threats(make_threats(24 * 365, step=timedelta(hours=1)))
+
+        queries = []
+        with db.connections.read() as conn:
+            conn.set_trace_callback(queries.append)
+
+        since, until = datetime(2026, 2, 10), datetime(2026, 2, 11)
+        count = db.count_threats(since=since, until=until)
+        window = db.get_threats(limit=1000, since=since, until=until, attack_type="XSS")
+        touched = {name for query in queries for name in query.split() if name.startswith("threats_")}
+
+        with db.connections.read() as conn:
+            conn.set_trace_callback(None)
+
+        ok = count == 24 and len(window) == 8 and touched == {"threats_2026_02"}
+        print(f"   {'✅' if ok else '❌'} Un día de febrero: {count} amenazas, "
+              f"particiones consultadas: {', '.join(sorted(touched))}")
+
+        start = time.perf_counter()
+        for _ in range(100):
+            db.count_threats(since=since, until=until)
+        per_query = (time.perf_counter() - start) / 100 * 1000
+        print(f"   count_threats de un día: {per_query:.2f} ms")
+
+        latest = db.get_threats(limit=10)
+        ok = latest[0].timestamp == START + timedelta(hours=24 * 365 - 1)
+        print(f"   {'✅' if ok else '❌'} Las últimas amenazas salen de la partición más reciente")
+        db.close()
+    print()
+
+
+def test_retention():
+    """Las particiones antiguas se archivan comprimidas y se eliminan"""
+    print("=" * 70)
+    print("TEST 3: RETENCIÓN Y ARCHIVO")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "nemesis.db")
+        db = ThreatDatabase(db_path, stats_flush_interval=None)
+        threats = make_threats(4000)
+        db.save_threats(threats)
+        db.close()
+
+        # Al abrirla se aplicaría con la fecha real: aquí, a 15 de enero de 2026 (octubre y noviembre caducan)
+        db = ThreatDatabase(db_path, stats_flush_interval=None, archive_dir=os.path.join(tmp, "cold"))
+        db.partitions.retention_days = 40
+        archives = db.apply_retention(now=datetime(2026, 1, 15))
+
+        archived = sum(1 for path in archives for _ in iter_archive(path))
+        kept = db.get_statistics()["total_threats"]
+        october = sum(1 for t in threats if t.timestamp.month == 10)
+        november = sum(1 for t in threats if t.timestamp.month == 11)
+        ok = len(archives) == 2 and archived == october + november and kept == 4000 - archived
+        print(f"   {'✅' if ok else '❌'} {len(archives)} particiones archivadas ({archived} amenazas), "
+              f"{kept} en la BD")
+
+        rows = list(iter_archive(archives[0]))
+        ok = rows[0]["id"] == 1 and rows[0]["timestamp"] == threats[0].timestamp.isoformat()
+        ok = ok and not {"threats_2025_10", "threats_2025_11"} & set(partition_tables(db_path))
+        print(f"   {'✅' if ok else '❌'} Archivos .jsonl.gz completos y tablas eliminadas")
+
+        ok = db.count_threats(until=datetime(2025, 12, 1)) == 0
+        db.save_threat(make_threats(1, start=datetime(2025, 10, 20))[0])
+        ok = ok and db.count_threats(until=datetime(2025, 12, 1)) == 1
+        print(f"   {'✅' if ok else '❌'} Amenazas tardías de un mes archivado recrean su partición")
+        db.close()
+    print()
+
+
+def test_migration():
+    """Una BD con la tabla threats clásica se migra conservando los IDs"""
+    print("=" * 70)
+    print("TEST 4: MIGRACIÓN DE LA TABLA CLÁSICA")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "legacy.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("""
+            CREATE TABLE threats (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL,
+                source_ip TEXT NOT NULL, attack_type TEXT NOT NULL, payload TEXT NOT NULL,
+                confidence REAL NOT NULL, action_taken TEXT NOT NULL, blocked BOOLEAN NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX idx_threats_timestamp ON threats(timestamp)")
+        conn.executemany(
+            "INSERT INTO threats (timestamp, source_ip, attack_type, payload, confidence, action_taken, blocked) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(t.timestamp.isoformat(), t.source_ip, t.attack_type, t.payload, t.confidence,
+              t.action_taken, t.blocked) for t in make_threats(3000)]
+        )
+        conn.execute("DELETE FROM threats WHERE id > 2990")
+        conn.commit()
+        conn.close()
+
+        db = ThreatDatabase(db_path, stats_flush_interval=None)
+        stored = db.count_threats()
+        first = db.get_threat(1)
+        new_id = db.save_threat(make_threats(1)[0])
+
+        ok = stored == 2990 and first.timestamp == START and new_id == 3001
+        print(f"   {'✅' if ok else '❌'} {stored} amenazas migradas a {len(partition_tables(db_path))} "
+              f"particiones, IDs conservados (nuevo ID {new_id})")
+        db.close()
+
+        payloads = sum(
+            len(chunk) for chunk, _ in iter_database_chunks(db_path, chunksize=500, include_threats=True)
+        )
+        print(f"   {'✅' if payloads == 2991 else '❌'} dataset_pipeline lee todas las particiones ({payloads})")
+    print()
+
+
+def test_other_process_retention():
+    """Un proceso que ya escribió en una partición sigue escribiendo tras archivarla otro"""
+    print("=" * 70)
+    print("TEST 5: RETENCIÓN DESDE OTRO PROCESO")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "nemesis.db")
+        writer = ThreatDatabase(db_path, stats_flush_interval=None)
+        writer.save_threats(make_threats(4000))
+
+        janitor = ThreatDatabase(db_path, stats_flush_interval=None, archive_dir=os.path.join(tmp, "cold"))
+        janitor.partitions.retention_days = 40
+        archives = janitor.apply_retention(now=datetime(2026, 1, 15))
+
+        # El escritor aún recuerda threats_2025_10 como viva
+        late = make_threats(10, start=datetime(2025, 10, 20))
+        saved = writer.save_threats(late)
+        writer.save_threat(make_threats(1, start=datetime(2025, 11, 2))[0])
+
+        recovered = janitor.count_threats(until=datetime(2025, 12, 1))
+        ok = len(archives) == 2 and saved == 10 and recovered == 11
+        ok = ok and {"threats_2025_10", "threats_2025_11"} <= set(partition_tables(db_path))
+        print(f"   {'✅' if ok else '❌'} Amenazas tardías tras el archivo de otro proceso: "
+              f"{recovered} guardadas, particiones recreadas")
+
+        # Ahora es el janitor quien recuerda threats_2025_10
+        janitor.save_threat(make_threats(1, start=datetime(2025, 10, 21))[0])
+        writer.partitions.retention_days = 40
+        writer.partitions.archive_dir = janitor.partitions.archive_dir
+        archives = writer.apply_retention(now=datetime(2026, 1, 15))
+        ok = len(archives) == 2 and janitor.count_threats(until=datetime(2025, 12, 1)) == 0
+        ok = ok and sum(1 for path in archives for _ in iter_archive(path)) == 12
+        print(f"   {'✅' if ok else '❌'} El escritor relee el catálogo al aplicar la retención")
+
+        janitor.save_threat(make_threats(1, start=datetime(2025, 10, 22))[0])
+        ok = writer.count_threats(until=datetime(2025, 12, 1)) == 1
+        print(f"   {'✅' if ok else '❌'} Y el otro proceso vuelve a recrear la partición")
+        janitor.close()
+        writer.close()
+    print()
+
+
+def test_retention_edge_cases():
+    """Sin particiones vivas la vista sigue funcionando; un fallo no deja archivos"""
+    print("=" * 70)
+    print("TEST 6: RETENCIÓN SIN PARTICIONES Y CON FALLOS")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cold = os.path.join(tmp, "cold")
+        db = ThreatDatabase(
+            os.path.join(tmp, "nemesis.db"), stats_flush_interval=None,
+            partition_by="day", archive_dir=cold
+        )
+        db.save_threats(make_threats(96, start=datetime.now() - timedelta(days=3)))
+        db.partitions.retention_days = 1
+
+        def failing(conn, start, end):
+            raise sqlite3.OperationalError("disco lleno")
+
+        db.partitions.on_archive.append(failing)
+        for _ in range(3):
+            try:
+                db.apply_retention(now=datetime.now() + timedelta(days=30))
+            except sqlite3.OperationalError:
+                pass
+        db.partitions.on_archive.remove(failing)
+        ok = not os.listdir(cold) and db.count_threats() == 96
+        print(f"   {'✅' if ok else '❌'} Archivo fallido tres veces: {len(os.listdir(cold))} archivos, "
+              f"{db.count_threats()} amenazas intactas")
+
+        archives = db.apply_retention(now=datetime.now() + timedelta(days=30))
+        live = db.partitions.stats["live_partitions"]
+        ok = live == 0 and len(archives) == len(os.listdir(cold)) >= 4
+        ok = ok and db.count_threats() == 0 and db.get_threats(limit=5) == []
+        print(f"   {'✅' if ok else '❌'} Todas las particiones archivadas ({len(archives)}): "
+              f"la vista threats sigue consultable")
+
+        db.save_threat(make_threats(1, start=datetime.now())[0])
+        ok = db.count_threats() == 1
+        print(f"   {'✅' if ok else '❌'} Y vuelve a recibir amenazas")
+        db.close()
+    print()
+
+
+def main():
+    print("""
+╔═══════════════════════════════════════════════════════════════════╗
+║                                                                   ║
+║          🧪 TEST DE PARTICIONES, RETENCIÓN Y ARCHIVO 🧪            ║
+║                                                                   ║
+╚═══════════════════════════════════════════════════════════════════╝
+    """)
+
+    logging.getLogger().setLevel(logging.ERROR)
+
+    test_partitioning()
+    test_pruning()
+    test_retention()
+    test_migration()
+    test_other_process_retention()
+    test_retention_edge_cases()
+
+    print("=" * 70)
+    print("✅ TODOS LOS TESTS COMPLETADOS")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
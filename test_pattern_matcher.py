@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Test del autómata de firmas (Aho-Corasick) compartido por el agente y las features
+"""
+
+import random
+import sys
+import time
+sys.path.insert(0, 'src')
+
+from ml.pattern_matcher import (
+    PatternMatcher, SQL_KEYWORDS, XSS_PATTERNS, CMD_PATTERNS,
+    identify_attack_type, signature_counts
+)
+from ml.train_brain import DatasetGeneratorV2, FeatureExtractorV2
+
+
+def legacy_counts(text):
+    """Implementación anterior (una búsqueda por firma)"""
+    text_lower = text.lower()
+    sql = sum(1 for keyword in SQL_KEYWORDS if keyword in text_lower)
+
+    count = sum(1 for pattern in XSS_PATTERNS if pattern in text_lower)
+    count += sum(1 for pattern in CMD_PATTERNS if pattern in text_lower)
+    if '../' in text or '..\\' in text or '..%2f' in text_lower:
+        count += 2
+    for op in [';', '|', '&', '`', '$']:
+        if op in text:
+            for part in text.split(op)[1:]:
+                if any(cmd in part.lower() for cmd in ['cat', 'ls', 'whoami', 'id', 'pwd']):
+                    count += 3
+
+    return sql, count
+
+
+def legacy_attack_type(payload):
+    """Clasificación anterior de NemesisAgent._identify_attack_type"""
+    lower = payload.lower()
+    if any(p in lower for p in ["'", "or", "union", "select", "insert", "drop", "--", ";--"]):
+        return "SQL_INJECTION"
+    if any(p in lower for p in ["<script", "javascript:", "onerror", "onload"]):
+        return "XSS"
+    if "../" in payload or "..\\" in payload:
+        return "PATH_TRAVERSAL"
+    if any(c in payload for c in ["|", "&", ";", "`", "$"]):
+        return "COMMAND_INJECTION"
+    return "UNKNOWN"
+
+
+def sample_payloads():
+    """Dataset de entrenamiento + payloads aleatorios con firmas mezcladas"""
+    random.seed(7)
+    payloads, _ = DatasetGeneratorV2(n_samples=2000).generate_dataset()
+    payloads = [FeatureExtractorV2.normalize_payload(p) for p in payloads]
+
+    pieces = SQL_KEYWORDS + XSS_PATTERNS + CMD_PATTERNS + [
+        ';', '|', '&', '`', '$', '../', '..\\', '..%2F', "'", '--', 'OR',
+        'SeLeCt', 'x', ' ', '/', 'İ', 'ß', 'é'
+    ]
+    for _ in range(3000):
+        payloads.append(''.join(random.choice(pieces) for _ in range(random.randint(0, 12))))
+
+    return payloads
+
+
+def test_automaton():
+    """Coincidencias solapadas y firmas repetidas entre categorías"""
+    print("=" * 70)
+    print("TEST 1: AUTÓMATA")
+    print("=" * 70)
+
+    matcher = PatternMatcher({"a": ["he", "she", "hers"], "b": ["his", "HE"]})
+    found = matcher.found("uSHErs and his")
+
+    ok = found == {"a": {"he", "she", "hers"}, "b": {"his", "he"}}
+    print(f"   Encontradas: {found}")
+    print(f"   {'✅' if ok else '❌'} Coincidencias solapadas y sin distinguir mayúsculas")
+
+    ok = matcher.found("nothing here?") == {"a": {"he"}, "b": {"he"}}
+    ok = ok and matcher.scan("") == [] and matcher.found("xyz") == {}
+    print(f"   {'✅' if ok else '❌'} Textos vacíos y sin coincidencias")
+    print()
+
+
+def test_equivalence():
+    """Mismos resultados que las búsquedas anteriores"""
+    print("=" * 70)
+    print("TEST 2: EQUIVALENCIA CON LA IMPLEMENTACIÓN ANTERIOR")
+    print("=" * 70)
+
+    payloads = sample_payloads()
+
+    mismatches = [p for p in payloads if signature_counts(p) != legacy_counts(p)]
+    print(f"   Payloads comparados: {len(payloads):,}")
+    print(f"   {'✅' if not mismatches else '❌'} Features 4 y 5 idénticas ({len(mismatches)} diferencias)")
+
+    mismatches = [p for p in payloads if identify_attack_type(p) != legacy_attack_type(p)]
+    print(f"   {'✅' if not mismatches else '❌'} Tipo de ataque idéntico ({len(mismatches)} diferencias)")
+
+    ok = FeatureExtractorV2.count_suspicious_patterns("a;cat x;ls|id") == legacy_counts("a;cat x;ls|id")[1]
+    print(f"   {'✅' if ok else '❌'} Operadores: un +3 por tramo con comando")
+    print()
+
+
+def test_scaling():
+    """El coste por payload no crece con el número de firmas"""
+    print("=" * 70)
+    print("TEST 3: COSTE FRENTE AL NÚMERO DE FIRMAS")
+    print("=" * 70)
+
+    random.seed(11)
+    payloads = sample_payloads()[:2000]
+    alphabet = 'abcdefghijklmnopqrstuvwxyz<>/;'
+
+    timings = []
+    for n_signatures in (50, 800):
+        signatures = {
+            "generated": [
+                ''.join(random.choice(alphabet) for _ in range(random.randint(4, 10)))
+                for _ in range(n_signatures)
+            ]
+        }
+        matcher = PatternMatcher(signatures)
+
+        start = time.perf_counter()
+        for payload in payloads:
+            matcher.scan(payload)
+        matcher_time = time.perf_counter() - start
+
+        patterns = signatures["generated"]
+        start = time.perf_counter()
+        for payload in payloads:
+            lower = payload.lower()
+            [p for p in patterns if p in lower]
+        naive_time = time.perf_counter() - start
+
+        timings.append((matcher_time, naive_time))
+        print(f"   {n_signatures:>4} firmas: autómata {matcher_time / len(payloads) * 1e6:6.2f} µs/payload"
+              f" | búsqueda por firma {naive_time / len(payloads) * 1e6:7.2f} µs/payload")
+
+    growth = timings[1][0] / timings[0][0]
+    print(f"   {'✅' if growth < 2 else '❌'} Autómata x{growth:.2f} con 16x más firmas")
+    print()
+
+
+def main():
+    print("""
+╔═══════════════════════════════════════════════════════════════════╗
+║                                                                   ║
+║             🧪 TEST DEL AUTÓMATA DE FIRMAS DE ATAQUE 🧪            ║
+║                                                                   ║
+╚═══════════════════════════════════════════════════════════════════╝
+    """)
+
+    test_automaton()
+    test_equivalence()
+    test_scaling()
+
+    print("=" * 70)
+    print("✅ TODOS LOS TESTS COMPLETADOS")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Test del prefiltro en cascada (primera etapa antes del modelo)
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, 'src')
+
+import joblib
+from sklearn.ensemble import RandomForestClassifier
+
+from core.nemesis_agent import NemesisAgent
+from core.prefilter import PrefilterCascade
+from core.worker_pool import DetectionWorkerPool
+from logs.log_parser import LogParser
+from ml.batch_features import text_statistics
+from ml.train_brain import DatasetGeneratorV2
+
+
+LOG_LINE = '10.1.{a}.{b} - - [04/Dec/2025:10:00:00] "{request}" 200 512'
+
+BENIGN = [
+    "GET /static/css/main.css HTTP/1.1",
+    "GET /assets/app.8f3a2c.js HTTP/1.1",
+    "GET /favicon.ico HTTP/1.1",
+    "GET /healthz HTTP/1.1",
+    "HEAD / HTTP/1.1",
+    "GET /images/banner-2025.png?v=3 HTTP/1.1",
+    "GET /products?page=2&limit=10 HTTP/1.1",
+    "GET /blog/2025/12/hello-world HTTP/1.1",
+]
+
+AMBIGUOUS = [
+    "GET /login?user=admin' OR '1'='1'-- HTTP/1.1",
+    "GET /search?q=<script>alert(1)</script> HTTP/1.1",
+    "GET /download?file=../../../etc/passwd HTTP/1.1",
+    "GET /ping?host=127.0.0.1&&whoami HTTP/1.1",
+    "GET /static/../../etc/passwd HTTP/1.1",
+    "GET /static/x.js?q=1%27%20OR%201=1 HTTP/1.1",
+    "GET /api/items?id=1+UNION+SELECT+password+FROM+users HTTP/1.1",
+    "GET /?id=1+or+1=1 HTTP/1.1",
+    "GET /login?user=admin--+ HTTP/1.1",
+    "GET /items?id=2+AND+1=1 HTTP/1.1",
+    "GET /items?id=1&x=a+Or+b HTTP/1.1",
+    "POST /login HTTP/1.1",
+    "GET /exec?cmd=hostname HTTP/1.1",
+    "GET /" + "a" * 300 + " HTTP/1.1",
+]
+
+
+def make_events(requests):
+    parser = LogParser()
+    return [
+        parser.parse(LOG_LINE.format(a=i // 250, b=i % 250, request=request))
+        for i, request in enumerate(requests)
+    ]
+
+
+def mixed_traffic(n=4000):
+    """80% estáticos/health checks/queries cortas, 20% dataset sintético"""
+    payloads, _ = DatasetGeneratorV2(n_samples=n // 5, seed=1).generate_dataset()
+    requests = [BENIGN[i % len(BENIGN)].replace("2", str(i % 10)) for i in range(n - len(payloads))]
+    return requests + payloads
+
+
+def test_cascade_decisions():
+    """Lo obvio se resuelve; los ataques siempre llegan al modelo"""
+    print("=" * 70)
+    print("TEST 1: DECISIONES DE LA CASCADA")
+    print("=" * 70)
+
+    cascade = PrefilterCascade()
+
+    ok = all(cascade.screen(make_events(BENIGN)))
+    print(f"   {'✅' if ok else '❌'} Estáticos, health checks y queries cortas -> legítimo sin ML")
+
+    decisions = cascade.screen(make_events(AMBIGUOUS))
+    ok = not any(decisions)
+    print(f"   {'✅' if ok else '❌'} Peticiones sospechosas -> ambiguas ({len(AMBIGUOUS)}/{len(AMBIGUOUS)})")
+
+    payloads, labels = DatasetGeneratorV2(n_samples=5000, seed=3).generate_dataset()
+    attacks = [p for p, label in zip(payloads, labels) if label == 1]
+    passed = sum(cascade.screen(make_events(attacks)))
+    print(f"   {'✅' if passed == 0 else '❌'} Ataques del dataset sintético resueltos sin ML: {passed}/{len(attacks)}")
+
+    print(f"   Motivos: {cascade.stats['rejected_by']}")
+
+    cascade = PrefilterCascade.from_config({"enabled": True, "allow_paths": ["/internal/metrics"], "max_short_target": 10})
+    ok = cascade.screen(make_events(["GET /internal/metrics HTTP/1.1", "GET /products?page=2 HTTP/1.1"])) == [True, False]
+    ok = ok and PrefilterCascade.from_config({"enabled": False}) is None
+    print(f"   {'✅' if ok else '❌'} Configurable (listas blancas, puertas, enabled)")
+    print()
+
+
+async def test_agent_short_circuit():
+    """El agente solo pasa lo ambiguo al modelo"""
+    print("=" * 70)
+    print("TEST 2: CORTOCIRCUITO EN EL AGENTE")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "brain.joblib")
+        payloads, labels = DatasetGeneratorV2(n_samples=3000, seed=2).generate_dataset()
+        joblib.dump(
+            RandomForestClassifier(n_estimators=100, max_depth=20, random_state=0, n_jobs=1)
+            .fit(text_statistics(payloads), labels),
+            model_path
+        )
+
+        events = make_events(mixed_traffic())
+
+        full = NemesisAgent(model_path=model_path, verdict_cache_size=0)
+        full._load_ai_brain()
+        fast = NemesisAgent(model_path=model_path, verdict_cache_size=0, prefilter=PrefilterCascade())
+        fast._load_ai_brain()
+
+        await full.analyze_events(events[:100])
+        await fast.analyze_events(events[:100])
+
+        start = time.perf_counter()
+        expected = await full.analyze_events(events)
+        full_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        verdicts = await fast.analyze_events(events)
+        fast_time = time.perf_counter() - start
+
+        stats = fast.prefilter_stats
+        print(f"   Resuelto sin ML: {stats['short_circuit_rate']:.1%} del tráfico")
+        print(f"   Sin prefiltro: {full_time * 1000:.0f} ms | con prefiltro: {fast_time * 1000:.0f} ms")
+        print(f"   {'✅' if fast_time < full_time else '❌'} Menos trabajo de features y bosque")
+
+        ok = all(
+            v.is_malicious == e.is_malicious
+            for v, e in zip(verdicts, expected) if v.attack_type != "BENIGN" or v.confidence != 1.0
+        )
+        missed = sum(e.is_malicious and not v.is_malicious for v, e in zip(verdicts, expected))
+        print(f"   {'✅' if ok else '❌'} Lo ambiguo recibe el mismo veredicto que sin prefiltro")
+        print(f"   Amenazas del modelo resueltas como legítimas por la cascada: {missed}")
+    print()
+
+
+async def test_shadow_mode():
+    """El modo sombra no cambia veredictos y audita desacuerdos"""
+    print("=" * 70)
+    print("TEST 3: MODO SOMBRA")
+    print("=" * 70)
+
+    # Sin modelo (reglas): el marcador "or" de las reglas salta con
+    # "/products?sort=color", así que hay desacuerdos que auditar
+    events = make_events(BENIGN + ["GET /products?sort=color HTTP/1.1"] + AMBIGUOUS)
+
+    plain = NemesisAgent(verdict_cache_size=0)
+    shadow = NemesisAgent(verdict_cache_size=0, prefilter=PrefilterCascade(shadow=True))
+
+    expected = await plain.analyze_events(events)
+    verdicts = await shadow.analyze_events(events)
+
+    ok = [(v.is_malicious, v.attack_type) for v in verdicts] == [(e.is_malicious, e.attack_type) for e in expected]
+    print(f"   {'✅' if ok else '❌'} Veredictos idénticos a los del análisis completo")
+
+    stats = shadow.prefilter_stats
+    would_miss = sum(
+        e.is_malicious for e, benign in zip(expected, PrefilterCascade().screen(events)) if benign
+    )
+    print(f"   Auditados: {stats['audited']} | desacuerdos: {stats['disagreements']} ({stats['disagreement_rate']:.0%})")
+    ok = stats['audited'] == len(BENIGN) + 1 and stats['disagreements'] == would_miss > 0
+    print(f"   {'✅' if ok else '❌'} Desacuerdos contados con ejemplos: "
+          f"{[s['payload'] for s in stats['disagreement_samples']][:2]}")
+    print()
+
+
+async def test_worker_pool_prefilter():
+    """Cada worker aplica la cascada y el pool suma sus estadísticas"""
+    print("=" * 70)
+    print("TEST 4: PREFILTRO EN EL POOL DE WORKERS")
+    print("=" * 70)
+
+    events = make_events(mixed_traffic(1000))
+    with DetectionWorkerPool(workers=2, prefilter=PrefilterCascade()) as pool:
+        verdicts = await pool.process_events(events)
+        stats = pool.prefilter_stats
+
+    ok = all(v is not None for v in verdicts) and stats['checked'] == len(events)
+    print(f"   {'✅' if ok else '❌'} {stats['checked']} eventos revisados en 2 workers, "
+          f"{stats['short_circuit_rate']:.1%} sin ML")
+    print()
+
+
+async def main():
+    print("""
+╔═══════════════════════════════════════════════════════════════════╗
+║                                                                   ║
+║              🧪 TEST DEL PREFILTRO EN CASCADA 🧪                   ║
+║                                                                   ║
+╚═══════════════════════════════════════════════════════════════════╝
+    """)
+
+    logging.getLogger().setLevel(logging.ERROR)
+
+    test_cascade_decisions()
+    await test_agent_short_circuit()
+    await test_shadow_mode()
+    await test_worker_pool_prefilter()
+
+    print("=" * 70)
+    print("✅ TODOS LOS TESTS COMPLETADOS")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Test de los rollups por minuto/hora que leen los dashboards
+"""
+
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+sys.path.insert(0, 'src')
+
+from database.rollups import ThreatRollups
+from database.threat_database import ThreatDatabase, ThreatRecord
+from database.write_behind import WriteBehindQueue
+
+
+# El rollup por minuto se poda respecto al reloj real
+NOW = datetime.now().replace(second=0, microsecond=0)
+
+
+def make_threats(n, start=NOW - timedelta(hours=20), step=timedelta(seconds=61)):
+    return [
+        ThreatRecord(
+            None, start + i * step, f"10.0.{i % 7}.{i % 50}",
+            "SQL_INJECTION" if i % 3 else "XSS", f"/login?id={i}' OR 1=1--", 0.95, "BLOCK", True
+        )
+        for i in range(n)
+    ]
+
+
+def raw_per_hour(conn, since):
+    return Counter(dict(conn.execute(
+        "SELECT substr(timestamp, 1, 13), COUNT(*) FROM threats WHERE timestamp >= ? GROUP BY 1",
+        (since.isoformat()[:13],)
+    ).fetchall()))
+
+
+def test_consistency():
+    """Los rollups coinciden con las amenazas, por ambos caminos de escritura"""
+    print("=" * 70)
+    print("TEST 1: ROLLUPS = AMENAZAS GUARDADAS")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ThreatDatabase(os.path.join(tmp, "nemesis.db"), stats_flush_interval=None)
+        threats = make_threats(1000)
+        db.save_threats(threats[:400])
+        for threat in threats[400:500]:
+            db.save_threat(threat)
+
+        queue = WriteBehindQueue(db)
+        queue.save_threats(threats[500:])
+        queue.flush()
+
+        timeline = db.get_timeline(hours=24, now=NOW)
+        expected = raw_per_hour(db.conn, NOW - timedelta(hours=23))
+        ok = dict(zip(timeline["buckets"], timeline["counts"])) == {
+            bucket: expected.get(bucket, 0) for bucket in timeline["buckets"]
+        }
+        ok = ok and timeline["total"] == 1000 and len(timeline["buckets"]) == 24
+        print(f"   {'✅' if ok else '❌'} Timeline de 24 buckets = amenazas por hora ({timeline['total']})")
+
+        xss = db.get_timeline(hours=24, attack_type="XSS", now=NOW)["total"]
+        minutes = db.get_timeline(hours=24, granularity="minute", now=NOW)
+        ok = xss == sum(1 for t in threats if t.attack_type == "XSS") and minutes["total"] == 1000
+        ok = ok and len(minutes["buckets"]) == 23 * 60 + NOW.minute + 1
+        print(f"   {'✅' if ok else '❌'} Filtro por tipo ({xss} XSS) y granularidad por minuto")
+
+        by_ip = Counter(dict(db.conn.execute(
+            "SELECT source_ip, SUM(count) FROM threat_rollup_hour GROUP BY source_ip"
+        ).fetchall()))
+        ok = by_ip == Counter(t.source_ip for t in threats)
+        print(f"   {'✅' if ok else '❌'} Recuento por IP de origen")
+        queue.close()
+        db.close()
+    print()
+
+
+def test_flat_latency():
+    """El timeline no lee amenazas y su coste no crece con ellas"""
+    print("=" * 70)
+    print("TEST 2: LATENCIA PLANA DEL TIMELINE")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ThreatDatabase(os.path.join(tmp, "nemesis.db"), stats_flush_interval=None, readers=1)
+
+        timings = []
+        for total in (2000, 50000):
+            db.save_threats(make_threats(
+                total - sum(n for n, _ in timings), start=NOW - timedelta(hours=23, minutes=59),
+                step=timedelta(hours=24) / total
+            ))
+            start = time.perf_counter()
+            for _ in range(50):
+                timeline = db.get_timeline(hours=24, now=NOW)
+            timings.append((total, (time.perf_counter() - start) / 50 * 1000))
+            print(f"   {total:>6} amenazas: {timings[-1][1]:.2f} ms por timeline "
+                  f"({timeline['total']} en las últimas 24 h)")
+
+        queries = []
+        with db.connections.read() as conn:
+            conn.set_trace_callback(queries.append)
+        db.get_timeline(hours=24, now=NOW)
+        with db.connections.read() as conn:
+            conn.set_trace_callback(None)
+
+        ok = queries and not any("threats" in query.split("FROM")[-1] for query in queries)
+        ok = ok and timings[1][1] < max(timings[0][1] * 5, 5.0)
+        print(f"   {'✅' if ok else '❌'} Solo consulta threat_rollup_hour y no escala con las amenazas")
+        db.close()
+    print()
+
+
+def test_retention_and_rebuild():
+    """Archivar una partición descuenta sus rollups; una BD previa se rellena"""
+    print("=" * 70)
+    print("TEST 3: RETENCIÓN Y BD EXISTENTES")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "nemesis.db")
+        db = ThreatDatabase(db_path, stats_flush_interval=None, archive_dir=os.path.join(tmp, "cold"))
+        threats = make_threats(4000, start=datetime(2025, 10, 1), step=timedelta(minutes=30))
+        db.save_threats(threats)
+
+        db.partitions.retention_days = 40
+        db.apply_retention(now=datetime(2026, 1, 15))
+        kept = db.count_threats()
+        rolled = db.conn.execute("SELECT SUM(count) FROM threat_rollup_hour").fetchone()[0]
+        ok = kept == rolled == db.get_statistics()["total_threats"]
+        ok = ok and db.conn.execute(
+            "SELECT COUNT(*) FROM threat_rollup_hour WHERE bucket < '2025-12'"
+        ).fetchone()[0] == 0
+        print(f"   {'✅' if ok else '❌'} Tras archivar: {kept} amenazas, {rolled} en los rollups")
+        db.close()
+
+        # BD de una versión anterior: amenazas sin rollups
+        conn = sqlite3.connect(db_path)
+        conn.execute("DROP TABLE threat_rollup_minute")
+        conn.execute("DROP TABLE threat_rollup_hour")
+        conn.commit()
+        conn.close()
+
+        db = ThreatDatabase(db_path, stats_flush_interval=None)
+        rolled = db.conn.execute("SELECT SUM(count) FROM threat_rollup_hour").fetchone()[0]
+        stats = db.get_statistics()
+        ok = rolled == kept and stats["total_threats"] == kept
+        ok = ok and stats["threats_by_type"]["XSS"] == db.count_threats(attack_type="XSS")
+        print(f"   {'✅' if ok else '❌'} Rollups recalculados al abrir una BD sin ellos ({rolled})")
+        db.close()
+
+        # Sin amenazas de las últimas 48 h el rollup por minuto está vacío
+        rebuilds = []
+        original = ThreatRollups.rebuild
+        ThreatRollups.rebuild = lambda self, *args, **kwargs: rebuilds.append(1) or original(self, *args, **kwargs)
+        try:
+            db = ThreatDatabase(db_path, stats_flush_interval=None)
+            minutes = db.conn.execute("SELECT COUNT(*) FROM threat_rollup_minute").fetchone()[0]
+            db.close()
+        finally:
+            ThreatRollups.rebuild = original
+        ok = minutes == 0 and not rebuilds
+        print(f"   {'✅' if ok else '❌'} Reabrir una BD sin amenazas recientes no recalcula los rollups")
+    print()
+
+
+def test_summary():
+    """/api/stats sale de los rollups y ve lo que escribe otro proceso"""
+    print("=" * 70)
+    print("TEST 5: ESTADÍSTICAS GLOBALES DESDE LOS ROLLUPS")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "nemesis.db")
+        writer = ThreatDatabase(db_path, stats_flush_interval=None)
+        dashboard = ThreatDatabase(db_path, stats_flush_interval=None, readers=1)
+
+        threats = make_threats(1500, start=NOW - timedelta(days=3), step=timedelta(minutes=5))
+        writer.save_threats(threats)
+        for threat in threats[:20]:
+            writer.block_ip(threat.source_ip, threat.attack_type)
+
+        queries = []
+        with dashboard.connections.read() as conn:
+            conn.set_trace_callback(queries.append)
+        summary = dashboard.get_summary(now=NOW)
+        with dashboard.connections.read() as conn:
+            conn.set_trace_callback(None)
+
+        expected = writer.get_statistics(max_age=None)
+        last_24h = sum(1 for t in threats if t.timestamp >= NOW - timedelta(days=1))
+        ok = summary['total_threats'] == expected['total_threats'] == 1500
+        ok = ok and summary['threats_by_type'] == expected['threats_by_type']
+        ok = ok and summary['total_blocked_ips'] == expected['total_blocked_ips']
+        ok = ok and [n for _, n in summary['top_malicious_ips']] == [n for _, n in expected['top_malicious_ips']]
+        ok = ok and summary['threats_last_24h'] == last_24h
+        print(f"   {'✅' if ok else '❌'} Otra instancia ve {summary['total_threats']} amenazas, "
+              f"{summary['threats_last_24h']} en 24 h (= contadores del escritor)")
+
+        ok = queries and not any("threats" in query.split("FROM")[-1] for query in queries)
+        print(f"   {'✅' if ok else '❌'} Solo consulta rollups y blocked_ips ({len(queries)} consultas)")
+        dashboard.close()
+        writer.close()
+    print()
+
+
+def test_minute_pruning():
+    """El rollup por minuto solo conserva las últimas horas"""
+    print("=" * 70)
+    print("TEST 4: PODA DEL ROLLUP POR MINUTO")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ThreatDatabase(os.path.join(tmp, "nemesis.db"), stats_flush_interval=None)
+        threats = make_threats(24 * 7, start=NOW - timedelta(days=7), step=timedelta(hours=1))
+        rows = [(t.timestamp.isoformat(), t.source_ip, t.attack_type) for t in threats]
+
+        with db.connections.write() as conn:
+            db.rollups.record(conn, rows, now=NOW)
+
+        oldest = db.conn.execute("SELECT MIN(bucket) FROM threat_rollup_minute").fetchone()[0]
+        hours = db.conn.execute("SELECT SUM(count) FROM threat_rollup_hour").fetchone()[0]
+        cutoff = (NOW - timedelta(hours=db.rollups.minute_retention_hours)).isoformat()[:16]
+        ok = oldest >= cutoff and hours == len(rows)
+        print(f"   {'✅' if ok else '❌'} Minutos desde {oldest} (corte {cutoff}), "
+              f"horas completas ({hours})")
+        db.close()
+    print()
+
+
+def main():
+    print("""
+╔═══════════════════════════════════════════════════════════════════╗
+║                                                                   ║
+║            🧪 TEST DE ROLLUPS POR MINUTO Y HORA 🧪                 ║
+║                                                                   ║
+╚═══════════════════════════════════════════════════════════════════╝
+    """)
+
+    logging.getLogger().setLevel(logging.ERROR)
+
+    test_consistency()
+    test_flat_latency()
+    test_retention_and_rebuild()
+    test_summary()
+    test_minute_pruning()
+
+    print("=" * 70)
+    print("✅ TODOS LOS TESTS COMPLETADOS")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Test de las estadísticas agregadas en memoria (daily_stats por upsert)
+"""
+
+import logging
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+sys.path.insert(0, 'src')
+
+from database.stats_aggregator import DailyStatsAggregator
+from database.threat_database import ThreatDatabase, ThreatRecord
+from database.write_behind import WriteBehindQueue
+
+
+ATTACKS = ["SQL_INJECTION", "XSS", "PATH_TRAVERSAL", "COMMAND_INJECTION", "PORT_SCAN"]
+
+
+def make_threats(n, start=None):
+    # Las últimas horas (cuentan en threats_last_24h), cruzando días
+    start = start or datetime.now() - timedelta(hours=20)
+    return [
+        ThreatRecord(
+            None, start + timedelta(seconds=i * 7), f"10.0.{i % 7}.{i % 30}",
+            ATTACKS[i % len(ATTACKS)], f"/login?id={i}' OR 1=1--", 0.95, "BLOCK", True
+        )
+        for i in range(n)
+    ]
+
+
+def sql_statistics(db_path):
+    """get_statistics calculado con SQL sobre threats (referencia)"""
+    since = (datetime.now() - timedelta(days=1)).isoformat()[:16]
+    conn = sqlite3.connect(db_path)
+    stats = {
+        'total_threats': conn.execute("SELECT COUNT(*) FROM threats").fetchone()[0],
+        'threats_by_type': dict(conn.execute(
+            "SELECT attack_type, COUNT(*) FROM threats GROUP BY attack_type").fetchall()),
+        'total_blocked_ips': conn.execute("SELECT COUNT(*) FROM blocked_ips").fetchone()[0],
+        'top_counts': [n for _, n in conn.execute(
+            "SELECT source_ip, COUNT(*) AS n FROM threats GROUP BY source_ip ORDER BY n DESC LIMIT 10")],
+        'threats_last_24h': conn.execute(
+            "SELECT COUNT(*) FROM threats WHERE substr(timestamp, 1, 16) >= ?", (since,)).fetchone()[0],
+    }
+    conn.close()
+    return stats
+
+
+def daily_rows(db_path):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT * FROM daily_stats ORDER BY date").fetchall()
+    conn.close()
+    return rows
+
+
+def daily_total(db_path):
+    return sum(row[2] for row in daily_rows(db_path))
+
+
+def test_memory_statistics():
+    """get_statistics desde memoria == SQL, sin consultas"""
+    print("=" * 70)
+    print("TEST 1: ESTADÍSTICAS DESDE MEMORIA")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "nemesis.db")
+        db = ThreatDatabase(db_path, stats_flush_interval=None)
+        threats = make_threats(3000)
+        db.save_threats(threats[:2000])
+        for threat in threats[2000:]:
+            db.save_threat(threat)
+            db.block_ip(threat.source_ip, threat.attack_type)
+
+        queries = []
+        db.conn.set_trace_callback(queries.append)
+        stats = db.get_statistics(max_age=None)
+        db.conn.set_trace_callback(None)
+
+        expected = sql_statistics(db_path)
+        actual = dict(stats, top_counts=[n for _, n in stats['top_malicious_ips']])
+        del actual['top_malicious_ips']
+        ok = actual == expected
+        print(f"   {'✅' if ok else '❌'} Mismo resultado que las consultas SQL "
+              f"({stats['total_threats']} amenazas, {stats['threats_last_24h']} en 24 h)")
+        print(f"   {'✅' if not queries else '❌'} get_statistics sin SQL ({len(queries)} consultas)")
+
+        # Al reabrir, los contadores parten de la BD
+        db.close()
+        reopened = ThreatDatabase(db_path, stats_flush_interval=None)
+        again = reopened.get_statistics()
+        ok = [n for _, n in again.pop('top_malicious_ips')] == actual.pop('top_counts') and again == actual
+        print(f"   {'✅' if ok else '❌'} Al reabrir la BD se recuperan los mismos contadores")
+
+        start = time.perf_counter()
+        for _ in range(1000):
+            reopened.get_statistics()
+        per_call = (time.perf_counter() - start) / 1000 * 1000
+        print(f"   get_statistics: {per_call:.3f} ms/llamada")
+        reopened.close()
+    print()
+
+
+def test_upsert_flush():
+    """daily_stats por lotes, exacta tras un cierre limpio"""
+    print("=" * 70)
+    print("TEST 2: VOLCADO PERIÓDICO CON UPSERT")
+    print("=" * 70)
+
+    # Desde las 22:00 de ayer: cruza la medianoche
+    threats = make_threats(2000, (datetime.now() - timedelta(days=1)).replace(hour=22, minute=0))
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "nemesis.db")
+        db = ThreatDatabase(db_path, stats_flush_interval=0.1)
+        for threat in threats[:1000]:
+            db.save_threat(threat)
+        time.sleep(0.5)
+        flushed = daily_total(db_path)
+        ok = flushed == 1000 and db.counters.pending_threats == 0 and db.counters.flushes <= 10
+        print(f"   {'✅' if ok else '❌'} 1000 save_threat -> {db.counters.flushes} upserts "
+              f"(antes 1000 SELECT + UPDATE + commit)")
+
+        db.save_threats(threats[1000:])
+        db.close()
+        closed = daily_rows(db_path)
+
+        # Referencia: recalculada desde threats
+        db = ThreatDatabase(db_path, stats_flush_interval=None)
+        db.rebuild_daily_stats()
+        rebuilt = daily_rows(db_path)
+        db.close()
+
+        ok = len(closed) == 2 and closed == rebuilt and sum(row[2] for row in closed) == 2000
+        print(f"   {'✅' if ok else '❌'} close() vuelca lo pendiente: daily_stats exacta ({len(closed)} días)")
+
+        # El primer save_threat de un día también cuenta su tipo de ataque
+        ok = all(row[2] == sum(row[4:9]) for row in closed)
+        print(f"   {'✅' if ok else '❌'} Columnas por tipo de ataque completas en todos los días")
+    print()
+
+
+def test_crash_consistency():
+    """Una caída pierde como mucho un intervalo; nunca cuenta de más"""
+    print("=" * 70)
+    print("TEST 3: CONSISTENCIA ANTE CAÍDAS")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "nemesis.db")
+
+        # 1000 amenazas volcadas, 500 más y kill -9 antes del siguiente volcado
+        script = (
+            "import os, sys; sys.path.insert(0, 'src')\n"
+            "from test_stats_aggregator import make_threats\n"
+            "from database import ThreatDatabase\n"
+            f"db = ThreatDatabase({db_path!r}, stats_flush_interval=3600)\n"
+            "threats = make_threats(1500)\n"
+            "db.save_threats(threats[:1000])\n"
+            "db.flush_stats()\n"
+            "for threat in threats[1000:]:\n"
+            "    db.save_threat(threat)\n"
+            "os._exit(9)\n"
+        )
+        subprocess.run([sys.executable, "-c", script])
+
+        db = ThreatDatabase(db_path, stats_flush_interval=None)
+        stored = db.get_statistics()['total_threats']
+        after_crash = daily_total(db_path)
+        ok = stored == 1500 and after_crash == 1000
+        print(f"   {'✅' if ok else '❌'} Tras la caída: {stored} amenazas en threats, "
+              f"{after_crash} en daily_stats (perdido solo el último intervalo)")
+
+        days = db.rebuild_daily_stats()
+        repaired = daily_total(db_path)
+        db.rebuild_daily_stats()
+        ok = repaired == 1500 and daily_total(db_path) == 1500
+        print(f"   {'✅' if ok else '❌'} rebuild_daily_stats() repara {days} días (idempotente)")
+        db.close()
+
+        # Con la cola write-behind los incrementos van con sus amenazas
+        queued_path = os.path.join(tmp, "queued.db")
+        script = (
+            "import os, sys; sys.path.insert(0, 'src')\n"
+            "from test_stats_aggregator import make_threats\n"
+            "from database import ThreatDatabase, WriteBehindQueue\n"
+            f"queue = WriteBehindQueue(ThreatDatabase({queued_path!r}, stats_flush_interval=3600))\n"
+            "queue.save_threats(make_threats(1500))\n"
+            "queue.flush()\n"
+            "os._exit(9)\n"
+        )
+        subprocess.run([sys.executable, "-c", script])
+
+        stored = sql_statistics(queued_path)['total_threats']
+        ok = stored == daily_total(queued_path) == 1500
+        print(f"   {'✅' if ok else '❌'} WriteBehindQueue: daily_stats exacta tras la caída")
+    print()
+
+
+def test_write_behind_counters():
+    """Los contadores solo cuentan lotes confirmados"""
+    print("=" * 70)
+    print("TEST 4: CONTADORES CON WRITE-BEHIND")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "nemesis.db")
+        queue = WriteBehindQueue(ThreatDatabase(db_path), max_rows=10**6, max_delay_ms=60000)
+        threats = make_threats(500)
+        queue.save_threats(threats)
+        for threat in threats:
+            queue.block_ip(threat.source_ip, threat.attack_type)
+
+        queued = queue.get_statistics(max_age=None)
+        flushed = queue.flush()
+        stats = queue.get_statistics(max_age=None)
+        ok = flushed and queued['total_threats'] == 0 and stats['total_threats'] == 500
+        ok = ok and stats['total_blocked_ips'] == len({t.source_ip for t in threats})
+        print(f"   {'✅' if ok else '❌'} En cola: {queued['total_threats']} amenazas contadas, "
+              f"tras el volcado: {stats['total_threats']}")
+
+        # Lote que falla al escribirse: se descarta sin contarse
+        insert_rows = queue.database.insert_rows
+
+        def failing(conn, rows):
+            raise RuntimeError("disco lleno")
+
+        log = logging.getLogger("database.write_behind")
+        log.setLevel(logging.CRITICAL)
+        queue.database.insert_rows = failing
+        queue.save_threats(make_threats(100))
+        lost = queue.flush()
+        queue.database.insert_rows = insert_rows
+        after = queue.get_statistics(max_age=None)['total_threats']
+        ok = queue.stats['dropped'] == 100 and after == 500
+        print(f"   {'✅' if ok else '❌'} Lote descartado ({queue.stats['dropped']} filas) sin contar: {after}")
+
+        ok = lost is False and queue.flush() is True and queue.close() is True
+        log.setLevel(logging.NOTSET)
+        print(f"   {'✅' if ok else '❌'} flush() devuelve False con el lote perdido y True después")
+
+        # Una cola cerrada con un lote perdido sin flush intermedio
+        failing_queue = WriteBehindQueue(queue.database, max_rows=10**6, max_delay_ms=60000)
+        log.setLevel(logging.CRITICAL)
+        queue.database.insert_rows = failing
+        failing_queue.save_threats(make_threats(10))
+        closed = failing_queue.close()
+        queue.database.insert_rows = insert_rows
+        log.setLevel(logging.NOTSET)
+        print(f"   {'✅' if closed is False else '❌'} close() devuelve False si se descartó lo pendiente")
+
+        queue.database.close()
+        expected = sql_statistics(db_path)
+        ok = expected['total_threats'] == stats['total_threats'] and daily_total(db_path) == 500
+        print(f"   {'✅' if ok else '❌'} Sin doble conteo en daily_stats ({daily_total(db_path)})")
+    print()
+
+
+def test_other_process():
+    """Un lector sobre la misma BD ve lo que escribe otra instancia"""
+    print("=" * 70)
+    print("TEST 5: ESTADÍSTICAS DE OTRO PROCESO")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "nemesis.db")
+        writer = ThreatDatabase(db_path, stats_flush_interval=None)
+        reader = ThreatDatabase(db_path, stats_flush_interval=None, readers=1)
+
+        threats = make_threats(5)
+        writer.save_threats(threats)
+        writer.block_ip(threats[0].source_ip, "test")
+
+        cached = reader.get_statistics(max_age=None)['total_threats']
+        stats = reader.get_statistics(max_age=0)
+        ok = cached == 0 and stats['total_threats'] == writer.get_statistics()['total_threats'] == 5
+        ok = ok and stats['total_blocked_ips'] == 1
+        print(f"   {'✅' if ok else '❌'} El lector ve {stats['total_threats']} amenazas "
+              f"(solo memoria: {cached})")
+
+        writer.save_threats(make_threats(3))
+        queries = []
+        with reader.connections.read() as conn:
+            conn.set_trace_callback(queries.append)
+        default = reader.get_statistics()['total_threats']
+        with reader.connections.read() as conn:
+            conn.set_trace_callback(None)
+        ok = default == 5 and not queries
+        print(f"   {'✅' if ok else '❌'} Por defecto solo memoria, sin SQL ({default})")
+
+        time.sleep(0.3)
+        ok = reader.get_statistics(max_age=0.2)['total_threats'] == 8
+        print(f"   {'✅' if ok else '❌'} Con max_age se reconcilia cuando caducan los contadores")
+        reader.close()
+        writer.close()
+    print()
+
+
+def main():
+    print("""
+╔═══════════════════════════════════════════════════════════════════╗
+║                                                                   ║
+║          🧪 TEST DE ESTADÍSTICAS AGREGADAS EN MEMORIA 🧪           ║
+║                                                                   ║
+╚═══════════════════════════════════════════════════════════════════╝
+    """)
+
+    logging.getLogger().setLevel(logging.ERROR)
+
+    test_memory_statistics()
+    test_upsert_flush()
+    test_crash_consistency()
+    test_write_behind_counters()
+    test_other_process()
+
+    print("=" * 70)
+    print("✅ TODOS LOS TESTS COMPLETADOS")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
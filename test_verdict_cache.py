@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Test de la caché de veredictos del agente
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, 'src')
+
+import joblib
+from sklearn.ensemble import RandomForestClassifier
+
+from core.nemesis_agent import NemesisAgent
+from core.verdict_cache import VerdictCache
+
+
+LINES = [
+    '10.0.0.{i} - - [04/Dec/2025:10:00:00] "GET /health HTTP/1.1" 200',
+    '10.0.0.{i} - - [04/Dec/2025:10:00:01] "GET /static/app.js HTTP/1.1" 200',
+    '10.0.0.{i} - - [04/Dec/2025:10:00:02] "GET /login?user=admin\' OR \'1\'=\'1\'-- HTTP/1.1" 403',
+    '10.0.0.{i} - - [04/Dec/2025:10:00:03] "GET /search?q=<script>alert(1)</script> HTTP/1.1" 403',
+]
+
+
+def train_model(agent, path):
+    """Modelo pequeño con las 3 features del agente"""
+    X, y = [], []
+    for i in range(100):
+        for j, template in enumerate(LINES):
+            event = agent._parse_log(template.format(i=i).replace("/health", f"/health{i}"))
+            X.append(agent._extract_features(event))
+            y.append(int(j >= 2))
+
+    model = RandomForestClassifier(n_estimators=20, random_state=0, n_jobs=1)
+    model.fit(X, y)
+    joblib.dump(model, path)
+
+
+def verdict_tuple(v):
+    return (v.is_malicious, v.confidence, v.attack_type, v.recommended_action) if v else None
+
+
+async def test_repeated_payloads():
+    """Los payloads repetidos no vuelven a pasar por el modelo"""
+    print("=" * 70)
+    print("TEST 1: PAYLOADS REPETIDOS SIN INFERENCIA")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "brain.joblib")
+        cached = NemesisAgent(model_path=model_path)
+        train_model(cached, model_path)
+        cached._load_ai_brain()
+
+        plain = NemesisAgent(model_path=model_path, verdict_cache_size=0)
+        plain._load_ai_brain()
+
+        lines = [t.format(i=i % 250) for i in range(1000) for t in LINES]
+
+        inferred = {"events": 0}
+        original = cached._ml_detection_batch
+
+        async def counting(events, behavior=None):
+            inferred["events"] += len(events)
+            return await original(events, behavior=behavior)
+
+        cached._ml_detection_batch = counting
+
+        with_cache = []
+        without_cache = []
+        for i in range(0, len(lines), 256):
+            with_cache += await cached.process_log_lines(lines[i:i + 256])
+            without_cache += await plain.process_log_lines(lines[i:i + 256])
+
+        stats = cached.cache_stats
+        print(f"   Líneas:               {len(lines)}")
+        print(f"   Eventos inferidos:    {inferred['events']}")
+        print(f"   Caché:                {stats}")
+
+        ok = [verdict_tuple(v) for v in with_cache] == [verdict_tuple(v) for v in without_cache]
+        print(f"   {'✅' if ok else '❌'} Veredictos idénticos con y sin caché")
+        print(f"   {'✅' if inferred['events'] == len(LINES) else '❌'} Un solo análisis por payload distinto")
+    print()
+
+
+async def test_invalidation():
+    """Cambiar umbral o modelo invalida la caché"""
+    print("=" * 70)
+    print("TEST 2: INVALIDACIÓN")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "brain.joblib")
+        agent = NemesisAgent(model_path=model_path)
+        train_model(agent, model_path)
+        agent._load_ai_brain()
+
+        line = LINES[2].format(i=1)
+        await agent.process_log_line(line)
+        print(f"   Entradas tras analizar: {agent.cache_stats['size']}")
+
+        agent.threshold = 0.99
+        ok = agent.cache_stats['size'] == 0
+        print(f"   {'✅' if ok else '❌'} Nuevo umbral vacía la caché")
+
+        await agent.process_log_line(line)
+        agent._load_ai_brain()
+        ok = agent.cache_stats['size'] == 0
+        print(f"   {'✅' if ok else '❌'} Nuevo modelo vacía la caché")
+
+        verdict = await agent.process_log_line(line)
+        print(f"   {'✅' if verdict.is_malicious else '❌'} Veredicto recalculado tras invalidar")
+    print()
+
+
+def test_bounded():
+    """La caché respeta su tamaño máximo (LRU)"""
+    print("=" * 70)
+    print("TEST 3: LÍMITE DE MEMORIA")
+    print("=" * 70)
+
+    cache = VerdictCache(max_entries=100, max_payload_length=64)
+    for i in range(1000):
+        cache.put(1, f"/p{i}", (False, 1.0, "BENIGN", "ALLOW"))
+        cache.get(1, "/p0")  # /p0 se usa siempre: no debe expulsarse
+
+    cache.put(1, "x" * 65, (True, 0.8, "XSS", "BLOCK"))
+
+    stats = cache.stats
+    print(f"   Caché: {stats}")
+    print(f"   {'✅' if len(cache) == 100 else '❌'} Tamaño acotado")
+    print(f"   {'✅' if cache.get(1, '/p0') else '❌'} Entrada usada recientemente se conserva")
+    print(f"   {'✅' if cache.get(1, 'x' * 65) is None else '❌'} Payloads largos no se cachean")
+    print()
+
+
+async def test_throughput():
+    """Throughput con tráfico muy repetitivo"""
+    print("=" * 70)
+    print("TEST 4: THROUGHPUT")
+    print("=" * 70)
+
+    logging.getLogger("core.nemesis_agent").setLevel(logging.ERROR)
+
+    lines = [t.format(i=i % 250) for i in range(5000) for t in LINES[:2]]
+
+    rates = {}
+    for size in (0, VerdictCache.MAX_ENTRIES):
+        agent = NemesisAgent(verdict_cache_size=size)
+        start = time.perf_counter()
+        for i in range(0, len(lines), 256):
+            await agent.process_log_lines(lines[i:i + 256])
+        rates[size] = len(lines) / (time.perf_counter() - start)
+
+    print(f"   Sin caché: {rates[0]:10.0f} líneas/s")
+    print(f"   Con caché: {rates[VerdictCache.MAX_ENTRIES]:10.0f} líneas/s")
+    print()
+
+
+async def test_realistic_traffic():
+    """Tráfico real: health checks, estáticos y sondas repetidas entre valores únicos"""
+    print("=" * 70)
+    print("TEST 5: TRÁFICO REPETIDO REALISTA")
+    print("=" * 70)
+
+    logging.getLogger("core.nemesis_agent").setLevel(logging.ERROR)
+
+    repeated = (
+        ["/health"] * 8
+        + ["/static/app.js?v=3f2a1c", "/static/style.css?v=3f2a1c", "/favicon.ico", "/img/logo.png"] * 3
+        + ["/.env", "/wp-login.php", "/admin/config.php", "/login?user=admin' OR '1'='1'--",
+           "/search?q=<script>alert(1)</script>", "/../../etc/passwd"]
+    )
+    paths = []
+    for i in range(4000):
+        if i % 7 == 3:
+            paths.append(f"/api/items?_={1764842400000 + i * 137}")  # Cache buster
+        elif i % 7 == 5:
+            paths.append(f"/cart?session={i * 7919 % 100003:06x}")
+        else:
+            paths.append(repeated[i * 31 % len(repeated)])
+    lines = [
+        f'10.{i % 3}.{i % 97}.{i % 251} - - [04/Dec/2025:10:{i // 60 % 60:02d}:{i % 60:02d}] '
+        f'"GET {path} HTTP/1.1" 200'
+        for i, path in enumerate(paths)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "brain.joblib")
+        cached = NemesisAgent(model_path=model_path)
+        train_model(cached, model_path)
+        cached._load_ai_brain()
+
+        plain = NemesisAgent(model_path=model_path, verdict_cache_size=0)
+        plain._load_ai_brain()
+
+        with_cache = []
+        without_cache = []
+        for i in range(0, len(lines), 256):
+            with_cache += await cached.process_log_lines(lines[i:i + 256])
+            without_cache += await plain.process_log_lines(lines[i:i + 256])
+
+        stats = cached.cache_stats
+        unique = sum(1 for p in paths if "?_=" in p or "session=" in p)
+        expected_misses = unique + len(set(repeated))
+        print(f"   Líneas: {len(lines)} ({unique} con valores únicos)")
+        print(f"   Caché:  {stats['hits']} aciertos, {stats['misses']} fallos ({stats['hit_rate']:.1f}%)")
+
+        ok = [verdict_tuple(v) for v in with_cache] == [verdict_tuple(v) for v in without_cache]
+        print(f"   {'✅' if ok else '❌'} Veredictos idénticos con y sin caché")
+        ok = stats['misses'] == expected_misses  # El resto, aciertos o resueltas por el prefiltro
+        print(f"   {'✅' if ok else '❌'} Solo fallan la primera petición repetida y las de valores únicos")
+
+        # Mismo parámetro con un valor benigno y con una inyección: dos claves
+        probe = NemesisAgent(model_path=model_path)
+        probe._load_ai_brain()
+        pair = [
+            '10.0.0.1 - - [04/Dec/2025:10:00:00] "GET /login?user=admin HTTP/1.1" 200',
+            '10.0.0.1 - - [04/Dec/2025:10:00:01] "GET /login?user=admin\' OR \'1\'=\'1\'-- HTTP/1.1" 200',
+        ]
+        verdicts = await probe.process_log_lines(pair)
+        expected = await plain.process_log_lines(pair)
+        ok = probe.cache_stats['size'] == 2
+        ok = ok and [verdict_tuple(v) for v in verdicts] == [verdict_tuple(v) for v in expected]
+        print(f"   {'✅' if ok else '❌'} Un valor inyectado no comparte veredicto con el benigno")
+    print()
+
+
+async def main():
+    print()
+    print("╔" + "═" * 68 + "╗")
+    print("║" + " " * 20 + "CACHÉ DE VEREDICTOS - TESTS" + " " * 21 + "║")
+    print("╚" + "═" * 68 + "╝")
+    print()
+
+    await test_repeated_payloads()
+    await test_invalidation()
+    test_bounded()
+    await test_throughput()
+    await test_realistic_traffic()
+
+    print("=" * 70)
+    print("✅ TODOS LOS TESTS COMPLETADOS")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Test del pool de detección multiproceso particionado por IP
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+sys.path.insert(0, 'src')
+
+from core.nemesis_agent import NemesisAgent
+from core.worker_pool import DetectionWorkerPool
+from logs.log_parser import LogParser
+from logs.log_sentinel import LogSentinel
+
+
+NORMAL = '10.0.{a}.{b} - - [04/Dec/2025:10:00:00] "GET /products?page={i} HTTP/1.1" 200 512'
+ATTACK = '10.1.{a}.{b} - - [04/Dec/2025:10:00:00] "GET /search?q=<script>alert({i})</script> HTTP/1.1" 403 0'
+
+
+def make_lines(n):
+    return [
+        (ATTACK if i % 7 == 0 else NORMAL).format(a=i // 256 % 256, b=i % 256, i=i)
+        for i in range(n)
+    ]
+
+
+async def test_verdicts_match():
+    """Mismos veredictos y mismo orden que el agente en proceso"""
+    print("=" * 70)
+    print("TEST 1: VEREDICTOS IGUALES AL AGENTE EN PROCESO")
+    print("=" * 70)
+
+    parser = LogParser()
+    events = [parser.parse(line) for line in make_lines(500)]
+    events[3] = None
+
+    expected = await NemesisAgent().analyze_events(events)
+
+    with DetectionWorkerPool(workers=3) as pool:
+        verdicts = await pool.process_events(events)
+        stats = pool.stats
+
+    ok = [
+        (v.is_malicious, v.attack_type) if v else None for v in verdicts
+    ] == [
+        (v.is_malicious, v.attack_type) if v else None for v in expected
+    ]
+    print(f"   Eventos por worker: {stats['events_per_worker']}")
+    print(f"   {'✅' if ok else '❌'} Veredictos alineados con los eventos")
+    ok = all(n > 0 for n in stats['events_per_worker']) and sum(stats['events_per_worker']) == 499
+    print(f"   {'✅' if ok else '❌'} Eventos repartidos entre los 3 workers")
+    print()
+
+
+async def test_ip_affinity():
+    """Una IP siempre va al mismo worker (estado por IP local)"""
+    print("=" * 70)
+    print("TEST 2: AFINIDAD POR IP")
+    print("=" * 70)
+
+    parser = LogParser()
+    attack = parser.parse(ATTACK.format(a=9, b=9, i=1))
+
+    with DetectionWorkerPool(workers=4) as pool:
+        shards = {pool.shard_for(attack.source_ip) for _ in range(10)}
+        print(f"   Shard de {attack.source_ip}: {shards}")
+        print(f"   {'✅' if len(shards) == 1 else '❌'} Shard estable")
+
+        before = await pool.process_event(attack)
+        pool.add_to_whitelist(attack.source_ip)
+        after = await pool.process_event(attack)
+
+        ok = before.is_malicious and after is None
+        print(f"   {'✅' if ok else '❌'} Whitelist aplicada en el worker dueño de la IP")
+    print()
+
+
+async def test_sentinel_with_pool():
+    """El centinela persiste y cuenta los veredictos del pool"""
+    print("=" * 70)
+    print("TEST 3: CENTINELA CON POOL")
+    print("=" * 70)
+
+    lines = make_lines(2000)
+    attacks = sum(1 for i in range(len(lines)) if i % 7 == 0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = os.path.join(tmp, "access.log")
+        with open(log_file, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+
+        results = {}
+        for workers in (1, 2):
+            with DetectionWorkerPool(workers=workers) as pool:
+                sentinel = LogSentinel(
+                    NemesisAgent(), log_file, follow=False,
+                    workers=2 * workers, batch_size=256, worker_pool=pool
+                )
+                started = time.perf_counter()
+                await sentinel.start()
+                elapsed = time.perf_counter() - started
+
+            results[workers] = sentinel.stats["threats_detected"]
+            print(f"   {workers} proceso(s): {len(lines) / elapsed:,.0f} líneas/s, "
+                  f"{results[workers]} amenazas")
+
+        print(f"   CPUs disponibles: {os.cpu_count()}")
+        ok = results[1] == results[2] == attacks
+        print(f"   {'✅' if ok else '❌'} Todas las amenazas llegan al centinela")
+    print()
+
+
+async def test_shared_model():
+    """Los workers mapean el mismo modelo compilado"""
+    print("=" * 70)
+    print("TEST 4: MODELO COMPARTIDO ENTRE WORKERS")
+    print("=" * 70)
+
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier
+    from ml.compiled_forest import compiled_path
+
+    parser = LogParser()
+    events = [parser.parse(line) for line in make_lines(700)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "brain.joblib")
+
+        agent = NemesisAgent(model_path=model_path)
+        X = [agent._extract_features(e) for e in events]
+        y = [int(e.status_code == 403) for e in events]
+        joblib.dump(RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y), model_path)
+
+        agent._load_ai_brain()
+        expected = await agent.analyze_events(events)
+
+        with DetectionWorkerPool(workers=2, model_path=model_path) as pool:
+            verdicts = await pool.process_events(events)
+            memory = pool.stats["worker_memory"]
+
+        for info in memory:
+            print(f"   Worker {info['pid']}: {info['format']}, {info['load_ms']:.1f} ms, "
+                  f"RSS {info['rss_mb']:.1f} MB ({info['shared_mb']:.1f} MB compartidos)")
+
+        print(f"   {'✅' if compiled_path(model_path).exists() else '❌'} Modelo compilado una vez al arrancar el pool")
+        ok = all(info['format'] == "compiled-mmap" for info in memory)
+        print(f"   {'✅' if ok else '❌'} Cada worker lo mapea en memoria y reporta su carga")
+        ok = [v.confidence for v in verdicts] == [v.confidence for v in expected]
+        print(f"   {'✅' if ok else '❌'} Mismas confianzas que el modelo joblib en proceso")
+    print()
+
+
+async def test_reload_without_pausing():
+    """reload_model no bloquea el bucle de eventos"""
+    print("=" * 70)
+    print("TEST 5: RECARGA DEL MODELO EN LOS WORKERS")
+    print("=" * 70)
+
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier
+
+    parser = LogParser()
+    events = [parser.parse(line) for line in make_lines(700)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path_a = os.path.join(tmp, "brain_a.joblib")
+        path_b = os.path.join(tmp, "brain_b.joblib")
+
+        agent = NemesisAgent()
+        X = [agent._extract_features(e) for e in events]
+        y = [int(e.status_code == 403) for e in events]
+        joblib.dump(RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y), path_a)
+        joblib.dump(RandomForestClassifier(n_estimators=20, random_state=1).fit(X, y), path_b)
+
+        with DetectionWorkerPool(workers=2, model_path=path_a) as pool:
+            await pool.process_events(events)
+
+            start = time.perf_counter()
+            future = pool.reload_model(path_b)
+            call_ms = (time.perf_counter() - start) * 1000
+
+            batches = 0
+            while not future.done():
+                await pool.process_events(events[:50])
+                batches += 1
+            future.result()
+
+            deadline = time.monotonic() + 20
+            while time.monotonic() < deadline:
+                stats = pool.reload_stats
+                if all(s['swaps'] + s['rejected'] for s in stats):
+                    break
+                await asyncio.sleep(0.05)
+
+        print(f"   reload_model: {call_ms:.1f} ms en el bucle, {batches} lotes durante la recarga")
+        ok = call_ms < 50 and all(s['swaps'] == 1 for s in stats)
+        print(f"   {'✅' if ok else '❌'} Devuelve un Future al instante y los workers cambian de modelo")
+    print()
+
+
+async def test_lazy_start():
+    """El primer lote arranca el pool sin detener el bucle de eventos"""
+    print("=" * 70)
+    print("TEST 6: ARRANQUE PEREZOSO Y ESTADÍSTICAS")
+    print("=" * 70)
+
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier
+
+    parser = LogParser()
+    events = [parser.parse(line) for line in make_lines(200)]
+
+    tmp = tempfile.TemporaryDirectory()
+    model_path = os.path.join(tmp.name, "brain.joblib")
+    agent = NemesisAgent()
+    X = [agent._extract_features(e) for e in events]
+    y = [int(e.status_code == 403) for e in events]
+    joblib.dump(RandomForestClassifier(n_estimators=100, random_state=0).fit(X, y), model_path)
+
+    # Con modelo, el arranque lo compila y lo carga en cada worker
+    pool = DetectionWorkerPool(workers=2, model_path=model_path)
+    try:
+        threads = []
+        start_pool = pool.start
+        pool.start = lambda: threads.append(threading.current_thread()) or start_pool()
+
+        start = time.perf_counter()
+        verdicts = await pool.process_events(events)
+        elapsed = time.perf_counter() - start
+
+        print(f"   Primer lote en {elapsed * 1000:.0f} ms (arranque incluido)")
+        ok = len(verdicts) == len(events) and threads and threading.main_thread() not in threads
+        print(f"   {'✅' if ok else '❌'} Los procesos arrancan en un hilo, fuera del bucle de eventos")
+
+        agent = NemesisAgent(model_path=model_path)
+        agent._load_ai_brain()
+        await agent.process_events(events)
+        ok = isinstance(pool.cache_stats, dict) and set(pool.cache_stats) == set(agent.cache_stats)
+        ok = ok and pool.cache_stats["hits"] + pool.cache_stats["misses"] > 0
+        ok = ok and pool.prefilter_stats == agent.prefilter_stats == {}
+        print(f"   {'✅' if ok else '❌'} cache_stats y prefilter_stats son propiedades, como en el agente")
+    finally:
+        pool.close()
+        tmp.cleanup()
+    print()
+
+
+async def main():
+    print()
+    print("╔" + "═" * 68 + "╗")
+    print("║" + " " * 16 + "POOL DE DETECCIÓN POR IP - TESTS" + " " * 20 + "║")
+    print("╚" + "═" * 68 + "╝")
+    print()
+
+    # Los workers registran cada amenaza; aquí solo interesan los resultados
+    logging.getLogger().setLevel(logging.ERROR)
+
+    await test_verdicts_match()
+    await test_ip_affinity()
+    await test_sentinel_with_pool()
+    await test_shared_model()
+    await test_reload_without_pausing()
+    await test_lazy_start()
+
+    print("=" * 70)
+    print("✅ TODOS LOS TESTS COMPLETADOS")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Test de la persistencia write-behind (escrituras por lotes en WAL)
+"""
+
+import logging
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+sys.path.insert(0, 'src')
+
+from database.threat_database import ThreatDatabase, ThreatRecord
+from database.write_behind import WriteBehindQueue
+
+
+ATTACKS = ["SQL_INJECTION", "XSS", "PATH_TRAVERSAL", "COMMAND_INJECTION", "PORT_SCAN"]
+
+
+def make_threats(n, start=datetime(2025, 12, 4, 23, 0, 0)):
+    return [
+        ThreatRecord(
+            None, start + timedelta(seconds=i * 0.5), f"10.0.{i % 7}.{i % 50}",
+            ATTACKS[i % len(ATTACKS)], f"/login?id={i}' OR 1=1--", 0.95, "BLOCK", True
+        )
+        for i in range(n)
+    ]
+
+
+def tables(db_path):
+    conn = sqlite3.connect(db_path)
+    result = {
+        "threats": conn.execute(
+            "SELECT timestamp, source_ip, attack_type, payload FROM threats ORDER BY id"
+        ).fetchall(),
+        "blocked": conn.execute(
+            "SELECT ip, reason, threat_count FROM blocked_ips ORDER BY ip"
+        ).fetchall(),
+        "daily": conn.execute("SELECT * FROM daily_stats ORDER BY date").fetchall(),
+    }
+    conn.close()
+    return result
+
+
+def write_all(database, threats):
+    for threat in threats:
+        database.save_threat(threat)
+        database.block_ip(threat.source_ip, f"{threat.attack_type} attack")
+
+
+def test_same_result():
+    """Mismo contenido que las escrituras directas"""
+    print("=" * 70)
+    print("TEST 1: MISMO RESULTADO QUE ThreatDatabase")
+    print("=" * 70)
+
+    # Ráfaga que cruza la medianoche: dos filas en daily_stats
+    threats = make_threats(10000)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        direct_path = os.path.join(tmp, "direct.db")
+        direct = ThreatDatabase(direct_path)
+        direct.save_threats(threats)
+        for threat in threats:
+            direct.block_ip(threat.source_ip, f"{threat.attack_type} attack")
+        direct.close()
+
+        queued_path = os.path.join(tmp, "queued.db")
+        queue = WriteBehindQueue(ThreatDatabase(queued_path), max_rows=1000, max_delay_ms=20)
+        write_all(queue, threats)
+        queue.close()
+
+        expected, actual = tables(direct_path), tables(queued_path)
+        for name in ("threats", "blocked", "daily"):
+            ok = expected[name] == actual[name]
+            print(f"   {'✅' if ok else '❌'} {name}: {len(actual[name])} filas idénticas")
+
+        stats = queue.stats
+        print(f"   {stats['flushes']} transacciones para {stats['rows_written']} filas "
+              f"({stats['rows_per_flush']:.0f} filas/lote)")
+    print()
+
+
+def test_flush_triggers():
+    """Volcado por número de filas, por tiempo y bajo demanda"""
+    print("=" * 70)
+    print("TEST 2: DISPAROS DEL VOLCADO")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "nemesis.db")
+        database = ThreatDatabase(db_path)
+
+        queue = WriteBehindQueue(database, max_rows=100, max_delay_ms=60000)
+        queue.save_threats(make_threats(90))
+        time.sleep(0.2)
+        waiting = queue.pending
+        queue.save_threats(make_threats(160))
+        time.sleep(0.2)
+        ok = waiting == 90 and queue.stats["threats_written"] == 250 and queue.pending == 0
+        print(f"   {'✅' if ok else '❌'} Al llegar a 100 filas: {waiting} en espera, luego "
+              f"{queue.stats['threats_written']} escritas en {queue.stats['flushes']} transacción")
+
+        ok = queue.flush(timeout=5) and len(queue.get_threats(limit=1000)) == 250
+        print(f"   {'✅' if ok else '❌'} flush() deja todo visible para las lecturas")
+        queue.close()
+
+        queue = WriteBehindQueue(database, max_rows=100000, max_delay_ms=30)
+        queue.save_threats(make_threats(10))
+        visible_now = len(queue.get_threats(limit=1000))
+        time.sleep(0.3)
+        visible_later = len(queue.get_threats(limit=1000))
+        ok = visible_now == 250 and visible_later == 260
+        print(f"   {'✅' if ok else '❌'} Cada 30 ms sin llegar al tamaño de lote ({visible_now} -> {visible_later})")
+
+        mode = database.conn.execute("PRAGMA journal_mode").fetchone()[0]
+        print(f"   {'✅' if mode == 'wal' else '❌'} Modo {mode}")
+
+        queue.close()
+        try:
+            queue.block_ip("10.0.0.1", "late")
+            ok = False
+        except RuntimeError:
+            ok = True
+        print(f"   {'✅' if ok else '❌'} Escribir tras close() falla en vez de perderse")
+        database.close()
+    print()
+
+
+def test_throughput():
+    """Decenas de miles de amenazas por segundo"""
+    print("=" * 70)
+    print("TEST 3: THROUGHPUT SOSTENIDO")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        direct = ThreatDatabase(os.path.join(tmp, "direct.db"))
+        threats = make_threats(1000)
+        start = time.perf_counter()
+        write_all(direct, threats)
+        direct_rate = len(threats) / (time.perf_counter() - start)
+        direct.close()
+
+        queue = WriteBehindQueue(ThreatDatabase(os.path.join(tmp, "queued.db")))
+        threats = make_threats(100000)
+        start = time.perf_counter()
+        write_all(queue, threats)
+        queue.flush()
+        queued_rate = len(threats) / (time.perf_counter() - start)
+        queue.close()
+
+        print(f"   Directo: {direct_rate:,.0f} amenazas/s | write-behind: {queued_rate:,.0f} amenazas/s "
+              f"(x{queued_rate / direct_rate:.0f})")
+        print(f"   {'✅' if queued_rate > 20000 else '❌'} Más de 20.000 amenazas/s (con su block_ip)")
+    print()
+
+
+def test_flush_on_exit():
+    """Lo pendiente se vuelca al salir del proceso"""
+    print("=" * 70)
+    print("TEST 4: VOLCADO AL SALIR")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "nemesis.db")
+        script = (
+            "import sys; sys.path.insert(0, 'src')\n"
+            "from test_write_behind import make_threats, write_all\n"
+            "from database import ThreatDatabase, WriteBehindQueue\n"
+            f"queue = WriteBehindQueue(ThreatDatabase({db_path!r}), max_rows=10**6, max_delay_ms=60000)\n"
+            "write_all(queue, make_threats(3000))\n"
+        )
+        subprocess.run([sys.executable, "-c", script], check=True)
+
+        result = tables(db_path)
+        ok = len(result["threats"]) == 3000 and sum(row[2] for row in result["blocked"]) == 3000
+        print(f"   {'✅' if ok else '❌'} Proceso terminado sin close(): {len(result['threats'])} amenazas en disco")
+    print()
+
+
+def main():
+    print("""
+╔═══════════════════════════════════════════════════════════════════╗
+║                                                                   ║
+║             🧪 TEST DE PERSISTENCIA WRITE-BEHIND 🧪                ║
+║                                                                   ║
+╚═══════════════════════════════════════════════════════════════════╝
+    """)
+
+    logging.getLogger().setLevel(logging.ERROR)
+
+    test_same_result()
+    test_flush_triggers()
+    test_throughput()
+    test_flush_on_exit()
+
+    print("=" * 70)
+    print("✅ TODOS LOS TESTS COMPLETADOS")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()